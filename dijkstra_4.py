@@ -1,6 +1,6 @@
 #!/usr/bin/python3
 #
-#  Copyright (C) 2015-2019 Sustainable Energy Now Inc., Angus King
+#  Copyright (C) 2015-2026 Sustainable Energy Now Inc., Angus King
 #
 #  djikstra_4.py - This file is part of SIREN.
 #
@@ -23,247 +23,199 @@
 #  remains with them.
 #  http://www.bogotobogo.com/python/files/Dijkstra/Dijkstra_shortest_path.py
 
-import sys
 import heapq
 from math import sin, cos, asin, sqrt, radians
+import numpy as np
 
 RADIUS = 6367.   # radius of earth in km
 
 
-class Vertex:
-    def __init__(self, node):
-        self.id = node
-        self.adjacent = {}
-         # Set distance to infinity for all nodes
-        self.distance = float(sys.maxsize)
-         # Mark all nodes unvisited
-        self.visited = False
-         # Predecessor
-        self.previous = None
-
-    # defining comparators less_than and equals
-    # clued from https://stackoverflow.com/questions/47912064/typeerror-not-supported-between-instances-of-heapnode-and-heapnode
-    def __lt__(self, other):
-        return self.distance < other.distance
-
-    def add_neighbor(self, neighbor, weight=0):
-        self.adjacent[neighbor] = weight
-
-    def get_connections(self):
-        return list(self.adjacent.keys())
-
-    def get_id(self):
-        return self.id
-
-    def get_weight(self, neighbor):
-        return self.adjacent[neighbor]
-
-    def set_distance(self, dist):
-        self.distance = dist
-        return
-
-    def get_distance(self):
-        return self.distance
-
-    def set_previous(self, prev):
-        self.previous = prev
-
-    def set_visited(self):
-        self.visited = True
-
-#    def __str__(self):
-#        return str(self.id) + ' adjacent: ' + str([x.id for x in self.adjacent])
-
-
-class Graph:
+def Distance(y1, x1, y2, x2):
+# find the differences between the coordinates
+    dy = y2 - y1
+    dx = x2 - x1
+    ra13 = pow(sin(dy / 2.), 2) + cos(y1) * cos(y2) * pow(sin(dx / 2.), 2)
+    return 2 * asin(min(1, sqrt(ra13)))
+
+def actualDistance(y1d, x1d, y2d, x2d):
+    x1 = radians(x1d)
+    y1 = radians(y1d)
+    x2 = radians(x2d)
+    y2 = radians(y2d)
+    dst = Distance(y1, x1, y2, x2)
+    return round(abs(dst) * RADIUS, 2)
+
+
+class Network:
+    # The grid lines as a graph with an integer id for each coordinate. Lines added to
+    # the end of the list are added to the graph, otherwise it's rebuilt. The shortest
+    # paths to each target (load centre) are kept and updated as edges are added
     def __init__(self):
-        self.vert_dict = {}
-        self.num_vertices = 0
-
-    def __iter__(self):
-        return iter(list(self.vert_dict.values()))
-
-    def add_vertex(self, node):
-        self.num_vertices = self.num_vertices + 1
-        new_vertex = Vertex(node)
-        self.vert_dict[node] = new_vertex
-        return new_vertex
-
-    def get_vertex(self, n):
-        if n in self.vert_dict:
-            return self.vert_dict[n]
-        else:
-            return None
-
-    def add_edge(self, frm, to, cost=0):
-        if frm not in self.vert_dict:
-            self.add_vertex(frm)
-        if to not in self.vert_dict:
-            self.add_vertex(to)
-        self.vert_dict[frm].add_neighbor(self.vert_dict[to], cost)
-        self.vert_dict[to].add_neighbor(self.vert_dict[frm], cost)
-
-    def get_vertices(self):
-        return list(self.vert_dict.keys())
-
-    def set_previous(self, current):
-        self.previous = current
-
-    def get_previous(self, current):
-        return self.previous
-
-
-def shortest(v, path):
-    ''' make shortest path from v.previous'''
-    if v.previous:
-        path.append(v.previous.get_id())
-        shortest(v.previous, path)
-    return
-
-
-def dijkstra(aGraph, start):
-   #  print '''Dijkstra's shortest path'''
-     # Set the distance for the start node to zero
-    start.set_distance(0)
-
-     # Put tuple pair into the priority queue
-    unvisited_queue = [(v.get_distance(), v) for v in aGraph]
-    heapq.heapify(unvisited_queue)
-
-    while len(unvisited_queue):
-         # Pops a vertex with the smallest distance
-        uv = heapq.heappop(unvisited_queue)
-        current = uv[1]
-        current.set_visited()
-
-        for next in current.adjacent:
-             # if visited, skip
-            if next.visited:
+        self.lines = None
+        self.grid = None
+        self.signature = []
+        self.reset()
+
+    def reset(self):
+        self.vertices = {} # (lat, lon): id
+        self.coords = [] # id: [lat, lon]
+        self.adjacent = [] # id: {id: [distance, line]}
+        self.ends = [] # new lines (after the grid lines)
+        self.seg_line = np.zeros(0, dtype=np.int64)
+        self.seg_a = np.zeros((0, 2), dtype=np.float64)
+        self.seg_b = np.zeros((0, 2), dtype=np.float64)
+        self.trees = {} # target id: [distances, previous, queue]
+
+    def update(self, lines, grid):
+        signature = [(id(line), id(line.coordinates), len(line.coordinates)) for line in lines]
+        if lines is not self.lines or grid != self.grid \
+          or signature[:len(self.signature)] != self.signature:
+            self.lines = lines
+            self.grid = grid
+            self.signature = []
+            self.reset()
+        for li in range(len(self.signature), len(lines)):
+            self.addLine(li)
+        self.signature = signature
+
+    def vertex(self, coordinate):
+        key = (float(coordinate[0]), float(coordinate[1]))
+        try:
+            return self.vertices[key]
+        except KeyError:
+            pass
+        self.vertices[key] = len(self.coords)
+        self.coords.append([key[0], key[1]])
+        self.adjacent.append({})
+        return self.vertices[key]
+
+    def addEdge(self, frm, to, cost, line):
+        if frm == to:
+            return
+        old = self.adjacent[frm].get(to)
+        self.adjacent[frm][to] = [cost, line]
+        self.adjacent[to][frm] = [cost, line]
+        if old is not None and cost > old[0]: # paths may be longer so start again
+            self.trees = {}
+            return
+        for distance, previous, queue in self.trees.values():
+            for u, v in [[frm, to], [to, frm]]:
+                if u in distance and distance[u] + cost < distance.get(v, float('inf')):
+                    distance[v] = distance[u] + cost
+                    previous[v] = u
+                    heapq.heappush(queue, (distance[v], v))
+
+    def addLine(self, li):
+        coordinates = self.lines[li].coordinates
+        if len(coordinates) == 0:
+            return
+        vert1 = self.vertex(coordinates[0])
+        for pt in range(1, len(coordinates)):
+            vert2 = self.vertex(coordinates[pt])
+            dist = actualDistance(coordinates[pt][0], coordinates[pt][1],
+                   coordinates[pt - 1][0], coordinates[pt - 1][1])
+            self.addEdge(vert1, vert2, dist, li)
+            vert1 = vert2
+        first = len(self.seg_line)
+        if len(coordinates) > 1:
+            points = np.array([[float(c[0]), float(c[1])] for c in coordinates], dtype=np.float64)
+            self.seg_line = np.concatenate((self.seg_line, np.full(len(points) - 1, li, dtype=np.int64)))
+            self.seg_a = np.concatenate((self.seg_a, points[:-1]))
+            self.seg_b = np.concatenate((self.seg_b, points[1:]))
+        # join the end of new lines to lines they finish on
+        if li >= self.grid:
+            self.joinEnd(li, 0, first)
+        for lj in self.ends:
+            self.joinEnd(lj, first, len(self.seg_line))
+        if li >= self.grid:
+            self.ends.append(li)
+
+    def joinEnd(self, li, frm, to):
+        # join the end of line li to the first segment it lies on of each other line in segments frm to to
+        end = self.lines[li].coordinates[-1]
+        c = (float(end[0]), float(end[1]))
+        a = self.seg_a[frm:to]
+        b = self.seg_b[frm:to]
+        cross = (c[1] - a[:, 1]) * (b[:, 0] - a[:, 0]) - (c[0] - a[:, 0]) * (b[:, 1] - a[:, 1])
+        dot = (c[0] - a[:, 0]) * (b[:, 0] - a[:, 0]) + (c[1] - a[:, 1]) * (b[:, 1] - a[:, 1])
+        squared = (b[:, 0] - a[:, 0]) * (b[:, 0] - a[:, 0]) + (b[:, 1] - a[:, 1]) * (b[:, 1] - a[:, 1])
+        ok = (np.abs(cross) <= 0.0001) & (dot >= 0) & (dot <= squared) & (self.seg_line[frm:to] != li)
+        ok &= ~(((a[:, 0] == c[0]) & (a[:, 1] == c[1])) | ((b[:, 0] == c[0]) & (b[:, 1] == c[1])))
+        segments = np.nonzero(ok)[0]
+        l2s, first = np.unique(self.seg_line[frm:to][segments], return_index=True)
+        vert2 = self.vertex(end)
+        for l2, s in zip(l2s.tolist(), segments[first].tolist()):
+            for pt in [a[s], b[s]]:
+                dist = actualDistance(pt[0], pt[1], c[0], c[1])
+                self.addEdge(self.vertex(pt), vert2, dist, l2)
+
+    def tree(self, target):
+        # shortest distances and paths from every vertex to target
+        if target not in self.trees:
+            self.trees[target] = [{target: 0.}, {}, [(0., target)]]
+        distance, previous, queue = self.trees[target]
+        while queue:
+            dist, u = heapq.heappop(queue)
+            if dist > distance[u]:
                 continue
-            new_dist = current.get_distance() + current.get_weight(next)
-
-            if new_dist < next.get_distance():
-                next.set_distance(new_dist)
-                next.set_previous(current)
-#                print 'updated : current = %s next = %s new_dist = %s' \
-#                        %(current.get_id(), next.get_id(), str(next.get_distance()))
-#            else:
-#                print 'not updated : current = %s next = %s new_dist = %s' \
-#                        %(current.get_id(), next.get_id(), str(next.get_distance()))
-
-         # Rebuild heap
-         # 1. Pop every item
-        while len(unvisited_queue):
-            heapq.heappop(unvisited_queue)
-         # 2. Put all vertices not visited into the queue
-        unvisited_queue = [(v.get_distance(), v) for v in aGraph if not v.visited]
-        heapq.heapify(unvisited_queue)
-    return
+            for v, edge in self.adjacent[u].items():
+                new_dist = dist + edge[0]
+                if new_dist < distance.get(v, float('inf')):
+                    distance[v] = new_dist
+                    previous[v] = u
+                    heapq.heappush(queue, (new_dist, v))
+        return distance, previous
+
+    def path(self, source, target):
+        # vertices from target back to source
+        key = (float(target[0]), float(target[1]))
+        if key not in self.vertices:
+            return []
+        vert1 = self.vertex(source)
+        vert2 = self.vertices[key]
+        distance, previous = self.tree(vert2)
+        if vert1 not in distance:
+            return [vert2]
+        path = [vert1]
+        while path[-1] != vert2:
+            path.append(previous[path[-1]])
+        path.reverse()
+        return path
+
+    def paths(self, sources, target):
+        # batch version of path() for a number of sources
+        return [self.path(source, target) for source in sources]
+
+
+# the graph for the lines last used
+network = Network()
 
 
 class Shortest:
-    def isBetween(self, a, b, c):
-        crossproduct = (c[1] - a[1]) * (b[0] - a[0]) - (c[0] - a[0]) * (b[1] - a[1])
-        if abs(crossproduct) > 0.0001:  # sys.float_info.epsilon:
-            return False    # (or != 0 if using integers)
-        dotproduct = (c[0] - a[0]) * (b[0] - a[0]) + (c[1] - a[1]) * (b[1] - a[1])
-        if dotproduct < 0:
-            return False
-        squaredlengthba = (b[0] - a[0]) * (b[0] - a[0]) + (b[1] - a[1]) * (b[1] - a[1])
-        if dotproduct > squaredlengthba:
-            return False
-        return True
-
-    def Distance(self, y1, x1, y2, x2):
-# find the differences between the coordinates
-        dy = y2 - y1
-        dx = x2 - x1
-        ra13 = pow(sin(dy / 2.), 2) + cos(y1) * cos(y2) * pow(sin(dx / 2.), 2)
-        return 2 * asin(min(1, sqrt(ra13)))
-
     def actualDistance(self, y1d, x1d, y2d, x2d):
-        x1 = radians(x1d)
-        y1 = radians(y1d)
-        x2 = radians(x2d)
-        y2 = radians(y2d)
-        dst = self.Distance(y1, x1, y2, x2)
-        return round(abs(dst) * RADIUS, 2)
+        return actualDistance(y1d, x1d, y2d, x2d)
 
     def __init__(self, lines, source, target, grid):
         self.source = source
         self.target = target
         self.lines = lines
         self.grid = grid # existing grid lines count
-        self.edges = {}
-        self.g = Graph()
-        for li in range(len(self.lines)):
-            vert1 = str(self.lines[li].coordinates[0])
-            for pt in range(1, len(self.lines[li].coordinates)):
-                vert2 = str(self.lines[li].coordinates[pt])
-                dist = self.actualDistance(self.lines[li].coordinates[pt][0], self.lines[li].coordinates[pt][1],
-                       self.lines[li].coordinates[pt - 1][0], self.lines[li].coordinates[pt - 1][1])
-                self.g.add_edge(vert1, vert2, dist)
-                self.edges[vert1 + vert2] = li
-                vert1 = vert2
-        for li in range(self.grid, len(self.lines)):
-            for l2 in range(len(self.lines)):
-                if li == l2:
-                    continue
-                for pt in range(1, len(self.lines[l2].coordinates)):
-                    if self.lines[l2].coordinates[pt - 1] == self.lines[li].coordinates[-1] or \
-                      self.lines[l2].coordinates[pt] == self.lines[li].coordinates[-1]:
-                        continue
-                    if self.isBetween(self.lines[l2].coordinates[pt - 1], self.lines[l2].coordinates[pt],
-                      self.lines[li].coordinates[-1]):
-                        dist = self.actualDistance(self.lines[l2].coordinates[pt - 1][0], self.lines[l2].coordinates[pt - 1][1],
-                               self.lines[li].coordinates[-1][0], self.lines[li].coordinates[-1][1])
-                        vert1 = str(self.lines[l2].coordinates[pt - 1])
-                        vert2 = str(self.lines[li].coordinates[-1])
-                        self.g.add_edge(vert1, vert2, dist)
-                        self.edges[vert1 + vert2] = l2
-                        dist = self.actualDistance(self.lines[l2].coordinates[pt][0], self.lines[l2].coordinates[pt][1],
-                               self.lines[li].coordinates[-1][0], self.lines[li].coordinates[-1][1])
-                        vert1 = str(self.lines[l2].coordinates[pt])
-                        vert2 = str(self.lines[li].coordinates[-1])
-                        self.g.add_edge(vert1, vert2, dist)
-                        self.edges[vert1 + vert2] = l2
-                        break
-     #    print 'Graph data:'
-      #   print 'source', self.source, 'target', self.target
-       #  for v in self.g:
-        #     for w in v.get_connections():
-         #        vid = v.get_id()
-          #       wid = w.get_id()
-           #      print '(%s ,%s, %s)'  % (vid, wid, str(v.get_weight(w)))
-        if self.g.get_vertex(str(self.source)) is None:
-            self.g.add_vertex(str(self.source))
-        dijkstra(self.g, self.g.get_vertex(str(self.source)))
-        target = self.g.get_vertex(str(self.target))
-        try:
-            self.path = [target.get_id()]
-            shortest(target, self.path)
-        except:
-            self.path = []
+        network.update(self.lines, self.grid)
+        self.network = network
+        self.path = network.path(self.source, self.target)
 
     def getPath(self):
         the_path = []
         for i in range(len(self.path)):
-            it = self.path[i].replace('[', '')
-            it = it.replace(']', '')
-            it = it.replace(' ', '')
-            bit = it.split(',')
-            the_path.append([float(bit[0]), float(bit[1])])
+            the_path.append(self.network.coords[self.path[i]][:])
         return the_path
 
     def getLines(self):
         the_lines = []
         for i in range(1, len(self.path)):
             try:
-                the_lines.append(self.edges[self.path[i - 1] + self.path[i]])
+                the_lines.append(self.network.adjacent[self.path[i - 1]][self.path[i]][1])
             except:
-                try:
-                    the_lines.append(self.edges[self.path[i] + self.path[i - 1]])
-                except:
-                    pass
+                pass
         the_lines = list(set(the_lines))
         return the_lines
@@ -0,0 +1,227 @@
+#!/usr/bin/python3
+#
+#  Copyright (C) 2026 Sustainable Energy Now Inc., Angus King
+#
+#  downloader.py - This file is part of SIREN.
+#
+#  SIREN is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as
+#  published by the Free Software Foundation, either version 3 of
+#  the License, or (at your option) any later version.
+#
+#  SIREN is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General
+#  Public License along with SIREN.  If not, see
+#  <http://www.gnu.org/licenses/>.
+#
+# Download manager for getmerra2 and getera5. Jobs, a target file and either a
+# url or a request for a fetch function, are kept in a manifest file so a run
+# that stops part way through continues where it stopped when run again. A few
+# jobs are run at a time. Urls are downloaded to a .part file which is resumed
+# with a range request if the server allows it and the job's url or request is
+# the same as when the .part file was started. Each file is checked when it
+# arrives, for size and by a verify function, and fetched again if it fails.
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import http.cookiejar
+import json
+import netrc
+import os
+import threading
+import urllib.error
+import urllib.request
+
+MANIFEST_VERSION = 1
+DOWNLOAD_WORKERS = 3
+DOWNLOAD_RETRIES = 3
+CHUNK = 1024 * 1024
+
+def netrcOpener():
+    # urllib opener using the logins in .netrc and keeping cookies, as needed for NASA Earthdata
+    password_manager = urllib.request.HTTPPasswordMgrWithDefaultRealm()
+    try:
+        logins = netrc.netrc()
+        for host in logins.hosts:
+            login, account, password = logins.authenticators(host)
+            password_manager.add_password(None, host, login, password)
+    except:
+        pass
+    return urllib.request.build_opener(urllib.request.HTTPBasicAuthHandler(password_manager),
+                                       urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+
+class DownloadManager():
+    def __init__(self, manifest, workers=DOWNLOAD_WORKERS, retries=DOWNLOAD_RETRIES, verify=None, fetch=None,
+                 opener=None, headers=None, timeout=300):
+        self.manifest = manifest
+        self.workers = max(int(workers), 1)
+        self.retries = max(int(retries), 1)
+        self.verify = verify # verify(target) returns '' if the file is ok otherwise why not
+        self.fetch = fetch # fetch(request, target) for jobs without a url; returns '' or an error
+        if opener is None:
+            opener = netrcOpener()
+        self.opener = opener
+        if headers is None:
+            headers = {}
+        self.headers = headers
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.verify_lock = threading.Lock() # netCDF reads aren't thread safe
+        self.jobs = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.manifest, 'r') as mf:
+                details = json.load(mf)
+            if details['version'] == MANIFEST_VERSION:
+                self.jobs = details['jobs']
+        except:
+            self.jobs = {}
+
+    def save(self):
+        # called with self.lock held
+        work_file = self.manifest + '.tmp'
+        try:
+            with open(work_file, 'w') as mf:
+                json.dump({'version': MANIFEST_VERSION, 'jobs': self.jobs}, mf, indent=1)
+            os.replace(work_file, self.manifest)
+        except:
+            try:
+                os.remove(work_file)
+            except:
+                pass
+
+    def complete(self, target):
+        # target has been downloaded and is unchanged since
+        job = self.jobs[target]
+        if job['status'] != 'done':
+            return False
+        try:
+            return os.path.getsize(target) == job['size']
+        except OSError:
+            return False
+
+    def add(self, target, url=None, request=None):
+        # add (or keep) a job; one already done for the same url or request is left as is.
+        # A partly downloaded file is only resumed for the same url or request
+        target = os.path.abspath(target)
+        with self.lock:
+            same = target in self.jobs and self.jobs[target]['url'] == url \
+                   and self.jobs[target]['request'] == request
+            if same and self.complete(target):
+                return
+            if not same:
+                try:
+                    os.remove(target + '.part')
+                except:
+                    pass
+            self.jobs[target] = {'url': url, 'request': request, 'status': 'pending', 'size': None,
+                                 'error': ''}
+            self.save()
+
+    def pending(self):
+        with self.lock:
+            return [target for target in self.jobs.keys() if not self.complete(target)]
+
+    def download(self, url, target):
+        part = target + '.part'
+        try:
+            have = os.path.getsize(part)
+        except OSError:
+            have = 0
+        request = urllib.request.Request(url, headers=self.headers)
+        if have > 0:
+            request.add_header('Range', f'bytes={have}-')
+        total = None
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                if response.status == 206:
+                    mode = 'ab'
+                    try:
+                        total = int(response.headers['Content-Range'].split('/')[-1])
+                    except:
+                        pass
+                else: # whole file
+                    mode = 'wb'
+                    have = 0
+                    try:
+                        total = int(response.headers['Content-Length'])
+                    except:
+                        pass
+                with open(part, mode) as pf:
+                    while True:
+                        chunk = response.read(CHUNK)
+                        if not chunk:
+                            break
+                        pf.write(chunk)
+                        have += len(chunk)
+        except urllib.error.HTTPError as err:
+            if err.code == 416: # range not satisfiable so start again
+                try:
+                    os.remove(part)
+                except:
+                    pass
+            return f'{os.path.basename(target)} failed: {err.code} {err.reason}'
+        except Exception as err: # the .part file is kept to resume from
+            return f'{os.path.basename(target)} failed: {err}'
+        if total is not None and have != total:
+            return f'{os.path.basename(target)} incomplete: {have:,} of {total:,} bytes'
+        os.replace(part, target)
+        return ''
+
+    def runJob(self, target):
+        job = self.jobs[target]
+        msg = ''
+        for attempt in range(self.retries):
+            if job['url'] is not None:
+                msg = self.download(job['url'], target)
+            else:
+                try:
+                    msg = self.fetch(job['request'], target)
+                    if msg is None:
+                        msg = ''
+                except Exception as err:
+                    msg = f'{os.path.basename(target)} failed: {err}'
+            if msg == '' and self.verify is not None:
+                with self.verify_lock:
+                    msg = self.verify(target)
+                if msg != '':
+                    try:
+                        os.remove(target)
+                    except:
+                        pass
+            if msg == '':
+                break
+        with self.lock:
+            if msg == '':
+                job['status'] = 'done'
+                job['size'] = os.path.getsize(target)
+                job['error'] = ''
+            else:
+                job['status'] = 'failed'
+                job['error'] = msg
+            self.save()
+        return msg
+
+    def run(self, progress=None):
+        # run outstanding jobs; progress(done, count, target, message) is called as each finishes.
+        # Returns the messages for jobs that failed
+        targets = self.pending()
+        errors = []
+        done = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {}
+            for target in targets:
+                futures[executor.submit(self.runJob, target)] = target
+            for future in as_completed(futures):
+                done += 1
+                msg = future.result()
+                if msg != '':
+                    errors.append(msg)
+                if progress is not None:
+                    progress(done, len(targets), futures[future], msg)
+        return errors
@@ -39,6 +39,7 @@ from colours import Colours, PlotPalette
 from credits import fileVersion
 from editini import EdtDialog, SaveIni
 from getmodels import getModelFile
+from plotcache import openPlotSheet
 from powerplot import MyQDialog, ChangeFontProp
 try:
     from senplot3d import TablePlot3D
@@ -215,6 +216,7 @@ class FlexiPlot(QtWidgets.QWidget):
         self.setup = [False, False, False]
         self.details = True
         self.book = None
+        self.book_file = ''
         self.rows = None
         self.leapyear = False
         iper = '<none>'
@@ -494,6 +496,7 @@ class FlexiPlot(QtWidgets.QWidget):
         self.step_fill = 'pre'
         self.step_where = True
         self.secondary_yaxis = False
+        self.sheet_cache = False
         config = configparser.RawConfigParser()
         config.read(self.config_file)
         try: # get defaults and list of files if any
@@ -560,6 +563,9 @@ class FlexiPlot(QtWidgets.QWidget):
                 elif key == 'secondary_yaxis':
                     if value.lower() in ['true', 'yes', 'on']:
                         self.secondary_yaxis = True
+                elif key == 'sheet_cache':
+                    if value.lower() in ['true', 'yes', 'on']:
+                        self.sheet_cache = True
                 elif key == 'sparse_ticks':
                     try:
                         self.sparse_ticks = [int(value)]
@@ -911,6 +917,7 @@ class FlexiPlot(QtWidgets.QWidget):
             try:
                 self.book = WorkBook()
                 self.book.open_workbook(ifile)
+                self.book_file = ifile
             except:
                 self.book = None
                 self.log.setText("Can't open file - " + ifile)
@@ -925,6 +932,10 @@ class FlexiPlot(QtWidgets.QWidget):
                 ndx = j
         self.sheet.setCurrentIndex(ndx)
 
+    def plotSheet(self, isheet):
+        # the worksheet as cached columns; read again if the file has changed
+        return openPlotSheet(self.book_file, isheet, disk=self.sheet_cache)
+
     def sheetChanged(self):
         self.log.setText('')
         if self.book is None:
@@ -986,7 +997,7 @@ class FlexiPlot(QtWidgets.QWidget):
 
     def setSeries(self, isheet, xseries='', yseries=[]):
         try:
-            ws = self.book.sheet_by_name(isheet)
+            ws = self.plotSheet(isheet)
         except:
             self.log.setText("Can't find sheet - " + isheet)
             return
@@ -1161,7 +1172,7 @@ class FlexiPlot(QtWidgets.QWidget):
         if isheet == '':
             self.log.setText('Sheet not set.')
             return
-        ws = self.book.sheet_by_name(isheet)
+        ws = self.plotSheet(isheet)
         x = []
         series = self.xseries.currentText()
         if series == '':
@@ -1516,7 +1527,7 @@ class FlexiPlot(QtWidgets.QWidget):
         titl = titl.replace('Diurnal ', '')
         titl = titl.replace('Diurnal', '')
         titl = titl.replace('$SHEET$', isheet)
-        ws = self.book.sheet_by_name(isheet)
+        ws = self.plotSheet(isheet)
         if self.plottype.currentText() == '3D Surface Chart':
             if html_3d:
                 saveit = self.file.text()[:self.file.text().rfind('.')] + '.html'
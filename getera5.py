@@ -32,6 +32,7 @@ import tempfile
 import zipfile
 
 from credits import fileVersion
+from downloader import DownloadManager, DOWNLOAD_WORKERS
 import displayobject
 from editini import SaveIni
 from getmodels import getModelFile
@@ -214,7 +215,7 @@ def retrieve_era5(ini_file, lat1, lat2, lon1, lon2, grd1, grd2, year, tgt_dir, l
     tgt_log = tgt_file[:tgt_file.rfind('.')] + '.log'
     if launch:
         parmstr = 'getera5,ini={},lat1={:.2f},lat2={:.2f},lon1={:.2f},lon2={:.2f},grd1={:.2f},grd2={:.2f},year={},tgt_dir={}'.format(
-                  ','.join(ini_file), lat1, lat2, lon1, lon2, grd1, grd2, year, tgt_dir)
+                  ini_file, lat1, lat2, lon1, lon2, grd1, grd2, year, tgt_dir)
         parms = parmstr.split(',')
         spawn(parms, tgt_dir + '/' + tgt_log)
         return 'Request for ' + tgt_file + ' launched.'
@@ -304,6 +305,54 @@ def retrieve_era5(ini_file, lat1, lat2, lon1, lon2, grd1, grd2, year, tgt_dir, l
                    tgt_dir + '/' + tgt_file)
 
 
+def download_era5(ini_file, lat1, lat2, lon1, lon2, grd1, grd2, years, tgt_dir, launch=False):
+    # retrieve a number of periods, a few at a time, with the download manager;
+    # launch runs it as a separate batch process
+    ini_file = getModelFile(ini_file)
+    config = configparser.RawConfigParser()
+    config.read(ini_file)
+    if launch:
+        log_file = 'era5_download_' + datetime.strftime(datetime.now(), '%Y-%m-%d_%H%M') + '.log'
+        parms = ['getera5', f'ini={ini_file}', f'lat1={lat1:.2f}', f'lat2={lat2:.2f}', f'lon1={lon1:.2f}',
+                 f'lon2={lon2:.2f}', f'grd1={grd1:.2f}', f'grd2={grd2:.2f}', f'tgt_dir={tgt_dir}']
+        for year in years:
+            parms.append(f'year={year}')
+        pid, msg = spawn(parms, tgt_dir + '/' + log_file)
+        if msg is not None:
+            return 'Download launch returned error: ' + str(msg)
+        return 'Request for ' + str(len(years)) + ' file(s) launched (logging to: ' + log_file + ')'
+    try:
+        workers = int(config.get('getera5', 'download_workers'))
+    except:
+        workers = DOWNLOAD_WORKERS
+    tgt_file = config.get('getera5', 'filename')
+
+    def fetch(request, target):
+        # None or the message from retrieve_era5
+        return retrieve_era5(ini_file, request['area'][0], request['area'][1], request['area'][2],
+                             request['area'][3], request['grid'][0], request['grid'][1], request['year'], tgt_dir)
+
+    def verify(target):
+        info = fileInfo(target)
+        if info.ok:
+            return ''
+        return info.log
+
+    def progress(done, count, target, msg):
+        if msg == '':
+            msg = os.path.basename(target) + ' retrieved'
+        print(f'{done} of {count}: {msg}', flush=True)
+
+    manager = DownloadManager(tgt_dir + '/.getera5.manifest.json', workers=workers, verify=verify, fetch=fetch)
+    for year in years:
+        request = {'year': year, 'area': [lat1, lat2, lon1, lon2], 'grid': [grd1, grd2]}
+        manager.add(tgt_dir + '/' + tgt_file.replace('$year$', year), request=request)
+    errors = manager.run(progress=progress)
+    if len(errors) > 0:
+        return str(len(errors)) + ' of ' + str(len(years)) + ' files failed. Run again to retry them.'
+    return str(len(years)) + ' file(s) retrieved.'
+
+
 class fileInfo:
     def get_info(self, cdf_file):
         try:
@@ -815,12 +864,19 @@ class getERA5(QtWidgets.QDialog):
 
     def getClicked(self):
         def get_file(year):
-            wgot = retrieve_era5(self.ini_file,
+            years.append(year)
+
+        def get_files():
+            if len(years) == 0:
+                return
+            wgot = download_era5(self.ini_file,
                                  self.northSpin.value(), self.southSpin.value(),
                                  self.westSpin.value(), self.eastSpin.value(),
                                  self.era5grid[0].value(), self.era5grid[1].value(),
-                                 year, self.tgt_dir.text(), True)
+                                 years, self.tgt_dir.text(), True)
             self.log.setText(wgot)
+
+        years = []
         try:
             filename = self.config.get('getera5', 'filename')
         except:
@@ -857,6 +913,7 @@ class getERA5(QtWidgets.QDialog):
         if self.retrieve_year and strt_period[:4] == stop_period[:4] and \
             strt_period[-2:] == '01' and stop_period[-2:] == '12':
             get_file(strt_period[:4])
+            get_files()
             return
         nxt_period = strt_period
         while nxt_period <= stop_period:
@@ -864,6 +921,7 @@ class getERA5(QtWidgets.QDialog):
             if not os.path.exists(self.tgt_dir.text() + '/' + the_file):
                 get_file(nxt_period)
             nxt_period = the_period(nxt_period, '+')
+        get_files()
         return
 
     def create_cdsapirc(self):
@@ -948,6 +1006,7 @@ if '__main__' == __name__:
         grd2 = 0.
         grd2_parms = ['grd2', 'grid1', 'longrid']
         year = ''
+        years = []
         year_parms = ['date', 'year']
         tgt_dir = os.getcwd()
         tgt_parms = ['tgt_dir', 'dir', 'folder', 'target']
@@ -1001,6 +1060,7 @@ if '__main__' == __name__:
                         errors.append(sys.argv[i])
                 elif argv[0] in year_parms:
                     year = argv[1]
+                    years.append(year)
                 elif argv[0] in tgt_parms:
                     tgt_dir = argv[1]
                     if not os.path.exists(tgt_dir):
@@ -1032,10 +1092,13 @@ if '__main__' == __name__:
                 grd1 = check[5]
                 grd2 = check[6]
                 year = check[7]
+                years = [year]
             else:
                 print(check[0])
                 sys.exit(4)
-        wgot = retrieve_era5(ini_file, lat1, lat2, lon1, lon2, grd1, grd2, year, tgt_dir)
+        if len(years) == 0:
+            years = [year]
+        print(download_era5(ini_file, lat1, lat2, lon1, lon2, grd1, grd2, years, tgt_dir))
         sys.exit()
     else:
         app = QtWidgets.QApplication(sys.argv)
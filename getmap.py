@@ -22,14 +22,16 @@
 from urllib3 import PoolManager
 import math
 import os
+import struct
 import sys
-import tempfile
+import zlib
 import configparser   # decode .ini file
 from PyQt5 import QtCore, QtGui, QtWidgets
 import displayobject
 from credits import fileVersion
 from getmodels import getModelFile
 from senutils import ClickableQLabel
+from tilefetch import TileFetcher, TILE_DAYS, TILE_MB, TILE_WORKERS
 import worldwindow
 
 scale = {0: '1:500 million', 1: '1:250 million', 2: '1:150 million', 3: '1:70 million',
@@ -39,6 +41,79 @@ scale = {0: '1:500 million', 1: '1:250 million', 2: '1:150 million', 3: '1:70 mi
          17: '1:4,000', 18: '1:2,000', 19: '1:1,000'}
 
 
+class mapWriter():
+    # Writes the map a strip of tiles at a time. A png is written as it goes, so only
+    # the current strip is held; other formats are assembled and saved by Qt at the end
+    def __init__(self, fname, fmt, width, height):
+        self.fname = fname
+        self.fmt = fmt
+        self.width = width
+        self.top = 0
+        self.work_file = fname + '.tmp'
+        if self.fmt.lower() == 'png':
+            self.image = None
+            self.zip = zlib.compressobj()
+            self.out = open(self.work_file, 'wb')
+            self.out.write(b'\x89PNG\r\n\x1a\n')
+            # 8 bit RGB, no interlace
+            self.chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+        else:
+            self.out = None
+            self.image = QtGui.QImage(width, height, QtGui.QImage.Format_RGB32)
+            self.image.fill(QtCore.Qt.white)
+
+    def chunk(self, kind, data):
+        self.out.write(struct.pack('>I', len(data)))
+        self.out.write(kind)
+        self.out.write(data)
+        self.out.write(struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+
+    def addStrip(self, strip):
+        if self.image is not None:
+            painter = QtGui.QPainter(self.image)
+            painter.drawImage(QtCore.QPoint(0, self.top), strip)
+            painter.end()
+        else:
+            rgb = strip.convertToFormat(QtGui.QImage.Format_RGB888)
+            ptr = rgb.constBits()
+            ptr.setsize(rgb.byteCount())
+            bits = bytes(ptr)
+            row_bytes = self.width * 3
+            rows = []
+            for r in range(rgb.height()):
+                i = r * rgb.bytesPerLine()
+                rows.append(b'\x00' + bits[i:i + row_bytes]) # no filter
+            data = self.zip.compress(b''.join(rows))
+            if len(data) > 0:
+                self.chunk(b'IDAT', data)
+        self.top += strip.height()
+
+    def close(self, ok=True):
+        if self.image is not None:
+            if ok:
+                self.image.save(self.fname, self.fmt)
+            self.image = None
+            return
+        if self.out is None:
+            return
+        try:
+            if ok:
+                self.chunk(b'IDAT', self.zip.flush())
+                self.chunk(b'IEND', b'')
+            self.out.close()
+            self.out = None
+            if ok:
+                os.replace(self.work_file, self.fname)
+                return
+        except:
+            self.out.close()
+            self.out = None
+        try:
+            os.remove(self.work_file)
+        except:
+            pass
+
+
 class retrieveMap():
 
     def mercatorToLat(self, mercatorY):
@@ -88,39 +163,6 @@ class retrieveMap():
             ytile = 0
         return (xtile, ytile)
 
-    def writetile(self, x, y, zoom):
-        url = self.url
-        if len(self.subs) > 0:
-            self.sub_ctr += 1
-            if self.sub_ctr >= len(self.subs):
-                self.sub_ctr = 0
-            url = url.replace('[]', self.subs[self.sub_ctr])
-        file_name = str(x) + '_' + str(y) + '.png'
-        url_tail = self.url_tail.replace('/zoom', '/' + str(zoom))
-        url_tail = url_tail.replace('/x', '/' + str(x))
-        url_tail = url_tail.replace('/y', '/' + str(y))
-        if 1 == 2: # Google?
-            url_tail = self.url_tail.replace('z=zoom', 'z=' + str(zoom))
-            url_tail = url_tail.replace('x=x', 'x=' + str(x))
-            url_tail = url_tail.replace('y=y', 'y=' + str(y))
-        if self.batch and self.debug:
-            print(url + url_tail)
-        user_agent = {'User-agent': 'getmap ' + fileVersion() + ' contact siren@sen.asn.au'}
-        http = PoolManager(headers=user_agent)
-        if self.batch and self.debug:
-            print('Retrieving ' + url_tail)
-        response = http.request('GET', url + url_tail)
-        if response.status == 200 and response.reason == 'OK':
-            if self.batch and self.debug:
-                print(url_tail + ' retrieved')
-            f = open(self.tmp_location + file_name, 'wb')
-            f.write(response.data)
-            f.close()
-            message = 'OK'
-        else:
-            message = url_tail + ' failed\n' + str(response.status) + ' ' + response.reason
-        return message, file_name
-
     def __init__(self, upper_lat, upper_lon, lower_lat, lower_lon, output, zoom=None, url=None, width=None, height=None, caller=None, debug=None):
         if len(sys.argv) > 1 and sys.argv[1][-4:] != '.ini':
             self.batch = True
@@ -207,32 +249,34 @@ class retrieveMap():
             self.properties += '\nlower_right%d=%1.3f, %1.3f' % (zoom, sb, eb)
             if output == '?' or output == '':
                 return
-        i = self.url.find('//')
-        if i >= 0:
-            self.url = self.url[i + 2:]
-        i = self.url.find('/')
-        self.url_tail = self.url[i:]
-        self.url = self.url[:i]
-        self.subs = []
-        i = self.url.find('[')
-        if i >= 0:
-            j = self.url.find(']', i)
-            if j > 0:
-                for k in range(i + 1, j):
-                    self.subs.append(self.url[k])
-                if i > 0:
-                    self.url = self.url[:i + 1] + self.url[j:]
-                else:
-                    self.url = self.url[0] + self.url[j:]
-        self.sub_ctr = -1
-        self.tmp_location = tempfile.gettempdir() + '/'
+        try:
+            cache_dir = config.get('getmap', 'tile_cache')
+        except:
+            cache_dir = None
+        try:
+            max_age = float(config.get('getmap', 'tile_cache_days'))
+        except:
+            max_age = TILE_DAYS
+        try:
+            max_mb = float(config.get('getmap', 'tile_cache_mb'))
+        except:
+            max_mb = TILE_MB
+        try:
+            workers = int(config.get('getmap', 'tile_workers'))
+        except:
+            workers = TILE_WORKERS
+        user_agent = {'User-agent': 'getmap ' + fileVersion() + ' contact siren@sen.asn.au'}
+        fetcher = TileFetcher(self.url, cache_dir=cache_dir, max_age=max_age, workers=workers,
+                              headers=user_agent, debug=self.batch and self.debug, max_mb=max_mb)
         i = output.rfind('.')
         if i < 0:
             fname = output + '.png'
+            i = len(output)
         else:
             fname = output
-        outputimg = QtGui.QPixmap(width, height)
-        painter = QtGui.QPainter(outputimg)
+        # tiles are drawn into a strip for their row as they arrive and each strip
+        # is passed to the writer once all its tiles are in
+        writer = mapWriter(fname, fname[i + 1:], width, height)
         if self.batch:
             print('Saving map to ' + fname)
         else:
@@ -240,23 +284,41 @@ class retrieveMap():
             tl = 0
             self.caller.progressbar.setMaximum((bottom_right[0] - top_left[0] + 1) * (bottom_right[1] - top_left[1] + 1) - 1)
             self.caller.progresslabel.setText('Downloading tiles')
-        for x in range(top_left[0], bottom_right[0] + 1):
-            for y in range(top_left[1], bottom_right[1] + 1):
-                msg, tile = self.writetile(x, y, zoom)
-                if msg != 'OK':
-                    if self.batch:
-                        print(msg)
-                    else:
-                        self.log += '\n' + msg
-                    painter.end()
-                    return
-                foo = QtGui.QImage(self.tmp_location + tile)
-                painter.drawImage(QtCore.QPoint(256 * (x - top_left[0]), 256 * (y - top_left[1])), foo)
-                if not self.batch:
-                    tl += 1
-                    self.caller.progressbar.setValue(tl)
-        outputimg.save(fname, fname[i + 1:])
-        painter.end()
+        tiles = []
+        for y in range(top_left[1], bottom_right[1] + 1):
+            for x in range(top_left[0], bottom_right[0] + 1):
+                tiles.append((x, y, zoom))
+        strips = {}
+        strip_tiles = {}
+        next_y = top_left[1]
+        for x, y, z, msg, data in fetcher.fetchTiles(tiles):
+            if msg != 'OK':
+                if self.batch:
+                    print(msg)
+                else:
+                    self.log += '\n' + msg
+                writer.close(ok=False)
+                fetcher.close()
+                return
+            if y not in strips:
+                strips[y] = QtGui.QImage(width, 256, QtGui.QImage.Format_RGB32)
+                strips[y].fill(QtCore.Qt.white)
+                strip_tiles[y] = 0
+            tile = QtGui.QImage()
+            tile.loadFromData(data)
+            painter = QtGui.QPainter(strips[y])
+            painter.drawImage(QtCore.QPoint(256 * (x - top_left[0]), 0), tile)
+            painter.end()
+            strip_tiles[y] += 1
+            while next_y in strip_tiles and strip_tiles[next_y] == w:
+                writer.addStrip(strips.pop(next_y))
+                del strip_tiles[next_y]
+                next_y += 1
+            if not self.batch:
+                tl += 1
+                self.caller.progressbar.setValue(tl)
+        fetcher.close()
+        writer.close()
         if len(sys.argv) == 1:
             self.log += '\nDone'
 
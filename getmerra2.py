@@ -24,11 +24,13 @@ import gzip
 import os
 import subprocess
 import sys
+import urllib.parse
 from netCDF4 import Dataset
 import configparser   # decode .ini file
 from PyQt5 import QtCore, QtGui, QtWidgets
 
 from credits import fileVersion
+from downloader import DownloadManager, DOWNLOAD_WORKERS
 import displayobject
 from editini import SaveIni
 from getmodels import getModelFile
@@ -39,7 +41,9 @@ def spawn(who, cwd, log):
     pid = ''
     stdoutf = cwd + '/' + log
     stdout = open(stdoutf, 'wb')
-    if who[0] == '"':
+    if type(who) is list:
+        pass
+    elif who[0] == '"':
         e = who.find('"', 1)
         who = [who[:e + 1]] + who[e + 1:].strip().split()
     else:
@@ -183,9 +187,8 @@ def checkFiles(chk_key, tgt_dir, ini_file=None, collection=None):
     msg_text = 'Boundaries and start date set for ' + chk_key.title() + dte_msg
     return [msg_text, dte, dte2, latn, lats, lonw, lone]
 
-def invokeWget(ini_file, coll, date1, date2, lat1, lat2, lon1, lon2, tgt_dir, spawn_wget):
-    config = configparser.RawConfigParser()
-    config.read(ini_file)
+def merraUrls(config, coll, date1, date2, lat1, lat2, lon1, lon2):
+    # one url per day from date1 to date2
     if coll == 'solar':
         ignor = 'wind'
     else:
@@ -195,7 +198,7 @@ def invokeWget(ini_file, coll, date1, date2, lat1, lat2, lon1, lon2, tgt_dir, sp
         variables = config.items('getmerra2')
         wget = config.get('getmerra2', 'wget')
     except:
-        return 'Error accessing', ini_file, 'variables'
+        return None
     working_vars = []
     for prop, value in variables:
         valu = value
@@ -219,10 +222,7 @@ def invokeWget(ini_file, coll, date1, date2, lat1, lat2, lon1, lon2, tgt_dir, sp
         if wget == wget_base:
             break
         wget_base = wget
-    a_date = datetime.datetime.now().strftime('%Y-%m-%d_%H%M')
-    wget_file = 'wget_' + coll + '_' + a_date + '.txt'
-    wf = open(tgt_dir + '/' + wget_file, 'w')
-    days = (date2 - date1).days + 1
+    urls = []
     while date1 <= date2:
         date_vars = []
         date_vars.append(('$year$','{0:04d}'.format(date1.year)))
@@ -231,8 +231,22 @@ def invokeWget(ini_file, coll, date1, date2, lat1, lat2, lon1, lon2, tgt_dir, sp
         wget = wget_base[:]
         for key, value in date_vars:
             wget = wget.replace(key, value)
-        wf.write(wget + '\n')
+        urls.append(wget)
         date1 = date1 + datetime.timedelta(days=1)
+    return urls
+
+def invokeWget(ini_file, coll, date1, date2, lat1, lat2, lon1, lon2, tgt_dir, spawn_wget):
+    config = configparser.RawConfigParser()
+    config.read(ini_file)
+    urls = merraUrls(config, coll, date1, date2, lat1, lat2, lon1, lon2)
+    if urls is None:
+        return 'Error accessing', ini_file, 'variables'
+    a_date = datetime.datetime.now().strftime('%Y-%m-%d_%H%M')
+    wget_file = 'wget_' + coll + '_' + a_date + '.txt'
+    wf = open(tgt_dir + '/' + wget_file, 'w')
+    days = len(urls)
+    for wget in urls:
+        wf.write(wget + '\n')
     wf.close()
     curdir = os.getcwd()
     os.chdir(tgt_dir)
@@ -262,6 +276,63 @@ def invokeWget(ini_file, coll, date1, date2, lat1, lat2, lon1, lon2, tgt_dir, sp
             return 'wget launch returned error: ' + msg
     return bat_file + ', ' + wget_file + ' (' + str(days) + ' days) created.'
 
+def urlFile(url):
+    # file name wget --content-disposition would use; the LABEL for the MERRA-2 subsetter
+    parts = urllib.parse.urlsplit(url)
+    try:
+        return urllib.parse.parse_qs(parts.query)['LABEL'][0]
+    except:
+        return os.path.basename(parts.path)
+
+def verifyFile(target):
+    info = fileInfo(target)
+    if info.ok:
+        return ''
+    return info.log
+
+def downloadMerra(ini_file, coll, date1, date2, lat1, lat2, lon1, lon2, tgt_dir, launch=False):
+    # download with the built in download manager; launch runs it as a separate batch process
+    config = configparser.RawConfigParser()
+    config.read(ini_file)
+    if launch:
+        a_date = datetime.datetime.now().strftime('%Y-%m-%d_%H%M')
+        log_file = 'download_' + coll + '_' + a_date + '.log'
+        if sys.argv[0][-4:] == '.exe':
+            who = [os.path.abspath(sys.argv[0])]
+        else:
+            who = [sys.executable, os.path.abspath(__file__)]
+        who += ['ini=' + os.path.abspath(ini_file), 'coll=' + coll,
+                'date1=' + date1.strftime('%Y-%m-%d'), 'date2=' + date2.strftime('%Y-%m-%d'),
+                'lat1=' + str(lat2), 'lat2=' + str(lat1), 'lon1=' + str(lon1), 'lon2=' + str(lon2),
+                'tgt_dir=' + tgt_dir, 'download']
+        pid, msg = spawn(who, tgt_dir, log_file)
+        if msg is None:
+            return 'Download being launched (pid=' + str(pid) + '; logging to: ' + log_file +')'
+        else:
+            return 'Download launch returned error: ' + str(msg)
+    urls = merraUrls(config, coll, date1, date2, lat1, lat2, lon1, lon2)
+    if urls is None:
+        return 'Error accessing ' + ini_file + ' variables'
+    try:
+        workers = int(config.get('getmerra2', 'download_workers'))
+    except:
+        workers = DOWNLOAD_WORKERS
+    manager = DownloadManager(tgt_dir + '/.getmerra2_' + coll + '.manifest.json', workers=workers,
+                              verify=verifyFile,
+                              headers={'User-agent': 'getmerra2 ' + fileVersion() + ' contact siren@sen.asn.au'})
+    for url in urls:
+        manager.add(tgt_dir + '/' + urlFile(url), url=url)
+
+    def progress(done, count, target, msg):
+        if msg == '':
+            msg = os.path.basename(target) + ' retrieved'
+        print(f'{done} of {count}: {msg}', flush=True)
+
+    errors = manager.run(progress=progress)
+    if len(errors) > 0:
+        return str(len(errors)) + ' of ' + str(len(urls)) + ' files failed. Run again to retry them.'
+    return str(len(urls)) + ' days retrieved.'
+
 
 class fileInfo:
     def __init__(self, inp_file):
@@ -372,6 +443,12 @@ class getMERRA2(QtWidgets.QDialog):
             self.wait_days = int(self.config.get('getmerra2', 'wait_days'))
         except:
             pass
+        self.downloader = 'native'
+        try:
+            if self.config.get('getmerra2', 'downloader').lower() == 'wget':
+                self.downloader = 'wget'
+        except:
+            pass
 
     def __init__(self, help='help.html', ini_file='getfiles.ini', parent=None):
         super(getMERRA2, self).__init__(parent)
@@ -809,8 +886,12 @@ class getMERRA2(QtWidgets.QDialog):
                 int(self.end_date.date().day()))
         i = self.dir_labels.index(me.title())
         tgt_dir = self.dirs[i].text()
-        wgot = invokeWget(self.ini_file, me, date1, date2, self.southSpin.value(),
-               self.northSpin.value(), self.westSpin.value(), self.eastSpin.value(), tgt_dir, True)
+        if self.downloader == 'wget':
+            wgot = invokeWget(self.ini_file, me, date1, date2, self.southSpin.value(),
+                   self.northSpin.value(), self.westSpin.value(), self.eastSpin.value(), tgt_dir, True)
+        else:
+            wgot = downloadMerra(self.ini_file, me, date1, date2, self.southSpin.value(),
+                   self.northSpin.value(), self.westSpin.value(), self.eastSpin.value(), tgt_dir, launch=True)
         self.log.setText(wgot)
         return
 
@@ -899,6 +980,7 @@ if '__main__' == __name__:
         tgt_parms = ['tgt_dir', 'dir', 'folder', 'target']
         spawn_wget = False
         spawn_parms = ['get', 'wget', 'spawn']
+        download = False
         errors = []
         for i in range(1, len(sys.argv)):
             argv = sys.argv[i].split('=')
@@ -969,6 +1051,13 @@ if '__main__' == __name__:
                         spawn_wget = False
                     else:
                         errors.append(sys.argv[i])
+                elif argv[0] == 'download':
+                    if argv[1].lower() in ['true', 'yes', 'on']:
+                        download = True
+                    elif argv[1].lower() in ['false', 'no', 'off']:
+                        download = False
+                    else:
+                        errors.append(sys.argv[i])
                 elif argv[0] == 'check':
                     if argv[1].lower() in ['true', 'yes', 'on']:
                         check = True
@@ -985,6 +1074,8 @@ if '__main__' == __name__:
                     coll = sys.argv[i]
                 elif sys.argv[i] == 'check':
                     check = True
+                elif sys.argv[i] == 'download':
+                    download = True
                 else:
                     errors.append(sys.argv[i])
         if len(errors) > 0:
@@ -1012,7 +1103,10 @@ if '__main__' == __name__:
         if date2 < date1:
             print('Date2 (End) less than Date1 (Start)')
             sys.exit(4)
-        wgot = invokeWget(ini_file, coll, date1, date2, lat2, lat1, lon1, lon2, tgt_dir, spawn_wget)
+        if download:
+            wgot = downloadMerra(ini_file, coll, date1, date2, lat2, lat1, lon1, lon2, tgt_dir)
+        else:
+            wgot = invokeWget(ini_file, coll, date1, date2, lat2, lat1, lon1, lon2, tgt_dir, spawn_wget)
         print(wgot)
         sys.exit()
     else:
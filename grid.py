@@ -24,6 +24,7 @@ import io
 import sys
 from math import sin, cos, radians, asin, acos, atan2, sqrt, degrees
 import zipfile
+import numpy as np
 
 import configparser   # decode .ini file
 from xml.etree.ElementTree import ElementTree, fromstring
@@ -356,6 +357,7 @@ class Grid:
     def __init__(self, grid2=False):
         self.get_config()
         self.lines = []
+        self.segments = None
         if grid2:
             kml_file = self.kml_file2
         else:
@@ -493,21 +495,77 @@ class Grid:
      #                self.lines[i].coordinates.insert(0, [connect[0][1], connect[0][2]])
      #        self.lines[i].connector = con
 
+    def segmentIndex(self):
+        # bounds for every line segment, rebuilt if lines have been added or removed.
+        # A segment's nearest point lies within its start +/- its extent (see DistancePointLine)
+        signature = [(id(line), len(line.coordinates)) for line in self.lines]
+        if self.segments is not None and self.segments['signature'] == signature:
+            return self.segments
+        y1 = []
+        x1 = []
+        y2 = []
+        x2 = []
+        ln = []
+        sg = []
+        for l in range(len(self.lines)):
+            coordinates = self.lines[l].coordinates
+            for i in range(len(coordinates) - 1):
+                y1.append(coordinates[i][0])
+                x1.append(coordinates[i][1])
+                y2.append(coordinates[i + 1][0])
+                x2.append(coordinates[i + 1][1])
+                ln.append(l)
+                sg.append(i)
+        y1 = np.radians(np.array(y1, dtype=np.float64))
+        x1 = np.radians(np.array(x1, dtype=np.float64))
+        dy = np.abs(np.radians(np.array(y2, dtype=np.float64)) - y1)
+        dx = np.abs(np.radians(np.array(x2, dtype=np.float64)) - x1)
+        self.segments = {'signature': signature, 'line': np.array(ln, dtype=np.int64),
+                         'segment': np.array(sg, dtype=np.int64), 'ymin': y1 - dy, 'ymax': y1 + dy,
+                         'xmin': x1 - dx, 'xmax': x1 + dx}
+        return self.segments
+
+    def segmentBounds(self, lat, lon):
+        # lower bound (km) for the distance from lat, lon to each segment
+        seg = self.segmentIndex()
+        py = radians(lat)
+        px = radians(lon)
+        dlat = np.maximum(np.maximum(seg['ymin'] - py, py - seg['ymax']), 0.)
+        if self.dummy_fix: # planar distance in radians
+            dlon = np.maximum(np.maximum(seg['xmin'] - px, px - seg['xmax']), 0.)
+            return np.sqrt(dlat * dlat + dlon * dlon) * RADIUS
+        width = seg['xmax'] - seg['xmin']
+        a = np.mod(px - seg['xmin'], 2 * np.pi)
+        dlon = np.where(a <= width, 0., np.minimum(a - width, 2 * np.pi - a))
+        cos_min = np.cos(np.minimum(np.maximum(np.abs(seg['ymin']), np.abs(seg['ymax'])), np.pi / 2))
+        hav = np.sin(dlat / 2.) ** 2 + cos(py) * cos_min * np.sin(dlon / 2.) ** 2
+        return 2 * np.arcsin(np.sqrt(np.minimum(hav, 1.))) * RADIUS
+
     def gridConnect(self, lat, lon, ignore=[]):
+        # segments are checked nearest (lower bound) first until the rest must be further away
         shortest = [99999, -1., -1., -1]
-        for l in range(len(self.lines)):
-            if l in ignore:
-                continue
-            for i in range(len(self.lines[l].coordinates) - 1):
+        best = None
+        seg = self.segmentIndex()
+        if len(seg['line']) > 0:
+            bounds = self.segmentBounds(lat, lon)
+            for s in np.argsort(bounds, kind='stable'):
+                if bounds[s] > shortest[0] + 0.01: # allow for rounding of distances
+                    break
+                l = int(seg['line'][s])
+                if l in ignore:
+                    continue
+                i = int(seg['segment'][s])
                 if self.dummy_fix:
                     dist = dust(lat, lon, self.lines[l].coordinates[i][0], self.lines[l].coordinates[i][1],
                            self.lines[l].coordinates[i + 1][0], self.lines[l].coordinates[i + 1][1])
                 else:
                     dist = self.DistancePointLine(lat, lon, self.lines[l].coordinates[i][0], self.lines[l].coordinates[i][1],
                            self.lines[l].coordinates[i + 1][0], self.lines[l].coordinates[i + 1][1])
-                if dist[0] >= 0 and dist[0] < shortest[0]:
+                # first segment (by line and position) of those equally close
+                if dist[0] >= 0 and (dist[0] < shortest[0] or (dist[0] == shortest[0] and (l, i) < best)):
                     shortest = dist[:]
                     shortest.append(l)
+                    best = (l, i)
         if shortest[0] == 99999:
              shortest[0] = -1
         return shortest   # length, lat, lon, line#
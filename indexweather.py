@@ -25,12 +25,11 @@ import sys
 from PyQt5 import QtCore, QtGui, QtWidgets
 import configparser   # decode .ini file
 import xlwt
-import tempfile
-import zipfile
 import displayobject
 from credits import fileVersion
 from getmodels import getModelFile
 from senutils import ClickableQLabel, getParents, getUser, ssCol
+from weatherfile import readWeather
 
 
 class makeIndex():
@@ -48,53 +47,18 @@ class makeIndex():
         else:
             config_file = getModelFile('SIREN.ini')
         self.log = ''
-        self.temp_dir = None
         files = []
         fils = os.listdir(src_dir)
         for fil in fils:
             if (what[0].lower() == 's' and (fil[-4:] == '.csv' or fil[-4:] == '.smw' or fil[-4:] == '.smz')) \
               or (what[0].lower() == 'w' and (fil[-4:] == '.srw' or fil[-4:] == '.srz') ):
-                if fil[-4:] == '.smz' or fil[-4:] == '.srz':
-                    if self.temp_dir is None:
-                        self.temp_dir = tempfile.gettempdir() + '/'
-                    zf = zipfile.ZipFile(src_dir + '/' + fil, 'r')
-                    for zi in zf.infolist():
-                        zf.extract(zi, self.temp_dir)
-                        tf = open(f'{self.temp_dir}{zi.filename}', 'r')
-                        lines = tf.readlines()
-                        tf.close()
-                        os.remove(f'{self.temp_dir}{zi.filename}')
-                        break
-                else:
-                    tf = open(src_dir + '/' + fil, 'r')
-                    lines = tf.readlines()
-                    tf.close()
-                if fil[-4:] == '.smw' or fil[-4:] == '.smz':
-                    bits = lines[0].split(',')
-                    src_lat = float(bits[4])
-                    src_lon = float(bits[5])
-                elif fil[-4:] == '.srw' or fil[-4:] == '.srz':
-                    bits = lines[0].split(',')
-                    src_lat = float(bits[5])
-                    src_lon = float(bits[6])
-                elif fil[-10:] == '(TMY2).csv' or fil[-10:] == '(TMY3).csv' \
-                  or fil[-10:] == '(INTL).csv' or fil[-4:] == '.csv':
-                    fst_row = len(lines) - 8760
-                    if fst_row < 3:
-                        bits = lines[0].split(',')
-                        src_lat = float(bits[4])
-                        src_lon = float(bits[5])
-                    else:
-                        cols = lines[fst_row - 3].split(',')
-                        bits = lines[fst_row - 2].split(',')
-                        for i in range(len(cols)):
-                            if cols[i].lower() in ['latitude', 'lat']:
-                                src_lat = float(bits[i])
-                            elif cols[i].lower() in ['longitude', 'lon', 'long', 'lng']:
-                                src_lon = float(bits[i])
-                else:
+                try:
+                    weather = readWeather(src_dir + '/' + fil)
+                except:
                     continue
-                files.append([src_lat, src_lon, fil])
+                if weather.lat is None or weather.lon is None:
+                    continue
+                files.append([weather.lat, weather.lon, fil])
         if tgt_fil[-5:] == '.xlsx':
             wb = oxl.Workbook()
             normal = oxl.styles.Font(name='Arial', size='10')
@@ -25,15 +25,31 @@ import sys
 import time
 from PyQt5 import QtCore, QtGui, QtWidgets
 import configparser   # decode .ini file
+import numpy as np
 import xlwt
-import tempfile
-import zipfile
 
 import displayobject
 from credits import fileVersion
 from floaters import ProgressBar
 from getmodels import getModelFile
 from senutils import ClickableQLabel, getParents, getUser, ssCol
+from weatherfile import readWeather
+
+
+def hourMonths(count, the_hour):
+    # month of each hour of the year
+    return np.minimum(np.searchsorted(the_hour[1:], np.arange(count), side='right'), 11)
+
+def hourTotals(values, mths, hourly=False, daily=False):
+    # totals by month, by hour of day and month, and by hour of day and day (row % 365)
+    hrs = np.arange(len(values))
+    totals = [np.bincount(mths, weights=values, minlength=12).tolist(), None, None]
+    if hourly:
+        totals[1] = np.bincount((hrs % 24) * 12 + mths, weights=values, minlength=24 * 12).reshape(24, 12).tolist()
+    if daily:
+        totals[2] = np.bincount((hrs % 24) * 365 + hrs % 365, weights=values,
+                                minlength=24 * 365).reshape(24, 365).tolist()
+    return totals
 
 
 class makeFile():
@@ -106,7 +122,6 @@ class makeFile():
         self.src_dir = src_dir
         self.wind_dir = wnd_dir
         self.rain_dir = rain
-        self.temp_dir = None
         if rain != '':
             self.do_rain = True
         else:
@@ -155,29 +170,12 @@ class makeFile():
         fils = os.listdir(self.src_dir)
         for fil in fils:
             if fil[-4:] == '.csv' or fil[-4:] == '.smw' or fil[-4:] == '.smz':
+                weather = readWeather(self.src_dir + '/' + fil)
+                lines = weather.lines
                 if fil[-4:] == '.csv':
-                    tf = open(self.src_dir + '/' + fil, 'r')
-                    line = tf.readline()
-                    if line.find('Latitude') < 0 or line.find('Longitude') < 0 \
-                      or line.find('Time Zone') < 0:
-                        tf.close()
+                    if len(lines) == 0 or lines[0].find('Latitude') < 0 or lines[0].find('Longitude') < 0 \
+                      or lines[0].find('Time Zone') < 0:
                         continue
-                    tf.seek(0)
-                elif fil[-4:] == '.smz':
-                    if self.temp_dir is None:
-                        self.temp_dir = tempfile.gettempdir() + '/'
-                    zf = zipfile.ZipFile(self.src_dir + '/' + fil, 'r')
-                    for zi in zf.infolist():
-                        zf.extract(zi, self.temp_dir)
-                        tf = open(f'{self.temp_dir}{zi.filename}', 'r')
-                        lines = tf.readlines()
-                        tf.close()
-                        os.remove(f'{self.temp_dir}{zi.filename}')
-                        break
-                else:
-                    tf = open(self.src_dir + '/' + fil, 'r')
-                    lines = tf.readlines()
-                    tf.close()
                 valu = []
                 cell = []
                 for j in range(len(the_cols)):
@@ -257,38 +255,40 @@ class makeFile():
                             col[the_cols.index('Rainfall')] = i
                 else:
                     continue
-                for i in range(fst_row, len(lines)):
-                    bits = lines[i].split(',')
-                    try:
-                        if src_yr < 0:
-                            src_yr = bits[yr_col]
-                    except:
-                        pass
-                    if calc_mth:
-                        mth = 11
-                        hr = i - fst_row
-                        for j in range(12):
-                            if hr < the_hour[j]:
-                                mth = j - 1
-                                break
-                    else:
-                        mth = int(bits[mth_col]) - 1
-                    for j in range(len(col)):
-                        if col[j] >= 0:
-                            if col_min[1][j] == None or float(bits[col[j]]) < col_min[1][j]:
-                                if (self.nonzero and float(bits[col[j]]) > 0) \
-                                  or j == the_cols.index('Temperature') :
-                                    col_min[1][j] = float(bits[col[j]])
-                            if float(bits[col[j]]) > col_max[1][j]:
-                                col_max[1][j] = float(bits[col[j]])
-                            valu[mth][j] += float(bits[col[j]])
-                            if self.hourly:
-                                hr = (i - fst_row) % 24
-                                valh[hr][mth][j] += float(bits[col[j]])
-                            if self.daily:
-                                hr = (i - fst_row) % 24
-                                dy = (i - fst_row) % 365
-                                vald[hr][dy][j] += float(bits[col[j]])
+                rows = weather.rows(fst_row)
+                try:
+                    if src_yr < 0:
+                        src_yr = int(weather.column(yr_col, fst_row)[0])
+                except:
+                    pass
+                if calc_mth:
+                    mths = hourMonths(len(rows), the_hour)
+                else:
+                    mths = (weather.column(mth_col, fst_row).astype(np.int64) - 1) % 12
+                for j in range(len(col)):
+                    if col[j] >= 0 and len(rows) > 0:
+                        values = weather.column(col[j], fst_row)
+                        if j == the_cols.index('Temperature'):
+                            low = values
+                        elif self.nonzero:
+                            low = values[values > 0]
+                        else:
+                            low = values[:0]
+                        if len(low) > 0 and (col_min[1][j] == None or low.min() < col_min[1][j]):
+                            col_min[1][j] = float(low.min())
+                        if values.max() > col_max[1][j]:
+                            col_max[1][j] = float(values.max())
+                        totals = hourTotals(values, mths, self.hourly, self.daily)
+                        for mth in range(12):
+                            valu[mth][j] += totals[0][mth]
+                        if self.hourly:
+                            for hr in range(24):
+                                for mth in range(12):
+                                    valh[hr][mth][j] += totals[1][hr][mth]
+                        if self.daily:
+                            for hr in range(24):
+                                for dy in range(365):
+                                    vald[hr][dy][j] += totals[2][hr][dy]
                 key = '%s_%s_%s' % ('{:0.4f}'.format(src_lat), '{:0.4f}'.format(src_lon), src_yr)
                 all_values[key] = valu
                 if self.hourly:
@@ -320,21 +320,8 @@ class makeFile():
                     vald.append([])
                     for j in range(365):
                         vald[-1].append(0.)
-            if fil[-4:] == '.srz':
-                if self.temp_dir is None:
-                    self.temp_dir = tempfile.gettempdir() + '/'
-                zf = zipfile.ZipFile(self.wind_dir + '/' + fil, 'r')
-                for zi in zf.infolist():
-                    zf.extract(zi, self.temp_dir)
-                    tf = open(f'{self.temp_dir}{zi.filename}', 'r')
-                    lines = tf.readlines()
-                    tf.close()
-                    os.remove(f'{self.temp_dir}{zi.filename}')
-                    break
-            else:
-                tf = open(self.wind_dir + '/' + fil, 'r')
-                lines = tf.readlines()
-                tf.close()
+            weather = readWeather(self.wind_dir + '/' + fil)
+            lines = weather.lines
             fst_row = len(lines) - 8760
             bits = lines[0].split(',')
             src_lat = float(bits[5])
@@ -352,27 +339,25 @@ class makeFile():
                        the_cols[val_col] = 'Wind @ 100m'
                        wnd_col = j
                        break
-            for i in range(fst_row, len(lines)):
-                bits = lines[i].split(',')
-                mth = 11
-                hr = i - fst_row
-                for j in range(12):
-                    if hr < the_hour[j]:
-                        mth = j - 1
-                        break
-                if col_min[1][val_col] == None or float(bits[wnd_col]) < col_min[1][val_col]:
-                    if self.nonzero and float(bits[wnd_col]) > 0:
-                        col_min[1][val_col] = float(bits[wnd_col])
-                if float(bits[wnd_col]) > col_max[1][val_col]:
-                    col_max[1][val_col] = float(bits[wnd_col])
-                valu[mth] += float(bits[wnd_col])
+            rows = weather.rows(fst_row)
+            if len(rows) > 0:
+                values = weather.column(wnd_col, fst_row)
+                low = values[values > 0]
+                if self.nonzero and len(low) > 0 and (col_min[1][val_col] == None or low.min() < col_min[1][val_col]):
+                    col_min[1][val_col] = float(low.min())
+                if values.max() > col_max[1][val_col]:
+                    col_max[1][val_col] = float(values.max())
+                totals = hourTotals(values, hourMonths(len(rows), the_hour), self.hourly, self.daily)
+                for mth in range(12):
+                    valu[mth] += totals[0][mth]
                 if self.hourly:
-                    hr = (i - fst_row) % 24
-                    valh[hr][mth] += float(bits[wnd_col])
+                    for hr in range(24):
+                        for mth in range(12):
+                            valh[hr][mth] += totals[1][hr][mth]
                 if self.daily:
-                    hr = (i - fst_row) % 24
-                    dy = (i - fst_row) % 365
-                    vald[hr][dy] += float(bits[wnd_col])
+                    for hr in range(24):
+                        for dy in range(365):
+                            vald[hr][dy] += totals[2][hr][dy]
             key = '%s_%s_%s' % ('{:0.4f}'.format(src_lat), '{:0.4f}'.format(src_lon), src_yr)
             wind_values[key] = valu
             if self.hourly:
@@ -441,9 +426,8 @@ class makeFile():
                         vald.append([])
                         for j in range(365):
                             vald[-1].append(0.)
-                tf = open(self.rain_dir + '/' + fil, 'r')
-                lines = tf.readlines()
-                tf.close()
+                weather = readWeather(self.rain_dir + '/' + fil)
+                lines = weather.lines
                 fst_row = len(lines) - 8760
                 if fst_row < 3:
                     bits = lines[0].split(',')
@@ -469,29 +453,27 @@ class makeFile():
                     elif cols[i].lower() in ['rainfall', 'rainfall (mm)']:
                         drop_rainfall = False
                         rain_col = i
-                for i in range(fst_row, len(lines)):
-                    bits = lines[i].split(',')
+                rows = weather.rows(fst_row)
+                if len(rows) > 0:
                     if src_yr < 0:
-                        src_yr = bits[yr_col]
-                    mth = 11
-                    hr = i - fst_row
-                    for j in range(12):
-                        if hr < the_hour[j]:
-                            mth = j - 1
-                            break
-                    if col_min[1][val_col] == None or float(bits[rain_col]) < col_min[1][val_col]:
-                        if self.nonzero and float(bits[rain_col]) > 0:
-                            col_min[1][val_col] = float(bits[rain_col])
-                    if float(bits[rain_col]) > col_max[1][val_col]:
-                        col_max[1][val_col] = float(bits[rain_col])
-                    valu[mth] += float(bits[rain_col])
+                        src_yr = int(weather.column(yr_col, fst_row)[0])
+                    values = weather.column(rain_col, fst_row)
+                    low = values[values > 0]
+                    if self.nonzero and len(low) > 0 and (col_min[1][val_col] == None or low.min() < col_min[1][val_col]):
+                        col_min[1][val_col] = float(low.min())
+                    if values.max() > col_max[1][val_col]:
+                        col_max[1][val_col] = float(values.max())
+                    totals = hourTotals(values, hourMonths(len(rows), the_hour), self.hourly, self.daily)
+                    for mth in range(12):
+                        valu[mth] += totals[0][mth]
                     if self.hourly:
-                        hr = (i - fst_row) % 24
-                        valh[hr][mth] += float(bits[rain_col])
+                        for hr in range(24):
+                            for mth in range(12):
+                                valh[hr][mth] += totals[1][hr][mth]
                     if self.daily:
-                        hr = (i - fst_row) % 24
-                        dy = (i - fst_row) % 365
-                        vald[hr][dy] += float(bits[rain_col])
+                        for hr in range(24):
+                            for dy in range(365):
+                                vald[hr][dy] += totals[2][hr][dy]
                 key = '%s_%s_%s' % ('{:0.4f}'.format(src_lat), '{:0.4f}'.format(src_lon), src_yr)
                 rain_values[key] = valu
                 if self.hourly:
@@ -20,6 +20,8 @@
 #
 from datetime import datetime, timedelta
 import gzip
+import hashlib
+import json
 from math import *
 import os
 import sys
@@ -37,7 +39,114 @@ from editini import SaveIni
 from getmodels import getModelFile
 from senutils import ClickableQLabel, getUser, extrapolateWind
 from sammodels import getDNI, getDHI
+from weatherfile import hubResource
 import numpy
+import multiprocessing
+
+def valueStrings(values):
+    # str() of each value; numpy scalars keep the precision of their type
+    if values.dtype in (numpy.float64, numpy.int64):
+        return [str(value) for value in values.tolist()]
+    return [str(value) for value in values]
+
+def fileSignature(path, old=None):
+    # size, modification time and hash of a file. The hash is only worked out
+    # again if the size or time differ from old
+    stat = os.stat(path)
+    sig = {'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+    if old is not None and old.get('size') == sig['size'] and old.get('mtime') == sig['mtime']:
+        sig['hash'] = old['hash']
+        return sig
+    digest = hashlib.sha1()
+    with open(path, 'rb') as fil:
+        for block in iter(lambda: fil.read(1048576), b''):
+            digest.update(block)
+    sig['hash'] = digest.hexdigest()
+    return sig
+
+def weatherFile(job):
+    # write one weather file for a location. job is built by makeWeather.locationJobs
+    # returns status (created, gaps or missing), number of gaps and if extrapolated
+    cols = [valueStrings(col) for col in job['cols']]
+    valid = job['valid']
+    lines = [job['header']]
+    with_gaps = 0
+    missing = False
+    if job['kind'] == 'wind':
+        for hr in range(job['hours']):
+            if valid is not None and not valid[hr]:
+                if not job['gaps']:
+                    missing = True
+                    break
+                if job['gap_line'] is not None:
+                    lines.append(job['gap_line'])
+                    with_gaps += 1
+                continue
+            lines.append(','.join([col[hr] for col in cols]) + '\n')
+    else:
+        dys = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+        ghis = job['ghi']
+        press = job['press']
+        if job['alb'] is None:
+            albs = None
+        else:
+            albs = valueStrings(job['alb'])
+        year = str(job['year'])
+        mth = 0
+        day = 1
+        hour = 0
+        for hr in range(job['hours']):
+            if valid is not None and not valid[hr]:
+                if not job['gaps']:
+                    missing = True
+                    break
+                lines.append(job['gap_line'])
+                with_gaps += 1
+                continue
+            ghi = ghis[hr]
+            dni = getDNI(ghi, hour=hr + 1, lat=job['lat'], lon=job['lon'], press=press[hr], zone=job['zone'])
+            dhi = getDHI(ghi, dni, hour=hr + 1, lat=job['lat'])
+            if job['kind'] == 'csv':
+                if job['spec']:
+                    lines.append(year + ',' + str(mth + 1) + ',' + str(day) + ',' + str(hour) + ',' +
+                                 str(int(ghi)) + ',' + str(int(dni)) + ',' + str(int(dhi)) + ',' +
+                                 ','.join([col[hr] for col in cols]) + '\n')
+                else:
+                    lines.append(year + ',' + '{:02d}'.format(mth + 1) + ',' + '{:02d}'.format(day) + ',' +
+                                 '{:02d}'.format(hour) + ',' + '{:0.1f}'.format(ghi) + ',' +
+                                 '{:0.1f}'.format(dni) + ',' + '{:0.1f}'.format(dhi) + ',' +
+                                 ','.join([col[hr] for col in cols]) + '\n')
+                hour += 1
+                if hour > 23:
+                    hour = 0
+                    day += 1
+                    if day > dys[mth]:
+                        mth += 1
+                        day = 1
+                        hour = 0
+            else:
+                if albs is None:
+                    alb = '-999'
+                else:
+                    alb = albs[hr]
+                lines.append(cols[0][hr] + ',-999,-999,-999,' + cols[1][hr] + ',' + cols[2][hr] + ',' +
+                             cols[3][hr] + ',' + str(int(ghi)) + ',' + str(int(dni)) + ',' + str(int(dhi)) +
+                             ',' + alb + ',-999,\n')
+    tf = open(job['file'], 'w')
+    tf.writelines(lines)
+    tf.close()
+    if with_gaps > 0 and with_gaps < 504:
+        status = 'gaps'
+    elif missing or with_gaps > 0:
+        if job['remove']:
+            os.remove(job['file'])
+        return 'missing', with_gaps, False
+    else:
+        status = 'created'
+    updated = False
+    if job['hub_height'] > 0:
+        updated = extrapolateWind(job['file'], job['hub_height'], law=job['law'], replace=True)
+    return status, with_gaps, updated
 
 class ShowHelp(QtWidgets.QDialog):
 
@@ -141,6 +250,8 @@ class makeWeather():
             self.log += 'Terminating as file not found - %s\n' % inp_file
             self.return_code = 12
             return None
+        if os.path.exists(inp_file):
+            self.inputFile(inp_file)
         if inp_file[-3:] == '.gz':
             if not os.path.exists(inp_file):
                 self.log += 'Terminating as file not found - %s\n' % inp_file
@@ -164,71 +275,35 @@ class makeWeather():
                 return None
             return inp_file
 
+    def getArray(self, vari):
+        # NetCDF variable (or slice of one) as an (hours, latitudes, longitudes) array
+        if isinstance(vari, numpy.ndarray):
+            return numpy.ma.getdata(vari)
+        return numpy.ma.getdata(vari[:])
+
+    def getExpver(self, vari):
+        # ERA5 and ERA5T data have an expver dimension; use ERA5 (0) where it has a value
+        arr = numpy.ma.masked_invalid(vari)
+        mask = numpy.ma.getmaskarray(arr)
+        return numpy.where(mask[:, 0], numpy.ma.getdata(arr)[:, 1], numpy.ma.getdata(arr)[:, 0])
+
     def getSpeed(self, vmi, umi):
-        try:
-            um = umi.data
-            vm = vmi.data
-        except:
-            um = umi[:]
-            vm = vmi[:]
-        sm = []
-        for hr in range(len(um)):   # 24 hours
-            hm = []
-            for lat in range(len(um[hr])):   # n latitudes
-                lm = []
-                for lon in range(len(um[hr][lat])):   # m longitudes
-                    lm.append(round(sqrt(um[hr][lat][lon] * um[hr][lat][lon] +
-                                    vm[hr][lat][lon] * vm[hr][lat][lon]), 4))
-                hm.append(lm)
-            sm.append(hm)
-        return sm
+        um = self.getArray(umi)
+        vm = self.getArray(vmi)
+        return list(numpy.round(numpy.sqrt((um * um + vm * vm).astype(numpy.float64)), 4))
 
     def getDirn(self, vmi, umi):
-        try:
-            um = umi.data
-            vm = vmi.data
-        except:
-            um = umi[:]
-            vm = vmi[:]
-        dm = []
-        for hr in range(len(um)):   # 24 hours
-            hm = []
-            for lat in range(len(um[hr])):   # n latitudes
-                lm = []
-                for lon in range(len(um[hr][lat])):   # m longitudes
+        um = self.getArray(umi)
+        vm = self.getArray(vmi)
      # Calculate the wind direction
-                    if abs(vm[hr][lat][lon]) < 0.000001:   # No v-component of velocity
-                        if vm[hr][lat][lon] >= 0:
-                            lm.append(270)
-                        else:
-                            lm.append(90)
-                    else:   # Calculate angle and convert to degrees
-                        theta = atan(um[hr][lat][lon] / vm[hr][lat][lon])
-                        theta = degrees(theta)
-                        if vm[hr][lat][lon] > 0:
-                            lm.append(int(theta + 180.0))
-                        else:   # Make sure angle is positive
-                            theta = theta + 360.0
-                            lm.append(int(theta % 360.0))
-                hm.append(lm)
-            dm.append(hm)
-        return dm
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            theta = numpy.degrees(numpy.arctan((um / vm).astype(numpy.float64)))
+        dm = numpy.where(vm > 0, theta + 180.0, (theta + 360.0) % 360.0) # make sure angle is positive
+        dm = numpy.where(numpy.abs(vm) < 0.000001, numpy.where(vm >= 0, 270, 90), dm) # no v-component of velocity
+        return list(numpy.trunc(dm).astype(numpy.int64))
 
     def getTemp(self, tmi):
-        try:
-            tm = tmi.data
-        except:
-            tm = tmi[:]
-        tmp = []
-        for hr in range(len(tm)):   # 24 hours
-            ht = []
-            for lat in range(len(tm[hr])):   # n latitudes
-                lt = []
-                for lon in range(len(tm[hr][lat])):   # m longitudes
-                    lt.append(round(tm[hr][lat][lon] - 273.15, 1))   # K to C
-                ht.append(lt)
-            tmp.append(ht)
-        return tmp
+        return list(numpy.round(self.getArray(tmi) - 273.15, 1))   # K to C
 
     def getPress(self, pmi):
         if self.fmat == 'srw':
@@ -237,65 +312,19 @@ class makeWeather():
         else:
             div = 100.   # Pa to mbar (hPa)
             rnd = 0
-        try:
-            pm = pmi.data
-        except:
-            pm = pmi[:]
-        ps = []
-        for hr in range(len(pm)):   # 24 hours
-            hp = []
-            for lat in range(len(pm[hr])):   # n latitudes
-                lp = []
-                for lon in range(len(pm[hr][lat])):   # m longitudes
-                    lp.append(round(pm[hr][lat][lon] / div, rnd))   # Pa to mbar
-                hp.append(lp)
-            ps.append(hp)
-        return ps
+        return list(numpy.round(self.getArray(pmi) / div, rnd))
 
     def getGHI(self, pmi, watts=True):
-        try:
-            pm = pmi.data
-        except:
-            pm = pmi[:]
-        ps = []
-        for hr in range(len(pm)):   # 24 or 8760 hours
-            hp = []
-            for lat in range(len(pm[hr])):   # n latitudes
-                lp = []
-                for lon in range(len(pm[hr][lat])):   # m longitudes
-                    if watts:
-                        lp.append(pm[hr][lat][lon])
-                    else:
-                        lp.append(pm[hr][lat][lon] / 3600) # joules so / seconds in an hour
-                hp.append(lp)
-            ps.append(hp)
-        return ps
+        pm = self.getArray(pmi)
+        if watts:
+            return list(pm.copy())
+        return list(pm / 3600) # joules so / seconds in an hour
 
     def getAlbedo(self, alb1, alb2i=None):
-        try:
-            alb = alb1.data
-        except:
-            alb = alb1[:]
+        alb = self.getArray(alb1)
         if alb2i is not None:
-            try:
-                alb2 = alb2i.data
-            except:
-                alb2 = alb2i[:]
-            do_2 = True
-        else:
-            do_2 = false
-        tmp = []
-        for hr in range(len(alb)):   # 24 or 8760 hours
-            at = []
-            for lat in range(len(alb[hr])):   # n latitudes
-                ap = []
-                for lon in range(len(alb[hr][lat])):   # m longitudes
-                    ap.append(alb[hr][lat][lon])
-                    if do_2:
-                        ap[-1] = (ap[-1] + alb2[hr][lat][lon]) / 2
-                at.append(ap)
-            tmp.append(at)
-        return tmp
+            return list((alb + self.getArray(alb2i)) / 2)
+        return list(alb.copy())
 
     def decodeError(self, inp_file):
         self.log += 'Terminating as error with - %s\n' % inp_file
@@ -332,6 +361,36 @@ class makeWeather():
                 lat_rat * (1.0 - lon_rat) * data[lat1][lon1 + 1] +
                 (1.0 - lat_rat) * (1.0 - lon_rat) * data[lat1 + 1][lon1 + 1])
 
+    def setSlab(self, lats):
+        # latitudes to read for this tile. Tiles are tile_rows rows of latitude (all longitudes)
+        # from the first file read and only used when making files for all locations
+        lats = numpy.ma.getdata(lats)
+        if self.tile_lats is None:
+            self.tile_lats = lats.tolist()
+        self.lat_slice = slice(None)
+        if self.tile_rows > 0 and self.src_lat is None:
+            band = self.tile_lats[self.tile * self.tile_rows:(self.tile + 1) * self.tile_rows]
+            ndx = numpy.nonzero((lats >= min(band)) & (lats <= max(band)))[0]
+            if len(ndx) == 0:
+                self.lat_slice = slice(0, 0)
+            else:
+                self.lat_slice = slice(int(ndx[0]), int(ndx[-1]) + 1)
+        return lats[self.lat_slice]
+
+    def readSlab(self, vari, t1=None, t2=None):
+        # read just the hours and latitudes needed from a NetCDF variable
+        return vari[t1:t2, ..., self.lat_slice, :]
+
+    def nextTile(self):
+        if self.tile_rows <= 0 or self.src_lat is not None or self.tile_lats is None:
+            return False
+        self.tile += 1
+        band = self.tile_lats[self.tile * self.tile_rows:(self.tile + 1) * self.tile_rows]
+        if len(band) == 0:
+            return False
+        self.logMsg('Processing latitudes {:0.4f} to {:0.4f}'.format(band[0], band[-1]))
+        return True
+
     def get_data(self, inp_file):
         unzip_file = self.unZip(inp_file)
         if self.return_code != 0:
@@ -356,10 +415,12 @@ class makeWeather():
         self.tims = cdf_file.variables['time'][:]
         self.lat_lon_ndx += [len(self.lati)] * len(self.tims)
         lats = cdf_file.variables[self.vars['latitude']][:]
+        lons = cdf_file.variables[self.vars['longitude']][:]
+        self.inputExtent(inp_file, lats, lons)
+        lats = self.setSlab(lats)
         self.lati.append([])
         for lat in lats:
             self.lati[-1].append(lat)
-        lons = cdf_file.variables[self.vars['longitude']][:]
         self.longi.append([])
         for lon in lons:
             self.longi[-1].append(lon)
@@ -373,21 +434,32 @@ class makeWeather():
                 self.lons.index(lon)
             except:
                 self.lons.append(lon)
+        if self.planning: # just the grid
+            cdf_file.close()
+            return
+        if self.make_wind or self.vars['u10m'] not in cdf_file.variables:
+            v2m = self.getArray(self.readSlab(cdf_file.variables[self.vars['v2m']]))
+            u2m = self.getArray(self.readSlab(cdf_file.variables[self.vars['u2m']]))
+            t2m = self.readSlab(cdf_file.variables[self.vars['t2m']])
         if self.vars['u10m'] in cdf_file.variables:
-            self.s10m += self.getSpeed(cdf_file.variables[self.vars['v10m']], cdf_file.variables[self.vars['u10m']])
-            self.d10m += self.getDirn(cdf_file.variables[self.vars['v10m']], cdf_file.variables[self.vars['u10m']])
-            self.t_10m += self.getTemp(cdf_file.variables[self.vars['t10m']])
+            v10m = self.getArray(self.readSlab(cdf_file.variables[self.vars['v10m']]))
+            u10m = self.getArray(self.readSlab(cdf_file.variables[self.vars['u10m']]))
+            self.s10m += self.getSpeed(v10m, u10m)
+            self.d10m += self.getDirn(v10m, u10m)
+            self.t_10m += self.getTemp(self.readSlab(cdf_file.variables[self.vars['t10m']]))
         else:
-            self.s10m += self.getSpeed(cdf_file.variables[self.vars['v2m']], cdf_file.variables[self.vars['u2m']])
-            self.d10m += self.getDirn(cdf_file.variables[self.vars['v2m']], cdf_file.variables[self.vars['u2m']])
-            self.t_10m += self.getTemp(cdf_file.variables[self.vars['t2m']])
-        self.p_s += self.getPress(cdf_file.variables[self.vars['ps']])
+            self.s10m += self.getSpeed(v2m, u2m)
+            self.d10m += self.getDirn(v2m, u2m)
+            self.t_10m += self.getTemp(t2m)
+        self.p_s += self.getPress(self.readSlab(cdf_file.variables[self.vars['ps']]))
         if self.make_wind:
-            self.s2m += self.getSpeed(cdf_file.variables[self.vars['v2m']], cdf_file.variables[self.vars['u2m']])
-            self.d2m += self.getDirn(cdf_file.variables[self.vars['v2m']], cdf_file.variables[self.vars['u2m']])
-            self.t_2m += self.getTemp(cdf_file.variables[self.vars['t2m']])
-            self.s50m += self.getSpeed(cdf_file.variables[self.vars['v50m']], cdf_file.variables[self.vars['u50m']])
-            self.d50m += self.getDirn(cdf_file.variables[self.vars['v50m']], cdf_file.variables[self.vars['u50m']])
+            self.s2m += self.getSpeed(v2m, u2m)
+            self.d2m += self.getDirn(v2m, u2m)
+            self.t_2m += self.getTemp(t2m)
+            v50m = self.getArray(self.readSlab(cdf_file.variables[self.vars['v50m']]))
+            u50m = self.getArray(self.readSlab(cdf_file.variables[self.vars['u50m']]))
+            self.s50m += self.getSpeed(v50m, u50m)
+            self.d50m += self.getDirn(v50m, u50m)
         cdf_file.close()
 
     def get_era5_data(self, inp_file, frst_hour, last_hour):
@@ -470,10 +542,12 @@ class makeWeather():
                 break
         self.lat_lon_ndx += [len(self.lati)] * (t2 - t1 + 1)
         lats = cdf_file[wf].variables[self.vars['latitude']][:]
+        lons = cdf_file[wf].variables[self.vars['longitude']][:]
+        self.inputExtent(inp_file, lats, lons)
+        lats = self.setSlab(lats)
         self.lati.append([])
         for lat in lats:
             self.lati[-1].append(lat)
-        lons = cdf_file[wf].variables[self.vars['longitude']][:]
         self.longi.append([])
         for lon in lons:
             self.longi[-1].append(lon)
@@ -487,64 +561,23 @@ class makeWeather():
                 self.lons.index(lon)
             except:
                 self.lons.append(lon)
+        if self.planning: # just the grid
+            cdf_file[sf].close()
+            if wf > 0:
+                cdf_file[wf].close()
+            return
         if self.show_progress:
             self.caller.daybar.setValue(0)
             self.caller.daybar.setMaximum(7)
             QtCore.QCoreApplication.processEvents()
         if expver:
             # need to find valid value in the two expver dimensions
-            tmp_var = []
-            for t in range(len(self.tims)):
-                tmp_var.append([])
-                for la in range(len(self.lats)):
-                    tmp_var[-1].append([])
-                    for lo in range(len(self.lons)):
-                        tmp_var[-1][-1].append([])
-            tmi = cdf_file[wf].variables[self.vars['t2m']][t1 : t2]
-            for t in range(len(tmp_var)):
-                for la in range(len(tmp_var[t])):
-                    for lo in range(len(tmp_var[t][la])):
-                        try:
-                            if isinstance(tmi[t][0][la][lo], float):
-                                tmp_var[t][la][lo] = float(tmi[t][0][la][lo])
-                            else:
-                                tmp_var[t][la][lo] = float(tmi[t][1][la][lo])
-                        except:
-                            continue
-            self.t_2m += self.getTemp(tmp_var)
+            self.t_2m += self.getTemp(self.getExpver(self.readSlab(cdf_file[wf].variables[self.vars['t2m']], t1, t2)))
             if self.show_progress:
                 self.caller.daybar.setValue(1)
                 QtCore.QCoreApplication.processEvents()
-            tmp_var = []
-            for t in range(len(self.tims)):
-                tmp_var.append([])
-                for la in range(len(self.lats)):
-                    tmp_var[-1].append([])
-                    for lo in range(len(self.lons)):
-                        tmp_var[-1][-1].append([])
-            tmi = cdf_file[wf].variables[self.vars['v10']][t1 : t2]
-            for t in range(len(tmp_var)):
-                for la in range(len(tmp_var[t])):
-                    for lo in range(len(tmp_var[t][la])):
-                        if isinstance(tmi[t][0][la][lo], float):
-                            tmp_var[t][la][lo] = float(tmi[t][0][la][lo])
-                        else:
-                            tmp_var[t][la][lo] = float(tmi[t][1][la][lo])
-            tmp_var2 = []
-            for t in range(len(self.tims)):
-                tmp_var2.append([])
-                for la in range(len(self.lats)):
-                    tmp_var2[-1].append([])
-                    for lo in range(len(self.lons)):
-                        tmp_var2[-1][-1].append([])
-            tmi = cdf_file[wf].variables[self.vars['u10']][t1 : t2]
-            for t in range(len(tmp_var2)):
-                for la in range(len(tmp_var2[t])):
-                    for lo in range(len(tmp_var2[t][la])):
-                        if isinstance(tmi[t][0][la][lo], float):
-                            tmp_var2[t][la][lo] = float(tmi[t][0][la][lo])
-                        else:
-                            tmp_var2[t][la][lo] = float(tmi[t][1][la][lo])
+            tmp_var = self.getExpver(self.readSlab(cdf_file[wf].variables[self.vars['v10']], t1, t2))
+            tmp_var2 = self.getExpver(self.readSlab(cdf_file[wf].variables[self.vars['u10']], t1, t2))
             self.s10m += self.getSpeed(tmp_var, tmp_var2)
             if self.show_progress:
                 self.caller.daybar.setValue(2)
@@ -553,41 +586,12 @@ class makeWeather():
             if self.show_progress:
                 self.caller.daybar.setValue(3)
                 QtCore.QCoreApplication.processEvents()
-            tmp_var = []
-            for t in range(len(self.tims)):
-                tmp_var.append([])
-                for la in range(len(self.lats)):
-                    tmp_var[-1].append([])
-                    for lo in range(len(self.lons)):
-                        tmp_var[-1][-1].append([])
-            tmi = cdf_file[wf].variables[self.vars['sp']][t1 : t2]
-            for t in range(len(tmp_var)):
-                for la in range(len(tmp_var[t])):
-                    for lo in range(len(tmp_var[t][la])):
-                        if isinstance(tmi[t][0][la][lo], float):
-                            tmp_var[t][la][lo] = float(tmi[t][0][la][lo])
-                        else:
-                            tmp_var[t][la][lo] = float(tmi[t][1][la][lo])
-            self.p_s += self.getPress(tmp_var)
+            self.p_s += self.getPress(self.getExpver(self.readSlab(cdf_file[wf].variables[self.vars['sp']], t1, t2)))
             if self.show_progress:
                 self.caller.daybar.setValue(4)
                 QtCore.QCoreApplication.processEvents()
             try:
-                tmp_var = []
-                for t in range(len(self.tims)):
-                    tmp_var.append([])
-                    for la in range(len(self.lats)):
-                        tmp_var[-1].append([])
-                        for lo in range(len(self.lons)):
-                            tmp_var[-1][-1].append([])
-                tmi = cdf_file[sf].variables[self.vars[localswg]][t1 : t2]
-                for t in range(len(tmp_var)):
-                    for la in range(len(tmp_var[t])):
-                        for lo in range(len(tmp_var[t][la])):
-                            if isinstance(tmi[t][0][la][lo], float):
-                                tmp_var[t][la][lo] = float(tmi[t][0][la][lo])
-                            else:
-                                tmp_var[t][la][lo] = float(tmi[t][1][la][lo])
+                tmp_var = self.getExpver(self.readSlab(cdf_file[sf].variables[self.vars[localswg]], t1, t2))
                 self.ghi += self.getGHI(tmp_var, watts=False)
                 if self.show_progress:
                     self.caller.daybar.setValue(5)
@@ -595,36 +599,8 @@ class makeWeather():
             except:
                 pass
             if self.make_wind:
-                tmp_var = []
-                for t in range(len(self.tims)):
-                    tmp_var.append([])
-                    for la in range(len(self.lats)):
-                        tmp_var[-1].append([])
-                        for lo in range(len(self.lons)):
-                            tmp_var[-1][-1].append([])
-                tmi = cdf_file[wf].variables[self.vars['v100']][t1 : t2]
-                for t in range(len(tmp_var)):
-                    for la in range(len(tmp_var[t])):
-                        for lo in range(len(tmp_var[t][la])):
-                            if isinstance(tmi[t][0][la][lo], float):
-                                tmp_var[t][la][lo] = float(tmi[t][0][la][lo])
-                            else:
-                                tmp_var[t][la][lo] = float(tmi[t][1][la][lo])
-                tmp_var2 = []
-                for t in range(len(self.tims)):
-                    tmp_var2.append([])
-                    for la in range(len(self.lats)):
-                        tmp_var2[-1].append([])
-                        for lo in range(len(self.lons)):
-                            tmp_var2[-1][-1].append([])
-                tmi = cdf_file[wf].variables[self.vars['u100']][t1 : t2]
-                for t in range(len(tmp_var2)):
-                    for la in range(len(tmp_var2[t])):
-                        for lo in range(len(tmp_var2[t][la])):
-                            if isinstance(tmi[t][0][la][lo], float):
-                                tmp_var2[t][la][lo] = float(tmi[t][0][la][lo])
-                            else:
-                                tmp_var2[t][la][lo] = float(tmi[t][1][la][lo])
+                tmp_var = self.getExpver(self.readSlab(cdf_file[wf].variables[self.vars['v100']], t1, t2))
+                tmp_var2 = self.getExpver(self.readSlab(cdf_file[wf].variables[self.vars['u100']], t1, t2))
                 self.s100m += self.getSpeed(tmp_var, tmp_var2)
                 if self.show_progress:
                     self.caller.daybar.setValue(6)
@@ -634,35 +610,39 @@ class makeWeather():
                     self.caller.daybar.setValue(7)
                     QtCore.QCoreApplication.processEvents()
         else: # not expver
-            self.t_2m += self.getTemp(cdf_file[wf].variables[self.vars['t2m']][t1 : t2])
+            self.t_2m += self.getTemp(self.readSlab(cdf_file[wf].variables[self.vars['t2m']], t1, t2))
             if self.show_progress:
                 self.caller.daybar.setValue(1)
                 QtCore.QCoreApplication.processEvents()
-            self.s10m += self.getSpeed(cdf_file[wf].variables[self.vars['v10']][t1 : t2] , cdf_file[wf].variables[self.vars['u10']][t1 : t2])
+            tmp_var = self.getArray(self.readSlab(cdf_file[wf].variables[self.vars['v10']], t1, t2))
+            tmp_var2 = self.getArray(self.readSlab(cdf_file[wf].variables[self.vars['u10']], t1, t2))
+            self.s10m += self.getSpeed(tmp_var, tmp_var2)
             if self.show_progress:
                 self.caller.daybar.setValue(2)
                 QtCore.QCoreApplication.processEvents()
-            self.d10m += self.getDirn(cdf_file[wf].variables[self.vars['v10']][t1 : t2], cdf_file[wf].variables[self.vars['u10']][t1 : t2])
+            self.d10m += self.getDirn(tmp_var, tmp_var2)
             if self.show_progress:
                 self.caller.daybar.setValue(3)
                 QtCore.QCoreApplication.processEvents()
-            self.p_s += self.getPress(cdf_file[wf].variables[self.vars['sp']][t1 : t2])
+            self.p_s += self.getPress(self.readSlab(cdf_file[wf].variables[self.vars['sp']], t1, t2))
             if self.show_progress:
                 self.caller.daybar.setValue(4)
                 QtCore.QCoreApplication.processEvents()
             try:
-                self.ghi += self.getGHI(cdf_file[sf].variables[self.vars[localswg]][t1 : t2], watts=False)
+                self.ghi += self.getGHI(self.readSlab(cdf_file[sf].variables[self.vars[localswg]], t1, t2), watts=False)
                 if self.show_progress:
                     self.caller.daybar.setValue(5)
                     QtCore.QCoreApplication.processEvents()
             except:
                 pass
             if self.make_wind:
-                self.s100m += self.getSpeed(cdf_file[wf].variables[self.vars['v100']][t1 : t2], cdf_file[wf].variables[self.vars['u100']][t1 : t2])
+                tmp_var = self.getArray(self.readSlab(cdf_file[wf].variables[self.vars['v100']], t1, t2))
+                tmp_var2 = self.getArray(self.readSlab(cdf_file[wf].variables[self.vars['u100']], t1, t2))
+                self.s100m += self.getSpeed(tmp_var, tmp_var2)
                 if self.show_progress:
                     self.caller.daybar.setValue(6)
                     QtCore.QCoreApplication.processEvents()
-                self.d100m += self.getDirn(cdf_file[wf].variables[self.vars['v100']][t1 : t2], cdf_file[wf].variables[self.vars['u100']][t1 : t2])
+                self.d100m += self.getDirn(tmp_var, tmp_var2)
                 if self.show_progress:
                     self.caller.daybar.setValue(7)
                     QtCore.QCoreApplication.processEvents()
@@ -694,20 +674,25 @@ class makeWeather():
      #   albedo   surface albedo
         self.tims = cdf_file.variables['time'][:]
         lats = cdf_file.variables[self.vars['latitude']][:]
+        lons = cdf_file.variables[self.vars['longitude']][:]
+        self.inputExtent(inp_file, lats, lons)
+        lats = self.setSlab(lats)
         self.latsi.append([])
         for lat in lats:
             self.latsi[-1].append(lat)
-        lons = cdf_file.variables[self.vars['longitude']][:]
         self.longsi.append([])
         for lon in lons:
             self.longsi[-1].append(lon)
+        if self.planning: # just the grid
+            cdf_file.close()
+            return
         if self.vars[self.swg] in cdf_file.variables:
-            self.ghi += self.getGHI(cdf_file.variables[self.vars[self.swg]])
+            self.ghi += self.getGHI(self.readSlab(cdf_file.variables[self.vars[self.swg]]))
         else:
             self.swg = 'swgnt'
-            self.ghi += self.getGHI(cdf_file.variables[self.vars['swgnt']])
+            self.ghi += self.getGHI(self.readSlab(cdf_file.variables[self.vars['swgnt']]))
         if self.vars['alb'] in cdf_file.variables:
-            self.alb += self.getAlbedo(cdf_file.variables[self.vars['alb']])
+            self.alb += self.getAlbedo(self.readSlab(cdf_file.variables[self.vars['alb']]))
         cdf_file.close()
 
     def checkZone(self):
@@ -904,7 +889,479 @@ class makeWeather():
         cdf_file.close()
         return
 
-    def process_era5(self):
+    def gridCube(self, var, grid, which):
+        # hourly values for a grid as a (hours, latitudes, longitudes) array. Built once per file set
+        key = (id(var), grid, which)
+        if key not in self.cubes:
+            hrs = self.grid_hours[grid]
+            hrs = hrs[hrs < len(var)]
+            if len(hrs) == 0:
+                self.cubes[key] = [hrs, None]
+            else:
+                self.cubes[key] = [hrs, numpy.stack([var[hr] for hr in hrs])]
+        return self.cubes[key]
+
+    def gridMaps(self, lat_list, lon_list):
+        # index of each latitude and longitude in each grid
+        maps = []
+        for g in range(len(lat_list)):
+            maps.append([{}, {}])
+            for i in range(len(lat_list[g])):
+                maps[-1][0].setdefault(lat_list[g][i], i)
+            for i in range(len(lon_list[g])):
+                maps[-1][1].setdefault(lon_list[g][i], i)
+        return maps
+
+    def rowSeries(self, var, la, hours, which='i'):
+        # values for all longitudes of latitude self.lats[la] by hour and where they're present
+        if which == 'si':
+            maps = self.maps_si
+        else:
+            maps = self.maps_i
+        values = None
+        valid = numpy.zeros((len(self.lons), hours), dtype=bool)
+        for grid in self.grid_hours:
+            if grid >= len(maps):
+                continue
+            try:
+                lat = maps[grid][0][self.lats[la]]
+            except KeyError:
+                continue
+            hrs, cube = self.gridCube(var, grid, which)
+            if cube is None or lat >= cube.shape[1]:
+                continue
+            lons = numpy.array([maps[grid][1].get(lon, -1) for lon in self.lons], dtype=numpy.int64)
+            locs = numpy.nonzero((lons >= 0) & (lons < cube.shape[2]))[0]
+            if len(locs) == 0:
+                continue
+            hrs = hrs[hrs < hours]
+            if values is None:
+                values = numpy.zeros((len(self.lons), hours), dtype=cube.dtype)
+            values[numpy.ix_(locs, hrs)] = cube[:len(hrs), lat, lons[locs]].T
+            valid[numpy.ix_(locs, hrs)] = True
+        if values is None:
+            values = numpy.zeros((len(self.lons), hours), dtype=numpy.float64)
+        return values, valid
+
+    def pointSeries(self, var, i, hours, rnd=4):
+        # values for location src_lat[i], src_lon[i] interpolated from the enclosing cell
+        values = None
+        for grid in self.grid_hours:
+            lati = self.lati[grid]
+            longi = self.longi[grid]
+            for lat2 in range(len(lati)):
+                if self.src_lat[i] <= lati[lat2]:
+                    break
+            for lon2 in range(len(longi)):
+                if self.src_lon[i] <= longi[lon2]:
+                    break
+            lat1 = lat2 - 1
+            lat_rat = (lati[lat2] - self.src_lat[i]) / (lati[lat2] - lati[lat1])
+            lon1 = lon2 - 1
+            lon_rat = (longi[lon2] - self.src_lon[i]) / (longi[lon2] - longi[lon1])
+            hrs, cube = self.gridCube(var, grid, 'i')
+            if cube is None:
+                continue
+            hrs = hrs[hrs < hours]
+            cube = cube[:len(hrs)]
+            valu = lat_rat * lon_rat * cube[:, lat1, lon1] + \
+                   (1.0 - lat_rat) * lon_rat * cube[:, lat1 + 1, lon1] + \
+                   lat_rat * (1.0 - lon_rat) * cube[:, lat1, lon1 + 1] + \
+                   (1.0 - lat_rat) * (1.0 - lon_rat) * cube[:, lat1 + 1, lon1 + 1]
+            if rnd > 0:
+                valu = numpy.round(valu, rnd)
+            else:
+                valu = numpy.trunc(valu).astype(numpy.int64)
+            if values is None:
+                values = numpy.zeros(hours, dtype=valu.dtype)
+            values[hrs] = valu
+        if values is None:
+            values = numpy.zeros(hours, dtype=numpy.float64)
+        return values
+
+    def windHeader(self, lat, lon):
+        hdr = 'id,<city>,<state>,<country>,%s,%s,%s,0,1,8760\n' % (str(self.src_year), round(lat, 4), round(lon, 4))
+        if self.era5:
+            hdr += 'Wind data derived from ERA5 reanalysis-era5-single-levels' + '\n'
+            hdr += 'Temperature,Pressure,Direction,Speed,Direction,Speed\n'
+            hdr += 'C,atm,degrees,m/s,degrees,m/s\n'
+            hdr += '2,0,10,10,100,100\n'
+        else:
+            hdr += 'Wind data derived from MERRA-2 tavg1_2d_slv_Nx' + '\n'
+            if len(self.s10m) > 0:
+                hdr += 'Temperature,Pressure,Direction,Speed,Temperature,Direction,Speed,' + \
+                       'Direction,Speed' + '\n'
+                hdr += 'C,atm,degrees,m/s,C,degrees,m/s,degrees,m/s' + '\n'
+                hdr += '2,0,2,2,10,10,10,50,50' + '\n'
+            else:
+                hdr += 'Temperature,Pressure,Direction,Speed,Direction,Speed' + '\n'
+                hdr += 'C,atm,degrees,m/s,degrees,m/s' + '\n'
+                hdr += '2,0,2,2,50,50' + '\n'
+        return hdr
+
+    def solarHeader(self, lat, lon):
+        if self.fmat == 'csv':
+            hdr = 'Location,City,Region,Country,Latitude,Longitude,Time Zone,Elevation,Source\n' + \
+                  'id,<city>,<state>,<country>,%s,%s,%s,0,IWEC\n' % (round(lat, 4), round(lon, 4), str(self.src_zone))
+            hdr += 'Year,Month,Day,Hour,GHI,DNI,DHI,Tdry,Pres,Wspd,Wdir' + '\n'
+        else:
+            hdr = 'id,<city>,<state>,%s,%s,%s,0,3600.0,%s,0:30:00\n' % (str(self.src_zone), round(lat, 4),
+                  round(lon, 4), str(self.src_year))
+        return hdr
+
+    def windVariables(self):
+        # variables (and rounding for specific locations) for each wind file column
+        if self.era5:
+            return [[self.t_2m, 1], [self.p_s, 6], [self.d10m, 0], [self.s10m, 4], [self.d100m, 0],
+                    [self.s100m, 4]], len(self.s100m)
+        if len(self.s10m) > 0:
+            return [[self.t_2m, 1], [self.p_s, 6], [self.d2m, 0], [self.s2m, 4], [self.t_10m, 1],
+                    [self.d10m, 0], [self.s10m, 4], [self.d50m, 0], [self.s50m, 4]], len(self.s50m)
+        return [[self.t_2m, 1], [self.p_s, 6], [self.d2m, 0], [self.s2m, 4], [self.d50m, 0],
+                [self.s50m, 4]], len(self.s50m)
+
+    def outputFile(self, wind, lat, lon, spec=False):
+        # the weather file for a location; spec for a location given by coordinates
+        if wind:
+            out_file = self.tgt_dir + 'wind_weather_'
+        else:
+            out_file = self.tgt_dir + 'solar_weather_'
+        if spec:
+            out_file += str(lat) + '_' + str(lon)
+        else:
+            out_file += '{:0.4f}'.format(lat) + '_' + '{:0.4f}'.format(lon)
+        return out_file + '_' + str(self.src_year) + '.' + self.fmat
+
+    def outputFiles(self, wind):
+        # the weather files for this tile and their locations
+        if self.src_lat is not None:
+            return [[self.outputFile(wind, self.src_lat[i], self.src_lon[i], spec=True), self.src_lat[i],
+                     self.src_lon[i]] for i in range(len(self.src_lat))]
+        return [[self.outputFile(wind, lat, lon), lat, lon] for lat in self.lats for lon in self.lons]
+
+    def locationJobs(self, wind, la=None, i=None):
+        # jobs to write files for a row of latitude la or for specific location i
+        if self.era5:
+            temp = self.t_2m
+            rad = 'i' # solar on the same grid
+        else:
+            temp = self.t_10m
+            rad = 'si'
+        job = {'kind': 'wind', 'gaps': self.gaps, 'gap_line': ',,,,,,,,\n', 'remove': True, 'valid': None,
+               'hub_height': 0, 'law': self.law, 'spec': i is not None, 'alb': None, 'zone': self.src_zone,
+               'year': self.src_year}
+        if wind:
+            variables, job['hours'] = self.windVariables()
+            job['hub_height'] = self.hub_height
+            if not self.era5 and len(self.s10m) == 0:
+                job['gap_line'] = None # no line for hours not in the grid
+        else:
+            job['kind'] = self.fmat
+            job['hours'] = len(self.s10m)
+            if self.fmat == 'csv':
+                variables = [[temp, 1], [self.p_s, 0], [self.s10m, 4], [self.d10m, 0]]
+            else:
+                variables = [[temp, 1], [self.s10m, 4], [self.d10m, 0], [self.p_s, 1]]
+            if self.era5:
+                job['remove'] = False
+        jobs = []
+        if i is not None:
+            job['file'] = self.outputFile(wind, self.src_lat[i], self.src_lon[i], spec=True)
+            job['lat'] = self.src_lat[i]
+            job['lon'] = self.src_lon[i]
+            if wind:
+                job['header'] = self.windHeader(self.src_lat[i], self.src_lon[i])
+            else:
+                job['header'] = self.solarHeader(self.src_lat[i], self.src_lon[i])
+                job['ghi'] = self.pointSeries(self.ghi, i, job['hours'])
+                job['press'] = self.pointSeries(self.p_s, i, job['hours'], rnd=0)
+                if len(self.alb) > 0:
+                    job['alb'] = self.pointSeries(self.alb, i, job['hours'])
+            job['cols'] = []
+            for var, rnd in variables:
+                job['cols'].append(self.pointSeries(var, i, job['hours'], rnd=rnd))
+            jobs.append(job)
+            return jobs
+        cols = []
+        valid = numpy.ones((len(self.lons), job['hours']), dtype=bool)
+        for var, rnd in variables:
+            values, ok = self.rowSeries(var, la, job['hours'])
+            cols.append(values)
+            valid &= ok
+        if not wind:
+            ghi, ok = self.rowSeries(self.ghi, la, job['hours'], which=rad)
+            valid &= ok
+            press, ok = self.rowSeries(self.p_s, la, job['hours'], which=rad)
+            if len(self.alb) > 0 and not self.era5:
+                alb, ok = self.rowSeries(self.alb, la, job['hours'], which=rad)
+        for lo in range(len(self.lons)):
+            loc_job = dict(job)
+            loc_job['valid'] = valid[lo]
+            loc_job['cols'] = [col[lo] for col in cols]
+            loc_job['file'] = self.outputFile(wind, self.lats[la], self.lons[lo])
+            loc_job['lat'] = self.lats[la]
+            loc_job['lon'] = self.lons[lo]
+            if wind:
+                loc_job['header'] = self.windHeader(self.lats[la], self.lons[lo])
+            else:
+                loc_job['header'] = self.solarHeader(self.lats[la], self.lons[lo])
+                loc_job['ghi'] = ghi[lo]
+                loc_job['press'] = press[lo]
+                if len(self.alb) > 0 and not self.era5:
+                    loc_job['alb'] = alb[lo]
+            jobs.append(loc_job)
+        return jobs
+
+    def readManifest(self):
+        # details of the files created by previous runs. Kept in the target directory
+        self.manifest_file = self.tgt_dir + '.makeweatherfiles.json'
+        self.manifest = {'inputs': {}, 'outputs': {}}
+        self.inputs = {}
+        self.extents = {}
+        self.tile_inputs = set()
+        try:
+            with open(self.manifest_file) as fil:
+                manifest = json.load(fil)
+            if isinstance(manifest['inputs'], dict) and isinstance(manifest['outputs'], dict):
+                self.manifest = manifest
+        except:
+            pass
+
+    def saveManifest(self):
+        self.manifest['inputs'].update(self.inputs)
+        work_file = self.manifest_file + '.tmp'
+        try:
+            with open(work_file, 'w') as fil:
+                json.dump(self.manifest, fil)
+            os.replace(work_file, self.manifest_file)
+        except:
+            try:
+                os.remove(work_file)
+            except:
+                pass
+
+    def inputFile(self, inp_file):
+        # remember the input files used for this run and this tile
+        self.tile_inputs.add(inp_file)
+        if inp_file in self.inputs:
+            return
+        try:
+            self.inputs[inp_file] = fileSignature(inp_file, self.manifest['inputs'].get(inp_file))
+        except:
+            pass
+
+    def inputExtent(self, inp_file, lats, lons):
+        # the area an input file covers, widened by a grid step so locations between grid points are included
+        lats = numpy.ma.getdata(lats)
+        lons = numpy.ma.getdata(lons)
+        step = 0.
+        for values in [lats, lons]:
+            if len(values) > 1:
+                step = max(step, float(numpy.max(numpy.abs(numpy.diff(values)))))
+        self.extents[inp_file] = (float(numpy.min(lats)) - step, float(numpy.max(lats)) + step,
+                                  float(numpy.min(lons)) - step, float(numpy.max(lons)) + step)
+
+    def runKey(self):
+        # what every output file depends on; parameters and program version
+        return {'params': {'year': self.src_year, 'zone': self.src_zone, 'format': self.fmat, 'swg': self.swg,
+                           'wrap': self.wrap, 'gaps': self.gaps, 'hub_height': self.hub_height, 'law': self.law,
+                           'coordinates': self.src_lat_lon},
+                'version': fileVersion('makeweatherfiles')}
+
+    def outputKey(self, lat, lon):
+        # what an output file depends on; the input files for this tile that cover its location, and
+        # the run's key. The input files are grouped by area and hashed once per tile for each group
+        if self.tile_areas is None:
+            self.tile_areas = {}
+            for inp_file in sorted(self.tile_inputs):
+                area = self.extents.get(inp_file) # None if not known; taken to cover everything
+                try:
+                    self.tile_areas[area].append(inp_file)
+                except KeyError:
+                    self.tile_areas[area] = [inp_file]
+            self.tile_digests = {}
+        areas = tuple(area for area in self.tile_areas.keys() if area is None or
+                      (area[0] <= lat <= area[1] and area[2] <= lon <= area[3]))
+        try:
+            inputs = self.tile_digests[areas]
+        except KeyError:
+            digest = hashlib.sha1()
+            for inp_file in sorted([inp for area in areas for inp in self.tile_areas[area]]):
+                digest.update((inp_file + '|' + self.inputs.get(inp_file, {}).get('hash', '') + '\n').encode())
+            inputs = digest.hexdigest()
+            self.tile_digests[areas] = inputs
+        return dict(self.run_key, inputs=inputs)
+
+    def isCurrent(self, out_file, key):
+        # True if out_file was created from the same inputs and hasn't changed since. A file not
+        # created due to data gaps is current if it still isn't there
+        entry = self.manifest['outputs'].get(out_file[out_file.rfind('/') + 1:])
+        if entry is None:
+            return False
+        for item in key.keys():
+            if entry.get(item) != key[item]:
+                return False
+        try:
+            stat = os.stat(out_file)
+        except:
+            return entry.get('missing', False)
+        return entry.get('size') == stat.st_size and entry.get('mtime') == stat.st_mtime_ns
+
+    def unchangedFile(self, out_file):
+        # log a current file that wasn't created due to data gaps
+        fil = out_file[out_file.rfind('/') + 1:]
+        if self.manifest['outputs'][fil].get('missing', False):
+            self.gaplog += '%s not created due to data gaps\n' % fil
+
+    def tileCurrent(self):
+        # True if the weather files for this tile are all current. Only the grids are read from
+        # the input files to work this out, so the data needn't be loaded if nothing has changed
+        if len(self.manifest['outputs']) == 0:
+            return False
+        log = self.log
+        gaplog = self.gaplog
+        self.tile_files = None
+        self.planning = True
+        try:
+            self.resetData()
+            if self.era5:
+                self.process_era5()
+            else:
+                self.process_merra()
+        finally:
+            self.planning = False
+            self.log = log
+            self.gaplog = gaplog
+        if self.return_code > 1 or self.tile_files is None:
+            self.return_code = 0
+            return False
+        for out_file, lat, lon in self.tile_files:
+            if not self.isCurrent(out_file, self.outputKey(lat, lon)):
+                self.return_code = 0
+                return False
+        for out_file, lat, lon in self.tile_files:
+            self.unchangedFile(out_file)
+        if self.tile == 0:
+            self.checkZone()
+        if len(self.tile_files) > 0:
+            self.log += '%s files unchanged since last created\n' % str(len(self.tile_files))
+        return True
+
+    def startWorkers(self):
+        # a pool of processes to write the weather files, started once for all the tiles
+        if self.workers <= 1:
+            return None
+        try:
+            # spawn rather than fork a copy of the GUI
+            return multiprocessing.get_context('spawn').Pool(processes=self.workers)
+        except Exception as err:
+            self.logMsg(f'Unable to start {self.workers} worker processes ({err}); continuing with one')
+        return None
+
+    def writeWeather(self, wind, pool=None):
+        # write the weather files. The loaded data is rearranged by location a row of
+        # latitude at a time and the files written by pool if there are workers
+        if self.planning: # just the files for tileCurrent
+            self.tile_files = self.outputFiles(wind)
+            return
+        self.cubes = {}
+        if wind:
+            hours = self.windVariables()[1]
+        else:
+            hours = len(self.s10m)
+        ndx = numpy.array(self.lat_lon_ndx[:hours], dtype=numpy.int64)
+        self.grid_hours = {}
+        for grid in numpy.unique(ndx).tolist():
+            self.grid_hours[grid] = numpy.nonzero(ndx == grid)[0]
+        if self.src_lat is not None:   # specific location(s)
+            tiles = [[None, i] for i in range(len(self.src_lat))]
+            if self.show_progress and not wind:
+                self.caller.daybar.setMaximum(len(self.src_lat) - 1)
+                QtCore.QCoreApplication.processEvents()
+        else: # all locations
+            self.maps_i = self.gridMaps(self.lati, self.longi)
+            if not self.era5 and not wind:
+                self.maps_si = self.gridMaps(self.latsi, self.longsi)
+            tiles = [[la, None] for la in range(len(self.lats))]
+            if self.show_progress:
+                self.caller.daybar.setMaximum(len(self.lats) * len(self.lons))
+                QtCore.QCoreApplication.processEvents()
+        done = 0
+        unchanged = 0
+        keys = {}
+        try:
+            for la, i in tiles:
+                jobs = []
+                for job in self.locationJobs(wind, la=la, i=i):
+                    key = self.outputKey(job['lat'], job['lon'])
+                    if self.isCurrent(job['file'], key):
+                        self.unchangedFile(job['file'])
+                        unchanged += 1
+                        done += 1
+                    else:
+                        keys[job['file']] = key
+                        jobs.append(job)
+                if pool is None:
+                    results = map(weatherFile, jobs)
+                else:
+                    results = pool.imap(weatherFile, jobs)
+                for job, result in zip(jobs, results):
+                    if self.show_progress:
+                        self.caller.daybar.setValue(done)
+                        QtCore.QCoreApplication.processEvents()
+                    done += 1
+                    status, with_gaps, updated = result
+                    fil = job['file'][job['file'].rfind('/') + 1:]
+                    entry = dict(keys[job['file']])
+                    if status == 'gaps':
+                        self.log += '%s created with gaps (%s days)\n' % (fil, str(int(with_gaps / 24)))
+                    elif status == 'missing':
+                        self.gaplog += '%s not created due to data gaps\n' % fil
+                        entry['missing'] = True
+                    else:
+                        self.log += '%s created\n' % fil
+                    if updated:
+                        self.log += '%s updated\n' % fil
+                    try:
+                        stat = os.stat(job['file'])
+                        entry['size'] = stat.st_size
+                        entry['mtime'] = stat.st_mtime_ns
+                    except:
+                        pass
+                    self.manifest['outputs'][fil] = entry
+        finally:
+            self.cubes = {}
+            if unchanged > 0:
+                self.log += '%s files unchanged since last created\n' % str(unchanged)
+            self.saveManifest()
+
+    def resetData(self):
+        self.the_year = self.src_year  # start with their year
+        self.tile_inputs = set()
+        self.lats = []
+        self.lati = []
+        self.latsi = []
+        self.lons = []
+        self.longi = []
+        self.longsi = []
+        self.lat_lon_ndx = []
+        self.longrange = [None, None]
+        self.tims = []
+        self.s10m = []
+        self.d10m = []
+        self.t_10m = []
+        self.p_s = []
+        self.ghi = []
+        self.s2m = []
+        self.s50m = []
+        self.s100m = []
+        self.d2m = []
+        self.d50m = []
+        self.d100m = []
+        self.t_2m = []
+        self.alb = []
+
+    def process_era5(self, pool=None):
         dys = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
         if self.show_progress:
             self.caller.daybar.setValue(0)
@@ -1021,7 +1478,8 @@ class makeWeather():
             if self.return_code != 0:
                 return
         self.longrange = [self.lons[0], self.lons[-1]]
-        self.checkZone()
+        if self.tile == 0:
+            self.checkZone()
         if self.make_wind:
             if self.show_progress:
                 self.caller.daybar.setValue(0)
@@ -1032,117 +1490,7 @@ class makeWeather():
             if not os.path.exists(target_dir):
                 self.log += 'mkdir %s\n' % target_dir
                 os.makedirs(target_dir)
-            if self.src_lat is not None:   # specific location(s)
-                for i in range(len(self.src_lat)):
-                    if self.show_progress:
-                        self.caller.daybar.setValue(i)
-                        QtCore.QCoreApplication.processEvents()
-                    out_file = self.tgt_dir + 'wind_weather_' + str(self.src_lat[i]) + '_' + \
-                               str(self.src_lon[i]) + '_' + str(self.src_year) + '.' + self.fmat
-                    tf = open(out_file, 'w')
-                    with_gaps = 0
-                    missing = False
-                    hdr = 'id,<city>,<state>,<country>,%s,%s,%s,0,1,8760\n' % (str(self.src_year),
-                          round(self.src_lat[i], 4), round(self.src_lon[i], 4))
-                    tf.write(hdr)
-                    tf.write('Wind data derived from ERA5 reanalysis-era5-single-levels' + '\n')
-                    tf.write('Temperature,Pressure,Direction,Speed,Direction,Speed\n')
-                    tf.write('C,atm,degrees,m/s,degrees,m/s\n')
-                    tf.write('2,0,10,10,100,100\n')
-                    for hr in range(len(self.s100m)):
-                        for lat2 in range(len(self.lati[self.lat_lon_ndx[hr]])):
-                            if self.src_lat[i] <= self.lati[self.lat_lon_ndx[hr]][lat2]:
-                                break
-                        for lon2 in range(len(self.longi[self.lat_lon_ndx[hr]])):
-                            if self.src_lon[i] <= self.longi[self.lat_lon_ndx[hr]][lon2]:
-                                break
-                        if self.longrange[0] is None:
-                            self.longrange[0] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        else:
-                            if self.longi[self.lat_lon_ndx[hr]][lon2] < self.longrange[0]:
-                                self.longrange[0] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        if self.longrange[1] is None:
-                            self.longrange[1] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        else:
-                            if self.longi[self.lat_lon_ndx[hr]][lon2] > self.longrange[1]:
-                                self.longrange[1] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        lat1 = lat2 - 1
-                        lat_rat = (self.lati[self.lat_lon_ndx[hr]][lat2] - self.src_lat[i]) / \
-                                  (self.lati[self.lat_lon_ndx[hr]][lat2] - self.lati[self.lat_lon_ndx[hr]][lat1])
-                        lon1 = lon2 - 1
-                        lon_rat = (self.longi[self.lat_lon_ndx[hr]][lon2] - self.src_lon[i]) / \
-                                  (self.longi[self.lat_lon_ndx[hr]][lon2] - self.longi[self.lat_lon_ndx[hr]][lon1])
-                        tf.write(str(self.valu(self.t_2m[hr], lat1, lon1, lat_rat, lon_rat, rnd=1)) + ',' +
-                                 str(self.valu(self.p_s[hr], lat1, lon1, lat_rat, lon_rat, rnd=6)) + ',' +
-                                 str(self.valu(self.d10m[hr], lat1, lon1, lat_rat, lon_rat, rnd=0)) + ',' +
-                                 str(self.valu(self.s10m[hr], lat1, lon1, lat_rat, lon_rat)) + ',' +
-                                 str(self.valu(self.d100m[hr], lat1, lon1, lat_rat, lon_rat, rnd=0)) + ',' +
-                                 str(self.valu(self.s100m[hr], lat1, lon1, lat_rat, lon_rat)) + '\n')
-                    tf.close()
-                    self.log += '%s created\n' % out_file[out_file.rfind('/') + 1:]
-                    if self.hub_height > 0:
-                        ok = extrapolateWind(out_file, self.hub_height, law=self.law, replace=True)
-                        if ok:
-                            self.log += '%s updated\n' % out_file[out_file.rfind('/') + 1:]
-            else: # all locations
-                if self.show_progress:
-                    self.caller.daybar.setMaximum(len(self.lats) * len(self.lons))
-                    QtCore.QCoreApplication.processEvents()
-                for la in range(len(self.lats)):
-                    for lo in range(len(self.lons)):
-                        if self.show_progress:
-                            self.caller.daybar.setValue(len(self.lats) * la + lo)
-                            QtCore.QCoreApplication.processEvents()
-                        with_gaps = 0
-                        missing = False
-                        out_file = self.tgt_dir + 'wind_weather_' + '{:0.4f}'.format(self.lats[la]) + \
-                                   '_' + '{:0.4f}'.format(self.lons[lo]) + '_' + str(self.src_year) + '.srw'
-                        tf = open(out_file, 'w')
-                        hdr = 'id,<city>,<state>,<country>,%s,%s,%s,0,1,8760\n' % (str(self.src_year),
-                              round(self.lats[la], 4), round(self.lons[lo], 4))
-                        tf.write(hdr)
-                        tf.write('Wind data derived from ERA5 reanalysis-era5-single-levels' + '\n')
-                        tf.write('Temperature,Pressure,Direction,Speed,Direction,Speed\n')
-                        tf.write('C,atm,degrees,m/s,degrees,m/s\n')
-                        tf.write('2,0,10,10,100,100\n')
-                        for hr in range(len(self.s100m)):
-                            try:
-                                lat = self.lati[self.lat_lon_ndx[hr]].index(self.lats[la])
-                                lon = self.longi[self.lat_lon_ndx[hr]].index(self.lons[lo])
-                            except:
-                                if self.gaps:
-                                    tf.write(',,,,,,,,\n')
-                                    with_gaps += 1
-                                    continue
-                                else:
-                                    missing = True
-                                    break
-                            try:
-                                tf.write(str(self.t_2m[hr][lat][lon]) + ',' + str(self.p_s[hr][lat][lon]) + ',' +
-                                         str(self.d10m[hr][lat][lon]) + ',' + str(self.s10m[hr][lat][lon]) + ',' +
-                                         str(self.d100m[hr][lat][lon]) + ',' + str(self.s100m[hr][lat][lon]) + '\n')
-                            except:
-                                if self.gaps:
-                                    tf.write(',,,,,,,,\n')
-                                    with_gaps += 1
-                                    continue
-                                else:
-                                    missing = True
-                                    break
-                        tf.close()
-                        if with_gaps > 0 and with_gaps < 504:
-                            self.log += '%s created with gaps (%s days)\n' % ( \
-                                        out_file[out_file.rfind('/') + 1:], str(int(with_gaps / 24)))
-                        elif missing or with_gaps > 0:
-                            os.remove(out_file)
-                            self.gaplog += '%s not created due to data gaps\n' % out_file[out_file.rfind('/') + 1:]
-                            continue
-                        else:
-                            self.log += '%s created\n' % out_file[out_file.rfind('/') + 1:]
-                        if self.hub_height > 0:
-                            ok = extrapolateWind(out_file, self.hub_height, law=self.law, replace=True)
-                            if ok:
-                                self.log += '%s updated\n' % out_file[out_file.rfind('/') + 1:]
+            self.writeWeather(True, pool)
             if self.show_progress:
                 self.caller.daybar.setValue(self.caller.daybar.maximum())
                 self.caller.progresslabel.setText('All done')
@@ -1158,217 +1506,7 @@ class makeWeather():
         if not os.path.exists(target_dir):
             self.log += 'mkdir %s\n' % target_dir
             os.makedirs(target_dir)
-        if self.src_lat is not None:  # specific location(s)
-            if self.show_progress:
-                self.caller.daybar.setMaximum(len(self.src_lat) - 1)
-                QtCore.QCoreApplication.processEvents()
-            for i in range(len(self.src_lat)):
-                if self.show_progress:
-                    self.caller.daybar.setValue(i)
-                    QtCore.QCoreApplication.processEvents()
-                out_file = self.tgt_dir + 'solar_weather_' + \
-                           str(self.src_lat[i]) + '_' + str(self.src_lon[i]) + '_' + str(self.src_year) + '.' + self.fmat
-                tf = open(out_file, 'w')
-                if self.fmat == 'csv':
-                    hdr = 'Location,City,Region,Country,Latitude,Longitude,Time Zone,Elevation,Source\n' + \
-                          'id,<city>,<state>,<country>,%s,%s,%s,0,IWEC\n' % (round(self.src_lat[i], 4),
-                          round(self.src_lon[i], 4), str(self.src_zone))
-                    tf.write(hdr)
-                    tf.write('Year,Month,Day,Hour,GHI,DNI,DHI,Tdry,Pres,Wspd,Wdir' + '\n')
-                    mth = 0
-                    day = 1
-                    hour = 0
-                    for hr in range(len(self.s10m)):
-                        for lat2 in range(len(self.lati[self.lat_lon_ndx[hr]])):
-                            if self.src_lat[i] <= self.lati[self.lat_lon_ndx[hr]][lat2]:
-                                break
-                        for lon2 in range(len(self.longi[self.lat_lon_ndx[hr]])):
-                            if self.src_lon[i] <= self.longi[self.lat_lon_ndx[hr]][lon2]:
-                                break
-                        if self.longrange[0] is None:
-                            self.longrange[0] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        else:
-                            if self.longi[self.lat_lon_ndx[hr]][lon2] < self.longrange[0]:
-                                self.longrange[0] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        if self.longrange[1] is None:
-                            self.longrange[1] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        else:
-                            if self.longi[self.lat_lon_ndx[hr]][lon2] > self.longrange[1]:
-                                self.longrange[1] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        lat1 = lat2 - 1
-                        lat_rat = (self.lati[self.lat_lon_ndx[hr]][lat2] - self.src_lat[i]) / \
-                                  (self.lati[self.lat_lon_ndx[hr]][lat2] - self.lati[self.lat_lon_ndx[hr]][lat1])
-                        lon1 = lon2 - 1
-                        lon_rat = (self.longi[self.lat_lon_ndx[hr]][lon2] - self.src_lon[i]) / \
-                                  (self.longi[self.lat_lon_ndx[hr]][lon2] - self.longi[self.lat_lon_ndx[hr]][lon1])
-                        ghi = self.valu(self.ghi[hr], lat1, lon1, lat_rat, lon_rat)
-                        dni = getDNI(ghi, hour=hr + 1, lat=self.src_lat[i], lon=self.src_lon[i],
-                              press=self.valu(self.p_s[hr], lat1,
-                              lon1, lat_rat, lon_rat, rnd=0), zone=self.src_zone)
-                        dhi = getDHI(ghi, dni, hour=hr + 1, lat=self.src_lat[i])
-                        tf.write(str(self.src_year) + ',' + str(mth + 1) + ',' +
-                        str(day) + ',' + str(hour) + ',' +
-                        str(int(ghi)) + ',' + str(int(dni)) + ',' + str(int(dhi)) + ',' +
-                        str(self.valu(self.t_2m[hr], lat1, lon1, lat_rat, lon_rat, rnd=1)) + ',' +
-                        str(self.valu(self.p_s[hr], lat1, lon1, lat_rat, lon_rat, rnd=0)) + ',' +
-                        str(self.valu(self.s10m[hr], lat1, lon1, lat_rat, lon_rat)) + ',' +
-                        str(self.valu(self.d10m[hr], lat1, lon1, lat_rat, lon_rat, rnd=0)) + '\n')
-                        hour += 1
-                        if hour > 23:
-                            hour = 0
-                            day += 1
-                            if day > dys[mth]:
-                                mth += 1
-                                day = 1
-                                hour = 0
-                else:
-                    hdr = 'id,<city>,<state>,%s,%s,%s,0,3600.0,%s,0:30:00\n' % (str(self.src_zone),
-                          round(self.src_lat[i], 4),
-                          round(self.src_lon[i], 4), str(self.src_year))
-                    tf.write(hdr)
-                    for hr in range(len(self.s10m)):
-                        for lat2 in range(len(self.lati[self.lat_lon_ndx[hr]])):
-                            if self.src_lat[i] <= self.lati[self.lat_lon_ndx[hr]][lat2]:
-                                break
-                        for lon2 in range(len(self.longi[self.lat_lon_ndx[hr]])):
-                            if self.src_lon[i] <= self.longi[self.lat_lon_ndx[hr]][lon2]:
-                                break
-                        if self.longrange[0] is None:
-                            self.longrange[0] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        else:
-                            if self.longi[self.lat_lon_ndx[hr]][lon2] < self.longrange[0]:
-                                self.longrange[0] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        if self.longrange[1] is None:
-                            self.longrange[1] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        else:
-                            if self.longi[self.lat_lon_ndx[hr]][lon2] > self.longrange[1]:
-                                self.longrange[1] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        lat1 = lat2 - 1
-                        lat_rat = (self.lati[self.lat_lon_ndx[hr]][lat2] - self.src_lat[i]) / \
-                                  (self.lati[self.lat_lon_ndx[hr]][lat2] - self.lati[self.lat_lon_ndx[hr]][lat1])
-                        lon1 = lon2 - 1
-                        lon_rat = (self.longi[self.lat_lon_ndx[hr]][lon2] - self.src_lon[i]) / \
-                                  (self.longi[self.lat_lon_ndx[hr]][lon2] - self.longi[self.lat_lon_ndx[hr]][lon1])
-                        ghi = self.valu(self.ghi[hr], lat1, lon1, lat_rat, lon_rat)
-                        dni = getDNI(ghi, hour=hr + 1, lat=self.src_lat[i], lon=self.src_lon[i],
-                              press=self.valu(self.p_s[hr], lat1, lon1, lat_rat,
-                              lon_rat, rnd=0), zone=self.src_zone)
-                        dhi = getDHI(ghi, dni, hour=hr + 1, lat=self.src_lat[i])
-                        if len(self.alb) > 0:
-                            alb = str(self.valu(self.alb[hr], lat1, lon1, lat_rat, lon_rat))
-                        else:
-                            alb = '-999'
-                        tf.write(str(self.valu(self.t_2m[hr], lat1, lon1, lat_rat, lon_rat, rnd=1)) +
-                        ',-999,-999,-999,' +
-                        str(self.valu(self.s10m[hr], lat1, lon1, lat_rat, lon_rat)) + ',' +
-                        str(self.valu(self.d10m[hr], lat1, lon1, lat_rat, lon_rat, rnd=0)) + ',' +
-                        str(self.valu(self.p_s[hr], lat1, lon1, lat_rat, lon_rat, rnd=1)) + ',' +
-                        str(int(ghi)) + ',' + str(int(dni)) + ',' + str(int(dhi)) + ',' + alb + ',-999,\n')
-                tf.close()
-                self.log += '%s created\n' % out_file[out_file.rfind('/') + 1:]
-        else: # all locations
-            if self.show_progress:
-                self.caller.daybar.setMaximum(len(self.lats) * len(self.lons))
-                QtCore.QCoreApplication.processEvents()
-            for la in range(len(self.lats)):
-                for lo in range(len(self.lons)):
-                    if self.show_progress:
-                        self.caller.daybar.setValue(len(self.lats) * la + lo)
-                        QtCore.QCoreApplication.processEvents()
-                    with_gaps = 0
-                    missing = False
-                    out_file = self.tgt_dir + 'solar_weather_' + '{:0.4f}'.format(self.lats[la]) + \
-                            '_' + '{:0.4f}'.format(self.lons[lo]) + '_' + str(self.src_year) + '.' + self.fmat
-                    tf = open(out_file, 'w')
-                    if self.fmat == 'csv':
-                        hdr = 'Location,City,Region,Country,Latitude,Longitude,Time Zone,Elevation,Source\n' + \
-                              'id,<city>,<state>,<country>,%s,%s,%s,0,IWEC\n' % (round(self.lats[la], 4),
-                              round(self.lons[lo], 4), str(self.src_zone))
-                        tf.write(hdr)
-                        tf.write('Year,Month,Day,Hour,GHI,DNI,DHI,Tdry,Pres,Wspd,Wdir' + '\n')
-                        mth = 0
-                        day = 1
-                        hour = 0
-                        for hr in range(len(self.s10m)):
-                            try:
-                                lat = self.lati[self.lat_lon_ndx[hr]].index(self.lats[la])
-                                lon = self.longi[self.lat_lon_ndx[hr]].index(self.lons[lo])
-                            except:
-                                if self.gaps:
-                                    tf.write(',,,,,,,,\n')
-                                    with_gaps += 1
-                                    continue
-                                else:
-                                    missing = True
-                                    break
-                            ghi = self.ghi[hr][lat][lon]
-                            dni = getDNI(ghi, hour=hr + 1, lat=self.lati[self.lat_lon_ndx[hr]][lat],
-                                  lon=self.longi[self.lat_lon_ndx[hr]][lon],
-                                  press=self.p_s[hr][lat][lon], zone=self.src_zone)
-                            dhi = getDHI(ghi, dni, hour=hr + 1, lat=self.lati[self.lat_lon_ndx[hr]][lat])
-                            tf.write(str(self.src_year) + ',' + '{:02d}'.format(mth + 1) + ',' +
-                                '{:02d}'.format(day) + ',' + '{:02d}'.format(hour) + ',' +
-                                '{:0.1f}'.format(ghi) + ',' + '{:0.1f}'.format(dni) + ',' +
-                                '{:0.1f}'.format(dhi) + ',' +
-                                str(self.t_2m[hr][lat][lon]) + ',' +
-                                str(self.p_s[hr][lat][lon]) + ',' +
-                                str(self.s10m[hr][lat][lon]) + ',' +
-                                str(self.d10m[hr][lat][lon]) + '\n')
-                            hour += 1
-                            if hour > 23:
-                                hour = 0
-                                day += 1
-                                if day > dys[mth]:
-                                    mth += 1
-                                    day = 1
-                                    hour = 0
-                    else:
-                        hdr = 'id,<city>,<state>,%s,%s,%s,0,3600.0,%s,0:30:00\n' % (str(self.src_zone),
-                              round(self.lats[la], 4),
-                              round(self.lons[lo], 4), str(self.src_year))
-                        tf.write(hdr)
-                        for hr in range(len(self.s10m)):
-                            try:
-                                lat = self.lati[self.lat_lon_ndx[hr]].index(self.lats[la])
-                                lon = self.longi[self.lat_lon_ndx[hr]].index(self.lons[lo])
-                                la2 = self.lati[self.lat_lon_ndx[hr]].index(self.lats[la])
-                                lo2 = self.longi[self.lat_lon_ndx[hr]].index(self.lons[lo])
-                            except:
-                                if self.gaps:
-                                    tf.write(',,,,,,,,\n')
-                                    with_gaps += 1
-                                    continue
-                                else:
-                                    missing = True
-                                    break
-                            ghi = self.ghi[hr][lat][lon]
-                            dni = getDNI(ghi, hour=hr + 1, lat=self.lati[self.lat_lon_ndx[hr]][lat],
-                                      lon=self.longi[self.lat_lon_ndx[hr]][lon],
-                                      press=self.p_s[hr][lat][lon], zone=self.src_zone)
-                            dhi = getDHI(ghi, dni, hour=hr + 1, lat=self.lati[self.lat_lon_ndx[hr]][lat])
-                            if len(self.alb) > 0:
-                                try: # bug here but let's fix later
-                                    alb = str(self.valu(self.alb[hr], lat1, lon1, lat_rat, lon_rat))
-                                except:
-                                    alb = '-999'
-                            else:
-                                alb = '-999'
-                            tf.write(str(self.t_2m[hr][lat][lon]) +
-                                ',-999,-999,-999,' +
-                                str(self.s10m[hr][lat][lon]) + ',' +
-                                str(self.d10m[hr][lat][lon]) + ',' +
-                                str(self.p_s[hr][lat][lon]) + ',' +
-                                str(int(ghi)) + ',' + str(int(dni)) + ',' + str(int(dhi)) + ',' + alb + ',-999,\n')
-                    tf.close()
-                    if with_gaps > 0 and with_gaps < 504:
-                        self.log += '%s created with gaps (%s days)\n' % ( \
-                                    out_file[out_file.rfind('/') + 1:], str(int(with_gaps / 24)))
-                    elif missing or with_gaps > 0:
-                  #      os.remove(out_file)
-                        self.gaplog += '%s not created due to data gaps\n' % out_file[out_file.rfind('/') + 1:]
-                        continue
-                    else:
-                        self.log += '%s created\n' % out_file[out_file.rfind('/') + 1:]
+        self.writeWeather(False, pool)
         if self.show_progress:
             self.caller.daybar.setValue(self.caller.daybar.maximum())
             self.caller.progresslabel.setText('All done')
@@ -1478,8 +1616,24 @@ class makeWeather():
             self.src_s_sfx = [era_file[1]]
             self.src_w_pfx = self.src_s_pfx[:]
             self.src_w_sfx = self.src_s_sfx[:]
+        self.planning = False # True while tileCurrent reads the grids
+        self.workers = 1 # processes to write weather files
+        self.tile_rows = 0 # rows of latitude to process at a time
+        config = configparser.RawConfigParser()
+        config.read(getModelFile('getfiles.ini'))
+        try:
+            self.workers = int(config.get('makeweatherfiles', 'workers'))
+            if self.workers <= 0:
+                self.workers = os.cpu_count()
+        except:
+            pass
+        try:
+            self.tile_rows = int(config.get('makeweatherfiles', 'tile_rows'))
+        except:
+            pass
         if self.tgt_dir != '':
             self.tgt_dir += '/'
+        self.readManifest()
         if info:
             if self.era5:
                 inp_strt = '{:04d}'.format(self.src_year)
@@ -1586,32 +1740,43 @@ class makeWeather():
         if self.tgt_dir[0] == self.tgt_dir[-1] and (self.tgt_dir[0] == '"' or
            self.tgt_dir[0] == "'"):
             self.tgt_dir = self.tgt_dir[1:-1]
-        self.lats = []
-        self.lati = []
-        self.latsi = []
-        self.lons = []
-        self.longi = []
-        self.longsi = []
-        self.lat_lon_ndx = []
-        self.longrange = [None, None]
-        self.tims = []
-        self.s10m = []
-        self.d10m = []
-        self.t_10m = []
-        self.p_s = []
-        self.ghi = []
-        self.s2m = []
-        self.s50m = []
-        self.s100m = []
-        self.d2m = []
-        self.d50m = []
-        self.d100m = []
-        self.t_2m = []
-        self.alb = []
+        self.tile = 0
+        self.tile_lats = None
+        zone_code = 0
+        self.run_key = self.runKey()
+        pool = None
+        started = False
+        finished = False
+        try:
+            while True: # a tile at a time if tile_rows set
+                self.tile_areas = None
+                if not self.tileCurrent():
+                    if not started: # first tile with files to write
+                        pool = self.startWorkers()
+                        started = True
+                    self.resetData()
+                    if self.era5:
+                        self.process_era5(pool)
+                    else:
+                        self.process_merra(pool)
+                if self.tile == 0:
+                    zone_code = self.return_code # checkZone warning
+                if self.return_code > 1 or not self.nextTile():
+                    break
+                self.return_code = 0
+            finished = True
+        finally:
+            if pool is not None:
+                if finished:
+                    pool.close()
+                else:
+                    pool.terminate()
+                pool.join()
+        if self.return_code == 0:
+            self.return_code = zone_code
+
+    def process_merra(self, pool=None):
         dys = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
-        if self.era5:
-            self.process_era5()
-            return
         # MERRA_2 data
         if self.src_zone > 0:
             inp_strt = '{:04d}'.format(self.src_year - 1) + '1231'
@@ -1705,7 +1870,8 @@ class makeWeather():
                     pass
                 del self.t_2m[len(self.t_2m) - (len(self.t_2m) - 8760):]
         self.longrange = [self.lons[0], self.lons[-1]]
-        self.checkZone()
+        if self.tile == 0:
+            self.checkZone()
         if self.make_wind:
             if self.show_progress:
                 self.caller.daybar.setValue(0)
@@ -1716,183 +1882,7 @@ class makeWeather():
             if not os.path.exists(target_dir):
                 self.log += 'mkdir %s\n' % target_dir
                 os.makedirs(target_dir)
-            if self.src_lat is not None:   # specific location(s)
-                for i in range(len(self.src_lat)):
-                    if self.show_progress:
-                        self.caller.daybar.setValue(i)
-                        QtCore.QCoreApplication.processEvents()
-                    out_file = self.tgt_dir + 'wind_weather_' + str(self.src_lat[i]) + '_' + \
-                               str(self.src_lon[i]) + '_' + str(self.src_year) + '.' + self.fmat
-                    tf = open(out_file, 'w')
-                    hdr = 'id,<city>,<state>,<country>,%s,%s,%s,0,1,8760\n' % (str(self.src_year),
-                          round(self.src_lat[i], 4), round(self.src_lon[i], 4))
-                    tf.write(hdr)
-                    tf.write('Wind data derived from MERRA-2 tavg1_2d_slv_Nx' + '\n')
-                    if len(self.s10m) > 0:
-                        tf.write('Temperature,Pressure,Direction,Speed,Temperature,Direction,Speed,' +
-                                 'Direction,Speed' + '\n')
-                        tf.write('C,atm,degrees,m/s,C,degrees,m/s,degrees,m/s' + '\n')
-                        tf.write('2,0,2,2,10,10,10,50,50' + '\n')
-                        for hr in range(len(self.s50m)):
-                            for lat2 in range(len(self.lati[self.lat_lon_ndx[hr]])):
-                                if self.src_lat[i] <= self.lati[self.lat_lon_ndx[hr]][lat2]:
-                                    break
-                            for lon2 in range(len(self.longi[self.lat_lon_ndx[hr]])):
-                                if self.src_lon[i] <= self.longi[self.lat_lon_ndx[hr]][lon2]:
-                                    break
-                            if self.longrange[0] is None:
-                                self.longrange[0] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                            else:
-                                if self.longi[self.lat_lon_ndx[hr]][lon2] < self.longrange[0]:
-                                    self.longrange[0] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                            if self.longrange[1] is None:
-                                self.longrange[1] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                            else:
-                                if self.longi[self.lat_lon_ndx[hr]][lon2] > self.longrange[1]:
-                                    self.longrange[1] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                            lat1 = lat2 - 1
-                            lat_rat = (self.lati[self.lat_lon_ndx[hr]][lat2] - self.src_lat[i]) / \
-                                      (self.lati[self.lat_lon_ndx[hr]][lat2] - self.lati[self.lat_lon_ndx[hr]][lat1])
-                            lon1 = lon2 - 1
-                            lon_rat = (self.longi[self.lat_lon_ndx[hr]][lon2] - self.src_lon[i]) / \
-                                      (self.longi[self.lat_lon_ndx[hr]][lon2] - self.longi[self.lat_lon_ndx[hr]][lon1])
-                            tf.write(str(self.valu(self.t_2m[hr], lat1, lon1, lat_rat, lon_rat, rnd=1)) + ',' +
-                                str(self.valu(self.p_s[hr], lat1, lon1, lat_rat, lon_rat, rnd=6)) + ',' +
-                                str(self.valu(self.d2m[hr], lat1, lon1, lat_rat, lon_rat, rnd=0)) + ',' +
-                                str(self.valu(self.s2m[hr], lat1, lon1, lat_rat, lon_rat)) + ',' +
-                                str(self.valu(self.t_10m[hr], lat1, lon1, lat_rat, lon_rat, rnd=1)) + ',' +
-                                str(self.valu(self.s10m[hr], lat1, lon1, lat_rat, lon_rat)) + ',' +
-                                str(self.valu(self.d50m[hr], lat1, lon1, lat_rat, lon_rat, rnd=0)) + ',' +
-                                str(self.valu(self.s50m[hr], lat1, lon1, lat_rat, lon_rat)) + '\n')
-                    else:
-                        tf.write('Temperature,Pressure,Direction,Speed,Direction,Speed' + '\n')
-                        tf.write('C,atm,degrees,m/s,degrees,m/s' + '\n')
-                        tf.write('2,0,2,2,50,50' + '\n')
-                        for hr in range(len(self.s50m)):
-                            for lat2 in range(len(self.lati[self.lat_lon_ndx[hr]])):
-                                if self.src_lat[i] <= self.lati[self.lat_lon_ndx[hr]][lat2]:
-                                    break
-                            for lon2 in range(len(self.longi[self.lat_lon_ndx[hr]])):
-                                if self.src_lon[i] <= self.longi[self.lat_lon_ndx[hr]][lon2]:
-                                    break
-                            if self.longrange[0] is None:
-                                self.longrange[0] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                            else:
-                                if self.longi[self.lat_lon_ndx[hr]][lon2] < self.longrange[0]:
-                                    self.longrange[0] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                            if self.longrange[1] is None:
-                                self.longrange[1] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                            else:
-                                if self.longi[self.lat_lon_ndx[hr]][lon2] > self.longrange[1]:
-                                    self.longrange[1] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                            lat1 = lat2 - 1
-                            lat_rat = (self.lati[self.lat_lon_ndx[hr]][lat2] - self.src_lat[i]) / (self.lati[self.lat_lon_ndx[hr]][lat2] - self.lati[self.lat_lon_ndx[hr]][lat1])
-                            lon1 = lon2 - 1
-                            lon_rat = (self.longi[self.lat_lon_ndx[hr]][lon2] - self.src_lon[i]) / (self.longi[self.lat_lon_ndx[hr]][lon2] - self.longi[self.lat_lon_ndx[hr]][lon1])
-                            tf.write(str(self.valu(self.t_2m[hr], lat1, lon1, lat_rat, lon_rat, rnd=1)) + ',' +
-                                str(self.valu(self.p_s[hr], lat1, lon1, lat_rat, lon_rat, rnd=6)) + ',' +
-                                str(self.valu(self.d2m[hr], lat1, lon1, lat_rat, lon_rat, rnd=0)) + ',' +
-                                str(self.valu(self.s2m[hr], lat1, lon1, lat_rat, lon_rat)) + ',' +
-                                str(self.valu(self.d50m[hr], lat1, lon1, lat_rat, lon_rat, rnd=0)) + ',' +
-                                str(self.valu(self.s50m[hr], lat1, lon1, lat_rat, lon_rat)) + '\n')
-                    tf.close()
-                    self.log += '%s created\n' % out_file[out_file.rfind('/') + 1:]
-                    if self.hub_height > 0:
-                        ok = extrapolateWind(out_file, self.hub_height, law=self.law, replace=True)
-                        if ok:
-                            self.log += '%s updated\n' % out_file[out_file.rfind('/') + 1:]
-            else: # all locations
-                if self.show_progress:
-                    self.caller.daybar.setMaximum(len(self.lats) * len(self.lons))
-                    QtCore.QCoreApplication.processEvents()
-                for la in range(len(self.lats)):
-                    for lo in range(len(self.lons)):
-                        if self.show_progress:
-                            self.caller.daybar.setValue(len(self.lats) * la + lo)
-                            QtCore.QCoreApplication.processEvents()
-                        with_gaps = 0
-                        missing = False
-                        out_file = self.tgt_dir + 'wind_weather_' + '{:0.4f}'.format(self.lats[la]) + \
-                                   '_' + '{:0.4f}'.format(self.lons[lo]) + '_' + str(self.src_year) + '.srw'
-                        tf = open(out_file, 'w')
-                        hdr = 'id,<city>,<state>,<country>,%s,%s,%s,0,1,8760\n' % (str(self.src_year),
-                              round(self.lats[la], 4), round(self.lons[lo], 4))
-                        tf.write(hdr)
-                        if self.era5:
-                            tf.write('Wind data derived from ERA5 reanalysis-era5-single-levels' + '\n')
-                        else:
-                            tf.write('Wind data derived from MERRA-2 tavg1_2d_slv_Nx' + '\n')
-                        if len(self.s10m) > 0:
-                            tf.write('Temperature,Pressure,Direction,Speed,Temperature,Direction,' +
-                                     'Speed,Direction,Speed' + '\n')
-                            tf.write('C,atm,degrees,m/s,C,degrees,m/s,degrees,m/s' + '\n')
-                            tf.write('2,0,2,2,10,10,10,50,50' + '\n')
-                            for hr in range(len(self.s50m)):
-                                try:
-                                    lat = self.lati[self.lat_lon_ndx[hr]].index(self.lats[la])
-                                    lon = self.longi[self.lat_lon_ndx[hr]].index(self.lons[lo])
-                                except:
-                                    if self.gaps:
-                                        tf.write(',,,,,,,,\n')
-                                        with_gaps += 1
-                                        continue
-                                    else:
-                                        missing = True
-                                        break
-                                try:
-                                    tf.write(str(self.t_2m[hr][lat][lon]) + ',' + str(self.p_s[hr][lat][lon]) + ',' +
-                                        str(self.d2m[hr][lat][lon]) + ',' + str(self.s2m[hr][lat][lon]) + ',' +
-                                        str(self.t_10m[hr][lat][lon]) + ',' + str(self.d10m[hr][lat][lon]) + ',' +
-                                        str(self.s10m[hr][lat][lon]) + ',' +
-                                        str(self.d50m[hr][lat][lon]) + ',' + str(self.s50m[hr][lat][lon]) + '\n')
-                                except:
-                                    if self.gaps:
-                                        tf.write(',,,,,,,,\n')
-                                        with_gaps += 1
-                                        continue
-                                    else:
-                                        missing = True
-                                        break
-                        else:
-                            tf.write('Temperature,Pressure,Direction,Speed,Direction,Speed' + '\n')
-                            tf.write('C,atm,degrees,m/s,degrees,m/s' + '\n')
-                            tf.write('2,0,2,2,50,50' + '\n')
-                            for hr in range(len(self.s50m)):
-                                try:
-                                    lat = self.lati[self.lat_lon_ndx[hr]].index(self.lats[la])
-                                    lon = self.longi[self.lat_lon_ndx[hr]].index(self.lons[lo])
-                                except:
-                                    if self.gaps:
-                                        continue
-                                    else:
-                                        missing = True
-                                        break
-                                try:
-                                    tf.write(str(self.t_2m[hr][lat][lon]) + ',' + str(self.p_s[hr][lat][lon]) + ',' +
-                                        str(self.d2m[hr][lat][lon]) + ',' + str(self.s2m[hr][lat][lon]) + ',' +
-                                        str(self.d50m[hr][lat][lon]) + ',' + str(self.s50m[hr][lat][lon]) + '\n')
-                                except:
-                                    if self.gaps:
-                                        tf.write(',,,,,,,,\n')
-                                        with_gaps += 1
-                                        continue
-                                    else:
-                                        missing = True
-                                        break
-                        tf.close()
-                        if with_gaps > 0 and with_gaps < 504:
-                            self.log += '%s created with gaps (%s days)\n' % ( \
-                                        out_file[out_file.rfind('/') + 1:], str(int(with_gaps / 24)))
-                        elif missing or with_gaps > 0:
-                            os.remove(out_file)
-                            self.gaplog += '%s not created due to data gaps\n' % out_file[out_file.rfind('/') + 1:]
-                            continue
-                        else:
-                            self.log += '%s created\n' % out_file[out_file.rfind('/') + 1:]
-                        if self.hub_height > 0:
-                            ok = extrapolateWind(out_file, self.hub_height, law=self.law, replace=True)
-                            if ok:
-                                self.log += '%s updated\n' % out_file[out_file.rfind('/') + 1:]
+            self.writeWeather(True, pool)
             return  # that's it for wind
         # get variable from solar files
         if self.src_zone > 0:
@@ -1965,222 +1955,7 @@ class makeWeather():
         if not os.path.exists(target_dir):
             self.log += 'mkdir %s\n' % target_dir
             os.makedirs(target_dir)
-        if self.src_lat is not None:  # specific location(s)
-            if self.show_progress:
-                self.caller.daybar.setMaximum(len(self.src_lat) - 1)
-                QtCore.QCoreApplication.processEvents()
-            for i in range(len(self.src_lat)):
-                if self.show_progress:
-                    self.caller.daybar.setValue(i)
-                    QtCore.QCoreApplication.processEvents()
-                out_file = self.tgt_dir + 'solar_weather_' + \
-                           str(self.src_lat[i]) + '_' + str(self.src_lon[i]) + '_' + str(self.src_year) + '.' + self.fmat
-                tf = open(out_file, 'w')
-                if self.fmat == 'csv':
-                    hdr = 'Location,City,Region,Country,Latitude,Longitude,Time Zone,Elevation,Source\n' + \
-                          'id,<city>,<state>,<country>,%s,%s,%s,0,IWEC\n' % (round(self.src_lat[i], 4),
-                          round(self.src_lon[i], 4), str(self.src_zone))
-                    tf.write(hdr)
-                    tf.write('Year,Month,Day,Hour,GHI,DNI,DHI,Tdry,Pres,Wspd,Wdir' + '\n')
-                    mth = 0
-                    day = 1
-                    hour = 0
-                    for hr in range(len(self.s10m)):
-                        for lat2 in range(len(self.lati[self.lat_lon_ndx[hr]])):
-                            if self.src_lat[i] <= self.lati[self.lat_lon_ndx[hr]][lat2]:
-                                break
-                        for lon2 in range(len(self.longi[self.lat_lon_ndx[hr]])):
-                            if self.src_lon[i] <= self.longi[self.lat_lon_ndx[hr]][lon2]:
-                                break
-                        if self.longrange[0] is None:
-                            self.longrange[0] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        else:
-                            if self.longi[self.lat_lon_ndx[hr]][lon2] < self.longrange[0]:
-                                self.longrange[0] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        if self.longrange[1] is None:
-                            self.longrange[1] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        else:
-                            if self.longi[self.lat_lon_ndx[hr]][lon2] > self.longrange[1]:
-                                self.longrange[1] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        if len(self.alb) > 0:
-                            try: # bug here but let's fix later
-                                    alb = self.valu(self.alb[hr], lat1, lon1, lat_rat, lon_rat)
-                            except:
-                                    alb = '-999'
-                        else:
-                            alb = -999
-                        lat1 = lat2 - 1
-                        lat_rat = (self.lati[self.lat_lon_ndx[hr]][lat2] - self.src_lat[i]) / (self.lati[self.lat_lon_ndx[hr]][lat2] - self.lati[self.lat_lon_ndx[hr]][lat1])
-                        lon1 = lon2 - 1
-                        lon_rat = (self.longi[self.lat_lon_ndx[hr]][lon2] - self.src_lon[i]) / (self.longi[self.lat_lon_ndx[hr]][lon2] - self.longi[self.lat_lon_ndx[hr]][lon1])
-                        ghi = self.valu(self.ghi[hr], lat1, lon1, lat_rat, lon_rat)
-                        dni = getDNI(ghi, hour=hr + 1, lat=self.src_lat[i], lon=self.src_lon[i],
-                              press=self.valu(self.p_s[hr], lat1,
-                              lon1, lat_rat, lon_rat, rnd=0), zone=self.src_zone)
-                        dhi = getDHI(ghi, dni, hour=hr + 1, lat=self.src_lat[i])
-                        tf.write(str(self.src_year) + ',' + str(mth + 1) + ',' +
-                        str(day) + ',' + str(hour) + ',' +
-                        str(int(ghi)) + ',' + str(int(dni)) + ',' + str(int(dhi)) + ',' +
-                        str(self.valu(self.t_10m[hr], lat1, lon1, lat_rat, lon_rat, rnd=1)) + ',' +
-                        str(self.valu(self.p_s[hr], lat1, lon1, lat_rat, lon_rat, rnd=0)) + ',' +
-                        str(self.valu(self.s10m[hr], lat1, lon1, lat_rat, lon_rat)) + ',' +
-                        str(self.valu(self.d10m[hr], lat1, lon1, lat_rat, lon_rat, rnd=0)) + '\n')
-                        hour += 1
-                        if hour > 23:
-                            hour = 0
-                            day += 1
-                            if day > dys[mth]:
-                                mth += 1
-                                day = 1
-                                hour = 0
-                else:
-                    hdr = 'id,<city>,<state>,%s,%s,%s,0,3600.0,%s,0:30:00\n' % (str(self.src_zone),
-                          round(self.src_lat[i], 4),
-                          round(self.src_lon[i], 4), str(self.src_year))
-                    tf.write(hdr)
-                    for hr in range(len(self.s10m)):
-                        for lat2 in range(len(self.lati[self.lat_lon_ndx[hr]])):
-                            if self.src_lat[i] <= self.lati[self.lat_lon_ndx[hr]][lat2]:
-                                break
-                        for lon2 in range(len(self.longi[self.lat_lon_ndx[hr]])):
-                            if self.src_lon[i] <= self.longi[self.lat_lon_ndx[hr]][lon2]:
-                                break
-                        if self.longrange[0] is None:
-                            self.longrange[0] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        else:
-                            if self.longi[self.lat_lon_ndx[hr]][lon2] < self.longrange[0]:
-                                self.longrange[0] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        if self.longrange[1] is None:
-                            self.longrange[1] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        else:
-                            if self.longi[self.lat_lon_ndx[hr]][lon2] > self.longrange[1]:
-                                self.longrange[1] = self.longi[self.lat_lon_ndx[hr]][lon2]
-                        lat1 = lat2 - 1
-                        lat_rat = (self.lati[self.lat_lon_ndx[hr]][lat2] - self.src_lat[i]) / (self.lati[self.lat_lon_ndx[hr]][lat2] - self.lati[self.lat_lon_ndx[hr]][lat1])
-                        lon1 = lon2 - 1
-                        lon_rat = (self.longi[self.lat_lon_ndx[hr]][lon2] - self.src_lon[i]) / (self.longi[self.lat_lon_ndx[hr]][lon2] - self.longi[self.lat_lon_ndx[hr]][lon1])
-                        ghi = self.valu(self.ghi[hr], lat1, lon1, lat_rat, lon_rat)
-                        dni = getDNI(ghi, hour=hr + 1, lat=self.src_lat[i], lon=self.src_lon[i],
-                              press=self.valu(self.p_s[hr], lat1, lon1, lat_rat,
-                              lon_rat, rnd=0), zone=self.src_zone)
-                        dhi = getDHI(ghi, dni, hour=hr + 1, lat=self.src_lat[i])
-                        if len(self.alb) > 0:
-                            alb = self.valu(self.alb[hr], lat1, lon1, lat_rat, lon_rat)
-                        else:
-                            alb = '-999'
-                        tf.write(str(self.valu(self.t_10m[hr], lat1, lon1, lat_rat, lon_rat, rnd=1)) +
-                        ',-999,-999,-999,' +
-                        str(self.valu(self.s10m[hr], lat1, lon1, lat_rat, lon_rat)) + ',' +
-                        str(self.valu(self.d10m[hr], lat1, lon1, lat_rat, lon_rat, rnd=0)) + ',' +
-                        str(self.valu(self.p_s[hr], lat1, lon1, lat_rat, lon_rat, rnd=1)) + ',' +
-                        str(int(ghi)) + ',' + str(int(dni)) + ',' + str(int(dhi)) + ',' + alb + ',-999,\n')
-                tf.close()
-                self.log += '%s created\n' % out_file[out_file.rfind('/') + 1:]
-        else: # all locations
-            if self.show_progress:
-                self.caller.daybar.setMaximum(len(self.lats) * len(self.lons))
-                QtCore.QCoreApplication.processEvents()
-            for la in range(len(self.lats)):
-                for lo in range(len(self.lons)):
-                    if self.show_progress:
-                        self.caller.daybar.setValue(len(self.lats) * la + lo)
-                        QtCore.QCoreApplication.processEvents()
-                    with_gaps = 0
-                    missing = False
-                    out_file = self.tgt_dir + 'solar_weather_' + '{:0.4f}'.format(self.lats[la]) + \
-                            '_' + '{:0.4f}'.format(self.lons[lo]) + '_' + str(self.src_year) + '.' + self.fmat
-                    tf = open(out_file, 'w')
-                    if self.fmat == 'csv':
-                        hdr = 'Location,City,Region,Country,Latitude,Longitude,Time Zone,Elevation,Source\n' + \
-                              'id,<city>,<state>,<country>,%s,%s,%s,0,IWEC\n' % (round(self.lats[la], 4),
-                              round(self.lons[lo], 4), str(self.src_zone))
-                        tf.write(hdr)
-                        tf.write('Year,Month,Day,Hour,GHI,DNI,DHI,Tdry,Pres,Wspd,Wdir' + '\n')
-                        mth = 0
-                        day = 1
-                        hour = 0
-                        for hr in range(len(self.s10m)):
-                            try:
-                                lat = self.latsi[self.lat_lon_ndx[hr]].index(self.lats[la])
-                                lon = self.longsi[self.lat_lon_ndx[hr]].index(self.lons[lo])
-                                la2 = self.lati[self.lat_lon_ndx[hr]].index(self.lats[la])
-                                lo2 = self.longi[self.lat_lon_ndx[hr]].index(self.lons[lo])
-                            except:
-                                if self.gaps:
-                                    tf.write(',,,,,,,,\n')
-                                    with_gaps += 1
-                                    continue
-                                else:
-                                    missing = True
-                                    break
-                            ghi = self.ghi[hr][lat][lon]
-                            dni = getDNI(ghi, hour=hr + 1, lat=self.latsi[self.lat_lon_ndx[hr]][lat],
-                                  lon=self.longsi[self.lat_lon_ndx[hr]][lon],
-                                  press=self.p_s[hr][lat][lon], zone=self.src_zone)
-                            dhi = getDHI(ghi, dni, hour=hr + 1, lat=self.latsi[self.lat_lon_ndx[hr]][lat])
-                            tf.write(str(self.src_year) + ',' + '{:02d}'.format(mth + 1) + ',' +
-                                '{:02d}'.format(day) + ',' + '{:02d}'.format(hour) + ',' +
-                                '{:0.1f}'.format(ghi) + ',' + '{:0.1f}'.format(dni) + ',' +
-                                '{:0.1f}'.format(dhi) + ',' +
-                                str(self.t_10m[hr][la2][lo2]) + ',' +
-                                str(self.p_s[hr][la2][lo2]) + ',' +
-                                str(self.s10m[hr][la2][lo2]) + ',' +
-                                str(self.d10m[hr][la2][lo2]) + '\n')
-                            hour += 1
-                            if hour > 23:
-                                hour = 0
-                                day += 1
-                                if day > dys[mth]:
-                                    mth += 1
-                                    day = 1
-                                    hour = 0
-                    else:
-                        hdr = 'id,<city>,<state>,%s,%s,%s,0,3600.0,%s,0:30:00\n' % (str(self.src_zone),
-                              round(self.lats[la], 4),
-                              round(self.lons[lo], 4), str(self.src_year))
-                        tf.write(hdr)
-                        for hr in range(len(self.s10m)):
-                            try:
-                                lat = self.latsi[self.lat_lon_ndx[hr]].index(self.lats[la])
-                                lon = self.longsi[self.lat_lon_ndx[hr]].index(self.lons[lo])
-                                la2 = self.lati[self.lat_lon_ndx[hr]].index(self.lats[la])
-                                lo2 = self.longi[self.lat_lon_ndx[hr]].index(self.lons[lo])
-                            except:
-                                if self.gaps:
-                                    tf.write(',,,,,,,,\n')
-                                    with_gaps += 1
-                                    continue
-                                else:
-                                    missing = True
-                                    break
-                            if len(self.alb) > 0:
-                                try:
-                                    alb = self.alb[hr][lat][lon]
-                                except:
-                                    alb = '-999'
-                            else:
-                                alb = '-999'
-                            ghi = self.ghi[hr][lat][lon]
-                            dni = getDNI(ghi, hour=hr + 1, lat=self.latsi[self.lat_lon_ndx[hr]][lat],
-                                  lon=self.longsi[self.lat_lon_ndx[hr]][lon],
-                                  press=self.p_s[hr][lat][lon], zone=self.src_zone)
-                            dhi = getDHI(ghi, dni, hour=hr + 1, lat=self.latsi[self.lat_lon_ndx[hr]][lat])
-                            tf.write(str(self.t_10m[hr][la2][lo2]) +
-                                ',-999,-999,-999,' +
-                                str(self.s10m[hr][la2][lo2]) + ',' +
-                                str(self.d10m[hr][la2][lo2]) + ',' +
-                                str(self.p_s[hr][la2][lo2]) + ',' +
-                                str(int(ghi)) + ',' + str(int(dni)) + ',' + str(int(dhi)) + ',' + alb + ',-999,\n')
-                    tf.close()
-                    if with_gaps > 0 and with_gaps < 504:
-                        self.log += '%s created with gaps (%s days)\n' % ( \
-                                    out_file[out_file.rfind('/') + 1:], str(int(with_gaps / 24)))
-                    elif missing or with_gaps > 0:
-                        os.remove(out_file)
-                        self.gaplog += '%s not created due to data gaps\n' % out_file[out_file.rfind('/') + 1:]
-                        continue
-                    else:
-                        self.log += '%s created\n' % out_file[out_file.rfind('/') + 1:]
+        self.writeWeather(False, pool)
         if self.show_progress:
             self.caller.daybar.setValue(self.caller.daybar.maximum())
             self.caller.progresslabel.setText('All done')
@@ -2557,11 +2332,18 @@ class getParms(QtWidgets.QWidget):
         self.progresslabel.setText('Updating wind weather files')
         fils = os.listdir(self.dirs[2].text())
         for f in range(len(fils) -1, -1, -1):
-            if fils[f][-4:] != '.srw':
+            if fils[f][-4:] != '.srw' and fils[f][-4:] != '.srz':
                 del fils[f]
         ctr = 0
         for f in range(len(fils)):
-            ok = extrapolateWind(self.dirs[2].text() + '/' + fils[f], self.hub_height.value(), law=self.law, replace=True)
+            if fils[f][-4:] == '.srz': # can't update a zipped file so save extrapolated speeds for Powermap
+                try:
+                    ok = hubResource(self.dirs[2].text() + '/' + fils[f], self.hub_height.value(), law=self.law,
+                                     disk=True) is not None
+                except:
+                    ok = False
+            else:
+                ok = extrapolateWind(self.dirs[2].text() + '/' + fils[f], self.hub_height.value(), law=self.law, replace=True)
             if ok:
                 self.progresslabel.setText('Updated ' + fils[f])
                 ctr += 1
@@ -2712,6 +2494,7 @@ class RptDialog(QtWidgets.QDialog):
 
 
 if "__main__" == __name__:
+    multiprocessing.freeze_support() # spawned workers of a frozen program
     batch = False
     check = False
     ini_file = 'getfiles.ini'
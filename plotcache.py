@@ -0,0 +1,352 @@
+#!/usr/bin/python3
+#
+#  Copyright (C) 2026 Sustainable Energy Now Inc., Angus King
+#
+#  plotcache.py - This file is part of SIREN.
+#
+#  SIREN is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as
+#  published by the Free Software Foundation, either version 3 of
+#  the License, or (at your option) any later version.
+#
+#  SIREN is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General
+#  Public License along with SIREN.  If not, see
+#  <http://www.gnu.org/licenses/>.
+#
+# Cache for powerplot and flexiplot worksheets. A worksheet is read once into a
+# list of values for each column and the last few are kept in memory. If asked,
+# they're also saved alongside the workbook as .<workbook>.<sheet>.plotcache.npz -
+# for each column the leading text cells as JSON and the numbers below them as
+# an array. Cached copies are used while the workbook's path, size and
+# modification time are unchanged.
+from collections import OrderedDict
+import json
+import os
+import re
+import numpy as np
+from pmdatacache import columnArray
+from senutils import WorkBook
+
+CACHE_VERSION = 1
+SHEET_CACHE = 4 # worksheets kept in memory
+
+sheets = OrderedDict()
+
+
+class PlotSheet():
+    # a worksheet held as columns; it can be used in place of a WorkBook.WorkSheet
+    def __init__(self, name, nrows, ncols, columns):
+        self.name = name
+        self.nrows = nrows
+        self.ncols = ncols
+        self.columns = columns # list of values for each column, nrows long
+        self.masks = {}
+        self.arrays = {}
+        self.layout = None
+        self.names = None
+
+    def cell_value(self, row, col):
+        if row < 0 or col < 0:
+            return None
+        try:
+            return self.columns[col][row]
+        except IndexError:
+            return None
+
+    def numeric(self, col):
+        # True for each row of a column holding a number
+        try:
+            return self.masks[col]
+        except KeyError:
+            pass
+        try:
+            values = self.columns[col]
+        except IndexError:
+            values = []
+        self.masks[col] = np.array([isinstance(value, (int, float)) for value in values], dtype=bool)
+        return self.masks[col]
+
+    def array(self, col, start, stop):
+        # values for rows start to stop - 1 as floats; nan if not a number
+        try:
+            values = self.arrays[col]
+        except KeyError:
+            try:
+                values = self.columns[col]
+            except IndexError:
+                values = []
+            values = np.array([value if isinstance(value, (int, float)) else np.nan for value in values],
+                              dtype=np.float64)
+            self.arrays[col] = values
+        values = values[max(start, 0):max(stop, 0)]
+        if len(values) < stop - start:
+            values = np.concatenate((values, np.full(stop - start - len(values), np.nan)))
+        return values
+
+    def series(self, col, start, stop):
+        # values for rows start to stop - 1 as a list; None past the end
+        try:
+            values = self.columns[col][max(start, 0):max(stop, 0)]
+        except IndexError:
+            values = []
+        if len(values) < stop - start:
+            values.extend([None] * (stop - start - len(values)))
+        return values
+
+    def invalid(self, col, start, stop):
+        # first row from start to stop - 1 that isn't a number; None if they all are
+        mask = self.numeric(col)[max(start, 0):max(stop, 0)]
+        bad = np.flatnonzero(~mask)
+        if len(bad) > 0:
+            return start + int(bad[0])
+        if len(mask) < stop - start:
+            return start + len(mask)
+        return None
+
+    def running_sums(self, cols, start, stop, interval):
+        # running totals within each interval of rows from start to stop - 1 for the sum of cols,
+        # a column then the next for each interval as a loop adding each cell in turn would
+        blocks = (stop - start + interval - 1) // interval
+        if blocks <= 0:
+            return np.zeros((0, len(cols) * interval))
+        end = start + blocks * interval
+        values = [self.array(col, start, end).reshape(blocks, interval) for col in cols]
+        return np.cumsum(np.concatenate(values, axis=1), axis=1)
+
+    def period_sums(self, col, starts, counts, interval):
+        # sum of values for each row of an interval over rows from starts[s] + 1 to starts[s] + counts[s].
+        # Each period stops at its first cell that isn't a number
+        rows = []
+        for s in range(len(starts)):
+            bad = self.invalid(col, starts[s] + 1, starts[s] + counts[s] + 1)
+            if bad is None:
+                stop = starts[s] + counts[s] + 1
+            else:
+                stop = bad
+            values = self.array(col, starts[s] + 1, stop)
+            if len(values) % interval != 0:
+                values = np.concatenate((values, np.zeros(interval - len(values) % interval)))
+            rows.append(values.reshape(-1, interval))
+        if len(rows) == 0:
+            return np.zeros(interval)
+        values = np.concatenate(rows)
+        if len(values) == 0:
+            return np.zeros(interval)
+        return np.cumsum(values, axis=0)[-1] # one value after another as a loop would add them
+
+    def day_hours(self, col, starts, counts, interval):
+        # values for rows starts[s] + 1 to starts[s] + counts[s], one after the other, as an
+        # interval x days array; nan if not a number
+        values = [np.zeros(0)]
+        for s in range(len(starts)):
+            values.append(self.array(col, starts[s] + 1, starts[s] + counts[s] + 1))
+        values = np.concatenate(values)
+        days = len(values) // interval
+        return values[:days * interval].reshape(days, interval).T
+
+    def column(self, col, row_range=None):
+        start, stop = self._span(row_range, self.nrows)
+        return self.array(col, start, stop)
+
+    def iter_rows(self, row_range=None, col_range=None):
+        start_row, stop_row = self._span(row_range, self.nrows)
+        start_col, stop_col = self._span(col_range, self.ncols)
+        if start_row >= stop_row or start_col >= stop_col:
+            return
+        columns = [self.series(col, start_row, stop_row) for col in range(start_col, stop_col)]
+        for values in zip(*columns):
+            yield list(values)
+
+    def header_map(self, row=0):
+        headers = {}
+        for col in range(self.ncols):
+            value = self.cell_value(row, col)
+            if value is None or value == '':
+                continue
+            headers[value] = col
+        return headers
+
+    def _span(self, the_range, count):
+        if the_range is None:
+            return 0, count
+        if isinstance(the_range, range):
+            start, stop = the_range.start, the_range.stop
+        else:
+            start, stop = the_range
+        if stop is None or stop > count:
+            stop = count
+        return max(start, 0), stop
+
+    def plot_layout(self):
+        # rows of a powerplot worksheet: toprow [technology row, hour row], zone_row, breakdown_row,
+        # interval, rows (after the hour row) and last_row (last with column 0 set). toprow is None
+        # if the sheet isn't in the expected format
+        if self.layout is not None:
+            return self.layout
+        self.layout = {'toprow': None, 'zone_row': -1, 'breakdown_row': -1, 'interval': 24, 'rows': None,
+                       'last_row': None}
+        tech_row = -1
+        for row in range(self.nrows):
+            value = self.cell_value(row, 0)
+            if value in ['Split', 'Breakdown']:
+                self.layout['breakdown_row'] = row
+            elif value == 'Technology':
+                tech_row = row
+            elif value == 'Zone':
+                self.layout['zone_row'] = row
+            elif value in ['Hour', 'Interval', 'Trading Interval']:
+                if self.cell_value(row, 1) != 'Period':
+                    break
+                if value in ['Interval', 'Trading Interval']:
+                    self.layout['interval'] = 48
+                if tech_row >= 0:
+                    self.layout['toprow'] = [tech_row, row]
+                else:
+                    self.layout['toprow'] = [row, row]
+                self.layout['rows'] = self.nrows - (row + 1)
+                break
+        for row in range(self.nrows -1, -1, -1):
+            if self.cell_value(row, 0) is not None:
+                self.layout['last_row'] = row
+                break
+        return self.layout
+
+    def column_name(self, col):
+        # powerplot name for a column; technology with the zone in front if there is one
+        if self.names is None:
+            layout = self.plot_layout()
+            self.names = []
+            for c2 in range(self.ncols):
+                if layout['toprow'] is None:
+                    self.names.append(None)
+                    continue
+                try:
+                    column = self.cell_value(layout['toprow'][0], c2).replace('\n',' ')
+                except:
+                    column = str(self.cell_value(layout['toprow'][0], c2))
+                zone = self.cell_value(layout['zone_row'], c2)
+                if layout['zone_row'] > 0 and zone != '' and zone is not None:
+                    column = zone.replace('\n',' ') + '.' + column
+                self.names.append(column)
+        return self.names[col]
+
+
+def cacheName(filename, sheet):
+    folder, name = os.path.split(os.path.abspath(filename))
+    return os.path.join(folder, '.' + name + '.' + re.sub(r'[^\w.-]', '_', sheet) + '.plotcache.npz')
+
+def cacheKey(filename, sheet):
+    stat = os.stat(filename)
+    return {'version': CACHE_VERSION, 'path': os.path.abspath(filename), 'sheet': sheet,
+            'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+
+def numberFrom(values):
+    # index of the first of the cells at the end of a column that are all numbers (or empty)
+    for i in range(len(values) - 1, -1, -1):
+        if values[i] is not None and (isinstance(values[i], bool) or not isinstance(values[i], (int, float))):
+            return i + 1
+    return 0
+
+def readCache(filename, sheet, key):
+    try:
+        with np.load(cacheName(filename, sheet), allow_pickle=False) as npz:
+            details = json.loads(str(npz['details']))
+            if details['key'] != key:
+                return None
+            columns = []
+            for col in range(details['ncols']):
+                values = details['text'][col]
+                if f'c{col}' in npz:
+                    tail = npz[f'c{col}']
+                    if tail.dtype.kind == 'f':
+                        tail = [None if value != value else value for value in tail.tolist()]
+                        if f'i{col}' in npz: # whole numbers among the floats
+                            for i in np.flatnonzero(npz[f'i{col}']).tolist():
+                                tail[i] = int(tail[i])
+                        values.extend(tail)
+                    else:
+                        values.extend(tail.tolist())
+                columns.append(values)
+    except:
+        return None
+    return PlotSheet(details['name'], details['nrows'], details['ncols'], columns)
+
+def writeCache(filename, sheet, key, plot_sheet):
+    details = {'key': key, 'name': plot_sheet.name, 'nrows': plot_sheet.nrows, 'ncols': plot_sheet.ncols,
+               'text': []}
+    arrays = {}
+    for col in range(plot_sheet.ncols):
+        values = plot_sheet.columns[col]
+        i = numberFrom(values)
+        tail = None
+        if i < len(values):
+            try:
+                tail = columnArray(values[i:])
+            except: # too big for an array
+                tail = None
+        if isinstance(tail, np.ndarray):
+            details['text'].append(values[:i])
+            arrays[f'c{col}'] = tail
+            if tail.dtype.kind == 'f':
+                ints = np.array([isinstance(value, int) for value in values[i:]], dtype=bool)
+                if ints.any():
+                    arrays[f'i{col}'] = ints
+        else:
+            details['text'].append(values)
+    try:
+        arrays['details'] = np.array(json.dumps(details))
+    except: # cells that aren't text or numbers (e.g. dates) so only keep it in memory
+        return
+    cache_file = cacheName(filename, sheet)
+    work_file = cache_file[:-4] + '.tmp.npz'
+    try:
+        np.savez(work_file, **arrays)
+        os.replace(work_file, cache_file)
+    except:
+        try:
+            os.remove(work_file)
+        except:
+            pass
+
+def readSheet(filename, sheet):
+    workbook = WorkBook()
+    workbook.open_workbook(filename, read_only=True)
+    try:
+        ws = workbook.sheet_by_name(sheet)
+        nrows = ws.nrows
+        ncols = ws.ncols
+        columns = [[] for col in range(ncols)]
+        for values in ws.iter_rows():
+            for col in range(ncols):
+                columns[col].append(values[col])
+    finally:
+        workbook.close()
+    return PlotSheet(sheet, nrows, ncols, columns)
+
+def openPlotSheet(filename, sheet, disk=False):
+    # return a worksheet as a PlotSheet; from memory or the cache file if the workbook hasn't changed
+    key = cacheKey(filename, sheet)
+    ndx = (key['path'], sheet)
+    try:
+        cached = sheets.pop(ndx)
+        if cached[0] == key:
+            sheets[ndx] = cached
+            return cached[1]
+    except KeyError:
+        pass
+    plot_sheet = None
+    if disk:
+        plot_sheet = readCache(filename, sheet, key)
+    if plot_sheet is None:
+        plot_sheet = readSheet(filename, sheet)
+        if disk:
+            writeCache(filename, sheet, key, plot_sheet)
+    sheets[ndx] = [key, plot_sheet]
+    while len(sheets) > SHEET_CACHE:
+        sheets.popitem(last=False)
+    return plot_sheet
@@ -28,8 +28,6 @@ from matplotlib.font_manager import FontProperties
 import matplotlib.lines as mlines
 import os
 import sys
-import tempfile
-import zipfile
 import configparser  # decode .ini file
 from PyQt5 import QtCore, QtGui, QtWidgets
 
@@ -38,6 +36,7 @@ from getmodels import getModelFile
 from zoompan import ZoomPanX
 from senutils import getParents, getUser, WorkBook
 from sammodels import getZenith
+from weatherfile import readWeather
 
 the_days = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
 
@@ -884,7 +883,6 @@ class PlotWeather():
                 rain = True
         except:
             pass
-        self.temp_dir = None
         self.windy = adjust_wind
        # find closest solar file
         self.solar_file, dist, lat, lon = self.find_closest(latitude, longitude)
@@ -945,20 +943,8 @@ class PlotWeather():
         rain_col = -1
         if self.plots['dhi'] or self.plots['dni'] or self.plots['ghi'] or self.plots['temp'] or self.plots['rain']:
             if os.path.exists(self.solar_files + '/' + self.solar_file):
-                if self.solar_file[-4:] == '.smz':
-                    if self.temp_dir is None:
-                        self.temp_dir = tempfile.gettempdir() + '/'
-                        zf = zipfile.ZipFile(self.solar_files + '/' + self.solar_file, 'r')
-                        for zi in zf.infolist():
-                            zf.extract(zi, self.temp_dir)
-                            tf = open(f'{self.temp_dir}{zi.filename}', 'r')
-                            lines = tf.readlines()
-                            tf.close()
-                            os.remove(f'{self.temp_dir}{zi.filename}')
-                else:
-                    tf = open(self.solar_files + '/' + self.solar_file, 'r')
-                    lines = tf.readlines()
-                    tf.close()
+                weather = readWeather(self.solar_files + '/' + self.solar_file)
+                lines = weather.lines
                 fst_row = len(lines) - 8760
                 if self.plots['dhi']:
                     self.ly['dhi'] = []
@@ -1013,25 +999,25 @@ class PlotWeather():
                             wind_col = i
                         elif cols[i].lower() in ['rain', 'rainfall', 'rainfall (mm)']:
                             rain_col = i
-                for i in range(fst_row, len(lines)):
-                    bits = lines[i].split(',')
-                    if self.plots['dhi']:
-                        self.ly['dhi'].append(float(bits[dhi_col]))
-                    if self.plots['dni']:
-                        self.ly['dni'].append(float(bits[dni_col]))
-                    if self.plots['ghi']:
-                        if ghi_col < 0:
-                            zenith = getZenith(i - fst_row + 1, src_lat, src_lon, src_zne)
-                            ghi_val = int(self.ly['dni'][-1] * cos(radians(zenith)) + self.ly['dhi'][-1])
-                            self.ly['ghi'].append(ghi_val)
-                        else:
-                            self.ly['ghi'].append(float(bits[ghi_col]))
-                    if self.plots['temp']:
-                        self.ly['temp'].append(float(bits[temp_col]))
-                    if self.plots['wind'] and wind_col >= 0:
-                        self.ly['wind'].append(float(bits[wind_col]))
-                    if self.plots['rain'] and rain_col >= 0:
-                        self.ly['rain'].append(float(bits[rain_col]))
+                if self.plots['dhi']:
+                    self.ly['dhi'] = weather.column(dhi_col, fst_row).tolist()
+                if self.plots['dni']:
+                    self.ly['dni'] = weather.column(dni_col, fst_row).tolist()
+                if self.plots['ghi']:
+                    if ghi_col < 0:
+                        dnis = weather.column(dni_col, fst_row)
+                        dhis = weather.column(dhi_col, fst_row)
+                        for i in range(len(dnis)):
+                            zenith = getZenith(i + 1, src_lat, src_lon, src_zne)
+                            self.ly['ghi'].append(int(dnis[i] * cos(radians(zenith)) + dhis[i]))
+                    else:
+                        self.ly['ghi'] = weather.column(ghi_col, fst_row).tolist()
+                if self.plots['temp']:
+                    self.ly['temp'] = weather.column(temp_col, fst_row).tolist()
+                if self.plots['wind'] and wind_col >= 0:
+                    self.ly['wind'] = weather.column(wind_col, fst_row).tolist()
+                if self.plots['rain'] and rain_col >= 0:
+                    self.ly['rain'] = weather.column(rain_col, fst_row).tolist()
                 for key in weathers:
                     try:
                         if len(self.ly[key]) == 0:
@@ -1045,20 +1031,8 @@ class PlotWeather():
         if self.plots['wind']:
             if self.wind_file != '':
                 if os.path.exists(self.wind_files + '/' + self.wind_file):
-                    if self.wind_file[-4:] == '.srz':
-                        if self.temp_dir is None:
-                            self.temp_dir = tempfile.gettempdir() + '/'
-                        zf = zipfile.ZipFile(self.wind_files + '/' + self.wind_file, 'r')
-                        for zi in zf.infolist():
-                            zf.extract(zi, self.temp_dir)
-                            tf = open(f'{self.temp_dir}{zi.filename}', 'r')
-                            lines = tf.readlines()
-                            tf.close()
-                            os.remove(f'{self.temp_dir}{zi.filename}')
-                    else:
-                        tf = open(self.wind_files + '/' + self.wind_file, 'r')
-                        lines = tf.readlines()
-                        tf.close()
+                    weather = readWeather(self.wind_files + '/' + self.wind_file)
+                    lines = weather.lines
                     fst_row = len(lines) - 8760
                     self.ly['wind'] = []  # we'll override any wind from the solar file
                     if self.windy is None:
@@ -1090,15 +1064,14 @@ class PlotWeather():
                                 col = cols[0][1]
                         else:
                             col = cols[0][1]
-                        for i in range(fst_row, len(lines)):
-                            bits = lines[i].split(',')
-                            self.ly['wind'].append(float(bits[col]))
-                            if col2 > 0:
-                                self.ly['wind2'].append(float(bits[col2]))
-                            elif self.windy is None:
-                                pass
-                            else:
-                                self.ly['wind2'].append(float(bits[col]) * (self.windy[1] / self.windy[0]) ** 0.143)
+                        speeds = weather.column(col, fst_row)
+                        self.ly['wind'] = speeds.tolist()
+                        if col2 > 0:
+                            self.ly['wind2'] = weather.column(col2, fst_row).tolist()
+                        elif self.windy is None:
+                            pass
+                        else:
+                            self.ly['wind2'] = (speeds * (self.windy[1] / self.windy[0]) ** 0.143).tolist()
                 else:
                     return
         if self.plots['rain'] and rain_col < 0:
@@ -1108,9 +1081,8 @@ class PlotWeather():
                     if comment != '':
                         comment += '\n'
                     comment += 'Rain: %s\n            at %s, %s (%s Km away)' % (self.rain_file, lat, lon, '{:0,.0f}'.format(dist))
-                    tf = open(self.rain_files + '/' + self.rain_file, 'r')
-                    lines = tf.readlines()
-                    tf.close()
+                    weather = readWeather(self.rain_files + '/' + self.rain_file)
+                    lines = weather.lines
                     fst_row = len(lines) - 8760
                     self.ly['rain'] = []  # we'll override and wind from the solar file
                     cols = lines[fst_row - 1].strip().split(',')
@@ -1118,9 +1090,7 @@ class PlotWeather():
                         if cols[i].lower() in ['rain', 'rainfall', 'rainfall (mm)']:
                             rain_col = i
                             break
-                    for i in range(fst_row, len(lines)):
-                        bits = lines[i].split(',')
-                        self.ly['rain'].append(float(bits[rain_col]))
+                    self.ly['rain'] = weather.column(rain_col, fst_row).tolist()
         len_x = 8760
         for i in range(len_x):
             self.x.append(i)
@@ -0,0 +1,183 @@
+#!/usr/bin/python3
+#
+#  Copyright (C) 2026 Sustainable Energy Now Inc., Angus King
+#
+#  pmdatacache.py - This file is part of SIREN.
+#
+#  SIREN is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as
+#  published by the Free Software Foundation, either version 3 of
+#  the License, or (at your option) any later version.
+#
+#  SIREN is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General
+#  Public License along with SIREN.  If not, see
+#  <http://www.gnu.org/licenses/>.
+#
+# Cache for Powermatch data workbooks. The first worksheet is saved alongside the
+# workbook as .<workbook>.pmcache.npz - the header rows as JSON and the hourly
+# columns as arrays. The cache is used while the workbook's path, size and
+# modification time are unchanged.
+import json
+import os
+import numpy as np
+import openpyxl as oxl
+
+CACHE_VERSION = 1
+HOURS = 8760
+
+
+class DataCell():
+    def __init__(self, value):
+        self.value = value
+
+
+class MergedCell(DataCell): # same name as openpyxl so checks for merged cells still work
+    pass
+
+
+class DataSheet():
+    # the parts of an openpyxl worksheet used by powermatch for its data workbook
+    def __init__(self, max_row, max_column, first_hour, header, merged, columns):
+        self.max_row = max_row
+        self.max_column = max_column
+        self.first_hour = first_hour # first row of hourly data
+        self.header = header # list of rows before first_hour
+        self.merged = merged # set of (row, column) for merged cells in header
+        self.columns = columns # column: values for rows first_hour to max_row
+
+    def cell(self, row, column):
+        if row < self.first_hour:
+            try:
+                value = self.header[row - 1][column - 1]
+            except IndexError:
+                value = None
+            if (row, column) in self.merged:
+                return MergedCell(value)
+            return DataCell(value)
+        try:
+            value = self.columns[column][row - self.first_hour]
+        except (IndexError, KeyError):
+            return DataCell(None)
+        if isinstance(value, np.generic):
+            value = value.item()
+            if value != value: # NaN is an empty cell
+                value = None
+        return DataCell(value)
+
+    def column(self, column, first_row):
+        # values for column from first_row (at or after first_hour) to max_row
+        try:
+            values = self.columns[column][first_row - self.first_hour:]
+        except KeyError:
+            return [None] * (self.max_row - first_row + 1)
+        if isinstance(values, np.ndarray):
+            if values.dtype.kind == 'f' and np.isnan(values).any():
+                return [None if value != value else value for value in values.tolist()]
+            return values.tolist()
+        return list(values)
+
+    def close(self):
+        self.columns = None
+
+
+def cacheName(filename):
+    folder, name = os.path.split(os.path.abspath(filename))
+    return os.path.join(folder, '.' + name + '.pmcache.npz')
+
+def cacheKey(filename):
+    stat = os.stat(filename)
+    return {'version': CACHE_VERSION, 'path': os.path.abspath(filename), 'size': stat.st_size,
+            'mtime': stat.st_mtime_ns}
+
+def readCache(filename):
+    key = cacheKey(filename)
+    try:
+        with np.load(cacheName(filename), allow_pickle=False) as npz:
+            details = json.loads(str(npz['details']))
+            if details['key'] != key:
+                return None
+            columns = {}
+            for col, values in details['text'].items():
+                columns[int(col)] = values
+            for col in details['numeric']:
+                columns[col] = npz[f'c{col}']
+    except:
+        return None
+    merged = set()
+    for row, col in details['merged']:
+        merged.add((row, col))
+    return DataSheet(details['max_row'], details['max_column'], details['first_hour'],
+                     details['header'], merged, columns)
+
+def writeCache(filename, sheet):
+    details = {'key': cacheKey(filename), 'max_row': sheet.max_row, 'max_column': sheet.max_column,
+               'first_hour': sheet.first_hour, 'header': sheet.header,
+               'merged': sorted(sheet.merged), 'numeric': [], 'text': {}}
+    arrays = {}
+    for col, values in sheet.columns.items():
+        if isinstance(values, np.ndarray):
+            details['numeric'].append(col)
+            arrays[f'c{col}'] = values
+        else:
+            details['text'][str(col)] = values
+    arrays['details'] = np.array(json.dumps(details, default=str))
+    cache_file = cacheName(filename)
+    work_file = cache_file[:-4] + '.tmp.npz'
+    try:
+        np.savez(work_file, **arrays)
+        os.replace(work_file, cache_file)
+    except:
+        try:
+            os.remove(work_file)
+        except:
+            pass
+
+def columnArray(values):
+    # hourly values as a numpy array if they're all numbers otherwise as a list
+    is_int = True
+    for value in values:
+        if value is None:
+            is_int = False
+        elif isinstance(value, bool) or not isinstance(value, (int, float)):
+            return list(values)
+        elif not isinstance(value, int):
+            is_int = False
+    if is_int:
+        return np.array(values, dtype=np.int64)
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+def readWorkbook(filename):
+    wb = oxl.load_workbook(filename)
+    ws = wb.worksheets[0]
+    max_row = ws.max_row
+    max_column = ws.max_column
+    first_hour = max(max_row - HOURS + 1, 1)
+    header = []
+    merged = set()
+    for row in ws.iter_rows(min_row=1, max_row=first_hour - 1, max_col=max_column):
+        header.append([])
+        for cell in row:
+            header[-1].append(cell.value)
+            if type(cell).__name__ == 'MergedCell':
+                merged.add((cell.row, cell.column))
+    columns = {}
+    col = 0
+    for values in ws.iter_cols(min_row=first_hour, max_row=max_row, max_col=max_column, values_only=True):
+        col += 1
+        columns[col] = columnArray(values)
+    wb.close()
+    return DataSheet(max_row, max_column, first_hour, header, merged, columns)
+
+def openDataSheet(filename):
+    # return the first worksheet of a Powermatch data workbook; from the cache if it's current
+    sheet = readCache(filename)
+    if sheet is not None:
+        return sheet
+    sheet = readWorkbook(filename)
+    writeCache(filename, sheet)
+    return sheet
@@ -0,0 +1,183 @@
+#!/usr/bin/python3
+#
+#  Copyright (C) 2026 Sustainable Energy Now Inc., Angus King
+#
+#  pmdispatch.py - This file is part of SIREN.
+#
+#  SIREN is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as
+#  published by the Free Software Foundation, either version 3 of
+#  the License, or (at your option) any later version.
+#
+#  SIREN is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General
+#  Public License along with SIREN.  If not, see
+#  <http://www.gnu.org/licenses/>.
+#
+# Dispatch engine for powermatch.doDispatch. The hourly RE, storage and generator
+# calculations are done against a 2-D (column x hour) numpy copy of pmss_data.
+# RE and generators are done as array operations. Storage depends on the previous
+# hour so it is done by a small kernel which is compiled if numba is available.
+import numpy as np
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# single entry cache so Batch and Optimise don't rebuild the array for every model
+_cache = [None, None] # columns of pmss_data, array
+
+def dispatchArray(pmss_data):
+    # return pmss_data as a 2-D float64 array. Columns are only converted again
+    # if pmss_data has changed (Batch may add load columns)
+    if isinstance(pmss_data, np.ndarray): # already done (e.g. shared by a worker process)
+        return pmss_data
+    cols = _cache[0]
+    if cols is not None and len(cols) == len(pmss_data):
+        for c in range(len(cols)):
+            if cols[c] is not pmss_data[c]:
+                break
+        else:
+            return _cache[1]
+    hours = 0
+    for column in pmss_data:
+        if column is not None:
+            hours = max(hours, len(column))
+    data = np.zeros((len(pmss_data), hours), dtype=np.float64)
+    for c in range(len(pmss_data)):
+        if pmss_data[c] is None or len(pmss_data[c]) == 0:
+            continue
+        data[c, :len(pmss_data[c])] = np.array(pmss_data[c], dtype=np.float64)
+    np.nan_to_num(data, copy=False) # empty cells
+    _cache[0] = list(pmss_data)
+    _cache[1] = data
+    return data
+
+def reContribution(data, load_col, load_mult, re_facs, ul_facs, committed=0.):
+    # re_facs and ul_facs are lists of (col, multiplier)
+    # returns shortfall, RE contribution to load by hour, and to meet load for each RE
+    # and underlying facility (same order as passed)
+    load = data[load_col] * load_mult
+    shortfall = load.copy()
+    re_tot = np.zeros(len(load), dtype=np.float64)
+    for col, mult in re_facs:
+        re_tot += data[col] * mult
+    shortfall -= re_tot
+    re_short = load - committed - re_tot
+    alloc = np.ones(len(load), dtype=np.float64)
+    over = re_short < 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        alloc[over] = (load[over] - committed) / re_tot[over]
+    alloc[~np.isfinite(alloc)] = 0.
+    alloc[alloc < 0] = 0. # don't use negative generation
+    row_tml = re_tot * alloc
+    re_tml = []
+    for col, mult in re_facs:
+        re_tml.append(float(np.dot(data[col], alloc)) * mult)
+    ul_tml = []
+    for col, mult in ul_facs:
+        ul_tml.append(float(data[col].sum()) * mult)
+    return shortfall, row_tml, re_tml, ul_tml
+
+def _storageKernel(shortfall, use, losses, balance, capacity, carry, min_level, recharge_max,
+                   recharge_loss, recharge_start, discharge_max, discharge_loss, discharge_start,
+                   parasite, min_run_time, warm_time, in_run, committed):
+    # shortfall is updated in place; use, losses and balance are filled for each hour
+    hours = len(shortfall)
+    in_warm = False
+    for row in range(hours):
+        storage_losses = 0.
+        if carry > 0:
+            loss = carry * parasite
+            carry = carry - loss
+            storage_losses -= loss
+        can_use = 0.
+        if shortfall[row] < 0: # excess generation
+            if row % 24 >= recharge_start:
+                if min_run_time > 0:
+                    in_run = False
+                if warm_time > 0:
+                    in_warm = False
+                can_use = - (capacity - carry) * (1 / (1 - recharge_loss))
+                if can_use < 0: # can use some
+                    if shortfall[row] > can_use:
+                        can_use = shortfall[row]
+                    if can_use < - recharge_max * (1 / (1 - recharge_loss)):
+                        can_use = - recharge_max
+                else:
+                    can_use = 0.
+                storage_losses += can_use * recharge_loss
+                carry -= (can_use * (1 - recharge_loss))
+                shortfall[row] -= can_use
+        elif shortfall[row] > committed: # shortfall
+            if row % 24 >= discharge_start:
+                if min_run_time > 0 and not in_run:
+                    if row + min_run_time <= hours - 1:
+                        in_run = True
+                        for i in range(row + 1, row + min_run_time + 1):
+                            if shortfall[i] <= 0:
+                                in_run = False
+                                break
+                if in_run:
+                    can_use = (shortfall[row] - committed) * (1 / (1 - discharge_loss))
+                    can_use = min(can_use, discharge_max)
+                    if can_use > carry - min_level:
+                        can_use = carry - min_level
+                    if warm_time > 0 and not in_warm:
+                        in_warm = True
+                        can_use = can_use * (1 - warm_time)
+                if can_use > 0:
+                    storage_loss = can_use * discharge_loss
+                    storage_losses -= storage_loss
+                    carry -= can_use
+                    can_use = can_use - storage_loss
+                    shortfall[row] -= can_use
+                    if carry < 0:
+                        carry = 0.
+                else:
+                    can_use = 0.
+        use[row] = can_use
+        losses[row] = storage_losses
+        balance[row] = carry
+
+if njit is not None:
+    _storageKernel = njit(cache=True)(_storageKernel)
+
+def storageDispatch(shortfall, capacity, initial, min_level, recharge_max, recharge_loss,
+                    recharge_start, discharge_max, discharge_loss, discharge_start, parasite,
+                    min_run_time, warm_time, in_run, committed=0.):
+    # shortfall (array) is updated in place
+    # returns storage used (+ discharge, - charge), losses and balance for each hour
+    hours = len(shortfall)
+    if njit is not None:
+        use = np.zeros(hours, dtype=np.float64)
+        losses = np.zeros(hours, dtype=np.float64)
+        balance = np.zeros(hours, dtype=np.float64)
+        _storageKernel(shortfall, use, losses, balance, float(capacity), float(initial),
+                       float(min_level), float(recharge_max), float(recharge_loss), recharge_start,
+                       float(discharge_max), float(discharge_loss), discharge_start, float(parasite),
+                       int(min_run_time), float(warm_time), bool(in_run), float(committed))
+        return use, losses, balance
+    # python lists are quicker than numpy arrays for element by element access
+    sf = shortfall.tolist()
+    use = [0.] * hours
+    losses = [0.] * hours
+    balance = [0.] * hours
+    _storageKernel(sf, use, losses, balance, capacity, initial, min_level, recharge_max,
+                   recharge_loss, recharge_start, discharge_max, discharge_loss, discharge_start,
+                   parasite, min_run_time, warm_time, in_run, committed)
+    shortfall[:] = sf
+    return np.array(use), np.array(losses), np.array(balance)
+
+def generatorDispatch(shortfall, cap_capacity, min_gen, reserve=0.):
+    # shortfall (array) is updated in place; reserve is added to shortfall when
+    # committed generation is reserved. Returns generation for each hour
+    short_4me = shortfall + reserve
+    gen = np.where(short_4me >= cap_capacity, cap_capacity, np.maximum(short_4me, min_gen))
+    gen = np.where(shortfall >= 0, gen, min_gen)
+    shortfall -= gen
+    return gen
@@ -22,6 +22,7 @@
 
 import csv
 import math
+import multiprocessing
 import openpyxl as oxl
 import os
 import sys
@@ -224,6 +225,7 @@ class MapView(QtWidgets.QGraphicsView):
         self.scale(self.zoom, self.zoom)
 
     def delStation(self, st):  # remove stations graphic items
+        self.scene()._stations.resetIndex()
         for itm in self.scene()._stationGroups[st.name]:
             self.scene().removeItem(itm)
         del self.scene()._stationGroups[st.name]
@@ -1598,6 +1600,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self.view.statusmsg.emit(comment)
 
     def delStation(self, st):  # remove stations graphic items
+        self.view.scene()._stations.resetIndex()
         if self.view.scene()._current_name.text() == st.name:
             self.view.scene()._current_name.setText('')
         try:  # ignore error to cater for duplicate station names in different scenarios
@@ -3522,4 +3525,5 @@ def main():
     sys.exit()
 
 if '__main__' == __name__:
+    multiprocessing.freeze_support() # spawned workers of a frozen program
     main()
@@ -19,7 +19,7 @@
 #  <http://www.gnu.org/licenses/>.
 #
 # Note: Batch process is all rather messy.
-from copy import copy
+from copy import copy, deepcopy
 import os
 import sys
 import datetime
@@ -50,6 +50,10 @@ from openpyxl.chart import (
 )
 from openpyxl.formatting.rule import ColorScaleRule
 from openpyxl.worksheet.datavalidation import DataValidation
+from openpyxl.cell import WriteOnlyCell
+import multiprocessing
+from multiprocessing import shared_memory
+from collections import OrderedDict
 import random
 import shutil
 import subprocess
@@ -57,6 +61,8 @@ from colours import PlotPalette
 from senutils import ClickableQLabel, getParents, getUser, ListWidget, setFontSize, ssCol, techClean, WorkBook
 from editini import EdtDialog, SaveIni
 from floaters import ProgressBar, FloatStatus
+from pmdatacache import openDataSheet
+from pmdispatch import dispatchArray, generatorDispatch, reContribution, storageDispatch
 from getmodels import getModelFile, commonprefix
 import configparser  # decode .ini file
 from zoompan import ZoomPanX
@@ -378,6 +384,67 @@ def add_to_batch(wb, batch_file, adj_list):
     wb.save(batch_file)
     return add_msg
 
+def save_streamed(wb, filename, hourly_sheet=None, hourly=None):
+    # save wb through a write-only workbook. hourly is (first row, columns, font, {column: [values, format]})
+    # and those rows are streamed after the rows in hourly_sheet so the hourly cells aren't held in memory
+    wo = oxl.Workbook(write_only=True)
+    for ws in wb.worksheets:
+        wos = wo.create_sheet(ws.title)
+        for key, dim in ws.column_dimensions.items():
+            if dim.width is not None:
+                wos.column_dimensions[key].width = dim.width
+        for key, dim in ws.row_dimensions.items():
+            if dim.height is not None:
+                wos.row_dimensions[key].height = dim.height
+        wos.freeze_panes = ws.freeze_panes
+        for rng in ws.merged_cells.ranges:
+            wos.merged_cells.add(str(rng))
+        for row in ws.iter_rows():
+            cells = []
+            for cell in row:
+                new_cell = WriteOnlyCell(wos, value=cell.value)
+                if cell.has_style:
+                    new_cell.font = copy(cell.font)
+                    new_cell.border = copy(cell.border)
+                    new_cell.fill = copy(cell.fill)
+                    new_cell.number_format = copy(cell.number_format)
+                    new_cell.protection = copy(cell.protection)
+                    new_cell.alignment = copy(cell.alignment)
+                cells.append(new_cell)
+            wos.append(cells)
+        if ws is not hourly_sheet:
+            continue
+        first_row, columns, font, values = hourly
+        for row in range(ws.max_row + 1, first_row):
+            wos.append([])
+        # one cell per column; each row is written when it is appended so the cells (and styles) are reused
+        cells = []
+        hours = 0
+        for col in range(1, columns + 1):
+            cells.append(WriteOnlyCell(wos))
+            cells[-1].font = font
+            if col in values.keys():
+                if values[col][1] is not None:
+                    cells[-1].number_format = values[col][1]
+                hours = max(hours, len(values[col][0]))
+        hour_values = []
+        for col, value in values.items():
+            if isinstance(value[0], np.ndarray):
+                hour_values.append([cells[col - 1], value[0].tolist()])
+            else:
+                hour_values.append([cells[col - 1], value[0]])
+        for hour in range(hours):
+            for cell, value in hour_values:
+                cell.value = value[hour]
+            wos.append(cells)
+    try: # openpyxl 3.1.x
+        for key, value in wb.defined_names.items():
+            wo.defined_names[key] = value
+    except:
+        for value in wb.defined_names.definedName:
+            wo.defined_names.append(value)
+    wo.save(filename)
+
 
 class MyQDialog(QtWidgets.QDialog):
     ignoreEnter = True
@@ -571,6 +638,55 @@ class JobFactors():
                 setattr(self, key, value)
 
 
+# powerMatch properties used by doDispatch. A copy of these allows doDispatch
+# to be run in a worker process (optimise_workers and batch_workers)
+dispatch_properties = ['adjusted_lcoe', 'carbon_price', 'constraints', 'corrected_lcoe', 'discount_rate',
+                       'do_jobs', 'generators', 'jobfactors', 'operational', 'optimise_total_re',
+                       'remove_cost', 'reserve_committed', 'scenarios', 'show_correlation', 'surplus_sign',
+                       'underlying']
+
+
+class DispatchState():
+    def __init__(self, pm):
+        for prop in dispatch_properties:
+            setattr(self, prop, getattr(pm, prop, None))
+        self.optimise_debug = False # no dialogs from a worker
+
+
+# each worker process has its own copy of pmss_details and reads pmss_data from shared memory
+dispatch_worker = {}
+
+def dispatchInit(state, pmss_details, shm_name, shape, year, re_order, dispatch_order):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    dispatch_worker['shm'] = shm # keep a reference while the worker lives
+    dispatch_worker['data'] = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    dispatch_worker['state'] = state
+    dispatch_worker['details'] = pmss_details
+    dispatch_worker['year'] = year
+    dispatch_worker['re_order'] = re_order
+    dispatch_worker['dispatch_order'] = dispatch_order
+
+def optimiseDispatch(multipliers):
+    pmss_details = dispatch_worker['details']
+    for fac, multiplier in multipliers.items():
+        pmss_details[fac].multiplier = multiplier
+    multi_value, op_data, extra = powerMatch.doDispatch(dispatch_worker['state'], dispatch_worker['year'], O,
+                                  pmss_details, dispatch_worker['data'], dispatch_worker['re_order'],
+                                  dispatch_worker['dispatch_order'], None, None)
+    return multi_value
+
+def batchJob(state, pmss_data, job):
+    # job has the details for one Batch or Transition model; props override state
+    year, option, pmss_details, re_order, dispatch_order, title, props = job
+    for prop, value in props.items():
+        setattr(state, prop, value)
+    return powerMatch.doDispatch(state, year, option, pmss_details, pmss_data, re_order, dispatch_order,
+                                 None, None, title=title)
+
+def batchDispatch(job):
+    return batchJob(dispatch_worker['state'], dispatch_worker['data'], job)
+
+
 class Adjustments(MyQDialog):
     def setAdjValueUnits(self, key, typ, capacity):
         if key != 'Load':
@@ -1166,6 +1282,7 @@ class powerMatch(QtWidgets.QWidget):
         self.batch_prefix = False
         self.batch_3d = 0
         self.batch_3d_best = '#FFC709,#06A9D6,same' # best cell colour,common best cell border,common highlight
+        self.batch_workers = 1
         self.more_details = False
         self.constraints = None
         self.generators = None
@@ -1195,6 +1312,8 @@ class powerMatch(QtWidgets.QWidget):
         self.optimise_multitable = False
         self.optimise_to_batch = True
         self.optimise_total_re = True
+        self.optimise_cache = 1000
+        self.optimise_workers = 1
         self.remove_cost = True
         self.reserve_committed = True
         self.results_prefix = ''
@@ -1254,6 +1373,13 @@ class powerMatch(QtWidgets.QWidget):
                         self.batch_3d = min(int(value), 8)
                 elif key == 'batch_3d_best':
                     self.batch_3d_best = value
+                elif key == 'batch_workers':
+                    try:
+                        self.batch_workers = int(value)
+                    except:
+                        pass
+                    if self.batch_workers <= 0:
+                        self.batch_workers = os.cpu_count()
                 elif key[:4] == 'tml_':
                     continue
                 elif key[-5:] == '_file':
@@ -1368,6 +1494,18 @@ class powerMatch(QtWidgets.QWidget):
                 elif key == 'optimise_total_re':
                     if value.lower() in ['false', 'off', 'no']:
                         self.optimise_total_re = False
+                elif key == 'optimise_cache':
+                    try:
+                        self.optimise_cache = int(value)
+                    except:
+                        pass
+                elif key == 'optimise_workers':
+                    try:
+                        self.optimise_workers = int(value)
+                    except:
+                        pass
+                    if self.optimise_workers <= 0:
+                        self.optimise_workers = os.cpu_count()
                 elif key[:9] == 'optimise_':
                     try:
                         bits = value.split(',')
@@ -3180,14 +3318,13 @@ class powerMatch(QtWidgets.QWidget):
                 self.setStatus('Execution aborted.')
             return
         try:
-            ts = oxl.load_workbook(pm_data_file)
+            ws = openDataSheet(pm_data_file) # cached copy of the first worksheet
         except FileNotFoundError:
             self.setStatus('Data file not found - ' + self.files[D].text())
             return
         except:
             self.setStatus('Error accessing Data file - ' + self.files[D].text())
             return
-        ws = ts.worksheets[0]
         top_row = ws.max_row - 8760
         if top_row < 1 or (ws.cell(row=top_row, column=1).value != 'Hour' \
                            or ws.cell(row=top_row, column=2).value != 'Period'):
@@ -3292,10 +3429,8 @@ class powerMatch(QtWidgets.QWidget):
             pmss_details[key] = PM_Facility(key, tech_names[i], capacity, typ, len(pmss_data), fctr)
             if key == 'Load':
                 load_columns[year] = len(pmss_data)
-            pmss_data.append([])
+            pmss_data.append(ws.column(col, top_row + 1))
             re_order.append(key)
-            for row in range(top_row + 1, ws.max_row + 1):
-                pmss_data[-1].append(ws.cell(row=row, column=col).value)
        #     if option == O and key not in self.optimisation.keys():
        #         self.optimisation[key] = Optimisation(key, 'Range', f'{capacity} {capacity} {capacity}')
         pmss_details['Load'].capacity = sum(pmss_data[load_col])
@@ -3408,7 +3543,7 @@ class powerMatch(QtWidgets.QWidget):
                 self.results_pfx_fld.setText(self.results_prefix)
             self.updated = True
             do_adjust = True
-        ts.close()
+        ws.close()
         self.progressbar.setValue(0) # was 1
         QtWidgets.QApplication.processEvents()
         if self.files[R].text() == '':
@@ -3634,980 +3769,1011 @@ class powerMatch(QtWidgets.QWidget):
                 else:
                     d3_ranges = None
             chart_groups = []
-            for sht in range(len(self.batch_models)):
-                sheet_start = time.time()
-                if sht == 0: # normal case
-                   # copy header rows to new worksheet
-                   merged_cells = []
-                   merge_cells = None
-                   model_row = False
-                   model_cols = len(self.batch_models[sht])
-                   for row in range(1, self.batch_report[0][1] + 2):
-                       if batch_input_sheet.cell(row=row, column=1).value in ['Model', 'Model Label', 'Technology', 'Year']:
-                           model_row = True
-                           model_row_no = row
-                       else:
-                           model_row = False
-                       for col in range(1, model_cols + 2):
-                           cell = batch_input_sheet.cell(row=row, column=col)
-                           if type(cell).__name__ == 'MergedCell':
-                               if merge_cells is None:
-                                   merge_cells = [row, col - 1, col]
-                               else:
-                                   merge_cells[2] = col
-                               continue
-                           if model_row and col > 1:
-                               new_cell = bs.cell(row=row, column=col, value=self.batch_models[sht][col - 1]['name'])
+            batch_pool = None
+            batch_cols = 0
+            batch_shm = None
+            finished = False
+            try:
+                for sht in range(len(self.batch_models)):
+                    sheet_start = time.time()
+                    if sht == 0: # normal case
+                       # copy header rows to new worksheet
+                       merged_cells = []
+                       merge_cells = None
+                       model_row = False
+                       model_cols = len(self.batch_models[sht])
+                       for row in range(1, self.batch_report[0][1] + 2):
+                           if batch_input_sheet.cell(row=row, column=1).value in ['Model', 'Model Label', 'Technology', 'Year']:
+                               model_row = True
+                               model_row_no = row
                            else:
-                               new_cell = bs.cell(row=row, column=col, value=cell.value)
-                           if cell.has_style:
-                               new_cell.font = copy(cell.font)
-                               new_cell.border = copy(cell.border)
-                               new_cell.fill = copy(cell.fill)
-                               new_cell.number_format = copy(cell.number_format)
-                               new_cell.protection = copy(cell.protection)
-                               new_cell.alignment = copy(cell.alignment)
+                               model_row = False
+                           for col in range(1, model_cols + 2):
+                               cell = batch_input_sheet.cell(row=row, column=col)
+                               if type(cell).__name__ == 'MergedCell':
+                                   if merge_cells is None:
+                                       merge_cells = [row, col - 1, col]
+                                   else:
+                                       merge_cells[2] = col
+                                   continue
+                               if model_row and col > 1:
+                                   new_cell = bs.cell(row=row, column=col, value=self.batch_models[sht][col - 1]['name'])
+                               else:
+                                   new_cell = bs.cell(row=row, column=col, value=cell.value)
+                               if cell.has_style:
+                                   new_cell.font = copy(cell.font)
+                                   new_cell.border = copy(cell.border)
+                                   new_cell.fill = copy(cell.fill)
+                                   new_cell.number_format = copy(cell.number_format)
+                                   new_cell.protection = copy(cell.protection)
+                                   new_cell.alignment = copy(cell.alignment)
+                               if merge_cells is not None:
+                                   bs.merge_cells(start_row=row, start_column=merge_cells[1], end_row=row, end_column=merge_cells[2])
+                                   merged_cells.append(merge_cells)
+                                   merge_cells = None
                            if merge_cells is not None:
                                bs.merge_cells(start_row=row, start_column=merge_cells[1], end_row=row, end_column=merge_cells[2])
                                merged_cells.append(merge_cells)
                                merge_cells = None
-                       if merge_cells is not None:
-                           bs.merge_cells(start_row=row, start_column=merge_cells[1], end_row=row, end_column=merge_cells[2])
-                           merged_cells.append(merge_cells)
-                           merge_cells = None
-                   try:
-                       normal = oxl.styles.Font(name=cell.font.name, sz=cell.font.sz)
-                       bold = oxl.styles.Font(name=cell.font.name, sz=cell.font.sz, bold=True)
-                   except:
-                       pass
-                else:
-                    sheet_name = f'{sht:0{sht_nam_len}}'
-                    if sheet_name in wb.sheetnames:
-                        del wb[sheet_name]
-                        if 'Charts_' + sheet_name in wb.sheetnames:
-                            del wb['Charts_' + sheet_name]
-                    bs = wb.create_sheet(sheet_name)
-                    if model_row_no > 1:
-                        title = self.batch_models[sht][0]['name']
-                        tech_2 = title.split('_')
-                        if len(tech_2) > 1:
-                            tech_2 = tech_2[-1]
-                            bits_2 = tech_2.split('.')[-1]
-                            title = title.replace(tech_2, bits_2)
-                            cap_2 = self.batch_models[sht][0][tech_2]
-                            fst_col = 2
-                            bs.cell(row=1, column=2).value = f'{title}_{cap_2}'
-                            bs.cell(row=1, column=2).font = normal
-                            bs.cell(row=1, column=2).alignment = oxl.styles.Alignment(wrap_text=True, vertical='bottom', horizontal='center')
-                            g = 1
-                            for i in range(1, len(self.batch_models[sht])):
-                                if self.batch_models[sht][i][tech_2] != cap_2:
-                                    bs.merge_cells(start_row=1, start_column=fst_col, end_row=1, end_column=i + 1)
-                                    if sht == 1:
-                                        d3_rng1 += 1
-                                    fst_col = i + 2
-                                    cap_2 = self.batch_models[sht][i][tech_2]
-                                    bs.cell(row=1, column=fst_col).value = f'{title}_{cap_2}'
-                                    if g == 0:
-                                        g = 1
-                                    else:
-                                        bs.cell(row=1, column=fst_col).fill = grey_fill
-                                        g = 0
-                                    bs.cell(row=1, column=fst_col).font = normal
-                                    bs.cell(row=1, column=fst_col).alignment = oxl.styles.Alignment(wrap_text=True, vertical='bottom', horizontal='center')
-                            bs.merge_cells(start_row=1, start_column=fst_col, end_row=1, end_column=i + 2)
-                            if sht == 1:
-                                d3_rng1 += 1
-                            if d3_rng2 < 0:
-                                d3_rng2 = i + 2 - fst_col + 1
-                        else:
+                       try:
+                           normal = oxl.styles.Font(name=cell.font.name, sz=cell.font.sz)
+                           bold = oxl.styles.Font(name=cell.font.name, sz=cell.font.sz, bold=True)
+                       except:
+                           pass
+                    else:
+                        sheet_name = f'{sht:0{sht_nam_len}}'
+                        if sheet_name in wb.sheetnames:
+                            del wb[sheet_name]
+                            if 'Charts_' + sheet_name in wb.sheetnames:
+                                del wb['Charts_' + sheet_name]
+                        bs = wb.create_sheet(sheet_name)
+                        if model_row_no > 1:
+                            title = self.batch_models[sht][0]['name']
+                            tech_2 = title.split('_')
+                            if len(tech_2) > 1:
+                                tech_2 = tech_2[-1]
+                                bits_2 = tech_2.split('.')[-1]
+                                title = title.replace(tech_2, bits_2)
+                                cap_2 = self.batch_models[sht][0][tech_2]
+                                fst_col = 2
+                                bs.cell(row=1, column=2).value = f'{title}_{cap_2}'
+                                bs.cell(row=1, column=2).font = normal
+                                bs.cell(row=1, column=2).alignment = oxl.styles.Alignment(wrap_text=True, vertical='bottom', horizontal='center')
+                                g = 1
+                                for i in range(1, len(self.batch_models[sht])):
+                                    if self.batch_models[sht][i][tech_2] != cap_2:
+                                        bs.merge_cells(start_row=1, start_column=fst_col, end_row=1, end_column=i + 1)
+                                        if sht == 1:
+                                            d3_rng1 += 1
+                                        fst_col = i + 2
+                                        cap_2 = self.batch_models[sht][i][tech_2]
+                                        bs.cell(row=1, column=fst_col).value = f'{title}_{cap_2}'
+                                        if g == 0:
+                                            g = 1
+                                        else:
+                                            bs.cell(row=1, column=fst_col).fill = grey_fill
+                                            g = 0
+                                        bs.cell(row=1, column=fst_col).font = normal
+                                        bs.cell(row=1, column=fst_col).alignment = oxl.styles.Alignment(wrap_text=True, vertical='bottom', horizontal='center')
+                                bs.merge_cells(start_row=1, start_column=fst_col, end_row=1, end_column=i + 2)
+                                if sht == 1:
+                                    d3_rng1 += 1
+                                if d3_rng2 < 0:
+                                    d3_rng2 = i + 2 - fst_col + 1
+                            else:
+                                try:
+                                    title = self.batch_models[sht][0]['hdr'].split('.')[-1]
+                                    del self.batch_models[sht][0]['hdr']
+                                except:
+                                    pass
+                                bs.cell(row=1, column=2).value = f'{title}'
+                                bs.cell(row=1, column=2).font = normal
+                                bs.cell(row=1, column=2).alignment = oxl.styles.Alignment(wrap_text=True, vertical='bottom', horizontal='center')
+                                bs.merge_cells(start_row=1, start_column=2, end_row=1, end_column=len(self.batch_models[sht]) + 1)
+                                if d3_rng2 < 0:
+                                    d3_rng2 = len(self.batch_models[sht])
+                    column = 1
+                    gndx = self.batch_report[0][1] # Capacity group starting row
+                    do_opt_parms = [False, 0, 0, 0]
+                    total_load_row = 0
+                    if self.discount_rate > 0:
+                        batch_disc_row = 0
+                    else:
+                        batch_disc_row = -1
+                    if self.carbon_price > 0:
+                        batch_carbon_row = 0
+                    else:
+                        batch_carbon_row = -1
+                    batch_lifetime = False
+                    batch_data_sources_row = 0
+                    re_tml_row = 0
+                    max_load_row = -1
+                    report_keys = []
+                    for g in range(len(self.batch_report)):
+                        report_keys.append(self.batch_report[g][0])
+                    if 'Lifetime Cost' in report_keys:
+                        batch_lifetime = True
+                    for g in range(len(self.batch_report)):
+                        if self.batch_report[g][0] == 'Chart':
+                            continue
+                        elif self.batch_report[g][0] == 'Carbon Price':
+                            batch_carbon_row = self.batch_report[g][1]
+                            continue
+                        elif self.batch_report[g][0] == 'Discount Rate' or self.batch_report[g][0].lower() == 'wacc':
+                            batch_disc_row = self.batch_report[g][1]
+                            continue
+                        elif self.batch_report[g][0].lower() == 'data sources':
+                            batch_data_sources_row = gndx
+                            gndx += 6
                             try:
-                                title = self.batch_models[sht][0]['hdr'].split('.')[-1]
-                                del self.batch_models[sht][0]['hdr']
+                                if self.loadCombo.currentText() != 'n/a':
+                                    gndx += 1
                             except:
                                 pass
-                            bs.cell(row=1, column=2).value = f'{title}'
-                            bs.cell(row=1, column=2).font = normal
-                            bs.cell(row=1, column=2).alignment = oxl.styles.Alignment(wrap_text=True, vertical='bottom', horizontal='center')
-                            bs.merge_cells(start_row=1, start_column=2, end_row=1, end_column=len(self.batch_models[sht]) + 1)
-                            if d3_rng2 < 0:
-                                d3_rng2 = len(self.batch_models[sht])
-                column = 1
-                gndx = self.batch_report[0][1] # Capacity group starting row
-                do_opt_parms = [False, 0, 0, 0]
-                total_load_row = 0
-                if self.discount_rate > 0:
-                    batch_disc_row = 0
-                else:
-                    batch_disc_row = -1
-                if self.carbon_price > 0:
-                    batch_carbon_row = 0
-                else:
-                    batch_carbon_row = -1
-                batch_lifetime = False
-                batch_data_sources_row = 0
-                re_tml_row = 0
-                max_load_row = -1
-                report_keys = []
-                for g in range(len(self.batch_report)):
-                    report_keys.append(self.batch_report[g][0])
-                if 'Lifetime Cost' in report_keys:
-                    batch_lifetime = True
-                for g in range(len(self.batch_report)):
-                    if self.batch_report[g][0] == 'Chart':
-                        continue
-                    elif self.batch_report[g][0] == 'Carbon Price':
-                        batch_carbon_row = self.batch_report[g][1]
-                        continue
-                    elif self.batch_report[g][0] == 'Discount Rate' or self.batch_report[g][0].lower() == 'wacc':
-                        batch_disc_row = self.batch_report[g][1]
-                        continue
-                    elif self.batch_report[g][0].lower() == 'data sources':
-                        batch_data_sources_row = gndx
-                        gndx += 6
-                        try:
-                            if self.loadCombo.currentText() != 'n/a':
-                                gndx += 1
-                        except:
-                            pass
-                        continue
-                    if self.batch_report[g][0] not in batch_details.keys() and self.batch_report[g][0] not in batch_extra.keys():
-                        continue
-                    self.batch_report[g][1] = gndx
-                    if self.batch_prefix:
-                        batch_pfx = get_batch_prefix(self.batch_report[g][0])
-                    else:
-                        batch_pfx = ''
-                    if option == T and self.batch_report[g][0] == 'Jobs':
-                        bs.cell(row=gndx, column=1).value = 'Jobs (figures indicative only)'
-                    else:
-                        bs.cell(row=gndx, column=1).value = self.batch_report[g][0]
-                    bs.cell(row=gndx, column=1).font = bold
-                    if self.batch_report[g][0] in batch_extra.keys():
-                        key = self.batch_report[g][0]
-                        if self.batch_report[g][0] == 'Optimisation Parameters':
-                            for row in range(1, batch_input_sheet.max_row + 1):
-                                if batch_input_sheet.cell(row=row, column=1).value == 'Optimisation Parameters':
-                                    do_opt_parms[0] = True
-                                    do_opt_parms[1] = gndx
-                                    do_opt_parms[2] = row
-                                    break
-                            for row in range(row, batch_input_sheet.max_row + 1):
-                                gndx += 1
-                                if batch_input_sheet.cell(row=row, column=1).value == '':
-                                    break
-                            do_opt_parms[3] = row
                             continue
-                        for sp in range(1, len(batch_extra[key])):
-                            if batch_extra[key][sp][0] == 'Total Load':
-                                total_load_row = gndx + sp
-                            elif batch_extra[key][sp][0] == 'Carbon Price':
-                                bs.cell(row=gndx + sp, column=1).value = batch_pfx + batch_extra[key][sp][0] + ' ($/tCO2e)'
-                            elif batch_extra[key][sp][0] == 'Lifetime':
-                                bs.cell(row=gndx + sp, column=1).value = batch_pfx + batch_extra[key][sp][0] + ' (years)'
-                            elif batch_extra[key][sp][0] == 'Total incl. Carbon Cost':
-                                bs.cell(row=gndx + sp, column=1).value = batch_pfx + 'LCOE incl. Carbon Cost'
-                            else:
-                                bs.cell(row=gndx + sp, column=1).value = batch_pfx + batch_extra[key][sp][0]
-                            if batch_extra[key][sp][0] in ['RE %age of Total Load', 'Total incl. Carbon Cost'] or \
-                              batch_extra[key][sp][0].find('LCOE') >= 0 and batch_extra[key][sp][0].find('Total LCOE') < 0:
-                                bs.cell(row=gndx + sp, column=1).font = bold
-                            else:
-                                bs.cell(row=gndx + sp, column=1).font = normal
-                        gndx += len(batch_extra[key]) + 1
-                        if key == 'Carbon':
-                            if not batch_lifetime:
-                                gndx -= 1
-                                tot_carb_row = gndx - 3
-                            else:
-                                tot_carb_row = gndx - 4
-                        elif key == 'LCOE ($/MWh)':
-                            tot_lco_row = gndx - 2
-                        elif key == 'LCOE With CO2 ($/MWh)':
-                            tot_lcc_row = gndx - 2
-                    else:
-                        if self.batch_report[g][0] not in batch_details.keys():
+                        if self.batch_report[g][0] not in batch_details.keys() and self.batch_report[g][0] not in batch_extra.keys():
                             continue
+                        self.batch_report[g][1] = gndx
                         if self.batch_prefix:
                             batch_pfx = get_batch_prefix(self.batch_report[g][0])
                         else:
                             batch_pfx = ''
-                        for sp in range(len(self.batch_tech)):
-                        #    if self.batch_report[g][0] == 'To Meet Load (MWh)' and sp == 0:
-                         #       bs.cell(row=gndx + sp + 1, column=1).value = 'RE Contribution To Load'
-                            if self.batch_report[g][0] != 'Capacity Factor' or self.batch_tech[sp] != 'Total':
-                                bs.cell(row=gndx + sp + 1, column=1).value = batch_pfx + self.batch_tech[sp]
-                            if self.batch_report[g][0] == 'Max MWh' and self.batch_tech[sp] == 'Total':
-                                max_load_row = gndx + sp + 1
-                                bs.cell(row=max_load_row, column=1).value = batch_pfx + 'Max Load'
-                            elif self.batch_tech[sp] == 'Total' and self.batch_report[g][0] != 'Capacity Factor':
-                                bs.cell(row=gndx + sp + 1, column=1).value = batch_pfx + self.batch_tech[sp] + ' ' + self.batch_report[g][0]
-                            bs.cell(row=gndx + sp + 1, column=1).font = normal
-                        if self.batch_report[g][0] == 'Cost ($/Yr)' and batch_disc_row >= 0:
-                            batch_disc_row = gndx + sp + 2
-                            bs.cell(row=batch_disc_row, column=1).value = batch_pfx + 'Discount Rate'
-                            bs.cell(row=batch_disc_row, column=1).font = normal
-                        if self.batch_report[g][0] == 'Capacity Factor' and self.batch_tech[-1] == 'Total':
-                            gndx += len(self.batch_tech) + 1
+                        if option == T and self.batch_report[g][0] == 'Jobs':
+                            bs.cell(row=gndx, column=1).value = 'Jobs (figures indicative only)'
                         else:
-                            gndx += len(self.batch_tech) + 2
-                        if self.batch_report[g][0] == 'Cost ($/Yr)' and batch_disc_row >= 0:
-                            gndx += 1
-                        if self.batch_report[g][0] == 'To Meet Load (MWh)':
-                            re_tml_row = gndx - 1
-                            bs.cell(row=re_tml_row, column=1).value = batch_pfx + 'RE Contribution To Load'
-                            bs.cell(row=re_tml_row, column=1).font = normal
-                            bs.cell(row=re_tml_row + 1, column=1).value = batch_pfx + 'Storage Contribution To Load'
-                            bs.cell(row=re_tml_row + 1, column=1).font = normal
-                            gndx += 2
-
-                merge_col = 1
-                last_name = ''
-                # find first varying capacity to create model name
-                model_key = ''
-                model_nme = ''
-                if sht > 0:
-                    for key in self.batch_models[sht][0].keys():
-                        if key == 'name':
-                            continue
-                        try:
-                            if self.batch_models[sht][0][key] != self.batch_models[sht][1][key]:
-                                model_key = key
-                                bits = key.split('.')[-1].split(' ')
-                                for bit in bits:
-                                    model_nme += bit.strip('()')[0]
-                                model_nme += '-'
-                                break
-                        except:
-                            pass
-                if option == T:
-                    capex_table = {}
-                    for fac in pmss_details.keys():
-                        capex_table[fac] = {'cum': 0}
-                for model, capacities in self.batch_models[sht].items():
-                    if option == T:
-                        if capacities['year'] != trn_year:
-                            # get generators and load for new year
-                            trn_year = capacities['year']
-                            year = str(trn_year)
-                            try:
-                                ws = gen_book.sheet_by_name(gen_sheet.replace('$YEAR$', year))
-                            except:
-                                gen_book.close()
-                                self.setStatus(f"No Generators sheet for year '{year}'.")
-                                return
-                            self.getGenerators(ws)
-                            if year not in load_columns.keys():
-                                load_file = self.load_files.replace('$YEAR$', year)
-                                if self.load_dir.text() != self._load_folder:
-                                    load_file = self.get_filename(load_file)
-                                if os.path.exists(load_file):
-                                    load_columns[year] = len(pmss_data)
-                                    pmss_data.append([])
-                                    pmss_data[-1] = get_load_data(load_file)
-                                elif 'Load' not in capacities.keys() or capacities['Load'] == 0:
-                                    self.setStatus(f"Missing load file - '{load_file}'")
-                                    return
+                            bs.cell(row=gndx, column=1).value = self.batch_report[g][0]
+                        bs.cell(row=gndx, column=1).font = bold
+                        if self.batch_report[g][0] in batch_extra.keys():
+                            key = self.batch_report[g][0]
+                            if self.batch_report[g][0] == 'Optimisation Parameters':
+                                for row in range(1, batch_input_sheet.max_row + 1):
+                                    if batch_input_sheet.cell(row=row, column=1).value == 'Optimisation Parameters':
+                                        do_opt_parms[0] = True
+                                        do_opt_parms[1] = gndx
+                                        do_opt_parms[2] = row
+                                        break
+                                for row in range(row, batch_input_sheet.max_row + 1):
+                                    gndx += 1
+                                    if batch_input_sheet.cell(row=row, column=1).value == '':
+                                        break
+                                do_opt_parms[3] = row
+                                continue
+                            for sp in range(1, len(batch_extra[key])):
+                                if batch_extra[key][sp][0] == 'Total Load':
+                                    total_load_row = gndx + sp
+                                elif batch_extra[key][sp][0] == 'Carbon Price':
+                                    bs.cell(row=gndx + sp, column=1).value = batch_pfx + batch_extra[key][sp][0] + ' ($/tCO2e)'
+                                elif batch_extra[key][sp][0] == 'Lifetime':
+                                    bs.cell(row=gndx + sp, column=1).value = batch_pfx + batch_extra[key][sp][0] + ' (years)'
+                                elif batch_extra[key][sp][0] == 'Total incl. Carbon Cost':
+                                    bs.cell(row=gndx + sp, column=1).value = batch_pfx + 'LCOE incl. Carbon Cost'
                                 else:
-                                    year = list(load_columns.keys())[-1]
-                                    self.setStatus(f"Missing load file for '{trn_year}' - using '{year}'")
-                                    pmss_details['Load'].col = load_columns[year]
-                    for fac in pmss_details.keys():
-                        if fac == 'Load' and (option == B or option == T):
-                            pmss_details['Load'].capacity = sum(pmss_data[load_columns[year]])
-                            pmss_details['Load'].col = load_columns[year]
-                            continue
-                        pmss_details[fac].multiplier = 0
-                    if int(prgv) > prgv_int:
-                        prgv_int = int(prgv)
-                        self.progressbar.setValue(int(prgv))
-                        QtWidgets.QApplication.processEvents()
-                    prgv += incr
-                    column += 1
-                    dispatch_order = []
-                    for key, capacity in capacities.items(): # cater for zones
-                        if key in ['Carbon Price', 'Discount Rate', 'Load', 'Total']:
-                            continue
-                        if key == 'name' and model_row_no > 0:
-                            if model_key != '':
-                                bs.cell(row=model_row_no, column=column).value = f'{model_nme}{capacities[model_key]}'
-                            elif capacity != '': # option == T:
-                                bs.cell(row=model_row_no, column=column).value = f'{capacity}'
-                            else:
-                                bs.cell(row=model_row_no, column=column).value = f'Model {model + 1}'
-                            bs.cell(row=model_row_no, column=column).font = normal
-                            bs.cell(row=model_row_no, column=column).alignment = oxl.styles.Alignment(wrap_text=True,
-                                    vertical='bottom', horizontal='center')
-                            continue
-                        if key == 'year':
-                            if option == T:
+                                    bs.cell(row=gndx + sp, column=1).value = batch_pfx + batch_extra[key][sp][0]
+                                if batch_extra[key][sp][0] in ['RE %age of Total Load', 'Total incl. Carbon Cost'] or \
+                                  batch_extra[key][sp][0].find('LCOE') >= 0 and batch_extra[key][sp][0].find('Total LCOE') < 0:
+                                    bs.cell(row=gndx + sp, column=1).font = bold
+                                else:
+                                    bs.cell(row=gndx + sp, column=1).font = normal
+                            gndx += len(batch_extra[key]) + 1
+                            if key == 'Carbon':
+                                if not batch_lifetime:
+                                    gndx -= 1
+                                    tot_carb_row = gndx - 3
+                                else:
+                                    tot_carb_row = gndx - 4
+                            elif key == 'LCOE ($/MWh)':
+                                tot_lco_row = gndx - 2
+                            elif key == 'LCOE With CO2 ($/MWh)':
+                                tot_lcc_row = gndx - 2
+                        else:
+                            if self.batch_report[g][0] not in batch_details.keys():
                                 continue
-                            if capacity in load_columns.keys():
-                                pmss_details['Load'].col = load_columns[capacity]
+                            if self.batch_prefix:
+                                batch_pfx = get_batch_prefix(self.batch_report[g][0])
                             else:
-                                load_columns[capacity] = len(pmss_data)
-                                pmss_data.append([])
-                                load_file = self.load_files.replace('$YEAR$', capacity)
-                                # load here if no load file
-                                if self.load_dir.text() != self._load_folder:
-                                    load_file = self.get_filename(load_file)
-                                pmss_data[-1] = get_load_data(load_file)
-                                pmss_details['Load'].col = load_columns[capacity]
-                            pmss_details['Load'].capacity = sum(pmss_data[pmss_details['Load'].col])
-                            continue
-                        if key not in re_order:
-                            dispatch_order.append(key)
-                        if key not in pmss_details.keys():
-                            gen = key[key.find('.') + 1:]
-                            if gen in re_order:
-                                typ = 'R'
-                            elif self.generators[gen].constraint in self.constraints and \
-                              self.constraints[self.generators[gen].constraint].category == 'Generator':
-                                typ = 'G'
+                                batch_pfx = ''
+                            for sp in range(len(self.batch_tech)):
+                            #    if self.batch_report[g][0] == 'To Meet Load (MWh)' and sp == 0:
+                             #       bs.cell(row=gndx + sp + 1, column=1).value = 'RE Contribution To Load'
+                                if self.batch_report[g][0] != 'Capacity Factor' or self.batch_tech[sp] != 'Total':
+                                    bs.cell(row=gndx + sp + 1, column=1).value = batch_pfx + self.batch_tech[sp]
+                                if self.batch_report[g][0] == 'Max MWh' and self.batch_tech[sp] == 'Total':
+                                    max_load_row = gndx + sp + 1
+                                    bs.cell(row=max_load_row, column=1).value = batch_pfx + 'Max Load'
+                                elif self.batch_tech[sp] == 'Total' and self.batch_report[g][0] != 'Capacity Factor':
+                                    bs.cell(row=gndx + sp + 1, column=1).value = batch_pfx + self.batch_tech[sp] + ' ' + self.batch_report[g][0]
+                                bs.cell(row=gndx + sp + 1, column=1).font = normal
+                            if self.batch_report[g][0] == 'Cost ($/Yr)' and batch_disc_row >= 0:
+                                batch_disc_row = gndx + sp + 2
+                                bs.cell(row=batch_disc_row, column=1).value = batch_pfx + 'Discount Rate'
+                                bs.cell(row=batch_disc_row, column=1).font = normal
+                            if self.batch_report[g][0] == 'Capacity Factor' and self.batch_tech[-1] == 'Total':
+                                gndx += len(self.batch_tech) + 1
                             else:
-                                typ = 'S'
-                            pmss_details[key] = PM_Facility(key, gen, capacity, typ, -1, 1)
-                    for fac in pmss_details.keys():
-                        if fac == 'Load':
-                            continue
-                        gen = pmss_details[fac].generator
-                        try:
-                            pmss_details[fac].multiplier = capacities[fac] * 1.0 / pmss_details[fac].capacity
-                        except:
-                            pass
+                                gndx += len(self.batch_tech) + 2
+                            if self.batch_report[g][0] == 'Cost ($/Yr)' and batch_disc_row >= 0:
+                                gndx += 1
+                            if self.batch_report[g][0] == 'To Meet Load (MWh)':
+                                re_tml_row = gndx - 1
+                                bs.cell(row=re_tml_row, column=1).value = batch_pfx + 'RE Contribution To Load'
+                                bs.cell(row=re_tml_row, column=1).font = normal
+                                bs.cell(row=re_tml_row + 1, column=1).value = batch_pfx + 'Storage Contribution To Load'
+                                bs.cell(row=re_tml_row + 1, column=1).font = normal
+                                gndx += 2
+
+                    merge_col = 1
+                    last_name = ''
+                    # find first varying capacity to create model name
+                    model_key = ''
+                    model_nme = ''
+                    if sht > 0:
+                        for key in self.batch_models[sht][0].keys():
+                            if key == 'name':
+                                continue
+                            try:
+                                if self.batch_models[sht][0][key] != self.batch_models[sht][1][key]:
+                                    model_key = key
+                                    bits = key.split('.')[-1].split(' ')
+                                    for bit in bits:
+                                        model_nme += bit.strip('()')[0]
+                                    model_nme += '-'
+                                    break
+                            except:
+                                pass
+                    if option == T:
+                        capex_table = {}
+                        for fac in pmss_details.keys():
+                            capex_table[fac] = {'cum': 0}
+                    batch_jobs = []
+                    batch_columns = []
+                    for model, capacities in self.batch_models[sht].items():
                         if option == T:
-                            if fac not in capex_table.keys():
-                                capex_table[fac] = {'cum': 0}
-                            if year not in capex_table[fac].keys():
+                            if capacities['year'] != trn_year:
+                                # get generators and load for new year
+                                trn_year = capacities['year']
+                                year = str(trn_year)
                                 try:
-                                    capex_table[fac][year] = [self.generators[fac].capex, 0]
+                                    ws = gen_book.sheet_by_name(gen_sheet.replace('$YEAR$', year))
                                 except:
-                                    capex_table[fac][year] = [self.generators[fac[fac.find('.') + 1:]].capex, 0]
-                            capacity = pmss_details[fac].multiplier * pmss_details[fac].capacity
-                            capex_table[fac][year][1] = capacity - capex_table[fac]['cum']
-                            capex_table[fac]['cum'] = capacity
-                    if option == T:
-                        for fac in capex_table.keys():
-                            if capex_table[fac]['cum'] == 0:
+                                    gen_book.close()
+                                    self.setStatus(f"No Generators sheet for year '{year}'.")
+                                    return
+                                self.getGenerators(ws)
+                                if year not in load_columns.keys():
+                                    load_file = self.load_files.replace('$YEAR$', year)
+                                    if self.load_dir.text() != self._load_folder:
+                                        load_file = self.get_filename(load_file)
+                                    if os.path.exists(load_file):
+                                        load_columns[year] = len(pmss_data)
+                                        pmss_data.append([])
+                                        pmss_data[-1] = get_load_data(load_file)
+                                    elif 'Load' not in capacities.keys() or capacities['Load'] == 0:
+                                        self.setStatus(f"Missing load file - '{load_file}'")
+                                        return
+                                    else:
+                                        year = list(load_columns.keys())[-1]
+                                        self.setStatus(f"Missing load file for '{trn_year}' - using '{year}'")
+                                        pmss_details['Load'].col = load_columns[year]
+                        for fac in pmss_details.keys():
+                            if fac == 'Load' and (option == B or option == T):
+                                pmss_details['Load'].capacity = sum(pmss_data[load_columns[year]])
+                                pmss_details['Load'].col = load_columns[year]
+                                continue
+                            pmss_details[fac].multiplier = 0
+                        column += 1
+                        dispatch_order = []
+                        for key, capacity in capacities.items(): # cater for zones
+                            if key in ['Carbon Price', 'Discount Rate', 'Load', 'Total']:
+                                continue
+                            if key == 'name' and model_row_no > 0:
+                                if model_key != '':
+                                    bs.cell(row=model_row_no, column=column).value = f'{model_nme}{capacities[model_key]}'
+                                elif capacity != '': # option == T:
+                                    bs.cell(row=model_row_no, column=column).value = f'{capacity}'
+                                else:
+                                    bs.cell(row=model_row_no, column=column).value = f'Model {model + 1}'
+                                bs.cell(row=model_row_no, column=column).font = normal
+                                bs.cell(row=model_row_no, column=column).alignment = oxl.styles.Alignment(wrap_text=True,
+                                        vertical='bottom', horizontal='center')
                                 continue
-                            capex = 0
-                            for key, detail in capex_table[fac].items():
-                                if key == 'cum':
+                            if key == 'year':
+                                if option == T:
                                     continue
-                                capex = capex + detail[0] * detail[1]
-                            capex = capex / capex_table[fac]['cum']
-                            try:
-                                self.generators[fac].capex = round(capex)
-                            except:
-                                self.generators[fac[fac.find('.') + 1:]].capex = round(capex)
-                    save_carbon_price = None
-                    if 'Carbon Price' in capacities.keys():
-                        save_carbon_price = self.carbon_price
-                        self.carbon_price = capacities['Carbon Price']
-                    if 'Discount Rate' in capacities.keys():
-                        save_discount_rate = self.discount_rate
-                        self.discount_rate = capacities['Discount Rate']
-                    if 'Load' in capacities.keys() and capacities['Load'] > 0 and capacities['Load'] != pmss_details['Load'].capacity:
-                        load_varies = True
-                        pmss_details['Load'].multiplier = capacities['Load'] / pmss_details['Load'].capacity
-                    else:
-                        pmss_details['Load'].multiplier = save_load_multiplier
-                    sp_data = self.doDispatch(year, option, pmss_details, pmss_data, re_order, dispatch_order,
-                              pm_data_file, rslts_file, title=capacities['name'])
-                    if 'Carbon Price' in capacities.keys():
-                        self.carbon_price = save_carbon_price
-                    # first the Facility/technology table at the top of sp_data
-                    for sp in range(len(self.batch_tech) + 1):
-                        if sp_data[sp][st_fac] in self.batch_tech:
-                            tndx = self.batch_tech.index(sp_data[sp][st_fac]) + 1
-                            for group in self.batch_report:
-                                if group[0] in batch_details.keys():
-                                    gndx = group[1]
-                                    col = batch_details[group[0]][0]
-                                    if group[0] == 'Capacity Factor' and sp_data[sp][0] == 'Total':
-                                        continue
-                                    if group[0] == 'Capacity Factor' and isinstance(sp_data[sp][col], str):
-                                        bs.cell(row=gndx + tndx, column=column).value = float(sp_data[sp][col].strip('%')) / 100.
-                                    else:
-                                        bs.cell(row=gndx + tndx, column=column).value = sp_data[sp][col]
-                                    bs.cell(row=gndx + tndx, column=column).number_format = batch_details[group[0]][1]
-                                    bs.cell(row=gndx + tndx, column=column).font = normal
-                        if sp_data[sp][st_fac] == 'Total':
-                            break
-                    if batch_disc_row > 1:
-                         bs.cell(row=batch_disc_row, column=column).value = self.discount_rate
-                         bs.cell(row=batch_disc_row, column=column).number_format = '#0.00%'
-                         bs.cell(row=batch_disc_row, column=column).font = normal
-                    # save details from Total row
-                    for group in self.batch_report:
-                        if group[0] == 'LCOE ($/MWh)':
-                            try:
-                                col = batch_details['LCOE ($/MWh)'][0]
-                                bs.cell(row=tot_lco_row, column=column).value = sp_data[sp][col]
-                                bs.cell(row=tot_lco_row, column=column).number_format = batch_details['LCOE ($/MWh)'][1]
-                                bs.cell(row=tot_lco_row, column=column).font = bold
-                            except:
-                                pass
-                        elif group[0] == 'LCOE With CO2 ($/MWh)':
-                            try:
-                                col = batch_details['LCOE With CO2 ($/MWh)'][0]
-                                bs.cell(row=tot_lcc_row, column=column).value = sp_data[sp][col]
-                                bs.cell(row=tot_lcc_row, column=column).number_format = batch_details['LCOE With CO2 ($/MWh)'][1]
-                                bs.cell(row=tot_lcc_row, column=column).font = bold
-                            except:
-                                pass
-                        elif group[0] == 'Carbon':
+                                if capacity in load_columns.keys():
+                                    pmss_details['Load'].col = load_columns[capacity]
+                                else:
+                                    load_columns[capacity] = len(pmss_data)
+                                    pmss_data.append([])
+                                    load_file = self.load_files.replace('$YEAR$', capacity)
+                                    # load here if no load file
+                                    if self.load_dir.text() != self._load_folder:
+                                        load_file = self.get_filename(load_file)
+                                    pmss_data[-1] = get_load_data(load_file)
+                                    pmss_details['Load'].col = load_columns[capacity]
+                                pmss_details['Load'].capacity = sum(pmss_data[pmss_details['Load'].col])
+                                continue
+                            if key not in re_order:
+                                dispatch_order.append(key)
+                            if key not in pmss_details.keys():
+                                gen = key[key.find('.') + 1:]
+                                if gen in re_order:
+                                    typ = 'R'
+                                elif self.generators[gen].constraint in self.constraints and \
+                                  self.constraints[self.generators[gen].constraint].category == 'Generator':
+                                    typ = 'G'
+                                else:
+                                    typ = 'S'
+                                pmss_details[key] = PM_Facility(key, gen, capacity, typ, -1, 1)
+                        for fac in pmss_details.keys():
+                            if fac == 'Load':
+                                continue
+                            gen = pmss_details[fac].generator
                             try:
-                                bs.cell(row=tot_carb_row, column=column).value = sp_data[sp][st_emc]
-                                bs.cell(row=tot_carb_row, column=column).number_format = '#,##0'
-                                bs.cell(row=tot_carb_row, column=column).font = normal
-                                bs.cell(row=tot_carb_row + 1, column=column).value = sp_data[sp][st_lcc]
-                                bs.cell(row=tot_carb_row + 1, column=column).number_format = '#,##0.00'
-                                bs.cell(row=tot_carb_row + 1, column=column).font = bold
-                                bs.cell(row=tot_carb_row + 2, column=column).value = sp_data[sp][st_lec]
-                                bs.cell(row=tot_carb_row + 2, column=column).number_format = '#,##0'
-                                bs.cell(row=tot_carb_row + 2, column=column).font = normal
+                                pmss_details[fac].multiplier = capacities[fac] * 1.0 / pmss_details[fac].capacity
                             except:
                                 pass
-                    if 'Discount Rate' in capacities.keys():
-                        self.discount_rate = save_discount_rate
-                    # now the other stuff in sp_data
-                    for sp in range(sp + 1, len(sp_data)):
-                        if sp_data[sp][st_fac] == '':
-                            continue
-                        i = sp_data[sp][st_fac].find(' (')
-                        if i >= 0:
-                            tgt = sp_data[sp][st_fac][: i]
-                        else:
-                            tgt = sp_data[sp][st_fac]
-                        if tgt == 'RE %age':
-                            for group in self.batch_report:
-                                if group[0] == 'To Meet Load (MWh)':
-                                    try:
-                                        col = batch_details['To Meet Load (MWh)'][0]
-                                        bs.cell(row=re_tml_row, column=column).value = sp_data[sp][col]
-                                        bs.cell(row=re_tml_row, column=column).number_format = batch_details['To Meet Load (MWh)'][1]
-                                        bs.cell(row=re_tml_row, column=column).font = normal
-                                    except:
-                                        pass
-                                    break
-                        elif tgt == 'Storage %age':
-                            for group in self.batch_report:
-                                if group[0] == 'To Meet Load (MWh)':
-                                    try:
-                                        col = batch_details['To Meet Load (MWh)'][0]
-                                        bs.cell(row=re_tml_row + 1, column=column).value = sp_data[sp][col]
-                                        bs.cell(row=re_tml_row + 1, column=column).number_format = batch_details['To Meet Load (MWh)'][1]
-                                        bs.cell(row=re_tml_row + 1, column=column).font = normal
-                                    except:
-                                        pass
-                                    break
-                        elif tgt == 'LCOE':
-                            for group in self.batch_report:
-                                if group[0] == 'LCOE ($/MWh)':
-                                    try:
-                                        col = batch_details['LCOE ($/MWh)'][0]
-                                        bs.cell(row=re_tml_row + 1, column=column).value = sp_data[sp][col]
-                                        bs.cell(row=re_tml_row + 1, column=column).number_format = batch_details['LCOE ($/MWh)'][1]
-                                        bs.cell(row=re_tml_row + 1, column=column).font = normal
-                                    except:
-                                        pass
-                                    break
-                        elif tgt == 'Carbon Price':
-                            for group in batch_extra['Carbon'][1:]:
-                                if group[0] == 'Carbon Price':
-                                    try:
-                                        col = group[1]
-                                        bs.cell(row=tot_carb_row - 1, column=column).value = sp_data[sp][col]
-                                        bs.cell(row=tot_carb_row - 1, column=column).number_format = batch_extra['Carbon'][0]
-                                        bs.cell(row=tot_carb_row - 1, column=column).font = normal
-                                    except:
-                                        pass
-                                    break
-                        elif tgt[:10] == 'Total Load':
-                            for group in self.batch_report:
-                                if group[0] == 'Max MWh':
+                            if option == T:
+                                if fac not in capex_table.keys():
+                                    capex_table[fac] = {'cum': 0}
+                                if year not in capex_table[fac].keys():
                                     try:
-                                        col = batch_details['Max MWh'][0]
-                                        bs.cell(row=max_load_row, column=column).value = sp_data[sp][col]
-                                        bs.cell(row=max_load_row, column=column).number_format = batch_extra['Max MWh'][0]
-                                        bs.cell(row=max_load_row, column=column).font = normal
+                                        capex_table[fac][year] = [self.generators[fac].capex, 0]
                                     except:
-                                        pass
-                                    break
-                        for key, details in batch_extra.items():
-                            try:
-                                x = [x for x in details if tgt in x][0]
+                                        capex_table[fac][year] = [self.generators[fac[fac.find('.') + 1:]].capex, 0]
+                                capacity = pmss_details[fac].multiplier * pmss_details[fac].capacity
+                                capex_table[fac][year][1] = capacity - capex_table[fac]['cum']
+                                capex_table[fac]['cum'] = capacity
+                        if option == T:
+                            for fac in capex_table.keys():
+                                if capex_table[fac]['cum'] == 0:
+                                    continue
+                                capex = 0
+                                for key, detail in capex_table[fac].items():
+                                    if key == 'cum':
+                                        continue
+                                    capex = capex + detail[0] * detail[1]
+                                capex = capex / capex_table[fac]['cum']
+                                try:
+                                    self.generators[fac].capex = round(capex)
+                                except:
+                                    self.generators[fac[fac.find('.') + 1:]].capex = round(capex)
+                        save_carbon_price = None
+                        if 'Carbon Price' in capacities.keys():
+                            save_carbon_price = self.carbon_price
+                            self.carbon_price = capacities['Carbon Price']
+                        if 'Discount Rate' in capacities.keys():
+                            save_discount_rate = self.discount_rate
+                            self.discount_rate = capacities['Discount Rate']
+                        if 'Load' in capacities.keys() and capacities['Load'] > 0 and capacities['Load'] != pmss_details['Load'].capacity:
+                            load_varies = True
+                            pmss_details['Load'].multiplier = capacities['Load'] / pmss_details['Load'].capacity
+                        else:
+                            pmss_details['Load'].multiplier = save_load_multiplier
+                        batch_props = {'carbon_price': self.carbon_price, 'discount_rate': self.discount_rate}
+                        if option == T: # capex changes by year
+                            batch_props['generators'] = deepcopy(self.generators)
+                        batch_jobs.append((year, option, deepcopy(pmss_details), re_order, dispatch_order,
+                                           capacities['name'], batch_props))
+                        batch_columns.append(column)
+                        if 'Carbon Price' in capacities.keys():
+                            self.carbon_price = save_carbon_price
+                        if 'Discount Rate' in capacities.keys():
+                            self.discount_rate = save_discount_rate
+                    # run the models then write the results in model order
+                    if self.batch_workers > 1 and len(batch_jobs) > 1:
+                        if batch_pool is not None and batch_cols != len(pmss_data): # more load columns
+                            self.stopWorkers(batch_pool, batch_shm)
+                            batch_pool = None
+                            batch_shm = None
+                        if batch_pool is None:
+                            batch_pool, batch_shm = self.startWorkers(self.batch_workers, year, None, pmss_data,
+                                                                      re_order, None)
+                            batch_cols = len(pmss_data)
+                    if batch_pool is not None and len(batch_jobs) > 1:
+                        batch_results = batch_pool.imap(batchDispatch, batch_jobs)
+                    else:
+                        batch_state = DispatchState(self)
+                        batch_state.optimise_debug = self.optimise_debug
+                        batch_results = (batchJob(batch_state, pmss_data, job) for job in batch_jobs)
+                    for column, batch_job, sp_data in zip(batch_columns, batch_jobs, batch_results):
+                        if int(prgv) > prgv_int:
+                            prgv_int = int(prgv)
+                            self.progressbar.setValue(int(prgv))
+                            QtWidgets.QApplication.processEvents()
+                        prgv += incr
+                        # first the Facility/technology table at the top of sp_data
+                        for sp in range(len(self.batch_tech) + 1):
+                            if sp_data[sp][st_fac] in self.batch_tech:
+                                tndx = self.batch_tech.index(sp_data[sp][st_fac]) + 1
                                 for group in self.batch_report:
-                                    if group[0] == key:
+                                    if group[0] in batch_details.keys():
                                         gndx = group[1]
+                                        col = batch_details[group[0]][0]
+                                        if group[0] == 'Capacity Factor' and sp_data[sp][0] == 'Total':
+                                            continue
+                                        if group[0] == 'Capacity Factor' and isinstance(sp_data[sp][col], str):
+                                            bs.cell(row=gndx + tndx, column=column).value = float(sp_data[sp][col].strip('%')) / 100.
+                                        else:
+                                            bs.cell(row=gndx + tndx, column=column).value = sp_data[sp][col]
+                                        bs.cell(row=gndx + tndx, column=column).number_format = batch_details[group[0]][1]
+                                        bs.cell(row=gndx + tndx, column=column).font = normal
+                            if sp_data[sp][st_fac] == 'Total':
+                                break
+                        if batch_disc_row > 1:
+                             bs.cell(row=batch_disc_row, column=column).value = batch_job[-1]['discount_rate']
+                             bs.cell(row=batch_disc_row, column=column).number_format = '#0.00%'
+                             bs.cell(row=batch_disc_row, column=column).font = normal
+                        # save details from Total row
+                        for group in self.batch_report:
+                            if group[0] == 'LCOE ($/MWh)':
+                                try:
+                                    col = batch_details['LCOE ($/MWh)'][0]
+                                    bs.cell(row=tot_lco_row, column=column).value = sp_data[sp][col]
+                                    bs.cell(row=tot_lco_row, column=column).number_format = batch_details['LCOE ($/MWh)'][1]
+                                    bs.cell(row=tot_lco_row, column=column).font = bold
+                                except:
+                                    pass
+                            elif group[0] == 'LCOE With CO2 ($/MWh)':
+                                try:
+                                    col = batch_details['LCOE With CO2 ($/MWh)'][0]
+                                    bs.cell(row=tot_lcc_row, column=column).value = sp_data[sp][col]
+                                    bs.cell(row=tot_lcc_row, column=column).number_format = batch_details['LCOE With CO2 ($/MWh)'][1]
+                                    bs.cell(row=tot_lcc_row, column=column).font = bold
+                                except:
+                                    pass
+                            elif group[0] == 'Carbon':
+                                try:
+                                    bs.cell(row=tot_carb_row, column=column).value = sp_data[sp][st_emc]
+                                    bs.cell(row=tot_carb_row, column=column).number_format = '#,##0'
+                                    bs.cell(row=tot_carb_row, column=column).font = normal
+                                    bs.cell(row=tot_carb_row + 1, column=column).value = sp_data[sp][st_lcc]
+                                    bs.cell(row=tot_carb_row + 1, column=column).number_format = '#,##0.00'
+                                    bs.cell(row=tot_carb_row + 1, column=column).font = bold
+                                    bs.cell(row=tot_carb_row + 2, column=column).value = sp_data[sp][st_lec]
+                                    bs.cell(row=tot_carb_row + 2, column=column).number_format = '#,##0'
+                                    bs.cell(row=tot_carb_row + 2, column=column).font = normal
+                                except:
+                                    pass
+                        # now the other stuff in sp_data
+                        for sp in range(sp + 1, len(sp_data)):
+                            if sp_data[sp][st_fac] == '':
+                                continue
+                            i = sp_data[sp][st_fac].find(' (')
+                            if i >= 0:
+                                tgt = sp_data[sp][st_fac][: i]
+                            else:
+                                tgt = sp_data[sp][st_fac]
+                            if tgt == 'RE %age':
+                                for group in self.batch_report:
+                                    if group[0] == 'To Meet Load (MWh)':
+                                        try:
+                                            col = batch_details['To Meet Load (MWh)'][0]
+                                            bs.cell(row=re_tml_row, column=column).value = sp_data[sp][col]
+                                            bs.cell(row=re_tml_row, column=column).number_format = batch_details['To Meet Load (MWh)'][1]
+                                            bs.cell(row=re_tml_row, column=column).font = normal
+                                        except:
+                                            pass
                                         break
-                                else:
-                                    continue
-                                tndx = details.index(x)
-                                col = x[1]
-                                bs.cell(row=gndx + tndx, column=column).value = sp_data[sp][col]
-                                if key == 'RE' or (key == 'Static Variables' and x[0] == 'Discount Rate'):
-                                    pct = float(sp_data[sp][col].strip('%')) / 100.
-                                    bs.cell(row=gndx + tndx, column=column).value = pct
-                                    bs.cell(row=gndx + tndx, column=column).number_format = '0.0%'
-                                else:
+                            elif tgt == 'Storage %age':
+                                for group in self.batch_report:
+                                    if group[0] == 'To Meet Load (MWh)':
+                                        try:
+                                            col = batch_details['To Meet Load (MWh)'][0]
+                                            bs.cell(row=re_tml_row + 1, column=column).value = sp_data[sp][col]
+                                            bs.cell(row=re_tml_row + 1, column=column).number_format = batch_details['To Meet Load (MWh)'][1]
+                                            bs.cell(row=re_tml_row + 1, column=column).font = normal
+                                        except:
+                                            pass
+                                        break
+                            elif tgt == 'LCOE':
+                                for group in self.batch_report:
+                                    if group[0] == 'LCOE ($/MWh)':
+                                        try:
+                                            col = batch_details['LCOE ($/MWh)'][0]
+                                            bs.cell(row=re_tml_row + 1, column=column).value = sp_data[sp][col]
+                                            bs.cell(row=re_tml_row + 1, column=column).number_format = batch_details['LCOE ($/MWh)'][1]
+                                            bs.cell(row=re_tml_row + 1, column=column).font = normal
+                                        except:
+                                            pass
+                                        break
+                            elif tgt == 'Carbon Price':
+                                for group in batch_extra['Carbon'][1:]:
+                                    if group[0] == 'Carbon Price':
+                                        try:
+                                            col = group[1]
+                                            bs.cell(row=tot_carb_row - 1, column=column).value = sp_data[sp][col]
+                                            bs.cell(row=tot_carb_row - 1, column=column).number_format = batch_extra['Carbon'][0]
+                                            bs.cell(row=tot_carb_row - 1, column=column).font = normal
+                                        except:
+                                            pass
+                                        break
+                            elif tgt[:10] == 'Total Load':
+                                for group in self.batch_report:
+                                    if group[0] == 'Max MWh':
+                                        try:
+                                            col = batch_details['Max MWh'][0]
+                                            bs.cell(row=max_load_row, column=column).value = sp_data[sp][col]
+                                            bs.cell(row=max_load_row, column=column).number_format = batch_extra['Max MWh'][0]
+                                            bs.cell(row=max_load_row, column=column).font = normal
+                                        except:
+                                            pass
+                                        break
+                            for key, details in batch_extra.items():
+                                try:
+                                    x = [x for x in details if tgt in x][0]
+                                    for group in self.batch_report:
+                                        if group[0] == key:
+                                            gndx = group[1]
+                                            break
+                                    else:
+                                        continue
+                                    tndx = details.index(x)
+                                    col = x[1]
                                     bs.cell(row=gndx + tndx, column=column).value = sp_data[sp][col]
-                                    bs.cell(row=gndx + tndx, column=column).number_format = details[0]
-                                bs.cell(row=gndx + tndx, column=column).font = normal
-                                if sp_data[sp][st_fac] == 'RE %age of Total Load' or \
-                                  sp_data[sp][st_fac].find('LCOE') >= 0 or \
-                                  sp_data[sp][st_fac].find('incl.') >= 0:
-                                    bs.cell(row=gndx + tndx, column=column).font = bold
-                                else:
-                                    bs.cell(row=gndx + tndx, column=column).font = normal
-                                if key == 'Load Analysis':
-                                    if x[0] in ['Load met', 'Surplus']:
-                                        tndx += 1
-                                        col = batch_extra['Load Analysis'][tndx][1]
+                                    if key == 'RE' or (key == 'Static Variables' and x[0] == 'Discount Rate'):
                                         pct = float(sp_data[sp][col].strip('%')) / 100.
                                         bs.cell(row=gndx + tndx, column=column).value = pct
                                         bs.cell(row=gndx + tndx, column=column).number_format = '0.0%'
+                                    else:
+                                        bs.cell(row=gndx + tndx, column=column).value = sp_data[sp][col]
+                                        bs.cell(row=gndx + tndx, column=column).number_format = details[0]
+                                    bs.cell(row=gndx + tndx, column=column).font = normal
+                                    if sp_data[sp][st_fac] == 'RE %age of Total Load' or \
+                                      sp_data[sp][st_fac].find('LCOE') >= 0 or \
+                                      sp_data[sp][st_fac].find('incl.') >= 0:
+                                        bs.cell(row=gndx + tndx, column=column).font = bold
+                                    else:
                                         bs.cell(row=gndx + tndx, column=column).font = normal
-                            except:
-                                pass
-                tim = (time.time() - sheet_start)
-                if tim < 60:
-                    tim = '%.1f secs' % tim
-                else:
-                    hhmm = tim / 60.
-                    tim = f'{int(hhmm)}:{int((hhmm-int(hhmm))*60.):0>2} mins'
-                timt = (time.time() - start_time)
-                if timt < 60:
-                    timt = '%.1f secs' % timt
-                else:
-                    hhmm = timt / 60.
-                    timt = f'{int(hhmm)}:{int((hhmm-int(hhmm))*60.):0>2} mins'
-                self.setStatus(f'Processed sheet {sht + 1} of {len(self.batch_models)}; ({len(self.batch_models[sht])} models; {tim}. Total {timt})')
-                QtWidgets.QApplication.processEvents()
-                if total_load_row > 0:
-                    if self.batch_prefix:
-                        batch_pfx = get_batch_prefix('Load Analysis')
-                    if option == T or load_varies:
-                        bs.cell(row=total_load_row, column=1).value = batch_pfx + 'Total Load'
+                                    if key == 'Load Analysis':
+                                        if x[0] in ['Load met', 'Surplus']:
+                                            tndx += 1
+                                            col = batch_extra['Load Analysis'][tndx][1]
+                                            pct = float(sp_data[sp][col].strip('%')) / 100.
+                                            bs.cell(row=gndx + tndx, column=column).value = pct
+                                            bs.cell(row=gndx + tndx, column=column).number_format = '0.0%'
+                                            bs.cell(row=gndx + tndx, column=column).font = normal
+                                except:
+                                    pass
+                    tim = (time.time() - sheet_start)
+                    if tim < 60:
+                        tim = '%.1f secs' % tim
                     else:
-                        load_mult = ''
-                        try:
-                            mult = round(pmss_details['Load'].multiplier, 3)
-                            if mult != 1:
-                                load_mult = ' x ' + str(mult)
-                        except:
-                            pass
-                        bs.cell(row=total_load_row, column=1).value = batch_pfx + 'Total Load - ' + year + load_mult
-                if do_opt_parms[0]:
-                    t_row = do_opt_parms[1]
-                    for row in range(do_opt_parms[2], do_opt_parms[3] + 1):
-                        for col in range(1, batch_input_sheet.max_column + 1):
-                            cell = batch_input_sheet.cell(row=row, column=col)
-                            new_cell = bs.cell(row=t_row, column=col, value=cell.value)
-                            if cell.has_style:
-                                new_cell.font = copy(cell.font)
-                                new_cell.border = copy(cell.border)
-                                new_cell.fill = copy(cell.fill)
-                                new_cell.number_format = copy(cell.number_format)
-                                new_cell.protection = copy(cell.protection)
-                                new_cell.alignment = copy(cell.alignment)
-                        t_row += 1
-                del_rows = []
-                for group in self.batch_report:
-                    if group[0] in ['Generation (MWh)']:
-                        # remove storage or RE
-                        gndx = group[1]
-                        if group[0] == 'Generation (MWh)':
-                            tst = 'S'
+                        hhmm = tim / 60.
+                        tim = f'{int(hhmm)}:{int((hhmm-int(hhmm))*60.):0>2} mins'
+                    timt = (time.time() - start_time)
+                    if timt < 60:
+                        timt = '%.1f secs' % timt
+                    else:
+                        hhmm = timt / 60.
+                        timt = f'{int(hhmm)}:{int((hhmm-int(hhmm))*60.):0>2} mins'
+                    self.setStatus(f'Processed sheet {sht + 1} of {len(self.batch_models)}; ({len(self.batch_models[sht])} models; {tim}. Total {timt})')
+                    QtWidgets.QApplication.processEvents()
+                    if total_load_row > 0:
+                        if self.batch_prefix:
+                            batch_pfx = get_batch_prefix('Load Analysis')
+                        if option == T or load_varies:
+                            bs.cell(row=total_load_row, column=1).value = batch_pfx + 'Total Load'
                         else:
-                            tst = 'R' # probably redundant
-                        for row in range(gndx, gndx + len(self.batch_tech)):
+                            load_mult = ''
                             try:
-                                if pmss_details[bs.cell(row=row, column=1).value].fac_type == tst:
-                                    del_rows.append(row)
+                                mult = round(pmss_details['Load'].multiplier, 3)
+                                if mult != 1:
+                                    load_mult = ' x ' + str(mult)
                             except:
                                 pass
-                for row in sorted(del_rows, reverse=True):
-                    bs.delete_rows(row, 1)
-                if d3_ranges is not None and len(self.batch_models) > 1 and sht == 1: #multiple sheets
-                    med_side = oxl.styles.Side(border_style='medium')
-                    thin_side = oxl.styles.Side(border_style='thin')
-                    border = oxl.styles.Border(left=thin_side, right=thin_side, top=thin_side, bottom=thin_side)
-                    med_border = oxl.styles.Border(left=med_side, right=med_side, top=med_side, bottom=med_side)
-                    best_3d = self.batch_3d_best.split(',')
-                    best_3d = best_3d + [''] * (3 - len(best_3d))
-                    if len(best_3d[0]) == 0:
-                        best_3d[0] = '#FFC709'
-                    if len(best_3d[1]) == 0:
-                        best_3d[1] = '#06A9D6'
-                    if len(best_3d[2]) == 0:
-                        best_3d[2] = 'same'
-                    if best_3d[2].lower() not in ['same', 'true', 'yes', 'on']:
-                        best_3d[2] = False
-                    else:
-                        best_3d[2] = True
-                    try:
-                        font1 = oxl.styles.Font(color=f'FF{best_3d[0][-6:]}', italic=True, bold=True)
-                    except:
-                        font1 = oxl.styles.Font(color=f'FFFFC709', italic=True, bold=True)
-                    try:
-                        otr_side = oxl.styles.Side(border_style='medium', color=best_3d[1][-6:])
-                    except:
-                        otr_side = oxl.styles.Side(border_style='medium', color='06A9D6')
-                    otr_border = oxl.styles.Border(left=otr_side, right=otr_side, top=otr_side, bottom=otr_side)
-                    font2 = oxl.styles.Font(bold=True)
-                    fonthide = oxl.styles.Font(color='FFFFFFFF')
-                   # self.setStatus(f'{bs.title}: {len(self.batch_models[sht]) + 1} columns, {bs.max_row}, {d3_rng1}, {d3_rng2}')
-                    # Hide these common cells in the top set of rows
-                    d3s.cell(row=3, column=3).value = '2nd cnt'
-                    d3s.cell(row=3, column=4).value = d3_rng2
-                    d3_rng_str = f'$D$3'
-                    d3s.cell(row=4, column=3).value = '2nd Lvl'
-                    d3s.cell(row=5, column=3).value = '1st col'
-                    d3s.cell(row=6, column=3).value = 'Lst col'
-                    for s in range(d3_rng1):
-                        d3s.cell(row=4, column=s + 4).value = s + 1
-                        if s == 0:
-                            d3s.cell(row=5, column=s + 4).value = 2
+                            bs.cell(row=total_load_row, column=1).value = batch_pfx + 'Total Load - ' + year + load_mult
+                    if do_opt_parms[0]:
+                        t_row = do_opt_parms[1]
+                        for row in range(do_opt_parms[2], do_opt_parms[3] + 1):
+                            for col in range(1, batch_input_sheet.max_column + 1):
+                                cell = batch_input_sheet.cell(row=row, column=col)
+                                new_cell = bs.cell(row=t_row, column=col, value=cell.value)
+                                if cell.has_style:
+                                    new_cell.font = copy(cell.font)
+                                    new_cell.border = copy(cell.border)
+                                    new_cell.fill = copy(cell.fill)
+                                    new_cell.number_format = copy(cell.number_format)
+                                    new_cell.protection = copy(cell.protection)
+                                    new_cell.alignment = copy(cell.alignment)
+                            t_row += 1
+                    del_rows = []
+                    for group in self.batch_report:
+                        if group[0] in ['Generation (MWh)']:
+                            # remove storage or RE
+                            gndx = group[1]
+                            if group[0] == 'Generation (MWh)':
+                                tst = 'S'
+                            else:
+                                tst = 'R' # probably redundant
+                            for row in range(gndx, gndx + len(self.batch_tech)):
+                                try:
+                                    if pmss_details[bs.cell(row=row, column=1).value].fac_type == tst:
+                                        del_rows.append(row)
+                                except:
+                                    pass
+                    for row in sorted(del_rows, reverse=True):
+                        bs.delete_rows(row, 1)
+                    if d3_ranges is not None and len(self.batch_models) > 1 and sht == 1: #multiple sheets
+                        med_side = oxl.styles.Side(border_style='medium')
+                        thin_side = oxl.styles.Side(border_style='thin')
+                        border = oxl.styles.Border(left=thin_side, right=thin_side, top=thin_side, bottom=thin_side)
+                        med_border = oxl.styles.Border(left=med_side, right=med_side, top=med_side, bottom=med_side)
+                        best_3d = self.batch_3d_best.split(',')
+                        best_3d = best_3d + [''] * (3 - len(best_3d))
+                        if len(best_3d[0]) == 0:
+                            best_3d[0] = '#FFC709'
+                        if len(best_3d[1]) == 0:
+                            best_3d[1] = '#06A9D6'
+                        if len(best_3d[2]) == 0:
+                            best_3d[2] = 'same'
+                        if best_3d[2].lower() not in ['same', 'true', 'yes', 'on']:
+                            best_3d[2] = False
                         else:
-                            d3s.cell(row=5, column=s + 4).value = f'={ssCol(s + 3)}6+1'
-                        d3s.cell(row=6, column=s + 4).value = f'={ssCol(s + 4)}5+{d3_rng_str}-1'
-                    rw = d3s.max_row + 2
-                    for d3t in range(self.batch_3d):
-                        dv3 = DataValidation(type='list', formula1=d3s_formula1, allow_blank=True)
-                        d3s.add_data_validation(dv3)
-                        dv3_cells = f'A{rw}:A{rw}'
-                        dv3.add(dv3_cells)
-                        acolor = oxl.styles.colors.Color(rgb='00ebbd34')
-                        cell_fill = oxl.styles.fills.PatternFill(patternType='solid', fgColor=acolor)
-                        d3s.cell(row=rw, column=1).fill = cell_fill
-                        d3s.cell(row=rw, column=1).value = d3s.cell(row=3 + d3t, column=1).value
-                        d3s.cell(row=rw, column=2).value = f'=VLOOKUP(A{rw},{d3s_vlookup})'
-                        d3s.cell(row=rw, column=2).alignment = oxl.styles.Alignment(horizontal='center')
-                        sn = f"'{bs.title}'"
-                        d3s.cell(row=rw, column=3).value = 'Row'
-                        d3s.cell(row=rw, column=4).value = f'=MATCH(A{rw},INDIRECT("{sn}!$A$1:$A${bs.max_row}"),0)'
-                        row_str = f'$D${rw}'
-                        lege_str = f'$B${rw}'
-                        rw += 1
+                            best_3d[2] = True
+                        try:
+                            font1 = oxl.styles.Font(color=f'FF{best_3d[0][-6:]}', italic=True, bold=True)
+                        except:
+                            font1 = oxl.styles.Font(color=f'FFFFC709', italic=True, bold=True)
+                        try:
+                            otr_side = oxl.styles.Side(border_style='medium', color=best_3d[1][-6:])
+                        except:
+                            otr_side = oxl.styles.Side(border_style='medium', color='06A9D6')
+                        otr_border = oxl.styles.Border(left=otr_side, right=otr_side, top=otr_side, bottom=otr_side)
+                        font2 = oxl.styles.Font(bold=True)
+                        fonthide = oxl.styles.Font(color='FFFFFFFF')
+                       # self.setStatus(f'{bs.title}: {len(self.batch_models[sht]) + 1} columns, {bs.max_row}, {d3_rng1}, {d3_rng2}')
+                        # Hide these common cells in the top set of rows
+                        d3s.cell(row=3, column=3).value = '2nd cnt'
+                        d3s.cell(row=3, column=4).value = d3_rng2
+                        d3_rng_str = f'$D$3'
+                        d3s.cell(row=4, column=3).value = '2nd Lvl'
+                        d3s.cell(row=5, column=3).value = '1st col'
+                        d3s.cell(row=6, column=3).value = 'Lst col'
                         for s in range(d3_rng1):
-                            d3s.cell(row=rw, column=s + 4).value = f'=ADDRESS({row_str},{ssCol(s + 4)}5,4,1)'
-                            d3s.cell(row=rw + 1, column=s + 4).value = f'=ADDRESS({row_str},{ssCol(s + 4)}6,4,1)'
-                        rw2 = rw + 4
-                        hdr1 = f'INDIRECT("\'{1:0{sht_nam_len}}\'!A{d3_ranges[1]+1}")'
-                        if self.batch_prefix:
-                            hdr1 = f'REPLACE({hdr1},1,3,"")'
-                        d3s.cell(row=rw2 - 1, column=4).value = f'={hdr1}'
-                        d3s.cell(row=rw2 - 1, column=4).alignment = oxl.styles.Alignment(wrap_text=True, vertical='bottom', horizontal='center')
-                        d3s.cell(row=rw2 - 1, column=4).border = med_border
-                        d3s.merge_cells(f'D{rw2 - 1}:{ssCol(d3_rng1 + 3)}{rw2 - 1}')
-                        for cl in range(d3_rng1):
-                            d3s.cell(row=rw2, column=cl + 4).value = f'=INDIRECT("\'{1:0{sht_nam_len}}\'!R{d3_ranges[1]+1}C"&{ssCol(cl + 4)}$5,0)'
-                            d3s.cell(row=rw2, column=cl + 4).number_format = '#0'
-                            d3s.cell(row=rw2, column=cl + 4).border = med_border
-                        d3s.cell(row=rw2, column=1).value = 'Sheet'
-                        hdr2 = f'INDIRECT("\'{1:0{sht_nam_len}}\'!A{d3_ranges[0]+1}")'
-                        if self.batch_prefix:
-                            hdr2 = f'REPLACE({hdr2},1,3,"")'
-                        d3s.cell(row=rw2 + 1, column=2).value = f'={hdr2}'
-                        d3s.cell(row=rw2 + 1, column=2).alignment = oxl.styles.Alignment(wrap_text=True, vertical='center', horizontal='center',
-                                                                                         textRotation=90)
-                        d3s.cell(row=rw2 + 1, column=2).border = med_border
-                        d3s.merge_cells(f'B{rw2 + 1}:B{rw2 + len(self.batch_models) - 1}')
-                        for rs in range(1, len(self.batch_models)):
-                            d3s.cell(row=rw2 + rs, column=1).value = f'{rs:0{sht_nam_len}}'
-                            d3s.cell(row=rw2 + rs, column=3).value = f'=INDIRECT("\'{rs:0{sht_nam_len}}\'!B{d3_ranges[0]+1}")'
-                            d3s.cell(row=rw2 + rs, column=3).number_format = '#0'
-                            d3s.cell(row=rw2 + rs, column=3).border = med_border
+                            d3s.cell(row=4, column=s + 4).value = s + 1
+                            if s == 0:
+                                d3s.cell(row=5, column=s + 4).value = 2
+                            else:
+                                d3s.cell(row=5, column=s + 4).value = f'={ssCol(s + 3)}6+1'
+                            d3s.cell(row=6, column=s + 4).value = f'={ssCol(s + 4)}5+{d3_rng_str}-1'
+                        rw = d3s.max_row + 2
+                        for d3t in range(self.batch_3d):
+                            dv3 = DataValidation(type='list', formula1=d3s_formula1, allow_blank=True)
+                            d3s.add_data_validation(dv3)
+                            dv3_cells = f'A{rw}:A{rw}'
+                            dv3.add(dv3_cells)
+                            acolor = oxl.styles.colors.Color(rgb='00ebbd34')
+                            cell_fill = oxl.styles.fills.PatternFill(patternType='solid', fgColor=acolor)
+                            d3s.cell(row=rw, column=1).fill = cell_fill
+                            d3s.cell(row=rw, column=1).value = d3s.cell(row=3 + d3t, column=1).value
+                            d3s.cell(row=rw, column=2).value = f'=VLOOKUP(A{rw},{d3s_vlookup})'
+                            d3s.cell(row=rw, column=2).alignment = oxl.styles.Alignment(horizontal='center')
+                            sn = f"'{bs.title}'"
+                            d3s.cell(row=rw, column=3).value = 'Row'
+                            d3s.cell(row=rw, column=4).value = f'=MATCH(A{rw},INDIRECT("{sn}!$A$1:$A${bs.max_row}"),0)'
+                            row_str = f'$D${rw}'
+                            lege_str = f'$B${rw}'
+                            rw += 1
+                            for s in range(d3_rng1):
+                                d3s.cell(row=rw, column=s + 4).value = f'=ADDRESS({row_str},{ssCol(s + 4)}5,4,1)'
+                                d3s.cell(row=rw + 1, column=s + 4).value = f'=ADDRESS({row_str},{ssCol(s + 4)}6,4,1)'
+                            rw2 = rw + 4
+                            hdr1 = f'INDIRECT("\'{1:0{sht_nam_len}}\'!A{d3_ranges[1]+1}")'
+                            if self.batch_prefix:
+                                hdr1 = f'REPLACE({hdr1},1,3,"")'
+                            d3s.cell(row=rw2 - 1, column=4).value = f'={hdr1}'
+                            d3s.cell(row=rw2 - 1, column=4).alignment = oxl.styles.Alignment(wrap_text=True, vertical='bottom', horizontal='center')
+                            d3s.cell(row=rw2 - 1, column=4).border = med_border
+                            d3s.merge_cells(f'D{rw2 - 1}:{ssCol(d3_rng1 + 3)}{rw2 - 1}')
+                            for cl in range(d3_rng1):
+                                d3s.cell(row=rw2, column=cl + 4).value = f'=INDIRECT("\'{1:0{sht_nam_len}}\'!R{d3_ranges[1]+1}C"&{ssCol(cl + 4)}$5,0)'
+                                d3s.cell(row=rw2, column=cl + 4).number_format = '#0'
+                                d3s.cell(row=rw2, column=cl + 4).border = med_border
+                            d3s.cell(row=rw2, column=1).value = 'Sheet'
+                            hdr2 = f'INDIRECT("\'{1:0{sht_nam_len}}\'!A{d3_ranges[0]+1}")'
+                            if self.batch_prefix:
+                                hdr2 = f'REPLACE({hdr2},1,3,"")'
+                            d3s.cell(row=rw2 + 1, column=2).value = f'={hdr2}'
+                            d3s.cell(row=rw2 + 1, column=2).alignment = oxl.styles.Alignment(wrap_text=True, vertical='center', horizontal='center',
+                                                                                             textRotation=90)
+                            d3s.cell(row=rw2 + 1, column=2).border = med_border
+                            d3s.merge_cells(f'B{rw2 + 1}:B{rw2 + len(self.batch_models) - 1}')
+                            for rs in range(1, len(self.batch_models)):
+                                d3s.cell(row=rw2 + rs, column=1).value = f'{rs:0{sht_nam_len}}'
+                                d3s.cell(row=rw2 + rs, column=3).value = f'=INDIRECT("\'{rs:0{sht_nam_len}}\'!B{d3_ranges[0]+1}")'
+                                d3s.cell(row=rw2 + rs, column=3).number_format = '#0'
+                                d3s.cell(row=rw2 + rs, column=3).border = med_border
+                                for s2 in range(d3_rng1):
+                                    f1 = f'=MIN(INDIRECT(CONCATENATE("\'",TEXT($A{rw2 + rs},"###00"),"\'!",' + \
+                                             f'TEXT({ssCol(s2 + 4)}${rw + 3},"###00"),":",TEXT({ssCol(s2 + 4)}${rw + 4},"###00"))))'
+                                    cels = f'INDIRECT("\'{rs:0{sht_nam_len}}\'!"&{ssCol(s2 + 4)}${rw}&":"&{ssCol(s2 + 4)}${rw + 1})'
+                                    f1 = f'=IF({lege_str}="<",MIN({cels}),MAX({cels})'
+                                    d3s.cell(row=rw2 + rs, column=s2 + 4).value = f1
+                                    d3s.cell(row=rw2 + rs, column=s2 + 4).number_format = '#0.00'
+                                    d3s.cell(row=rw2 + rs, column=s2 + 4).border = border
+                            # now for Len's extras
+                            d3s_strt = f'D{rw2 + 1}'
+                            d3s_endcol = f'{ssCol(d3_rng1 + 3)}'
+                            d3s_end = f'{d3s_endcol}{rw2 + len(self.batch_models) - 1}'
+                            d3s_range = f'{d3s_strt}:{d3s_end}'
+                            d3s.cell(row=rw2 + rs + 1, column=1).value = 'Within range'
+                            d3s.cell(row=rw2 + rs + 1, column=4).value = .05
+                            d3s.cell(row=rw2 + rs + 1, column=4).number_format = '#,##0%'
+                            d3s.cell(row=rw2 + rs + 2, column=1).value = 'Best range'
+                            d3s.cell(row=rw2 + rs + 2, column=2).value = f'=IF(D{rw2 + rs + 3}>0,1,MATCH(1,C{rw2 + rs + 3}:{d3s_endcol}{rw2 + rs + 3},1))'
+                            d3s.cell(row=rw2 + rs + 2, column=2).font = fonthide
+                            d3s.cell(row=rw2 + rs + 2, column=3).value = f'=INDIRECT("R{rw2 + rs + 3}C"&3+B{rw2 + rs + 2},0)'
+                            d3s.cell(row=rw2 + rs + 2, column=3).font = fonthide
+                            d3s.cell(row=rw2 + rs + 2, column=4).value = f'=IF({lege_str}=">",IFERROR(MAX({d3s_range})*(1-D{rw2 + rs + 1}),' + \
+                                                                         f'MAX({d3s_range})),MIN({d3s_range}))'
+                            d3s.cell(row=rw2 + rs + 2, column=4).number_format = '#0.00'
+                            rumin = oxl.formatting.rule.FormulaRule(formula=[f'{lege_str}="<"'], border=med_border)
+                            d3s.conditional_formatting.add(f'D{rw2 + rs + 2}', rumin)
+                            d3s.cell(row=rw2 + rs + 2, column=5).value = 'up to'
+                            d3s.cell(row=rw2 + rs + 2, column=5).alignment = oxl.styles.Alignment(horizontal='center')
+                            d3s.cell(row=rw2 + rs + 2, column=6).value = f'=IF({lege_str}=">",MAX({d3s_range}),' + \
+                                                                         f'IFERROR($D${rw2 + rs + 2}*(1+$D${rw2 + rs + 1}),$D${rw2 + rs + 2}))'
+                            d3s.cell(row=rw2 + rs + 2, column=6).number_format = '#0.00'
+                            rumax = oxl.formatting.rule.FormulaRule(formula=[f'{lege_str}=">"'], border=med_border)
+                            d3s.conditional_formatting.add(f'F{rw2 + rs + 2}', rumax)
+                            rul = f'OR(AND({lege_str}="<",{d3s_strt}=$D${rw2 + rs + 2}),' + \
+                                  f'AND({lege_str}=">",{d3s_strt}=$F${rw2 + rs + 2}))'
+                            rule1 = oxl.formatting.rule.FormulaRule(formula=[rul], font=font1, border=med_border)
+                            d3s.conditional_formatting.add(d3s_range, rule1)
+                            if d3t == 0:
+                                save_rul = rul
+                            else:
+                                rule1a = oxl.formatting.rule.FormulaRule(formula=[save_rul], font=font2, border=otr_border)
+                                d3s.conditional_formatting.add(d3s_range, rule1a)
+                            if d3t == 0 or not best_3d[2]:
+                                rul2 = [f'$D${rw2 + rs + 2}',f'$F${rw2 + rs + 2}']
+                                rule2 = oxl.formatting.rule.CellIsRule(operator='between',
+                                                                       formula=rul2,
+                                                                       font=font2)
+                                save_rul2 = f'IF(AND({d3s_strt}>=$D${rw2 + rs + 2},{d3s_strt}<=$F${rw2 + rs + 2}))'
+                            else:
+                                rule2 = oxl.formatting.rule.FormulaRule(formula=[save_rul2], font=font2)
+                            d3s.conditional_formatting.add(d3s_range, rule2)
+                            rule3 = ColorScaleRule(start_type='min', start_color='FF63BE7B',
+                                                   mid_type='percentile', mid_value=50, mid_color='FFFFEB84',
+                                                   end_type='max', end_color='FFF8696B')
+                            d3s.conditional_formatting.add(d3s_range, rule3)
+                            d3s.cell(row=rw2 + rs + 3, column=1).value = 'Sheet (1st level) with best'
+                            d3s.cell(row=rw2 + rs + 3, column=2).value = f'=OFFSET($A${rw2 + 1},IF(C{rw2 + rs + 2}=0,0,C{rw2 + rs + 2}-1),0,1,1)'
+                            d3s.cell(row=rw2 + rs + 4, column=1).value = '2nd level with best'
+                            d3s.cell(row=rw2 + rs + 4, column=2).value = f'=MATCH(VALUE(B{rw2 + rs + 3}),D{rw2 + rs + 3}:{ssCol(d3_rng1 + 3)}{rw2 + rs + 3},0)'
                             for s2 in range(d3_rng1):
-                                f1 = f'=MIN(INDIRECT(CONCATENATE("\'",TEXT($A{rw2 + rs},"###00"),"\'!",' + \
-                                         f'TEXT({ssCol(s2 + 4)}${rw + 3},"###00"),":",TEXT({ssCol(s2 + 4)}${rw + 4},"###00"))))'
-                                cels = f'INDIRECT("\'{rs:0{sht_nam_len}}\'!"&{ssCol(s2 + 4)}${rw}&":"&{ssCol(s2 + 4)}${rw + 1})'
-                                f1 = f'=IF({lege_str}="<",MIN({cels}),MAX({cels})'
-                                d3s.cell(row=rw2 + rs, column=s2 + 4).value = f1
-                                d3s.cell(row=rw2 + rs, column=s2 + 4).number_format = '#0.00'
-                                d3s.cell(row=rw2 + rs, column=s2 + 4).border = border
-                        # now for Len's extras
-                        d3s_strt = f'D{rw2 + 1}'
-                        d3s_endcol = f'{ssCol(d3_rng1 + 3)}'
-                        d3s_end = f'{d3s_endcol}{rw2 + len(self.batch_models) - 1}'
-                        d3s_range = f'{d3s_strt}:{d3s_end}'
-                        d3s.cell(row=rw2 + rs + 1, column=1).value = 'Within range'
-                        d3s.cell(row=rw2 + rs + 1, column=4).value = .05
-                        d3s.cell(row=rw2 + rs + 1, column=4).number_format = '#,##0%'
-                        d3s.cell(row=rw2 + rs + 2, column=1).value = 'Best range'
-                        d3s.cell(row=rw2 + rs + 2, column=2).value = f'=IF(D{rw2 + rs + 3}>0,1,MATCH(1,C{rw2 + rs + 3}:{d3s_endcol}{rw2 + rs + 3},1))'
-                        d3s.cell(row=rw2 + rs + 2, column=2).font = fonthide
-                        d3s.cell(row=rw2 + rs + 2, column=3).value = f'=INDIRECT("R{rw2 + rs + 3}C"&3+B{rw2 + rs + 2},0)'
-                        d3s.cell(row=rw2 + rs + 2, column=3).font = fonthide
-                        d3s.cell(row=rw2 + rs + 2, column=4).value = f'=IF({lege_str}=">",IFERROR(MAX({d3s_range})*(1-D{rw2 + rs + 1}),' + \
-                                                                     f'MAX({d3s_range})),MIN({d3s_range}))'
-                        d3s.cell(row=rw2 + rs + 2, column=4).number_format = '#0.00'
-                        rumin = oxl.formatting.rule.FormulaRule(formula=[f'{lege_str}="<"'], border=med_border)
-                        d3s.conditional_formatting.add(f'D{rw2 + rs + 2}', rumin)
-                        d3s.cell(row=rw2 + rs + 2, column=5).value = 'up to'
-                        d3s.cell(row=rw2 + rs + 2, column=5).alignment = oxl.styles.Alignment(horizontal='center')
-                        d3s.cell(row=rw2 + rs + 2, column=6).value = f'=IF({lege_str}=">",MAX({d3s_range}),' + \
-                                                                     f'IFERROR($D${rw2 + rs + 2}*(1+$D${rw2 + rs + 1}),$D${rw2 + rs + 2}))'
-                        d3s.cell(row=rw2 + rs + 2, column=6).number_format = '#0.00'
-                        rumax = oxl.formatting.rule.FormulaRule(formula=[f'{lege_str}=">"'], border=med_border)
-                        d3s.conditional_formatting.add(f'F{rw2 + rs + 2}', rumax)
-                        rul = f'OR(AND({lege_str}="<",{d3s_strt}=$D${rw2 + rs + 2}),' + \
-                              f'AND({lege_str}=">",{d3s_strt}=$F${rw2 + rs + 2}))'
-                        rule1 = oxl.formatting.rule.FormulaRule(formula=[rul], font=font1, border=med_border)
-                        d3s.conditional_formatting.add(d3s_range, rule1)
-                        if d3t == 0:
-                            save_rul = rul
-                        else:
-                            rule1a = oxl.formatting.rule.FormulaRule(formula=[save_rul], font=font2, border=otr_border)
-                            d3s.conditional_formatting.add(d3s_range, rule1a)
-                        if d3t == 0 or not best_3d[2]:
-                            rul2 = [f'$D${rw2 + rs + 2}',f'$F${rw2 + rs + 2}']
-                            rule2 = oxl.formatting.rule.CellIsRule(operator='between',
-                                                                   formula=rul2,
-                                                                   font=font2)
-                            save_rul2 = f'IF(AND({d3s_strt}>=$D${rw2 + rs + 2},{d3s_strt}<=$F${rw2 + rs + 2}))'
+                                d3s.cell(row=rw2 + rs + 3, column=s2 + 4).value = f'=IF({lege_str}="<",IFERROR(MATCH($D${rw2 + rs + 2},{ssCol(s2 + 4)}${rw2 + 1}:' + \
+                                                                                  f'{ssCol(s2 + 4)}${rw2 + len(self.batch_models) - 1},0),0),' + \
+                                                                                  f'IFERROR(MATCH($F${rw2 + rs + 2},{ssCol(s2 + 4)}${rw2 + 1}:' + \
+                                                                                  f'{ssCol(s2 + 4)}${rw2 + len(self.batch_models) - 1},0),0)'
+                                d3s.cell(row=rw2 + rs + 3, column=s2 + 4).font = fonthide
+                                d3s.cell(row=rw2 + rs + 4, column=s2 + 4).value = f'=IF({ssCol(s2 + 4)}{rw2 + rs + 3}>0,MATCH(OFFSET({ssCol(s2 + 4)}{rw2 + 1},' + \
+                                                                                  f'{ssCol(s2 + 4)}{rw2 + rs + 3}-1,0),' + \
+                                                                                  f'INDIRECT("\'"&$B{rw2 + rs + 3}&"\'!"&{ssCol(s2 + 4)}{rw}&":"&' + \
+                                                                                  f'{ssCol(s2 + 4)}{rw + 1}),0),"")'
+                            d3s.row_dimensions[rw2 + rs + 4].hidden = True
+                            d3s.cell(row=rw2 + rs + 5, column=1).value = 'Target cell with best'
+                            d3s.cell(row=rw2 + rs + 5, column=2).value = f'=ADDRESS({row_str},OFFSET(D5,0,B{rw2 + rs + 4}-1)+OFFSET(D{rw2 + rs + 4},' + \
+                                                                         f'0,B{rw2 + rs + 4}-1)-1,4,1)'
+                            d3s.cell(row=rw2 + rs + 6, column=1).value = 'Link to best'
+                            d3s.cell(row=rw2 + rs + 6, column=2).value = f'=HYPERLINK("#\'"&B{rw2 + rs + 3}&"\'!"&B{rw2 + rs + 5},"\'"&B{rw2 + rs + 3}&"\'!"&B{rw2 + rs + 5})'
+                            fontlink = oxl.styles.Font(color='FFFF0000', underline='single', name='Arial', size=10)
+                            d3s.cell(row=rw2 + rs + 6, column=2).font = fontlink
+                            rw = rw2 + rs + 8
+                        if self.batch_3d == 1:
+                            d3s.freeze_panes = d3s_strt
+                    for column_cells in bs.columns:
+                        length = 0
+                        for cell in column_cells:
+                            if cell.row < self.batch_report[0][1] - 1:
+                                continue
+                            try:
+                                value = str(round(cell.value, 2))
+                            except:
+                                value = cell.value
+                            if value is None:
+                                continue
+                            if len(value) > length:
+                                length = len(value)
+                        if isinstance(cell.column, int):
+                            cel = ssCol(cell.column)
                         else:
-                            rule2 = oxl.formatting.rule.FormulaRule(formula=[save_rul2], font=font2)
-                        d3s.conditional_formatting.add(d3s_range, rule2)
-                        rule3 = ColorScaleRule(start_type='min', start_color='FF63BE7B',
-                                               mid_type='percentile', mid_value=50, mid_color='FFFFEB84',
-                                               end_type='max', end_color='FFF8696B')
-                        d3s.conditional_formatting.add(d3s_range, rule3)
-                        d3s.cell(row=rw2 + rs + 3, column=1).value = 'Sheet (1st level) with best'
-                        d3s.cell(row=rw2 + rs + 3, column=2).value = f'=OFFSET($A${rw2 + 1},IF(C{rw2 + rs + 2}=0,0,C{rw2 + rs + 2}-1),0,1,1)'
-                        d3s.cell(row=rw2 + rs + 4, column=1).value = '2nd level with best'
-                        d3s.cell(row=rw2 + rs + 4, column=2).value = f'=MATCH(VALUE(B{rw2 + rs + 3}),D{rw2 + rs + 3}:{ssCol(d3_rng1 + 3)}{rw2 + rs + 3},0)'
-                        for s2 in range(d3_rng1):
-                            d3s.cell(row=rw2 + rs + 3, column=s2 + 4).value = f'=IF({lege_str}="<",IFERROR(MATCH($D${rw2 + rs + 2},{ssCol(s2 + 4)}${rw2 + 1}:' + \
-                                                                              f'{ssCol(s2 + 4)}${rw2 + len(self.batch_models) - 1},0),0),' + \
-                                                                              f'IFERROR(MATCH($F${rw2 + rs + 2},{ssCol(s2 + 4)}${rw2 + 1}:' + \
-                                                                              f'{ssCol(s2 + 4)}${rw2 + len(self.batch_models) - 1},0),0)'
-                            d3s.cell(row=rw2 + rs + 3, column=s2 + 4).font = fonthide
-                            d3s.cell(row=rw2 + rs + 4, column=s2 + 4).value = f'=IF({ssCol(s2 + 4)}{rw2 + rs + 3}>0,MATCH(OFFSET({ssCol(s2 + 4)}{rw2 + 1},' + \
-                                                                              f'{ssCol(s2 + 4)}{rw2 + rs + 3}-1,0),' + \
-                                                                              f'INDIRECT("\'"&$B{rw2 + rs + 3}&"\'!"&{ssCol(s2 + 4)}{rw}&":"&' + \
-                                                                              f'{ssCol(s2 + 4)}{rw + 1}),0),"")'
-                        d3s.row_dimensions[rw2 + rs + 4].hidden = True
-                        d3s.cell(row=rw2 + rs + 5, column=1).value = 'Target cell with best'
-                        d3s.cell(row=rw2 + rs + 5, column=2).value = f'=ADDRESS({row_str},OFFSET(D5,0,B{rw2 + rs + 4}-1)+OFFSET(D{rw2 + rs + 4},' + \
-                                                                     f'0,B{rw2 + rs + 4}-1)-1,4,1)'
-                        d3s.cell(row=rw2 + rs + 6, column=1).value = 'Link to best'
-                        d3s.cell(row=rw2 + rs + 6, column=2).value = f'=HYPERLINK("#\'"&B{rw2 + rs + 3}&"\'!"&B{rw2 + rs + 5},"\'"&B{rw2 + rs + 3}&"\'!"&B{rw2 + rs + 5})'
-                        fontlink = oxl.styles.Font(color='FFFF0000', underline='single', name='Arial', size=10)
-                        d3s.cell(row=rw2 + rs + 6, column=2).font = fontlink
-                        rw = rw2 + rs + 8
-                    if self.batch_3d == 1:
-                        d3s.freeze_panes = d3s_strt
-                for column_cells in bs.columns:
-                    length = 0
-                    for cell in column_cells:
-                        if cell.row < self.batch_report[0][1] - 1:
-                            continue
-                        try:
-                            value = str(round(cell.value, 2))
-                        except:
-                            value = cell.value
-                        if value is None:
+                            cel = cell.column
+                        bs.column_dimensions[cel].width = max(length * 1.05, 10)
+                    if batch_data_sources_row > 0:
+                        i = self.data_sources(bs, batch_data_sources_row - len(del_rows), pm_data_file, option)
+                    bs.freeze_panes = 'B' + str(self.batch_report[0][1])
+                    bs.activeCell = 'B' + str(self.batch_report[0][1])
+                    for sheet in wb:
+                        wb[sheet.title].views.sheetView[0].tabSelected = False
+                    wb.active = bs
+                    # check if any charts/graphs
+                    if self.batch_report[-1][0] == 'Chart':
+                        if sht > 0 and '' not in chart_groups:
                             continue
-                        if len(value) > length:
-                            length = len(value)
-                    if isinstance(cell.column, int):
-                        cel = ssCol(cell.column)
-                    else:
-                        cel = cell.column
-                    bs.column_dimensions[cel].width = max(length * 1.05, 10)
-                if batch_data_sources_row > 0:
-                    i = self.data_sources(bs, batch_data_sources_row - len(del_rows), pm_data_file, option)
-                bs.freeze_panes = 'B' + str(self.batch_report[0][1])
-                bs.activeCell = 'B' + str(self.batch_report[0][1])
-                for sheet in wb:
-                    wb[sheet.title].views.sheetView[0].tabSelected = False
-                wb.active = bs
-                # check if any charts/graphs
-                if self.batch_report[-1][0] == 'Chart':
-                    if sht > 0 and '' not in chart_groups:
-                        continue
-                    bold = oxl.styles.Font(name='Arial', bold=True)
-                    min_col = 2
-                    max_col = len(self.batch_models[sht]) + 1
-                    chs = None
-                    in_chart = False
-                    cht_cells = ['N', 'B']
-                    cht_row = -27
-                    tndx_rows = max(9, len(self.batch_tech) + 4)
-                    cats = None
-                    chart_group = ''
-                    chart_smooth = True
-                    for row in range(self.batch_report[-1][1], batch_input_sheet.max_row + 1):
-                        if batch_input_sheet.cell(row=row, column=1).value is None:
-                            continue
-                        if batch_input_sheet.cell(row=row, column=1).value.lower() in ['chart', 'graph', 'plot']:
-                            if sht > 0 and batch_input_sheet.cell(row=row, column=2).value is not None \
-                              and batch_input_sheet.cell(row=row, column=2).value != '':
+                        bold = oxl.styles.Font(name='Arial', bold=True)
+                        min_col = 2
+                        max_col = len(self.batch_models[sht]) + 1
+                        chs = None
+                        in_chart = False
+                        cht_cells = ['N', 'B']
+                        cht_row = -27
+                        tndx_rows = max(9, len(self.batch_tech) + 4)
+                        cats = None
+                        chart_group = ''
+                        chart_smooth = True
+                        for row in range(self.batch_report[-1][1], batch_input_sheet.max_row + 1):
+                            if batch_input_sheet.cell(row=row, column=1).value is None:
                                 continue
-                            if in_chart:
-                                charts[-1].width = 20
-                                charts[-1].height = 12
-                                nocolor = []
-                                for s in range(len(charts[-1].series)):
-                                    nocolor.append(s)
-                                if charts2[-1] is not None:
-                                    for s in range(len(charts2[-1].series)):
-                                        nocolor.append(s + len(charts[-1].series))
-                                colors = PlotPalette(nocolor, lower=False, palette=48)
-                                for s in range(len(charts[-1].series)):
-                                    ser = charts[-1].series[s]
-                                    ser.marker.symbol = 'circle' #'dot', 'plus', 'triangle', 'x', 'picture', 'star', 'diamond', 'square', 'circle', 'dash', 'auto'
-                                    ser.graphicalProperties.line.solidFill = colors[s].strip('#')
-                                if charts2[-1] is not None:
-                                    for s in range(len(charts2[-1].series)):
-                                        ser = charts2[-1].series[s]
-                                        ser.marker.symbol = 'triangle'
-                                        ser.graphicalProperties.line.solidFill = colors[s + len(charts[-1].series)].strip('#')
-                                    charts2[-1].y_axis.crosses = 'max'
-                                    charts[-1] += charts2[-1]
-                                if cats is not None:
-                                    charts[-1].set_categories(cats)
-                                if len(charts) % 2:
-                                    cht_row += 30
-                                if chart_group != '':
-                                    cht_col = col_letters.index(cht_cells[len(charts) % 2])
-                                    chs.cell(row=cht_row - 1, column=cht_col).value = chart_group
-                                    chs.cell(row=cht_row - 1, column=cht_col).font = bold
-                                chs.add_chart(charts[-1], cht_cells[len(charts) % 2] + str(cht_row))
-                            in_chart = True
-                            if chs is None:
-                                if bs.title.find('Results') >= 0:
-                                    txt = bs.title.replace('Results', 'Charts')
+                            if batch_input_sheet.cell(row=row, column=1).value.lower() in ['chart', 'graph', 'plot']:
+                                if sht > 0 and batch_input_sheet.cell(row=row, column=2).value is not None \
+                                  and batch_input_sheet.cell(row=row, column=2).value != '':
+                                    continue
+                                if in_chart:
+                                    charts[-1].width = 20
+                                    charts[-1].height = 12
+                                    nocolor = []
+                                    for s in range(len(charts[-1].series)):
+                                        nocolor.append(s)
+                                    if charts2[-1] is not None:
+                                        for s in range(len(charts2[-1].series)):
+                                            nocolor.append(s + len(charts[-1].series))
+                                    colors = PlotPalette(nocolor, lower=False, palette=48)
+                                    for s in range(len(charts[-1].series)):
+                                        ser = charts[-1].series[s]
+                                        ser.marker.symbol = 'circle' #'dot', 'plus', 'triangle', 'x', 'picture', 'star', 'diamond', 'square', 'circle', 'dash', 'auto'
+                                        ser.graphicalProperties.line.solidFill = colors[s].strip('#')
+                                    if charts2[-1] is not None:
+                                        for s in range(len(charts2[-1].series)):
+                                            ser = charts2[-1].series[s]
+                                            ser.marker.symbol = 'triangle'
+                                            ser.graphicalProperties.line.solidFill = colors[s + len(charts[-1].series)].strip('#')
+                                        charts2[-1].y_axis.crosses = 'max'
+                                        charts[-1] += charts2[-1]
+                                    if cats is not None:
+                                        charts[-1].set_categories(cats)
+                                    if len(charts) % 2:
+                                        cht_row += 30
+                                    if chart_group != '':
+                                        cht_col = col_letters.index(cht_cells[len(charts) % 2])
+                                        chs.cell(row=cht_row - 1, column=cht_col).value = chart_group
+                                        chs.cell(row=cht_row - 1, column=cht_col).font = bold
+                                    chs.add_chart(charts[-1], cht_cells[len(charts) % 2] + str(cht_row))
+                                in_chart = True
+                                if chs is None:
+                                    if bs.title.find('Results') >= 0:
+                                        txt = bs.title.replace('Results', 'Charts')
+                                    else:
+                                        txt = 'Charts_' + bs.title
+                                    chs = wb.create_sheet(txt)
+                                    if sht == 0:
+                                        if '3D Summary' in wb.sheetnames:
+                                            ndx = wb.sheetnames.index('3D Summary')
+                                            if ndx > 0:
+                                                if (wb.sheetnames[ndx - 1][:8] == 'Results_' and wb.sheetnames[ndx + 1][:7] == 'Charts_') \
+                                                  or (wb.sheetnames[ndx + 1][:8] == 'Results_' and wb.sheetnames[ndx - 1][:7] == 'Charts_') :
+                                                    ndx = len(wb.sheetnames) - ndx
+                                                    wb.move_sheet('3D Summary', offset=ndx)
+                                    charts = []
+                                    charts2 = []
+                                charts.append(LineChart())
+                                charts2.append(None)
+                                if batch_input_sheet.cell(row=row, column=2).value is None or len(merged_cells) == 0:
+                                    min_col = 2
+                                    max_col = len(self.batch_models[sht]) + 1
+                                    chart_group = ''
                                 else:
-                                    txt = 'Charts_' + bs.title
-                                chs = wb.create_sheet(txt)
+                                    merge_group = get_value(batch_input_sheet, row, 2)
+                                    for i in range(len(merged_cells) -1, -1, -1):
+                                        merge_value = get_value(batch_input_sheet, merged_cells[i][0], merged_cells[i][1])
+                                        if merge_value == merge_group:
+                                            min_col = merged_cells[i][1]
+                                            max_col = merged_cells[i][2]
+                                            chart_group = merge_group
+                                            break
                                 if sht == 0:
-                                    if '3D Summary' in wb.sheetnames:
-                                        ndx = wb.sheetnames.index('3D Summary')
-                                        if ndx > 0:
-                                            if (wb.sheetnames[ndx - 1][:8] == 'Results_' and wb.sheetnames[ndx + 1][:7] == 'Charts_') \
-                                              or (wb.sheetnames[ndx + 1][:8] == 'Results_' and wb.sheetnames[ndx - 1][:7] == 'Charts_') :
-                                                ndx = len(wb.sheetnames) - ndx
-                                                wb.move_sheet('3D Summary', offset=ndx)
-                                charts = []
-                                charts2 = []
-                            charts.append(LineChart())
-                            charts2.append(None)
-                            if batch_input_sheet.cell(row=row, column=2).value is None or len(merged_cells) == 0:
-                                min_col = 2
-                                max_col = len(self.batch_models[sht]) + 1
-                                chart_group = ''
-                            else:
-                                merge_group = get_value(batch_input_sheet, row, 2)
-                                for i in range(len(merged_cells) -1, -1, -1):
-                                    merge_value = get_value(batch_input_sheet, merged_cells[i][0], merged_cells[i][1])
-                                    if merge_value == merge_group:
-                                        min_col = merged_cells[i][1]
-                                        max_col = merged_cells[i][2]
-                                        chart_group = merge_group
-                                        break
-                            if sht == 0:
-                                chart_groups.append(chart_group)
-                        elif not in_chart:
-                            continue
-                        elif batch_input_sheet.cell(row=row, column=1).value.lower()[:4] == 'line':
-                            if batch_input_sheet.cell(row=row, column=2).value.lower() == 'straight':
-                                chart_smooth = False
-                        elif batch_input_sheet.cell(row=row, column=1).value.lower() == 'title':
-                            charts[-1].title = batch_input_sheet.cell(row=row, column=2).value
-                        elif batch_input_sheet.cell(row=row, column=1).value.lower() == 'x-title':
-                            charts[-1].x_axis.title = get_value(batch_input_sheet, row, 2)
-                        elif batch_input_sheet.cell(row=row, column=1).value.lower() == 'y-title':
-                            charts[-1].y_axis.title = batch_input_sheet.cell(row=row, column=2).value
-                        elif batch_input_sheet.cell(row=row, column=1).value.lower() == 'y-title2':
-                            if charts2[-1] is None:
-                                charts2[-1] = LineChart()
-                                charts2[-1].x_axis.title = None
-                            charts2[-1].y_axis.axId = 200
-                            charts2[-1].y_axis.title = batch_input_sheet.cell(row=row, column=2).value
-                        elif batch_input_sheet.cell(row=row, column=1).value.lower() in ['categories', 'y-labels', 'data', 'data2']:
-                            dgrp = get_value(batch_input_sheet, row, 2)
-                            if self.batch_prefix:
-                                batch_pfx = get_batch_prefix(dgrp)
-                            else:
-                                batch_pfx = ''
-                            if batch_input_sheet.cell(row=row, column=1).value.lower() == 'categories' \
-                              and dgrp.lower() in ['model', 'model label', 'technology', 'year']: # models as categories
-                                rw = self.batch_report[0][1] - 1
-                                cats = Reference(bs, min_col=min_col, min_row=rw, max_col=max_col, max_row=rw)
+                                    chart_groups.append(chart_group)
+                            elif not in_chart:
                                 continue
-                            if dgrp.lower() in ['capacity (mw)', 'capacity (mw/mwh)']:
-                                gndx = self.batch_report[0][1]
-                            else:
-                                for group in self.batch_report:
-                                    if group[0].lower() == dgrp.lower():
-                                        gndx = group[1]
-                                        break
+                            elif batch_input_sheet.cell(row=row, column=1).value.lower()[:4] == 'line':
+                                if batch_input_sheet.cell(row=row, column=2).value.lower() == 'straight':
+                                    chart_smooth = False
+                            elif batch_input_sheet.cell(row=row, column=1).value.lower() == 'title':
+                                charts[-1].title = batch_input_sheet.cell(row=row, column=2).value
+                            elif batch_input_sheet.cell(row=row, column=1).value.lower() == 'x-title':
+                                charts[-1].x_axis.title = get_value(batch_input_sheet, row, 2)
+                            elif batch_input_sheet.cell(row=row, column=1).value.lower() == 'y-title':
+                                charts[-1].y_axis.title = batch_input_sheet.cell(row=row, column=2).value
+                            elif batch_input_sheet.cell(row=row, column=1).value.lower() == 'y-title2':
+                                if charts2[-1] is None:
+                                    charts2[-1] = LineChart()
+                                    charts2[-1].x_axis.title = None
+                                charts2[-1].y_axis.axId = 200
+                                charts2[-1].y_axis.title = batch_input_sheet.cell(row=row, column=2).value
+                            elif batch_input_sheet.cell(row=row, column=1).value.lower() in ['categories', 'y-labels', 'data', 'data2']:
+                                dgrp = get_value(batch_input_sheet, row, 2)
+                                if self.batch_prefix:
+                                    batch_pfx = get_batch_prefix(dgrp)
                                 else:
-                                     continue
-                                # backup a bit in case rows deleted
-                                for r in range(len(del_rows)):
-                                    try:
-                                        if bs.cell(row=gndx, column=1).value.lower() == group[0].lower():
+                                    batch_pfx = ''
+                                if batch_input_sheet.cell(row=row, column=1).value.lower() == 'categories' \
+                                  and dgrp.lower() in ['model', 'model label', 'technology', 'year']: # models as categories
+                                    rw = self.batch_report[0][1] - 1
+                                    cats = Reference(bs, min_col=min_col, min_row=rw, max_col=max_col, max_row=rw)
+                                    continue
+                                if dgrp.lower() in ['capacity (mw)', 'capacity (mw/mwh)']:
+                                    gndx = self.batch_report[0][1]
+                                else:
+                                    for group in self.batch_report:
+                                        if group[0].lower() == dgrp.lower():
+                                            gndx = group[1]
                                             break
-                                    except:
-                                        pass
-                                    gndx -= 1
-                            ditm = get_value(batch_input_sheet, row, 3)
-                            for tndx in range(tndx_rows):
-                                if bs.cell(row=gndx + tndx, column=1).value is None:
-                                    break
-                                if bs.cell(row=gndx + tndx, column=1).value.lower() == f'{batch_pfx.lower()}{ditm.lower()}':
-                                    if batch_input_sheet.cell(row=row, column=1).value.lower() == 'data':
-                                        values = Reference(bs, min_col=min_col, min_row=gndx + tndx, max_col=max_col, max_row=gndx + tndx)
-                                        series = Series(values)
-                                        series.title = oxl.chart.series.SeriesLabel(oxl.chart.data_source.StrRef("'" + bs.title + "'!A" + str(gndx + tndx)))
-                                        series.smooth = chart_smooth
-                                        charts[-1].append(series)
-                                    elif batch_input_sheet.cell(row=row, column=1).value.lower() == 'data2':
-                                        if charts2[-1] is None:
-                                            charts2[-1] = LineChart()
-                                        values = Reference(bs, min_col=min_col, min_row=gndx + tndx, max_col=max_col, max_row=gndx + tndx)
-                                        series = Series(values)
-                                        series.title = oxl.chart.series.SeriesLabel(oxl.chart.data_source.StrRef("'" + bs.title + "'!A" + str(gndx + tndx)))
-                                        series.smooth = chart_smooth
-                                        charts2[-1].append(series)
                                     else:
-                                        cats = Reference(bs, min_col=min_col, min_row=gndx + tndx, max_col=max_col, max_row=gndx + tndx)
-                                    break
-                    if in_chart:
-                        charts[-1].width = 20
-                        charts[-1].height = 12
-                        nocolor = []
-                        for s in range(len(charts[-1].series)):
-                            nocolor.append(s)
-                        if charts2[-1] is not None:
-                            for s in range(len(charts2[-1].series)):
-                                nocolor.append(s + len(charts[-1].series))
-                        colors = PlotPalette(nocolor, lower=False, palette=48)
-                        for s in range(len(charts[-1].series)):
-                            ser = charts[-1].series[s]
-                            ser.marker.symbol = 'circle' #'dot', 'plus', 'triangle', 'x', 'picture', 'star', 'diamond', 'square', 'circle', 'dash', 'auto'
-                            ser.graphicalProperties.line.solidFill = colors[s].strip('#')
-                        if charts2[-1] is not None:
-                            for s in range(len(charts2[-1].series)):
-                                ser = charts2[-1].series[s]
-                                ser.marker.symbol = 'triangle'
-                                ser.graphicalProperties.line.solidFill = colors[s + len(charts[-1].series)].strip('#')
-                            charts2[-1].y_axis.crosses = 'max'
-                            charts[-1] += charts2[-1]
-                        if cats is not None:
-                            charts[-1].set_categories(cats)
-                        if len(charts) % 2:
-                            cht_row += 30
-                        if chart_group != '':
-                            cht_col = col_letters.index(cht_cells[len(charts) % 2])
-                            chs.cell(row=cht_row - 1, column=cht_col).value = chart_group
-                            chs.cell(row=cht_row - 1, column=cht_col).font = bold
-                        chs.add_chart(charts[-1], cht_cells[len(charts) % 2] + str(cht_row))
+                                         continue
+                                    # backup a bit in case rows deleted
+                                    for r in range(len(del_rows)):
+                                        try:
+                                            if bs.cell(row=gndx, column=1).value.lower() == group[0].lower():
+                                                break
+                                        except:
+                                            pass
+                                        gndx -= 1
+                                ditm = get_value(batch_input_sheet, row, 3)
+                                for tndx in range(tndx_rows):
+                                    if bs.cell(row=gndx + tndx, column=1).value is None:
+                                        break
+                                    if bs.cell(row=gndx + tndx, column=1).value.lower() == f'{batch_pfx.lower()}{ditm.lower()}':
+                                        if batch_input_sheet.cell(row=row, column=1).value.lower() == 'data':
+                                            values = Reference(bs, min_col=min_col, min_row=gndx + tndx, max_col=max_col, max_row=gndx + tndx)
+                                            series = Series(values)
+                                            series.title = oxl.chart.series.SeriesLabel(oxl.chart.data_source.StrRef("'" + bs.title + "'!A" + str(gndx + tndx)))
+                                            series.smooth = chart_smooth
+                                            charts[-1].append(series)
+                                        elif batch_input_sheet.cell(row=row, column=1).value.lower() == 'data2':
+                                            if charts2[-1] is None:
+                                                charts2[-1] = LineChart()
+                                            values = Reference(bs, min_col=min_col, min_row=gndx + tndx, max_col=max_col, max_row=gndx + tndx)
+                                            series = Series(values)
+                                            series.title = oxl.chart.series.SeriesLabel(oxl.chart.data_source.StrRef("'" + bs.title + "'!A" + str(gndx + tndx)))
+                                            series.smooth = chart_smooth
+                                            charts2[-1].append(series)
+                                        else:
+                                            cats = Reference(bs, min_col=min_col, min_row=gndx + tndx, max_col=max_col, max_row=gndx + tndx)
+                                        break
+                        if in_chart:
+                            charts[-1].width = 20
+                            charts[-1].height = 12
+                            nocolor = []
+                            for s in range(len(charts[-1].series)):
+                                nocolor.append(s)
+                            if charts2[-1] is not None:
+                                for s in range(len(charts2[-1].series)):
+                                    nocolor.append(s + len(charts[-1].series))
+                            colors = PlotPalette(nocolor, lower=False, palette=48)
+                            for s in range(len(charts[-1].series)):
+                                ser = charts[-1].series[s]
+                                ser.marker.symbol = 'circle' #'dot', 'plus', 'triangle', 'x', 'picture', 'star', 'diamond', 'square', 'circle', 'dash', 'auto'
+                                ser.graphicalProperties.line.solidFill = colors[s].strip('#')
+                            if charts2[-1] is not None:
+                                for s in range(len(charts2[-1].series)):
+                                    ser = charts2[-1].series[s]
+                                    ser.marker.symbol = 'triangle'
+                                    ser.graphicalProperties.line.solidFill = colors[s + len(charts[-1].series)].strip('#')
+                                charts2[-1].y_axis.crosses = 'max'
+                                charts[-1] += charts2[-1]
+                            if cats is not None:
+                                charts[-1].set_categories(cats)
+                            if len(charts) % 2:
+                                cht_row += 30
+                            if chart_group != '':
+                                cht_col = col_letters.index(cht_cells[len(charts) % 2])
+                                chs.cell(row=cht_row - 1, column=cht_col).value = chart_group
+                                chs.cell(row=cht_row - 1, column=cht_col).font = bold
+                            chs.add_chart(charts[-1], cht_cells[len(charts) % 2] + str(cht_row))
+                finished = True
+            finally: # workers stop even if a model fails
+                self.stopWorkers(batch_pool, batch_shm, terminate=not finished)
             if len(self.batch_models) > 1 and len(self.batch_models[0]) == 1:
                 try:
                     del wb['Results_' + rpt_time]
@@ -4778,10 +4944,9 @@ class powerMatch(QtWidgets.QWidget):
                 surp_pct = 0
                 re_pct = 0
             max_short = [0, 0]
-            for h in range(len(shortfall)):
-                if shortfall[h] > max_short[1]:
-                    max_short[0] = h
-                    max_short[1] = shortfall[h]
+            if len(shortfall) > 0 and shortfall.max() > 0:
+                max_short[0] = int(shortfall.argmax())
+                max_short[1] = float(shortfall[max_short[0]])
             if max_short[1] > 0:
                 sp_d = [' '] * len(headers)
                 sp_d[st_fac] = 'Largest Shortfall'
@@ -4882,16 +5047,7 @@ class powerMatch(QtWidgets.QWidget):
             ns.cell(row=hrs_row, column=col).value = '=COUNTIF(' + ssCol(col) + str(hrows) + \
                                            ':' + ssCol(col) + str(hrows + 8759) + ',">0")'
             ns.cell(row=hrs_row, column=col).number_format = '#,##0'
-            di = pmss_details[fac].col
-            if pmss_details[fac].multiplier == 1:
-                for row in range(hrows, 8760 + hrows):
-                    ns.cell(row=row, column=col).value = pmss_data[di][row - hrows]
-                    ns.cell(row=row, column=col).number_format = '#,##0.00'
-            else:
-                for row in range(hrows, 8760 + hrows):
-                    ns.cell(row=row, column=col).value = pmss_data[di][row - hrows] * \
-                                                         pmss_details[fac].multiplier
-                    ns.cell(row=row, column=col).number_format = '#,##0.00'
+            ns_hours[col] = [pm_data[pmss_details[fac].col][:8760] * pmss_details[fac].multiplier, '#,##0.00']
             return col
 
         def do_detail_summary(fac, col, ss_row, dd_tml_sum, dd_re_sum):
@@ -5320,30 +5476,22 @@ class powerMatch(QtWidgets.QWidget):
                             self.constraints[const].capacity_min
                     if self.reserve_committed:
                         committed_gen_tot += committed_gen[gen]
-        shortfall = [0] * 8760
-        row_tml = [0.] * 8760
-        for h in range(len(pmss_data[load_col])):
-            load_h = pmss_data[load_col][h] * pmss_details['Load'].multiplier
-            shortfall[h] = load_h
-            re_shortfall = load_h - committed_gen_tot
-            for fac in fac_tml.keys():
-                if fac in underlying_facs:
-                    continue
-                re_shortfall -= pmss_data[pmss_details[fac].col][h] * pmss_details[fac].multiplier
-                shortfall[h] -= pmss_data[pmss_details[fac].col][h] * pmss_details[fac].multiplier
-            if re_shortfall >= 0:
-                alloc = 1.
+        pm_data = dispatchArray(pmss_data)
+        re_facs = []
+        ul_facs = []
+        for fac in fac_tml.keys():
+            if fac in underlying_facs:
+                ul_facs.append(fac)
             else:
-                alloc = (load_h - committed_gen_tot) / (load_h - re_shortfall - committed_gen_tot)
-                if alloc < 0: # don't use negative generation
-                    alloc = 0
-            for fac in fac_tml.keys():
-                if fac in underlying_facs:
-                    fac_tml[fac] += pmss_data[pmss_details[fac].col][h] * pmss_details[fac].multiplier
-                else:
-                    row_tml[h] += pmss_data[pmss_details[fac].col][h] * pmss_details[fac].multiplier * alloc
-                    fac_tml[fac] += pmss_data[pmss_details[fac].col][h] * pmss_details[fac].multiplier * alloc
-            line = ''
+                re_facs.append(fac)
+        shortfall, row_tml, re_tml, ul_tml = reContribution(pm_data, load_col, pmss_details['Load'].multiplier,
+            [(pmss_details[fac].col, pmss_details[fac].multiplier) for fac in re_facs],
+            [(pmss_details[fac].col, pmss_details[fac].multiplier) for fac in ul_facs],
+            committed_gen_tot)
+        for f in range(len(re_facs)):
+            fac_tml[re_facs[f]] = re_tml[f]
+        for f in range(len(ul_facs)):
+            fac_tml[ul_facs[f]] = ul_tml[f]
         fac_tml_sum = 0
         if self.corrected_lcoe:
             for fac in fac_tml.keys():
@@ -5352,19 +5500,9 @@ class powerMatch(QtWidgets.QWidget):
                 fac_tml_sum += fac_tml[fac]
         if self.show_correlation:
             col = pmss_details['Load'].col
-            if pmss_details['Load'].multiplier == 1:
-                df1 = pmss_data[col]
-            else:
-                tgt = []
-                for h in range(len(pmss_data[col])):
-                    tgt.append(pmss_data[col][h] * pmss_details['Load'].multiplier)
-                df1 = tgt
-            corr_src = []
-            for h in range(len(shortfall)):
-                if shortfall[h] < 0:
-                    corr_src.append(pmss_data[col][h])
-                else:
-                    corr_src.append(pmss_data[col][h] - shortfall[h])
+            df1 = pm_data[col] * pmss_details['Load'].multiplier
+            sf = np.asarray(shortfall)
+            corr_src = np.where(sf < 0, pm_data[col], pm_data[col] - sf)
             try:
                 corr = np.corrcoef(df1, corr_src)
                 if np.isnan(corr.item((0, 1))):
@@ -5381,6 +5519,7 @@ class powerMatch(QtWidgets.QWidget):
             wb = oxl.Workbook()
             ns = wb.active
             ns.title = 'Detail'
+            ns_hours = {} # hourly columns for Detail; streamed when the workbook is saved
             normal = oxl.styles.Font(name='Arial')
             bold = oxl.styles.Font(name='Arial', bold=True)
             ss = wb.create_sheet('Summary', 0)
@@ -5456,20 +5595,11 @@ class powerMatch(QtWidgets.QWidget):
             o = 4
             col = 3
             # hour, period
-            for row in range(hrows, 8760 + hrows):
-                ns.cell(row=row, column=1).value = row - hrows + 1
-                ns.cell(row=row, column=2).value = format_period(row - hrows)
+            ns_hours[1] = [list(range(1, 8761)), None]
+            ns_hours[2] = [[format_period(row) for row in range(8760)], None]
             # and load
             load_col = pmss_details['Load'].col
-            if pmss_details['Load'].multiplier == 1:
-                for row in range(hrows, 8760 + hrows):
-                    ns.cell(row=row, column=3).value = pmss_data[load_col][row - hrows]
-                    ns.cell(row=row, column=col).number_format = '#,##0.00'
-            else:
-                for row in range(hrows, 8760 + hrows):
-                    ns.cell(row=row, column=3).value = pmss_data[load_col][row - hrows] * \
-                            pmss_details['Load'].multiplier
-                    ns.cell(row=row, column=col).number_format = '#,##0.00'
+            ns_hours[3] = [pm_data[load_col][:8760] * pmss_details['Load'].multiplier, '#,##0.00']
             # here we're processing renewables (so no storage)
             for fac in re_order:
                 if fac == 'Load':
@@ -5496,12 +5626,7 @@ class powerMatch(QtWidgets.QWidget):
             for col in range(3, shrt_col + 1):
                 ns.cell(row=what_row, column=col).alignment = oxl.styles.Alignment(wrap_text=True,
                         vertical='bottom', horizontal='center')
-                ns.cell(row=row, column=shrt_col).value = shortfall[row - hrows] * -self.surplus_sign
-                for col in range(3, shrt_col + 1):
-                    ns.cell(row=row, column=col).number_format = '#,##0.00'
-            for row in range(hrows, 8760 + hrows):
-                ns.cell(row=row, column=shrt_col).value = shortfall[row - hrows] * -self.surplus_sign
-                ns.cell(row=row, column=col).number_format = '#,##0.00'
+            ns_hours[shrt_col] = [shortfall[:8760] * -self.surplus_sign, '#,##0.00']
             col = shrt_col + 1
             ns.cell(row=tml_row, column=col).value = '=SUM(' + ssCol(col) + str(hrows) + \
                                                    ':' + ssCol(col) + str(hrows + 8759) + ')'
@@ -5515,9 +5640,7 @@ class powerMatch(QtWidgets.QWidget):
             ns.cell(row=what_row, column=col).value = 'RE Contrib.\nto Load'
             ns.cell(row=what_row, column=col).alignment = oxl.styles.Alignment(wrap_text=True,
                     vertical='bottom', horizontal='center')
-            for row in range(hrows, 8760 + hrows):
-                ns.cell(row=row, column=col).value = row_tml[row - hrows]
-                ns.cell(row=row, column=col).number_format = '#,##0.00'
+            ns_hours[col] = [row_tml[:8760], '#,##0.00']
           #  shrt_col += 1
            # col = shrt_col + 1
             ul_re_sum = ns_re_sum
@@ -5541,12 +5664,13 @@ class powerMatch(QtWidgets.QWidget):
                 ns.cell(row=max_row, column=col).value = '=MAX(' + ssCol(col) + str(hrows) + \
                                                          ':' + ssCol(col) + str(hrows + 8759) + ')'
                 ns.cell(row=max_row, column=col).number_format = '#,##0.00'
+                ul_load = []
                 for row in range(hrows, 8760 + hrows):
                     txt = '='
                     for c in nsul_sums:
                         txt += c + str(row) + '+'
-                    ns.cell(row=row, column=col).value = txt[:-1]
-                    ns.cell(row=row, column=col).number_format = '#,##0.00'
+                    ul_load.append(txt[:-1])
+                ns_hours[col] = [ul_load, '#,##0.00']
             next_col = col
             col += 1
         else: # O, O1, B, S, T
@@ -5564,23 +5688,18 @@ class powerMatch(QtWidgets.QWidget):
                 # at the moment for batch or transition we won't report operational and underlying separately
                 load_facs = underlying_facs[:]
                 load_facs.insert(0, 'Load')
-                for h in range(len(pmss_data[load_col])):
-                    amt = 0
-                    for fac in load_facs:
-                        amt += pmss_data[pmss_details[fac].col][h] * pmss_details[fac].multiplier
-                    if amt > load_max:
-                        load_max = amt
-                        load_hr = h
-                    sp_load += amt
+                amt = np.zeros(pm_data.shape[1], dtype=np.float64)
+                for fac in load_facs:
+                    amt += pm_data[pmss_details[fac].col] * pmss_details[fac].multiplier
+                sp_load = float(amt.sum())
                 underlying_facs = []
             else:
                 fac = 'Load'
-                sp_load = sum(pmss_data[load_col]) * pmss_details[fac].multiplier
-                for h in range(len(pmss_data[load_col])):
-                    amt = pmss_data[load_col][h] * pmss_details[fac].multiplier
-                    if amt > load_max:
-                        load_max = amt
-                        load_hr = h
+                amt = pm_data[load_col] * pmss_details[fac].multiplier
+                sp_load = float(amt.sum())
+            if len(amt) > 0 and amt.max() > load_max:
+                load_hr = int(amt.argmax())
+                load_max = float(amt[load_hr])
             for fac in re_order:
                 if fac == 'Load' or fac in underlying_facs:
                     continue
@@ -5593,8 +5712,8 @@ class powerMatch(QtWidgets.QWidget):
                     sp_d[st_tml] = fac_tml[fac]
                 except:
                     pass
-                sp_d[st_sub] = sum(pmss_data[pmss_details[fac].col]) * pmss_details[fac].multiplier
-                sp_d[st_max] = max(pmss_data[pmss_details[fac].col]) * pmss_details[fac].multiplier
+                sp_d[st_sub] = float(pm_data[pmss_details[fac].col].sum()) * pmss_details[fac].multiplier
+                sp_d[st_max] = float(pm_data[pmss_details[fac].col].max()) * pmss_details[fac].multiplier
                 sp_data.append(sp_d)
         if option not in [O, O1, B, T]:
             self.progressbar.setValue(6)
@@ -5648,116 +5767,40 @@ class powerMatch(QtWidgets.QWidget):
                     parasite = self.constraints[self.generators[gen].constraint].parasitic_loss / 24.
                 else:
                     parasite = 0.
-                in_run = [False, False]
                 min_run_time = self.constraints[self.generators[gen].constraint].min_run_time
-                in_run[0] = True # start off in_run
+                in_run = True # start off in_run
                 if min_run_time > 0 and self.generators[gen].initial == 0:
-                    in_run[0] = False
+                    in_run = False
                 warm_time = self.constraints[self.generators[gen].constraint].warm_time
                 storage_carry = storage[1] # self.generators[gen].initial
                 if option == D:
                     ns.cell(row=ini_row, column=col + 2).value = storage_carry
                     ns.cell(row=ini_row, column=col + 2).number_format = '#,##0.00'
-                storage_bal = []
-                storage_can = 0.
-                use_max = [0, None]
-                sto_max = storage_carry
-                for row in range(8760):
-                    storage_loss = 0.
-                    storage_losses = 0.
-                    if storage_carry > 0:
-                        loss = storage_carry * parasite
-                        # for later: record parasitic loss
-                        storage_carry = storage_carry - loss
-                        storage_losses -= loss
-                    if shortfall[row] < 0:  # excess generation
-                        if row % 24 >= self.constraints[self.generators[gen].constraint].recharge_start:
-                            if min_run_time > 0:
-                                in_run[0] = False
-                            if warm_time > 0:
-                                in_run[1] = False
-                            can_use = - (storage[0] - storage_carry) * (1 / (1 - recharge[1]))
-                            if can_use < 0: # can use some
-                                if shortfall[row] > can_use:
-                                    can_use = shortfall[row]
-                                if can_use < - recharge[0] * (1 / (1 - recharge[1])):
-                                    can_use = - recharge[0]
-                            else:
-                                can_use = 0.
-                            # for later: record recharge loss
-                            storage_losses += can_use * recharge[1]
-                            storage_carry -= (can_use * (1 - recharge[1]))
-                            shortfall[row] -= can_use
-                            if corr_data is not None:
-                               corr_src[row] += can_use
-                        else:
-                            can_use = 0
-                    elif shortfall[row] > committed_gen_bal: # shortfall
-                        # This is code to support delaying battery usage until a certain time
-                        # to implement fully need an additional facility variable to indicate start time
-                        # Ref 2024 WEM ESOO 2.5 (ESROI)
-                        if row % 24 >= self.constraints[self.generators[gen].constraint].discharge_start:
-                            if min_run_time > 0 and shortfall[row] > committed_gen_bal:
-                                if not in_run[0]:
-                                    if row + min_run_time <= 8759:
-                                        for i in range(row + 1, row + min_run_time + 1):
-                                            if shortfall[i] <= 0:
-                                                break
-                                        else:
-                                            in_run[0] = True
-                            if in_run[0]:
-                                can_use = (shortfall[row] - committed_gen_bal) * (1 / (1 - discharge[1]))
-                                can_use = min(can_use, discharge[0])
-                                if can_use > storage_carry - storage[2]:
-                                    can_use = storage_carry - storage[2]
-                                if warm_time > 0 and not in_run[1]:
-                                    in_run[1] = True
-                                    can_use = can_use * (1 - warm_time)
-                            else:
-                                can_use = 0
-                            if can_use > 0:
-                                storage_loss = can_use * discharge[1]
-                                storage_losses -= storage_loss
-                                storage_carry -= can_use
-                                can_use = can_use - storage_loss
-                                shortfall[row] -= can_use
-                                if corr_data is not None:
-                                    corr_src[row] += can_use
-                                if storage_carry < 0:
-                                    storage_carry = 0
-                            else:
-                                can_use = 0.
-                        else:
-                            can_use = 0.
-                    else:
-                        can_use = 0.
-                    if can_use < 0:
-                        if use_max[1] is None or can_use < use_max[1]:
-                            use_max[1] = can_use
-                    elif can_use > use_max[0]:
-                        use_max[0] = can_use
-                    storage_bal.append(storage_carry)
-                    if storage_bal[-1] > sto_max:
-                        sto_max = storage_bal[-1]
-                    if option == D:
-                        if can_use > 0:
-                            ns.cell(row=row + hrows, column=col).value = 0
-                            ns.cell(row=row + hrows, column=col + 2).value = can_use * self.surplus_sign
-                        else:
-                            ns.cell(row=row + hrows, column=col).value = can_use * -self.surplus_sign
-                            ns.cell(row=row + hrows, column=col + 2).value = 0
-                        ns.cell(row=row + hrows, column=col + 1).value = storage_losses
-                        ns.cell(row=row + hrows, column=col + 3).value = storage_carry
-                        ns.cell(row=row + hrows, column=col + 4).value = shortfall[row] * -self.surplus_sign
-                        for ac in range(5):
-                            ns.cell(row=row + hrows, column=col + ac).number_format = '#,##0.00'
-                            ns.cell(row=max_row, column=col + ac).value = '=MAX(' + ssCol(col + ac) + \
-                                    str(hrows) + ':' + ssCol(col + ac) + str(hrows + 8759) + ')'
-                            ns.cell(row=max_row, column=col + ac).number_format = '#,##0.00'
-                    else:
-                        tot_sto_loss += storage_losses
-                        if can_use > 0:
-                            storage_can += can_use
+                storage_use, storage_losses, storage_bal = storageDispatch(shortfall, storage[0],
+                        storage_carry, storage[2], recharge[0], recharge[1],
+                        self.constraints[self.generators[gen].constraint].recharge_start,
+                        discharge[0], discharge[1],
+                        self.constraints[self.generators[gen].constraint].discharge_start,
+                        parasite, min_run_time, warm_time, in_run, committed_gen_bal)
+                if corr_data is not None:
+                    corr_src += storage_use
+                if option == D:
+                    ns_hours[col] = [np.where(storage_use > 0, 0., storage_use * -self.surplus_sign)[:8760],
+                                     '#,##0.00']
+                    ns_hours[col + 1] = [storage_losses[:8760], '#,##0.00']
+                    ns_hours[col + 2] = [np.where(storage_use > 0, storage_use * self.surplus_sign, 0.)[:8760],
+                                         '#,##0.00']
+                    ns_hours[col + 3] = [storage_bal[:8760], '#,##0.00']
+                    ns_hours[col + 4] = [shortfall[:8760] * -self.surplus_sign, '#,##0.00']
+                    for ac in range(5):
+                        ns.cell(row=max_row, column=col + ac).value = '=MAX(' + ssCol(col + ac) + \
+                                str(hrows) + ':' + ssCol(col + ac) + str(hrows + 8759) + ')'
+                        ns.cell(row=max_row, column=col + ac).number_format = '#,##0.00'
+                else:
+                    tot_sto_loss += float(storage_losses.sum())
+                    storage_can = float(storage_use[storage_use > 0].sum())
+                    use_max = [max(0., float(storage_use.max())), None]
+                    sto_max = max(storage_carry, float(storage_bal.max()))
                 if option == D:
                     ns.cell(row=sum_row, column=col).value = '=SUMIF(' + ssCol(col) + \
                             str(hrows) + ':' + ssCol(col) + str(hrows + 8759) + ',">0")'
@@ -5804,35 +5847,15 @@ class powerMatch(QtWidgets.QWidget):
                     min_gen = committed_gen[gen]
                 else:
                     min_gen = 0
+                reserve = 0.
+                if self.reserve_committed and gen in committed_gen.keys():
+                    reserve = committed_gen[gen] - committed_gen_bal
+                gen_use = generatorDispatch(shortfall, cap_capacity, min_gen, reserve)
                 if option == D:
                     ns.cell(row=cap_row, column=col).value = capacity
                     ns.cell(row=cap_row, column=col).number_format = '#,##0.00'
-                    for row in range(8760):
-                        if shortfall[row] >= 0: # shortfall?
-                            short_4me = shortfall[row]
-                            if self.reserve_committed:
-                                try:
-                                    short_4me = shortfall[row] - committed_gen_bal + committed_gen[gen]
-                                except:
-                                    pass
-                            if short_4me >= cap_capacity:
-                                shortfall[row] = shortfall[row] - cap_capacity
-                                ns.cell(row=row + hrows, column=col).value = cap_capacity
-                            elif short_4me >= min_gen:
-                                shortfall[row] = shortfall[row] - short_4me
-                                ns.cell(row=row + hrows, column=col).value = short_4me
-                            elif short_4me < min_gen:
-                                ns.cell(row=row + hrows, column=col).value = min_gen
-                                shortfall[row] -= min_gen
-                            else:
-                                ns.cell(row=row + hrows, column=col).value = shortfall[row]
-                                shortfall[row] = 0
-                        else:
-                            shortfall[row] -= min_gen
-                            ns.cell(row=row + hrows, column=col).value = min_gen
-                        ns.cell(row=row + hrows, column=col + 1).value = shortfall[row] * -self.surplus_sign
-                        ns.cell(row=row + hrows, column=col).number_format = '#,##0.00'
-                        ns.cell(row=row + hrows, column=col + 1).number_format = '#,##0.00'
+                    ns_hours[col] = [gen_use[:8760], '#,##0.00']
+                    ns_hours[col + 1] = [shortfall[:8760] * -self.surplus_sign, '#,##0.00']
                     ns.cell(row=sum_row, column=col).value = '=SUM(' + ssCol(col) + str(hrows) + \
                             ':' + ssCol(col) + str(hrows + 8759) + ')'
                     ns.cell(row=sum_row, column=col).number_format = '#,##0'
@@ -5850,41 +5873,8 @@ class powerMatch(QtWidgets.QWidget):
                     ns.cell(row=hrs_row, column=col + 1).number_format = '#,##0.0%'
                     col += 2
                 else:
-                    gen_can = 0.
-                    gen_max = 0
-                    for row in range(8760):
-                        if shortfall[row] >= 0: # shortfall?
-                            short_4me = shortfall[row]
-                            if self.reserve_committed:
-                                try:
-                                    short_4me = shortfall[row] - committed_gen_bal + committed_gen[gen]
-                                except:
-                                    pass
-                            if short_4me >= cap_capacity:
-                                shortfall[row] = shortfall[row] - cap_capacity
-                                gen_can += cap_capacity
-                                if cap_capacity > gen_max:
-                                    gen_max = cap_capacity
-                            elif short_4me >= min_gen:
-                                gen_can += short_4me
-                                if short_4me > gen_max:
-                                    gen_max = short_4me
-                                shortfall[row] = shortfall[row] - short_4me
-                            elif short_4me < min_gen:
-                                gen_can += min_gen
-                                if min_gen > gen_max:
-                                    gen_max = min_gen
-                                shortfall[row] -= min_gen
-                            else:
-                                gen_can += shortfall[row]
-                                if shortfall[row] > gen_max:
-                                    gen_max = shortfall[row]
-                                shortfall[row] = 0
-                        else:
-                            if min_gen > gen_max:
-                                gen_max = min_gen
-                            gen_can += min_gen
-                            shortfall[row] -= min_gen
+                    gen_can = float(gen_use.sum())
+                    gen_max = max(0, float(gen_use.max()))
                     if capacity == 0:
                         continue
                     sp_d = [' '] * len(headers)
@@ -5921,12 +5911,8 @@ class powerMatch(QtWidgets.QWidget):
                 corr = 0
             corr_data.append(['RE plus Storage', corr])
             col = pmss_details['Load'].col
-            corr_src = []
-            for h in range(len(shortfall)):
-                if shortfall[h] < 0:
-                    corr_src.append(pmss_data[col][h])
-                else:
-                    corr_src.append(pmss_data[col][h] - shortfall[h])
+            sf = np.asarray(shortfall)
+            corr_src = np.where(sf < 0, pm_data[col], pm_data[col] - sf)
             try:
                 corr = np.corrcoef(df1, corr_src)
                 if np.isnan(corr.item((0, 1))):
@@ -6108,14 +6094,8 @@ class powerMatch(QtWidgets.QWidget):
                         pass
                     sp_data[sp][st_job] = jobs
                     total_jobs += jobs
-            sf_sums = [0., 0., 0.]
-            for sf in range(len(shortfall)):
-                if shortfall[sf] > 0:
-                    sf_sums[0] += shortfall[sf]
-                    sf_sums[2] += pmss_data[load_col][sf] * pmss_details['Load'].multiplier
-                else:
-                    sf_sums[1] += shortfall[sf]
-                    sf_sums[2] += pmss_data[load_col][sf] * pmss_details['Load'].multiplier
+            sf_sums = [float(shortfall[shortfall > 0].sum()), float(shortfall[shortfall <= 0].sum()),
+                       float(pm_data[load_col].sum()) * pmss_details['Load'].multiplier]
             if gen_sum > 0:
                 gs = cost_sum / gen_sum
             else:
@@ -6151,13 +6131,13 @@ class powerMatch(QtWidgets.QWidget):
                     sp_d[st_fac] = fac
                     sp_d[st_cap] = pmss_details[fac].capacity * pmss_details[fac].multiplier
                     cap_sum += sp_d[st_cap]
-                    sp_d[st_tml] = sum(pmss_data[pmss_details[fac].col]) * pmss_details[fac].multiplier
+                    sp_d[st_tml] = float(pm_data[pmss_details[fac].col].sum()) * pmss_details[fac].multiplier
                     tml_sum += sp_d[st_tml]
                     sp_d[st_sub] = sp_d[st_tml]
                     gen_sum += sp_d[st_tml]
                     sp_load += sp_d[st_tml]
                     sp_d[st_cfa] = '{:.1f}%'.format(sp_d[st_sub] / sp_d[st_cap] / 8760 * 100.)
-                    sp_d[st_max] = max(pmss_data[pmss_details[fac].col]) * pmss_details[fac].multiplier
+                    sp_d[st_max] = float(pm_data[pmss_details[fac].col].max()) * pmss_details[fac].multiplier
                     if self.generators[gen].capex > 0 or self.generators[gen].fixed_om > 0 \
                       or self.generators[gen].variable_om > 0 or self.generators[gen].fuel > 0:
                         capex = sp_d[st_cap] * self.generators[gen].capex
@@ -6237,13 +6217,12 @@ class powerMatch(QtWidgets.QWidget):
                     load_max = 0
                     load_hr = 0
                     load_col = pmss_details['Load'].col
-                    for h in range(len(pmss_data[load_col])):
-                        amt = pmss_data[load_col][h] * pmss_details['Load'].multiplier
-                        for fac in underlying_facs:
-                            amt += pmss_data[pmss_details[fac].col][h] * pmss_details[fac].multiplier
-                        if amt > load_max:
-                            load_max = amt
-                            load_hr = h
+                    amt = pm_data[load_col] * pmss_details['Load'].multiplier
+                    for fac in underlying_facs:
+                        amt = amt + pm_data[pmss_details[fac].col] * pmss_details[fac].multiplier
+                    if len(amt) > 0 and amt.max() > load_max:
+                        load_hr = int(amt.argmax())
+                        load_max = float(amt[load_hr])
                 if option == O or option == O1:
                     load_pct, surp_pct, re_pct = summary_totals('Underlying ')
                 else:
@@ -6595,20 +6574,7 @@ class powerMatch(QtWidgets.QWidget):
             do_sum = False
             do_cost = False
             for cell in column_cells:
-                if cell.row >= hrows:
-                    if do_sum:
-                        try:
-                            sum_value += abs(cell.value)
-                        except:
-                            pass
-                    else:
-                        try:
-                            value = str(round(cell.value, 2))
-                            if len(value) > length:
-                                length = len(value) + 2
-                        except:
-                            pass
-                elif cell.row > 0:
+                if cell.row > 0:
                     if str(cell.value)[0] != '=':
                         values = str(cell.value).split('\n')
                         for value in values:
@@ -6626,6 +6592,21 @@ class powerMatch(QtWidgets.QWidget):
                             do_cost = True
                         if cell.value[1:4] == 'SUM':
                             do_sum = True
+            # and the hourly values
+            if cell.column in ns_hours.keys():
+                values = ns_hours[cell.column][0]
+                if do_sum and isinstance(values, np.ndarray):
+                    sum_value = float(np.abs(values).sum())
+                elif not do_sum:
+                    if isinstance(values, np.ndarray):
+                        values = values.tolist()
+                    for value in values:
+                        try:
+                            value = str(round(value, 2))
+                            if len(value) > length:
+                                length = len(value) + 2
+                        except:
+                            pass
             if sum_value > 0:
                 alen = len(str(int(sum_value))) * 1.5
                 if do_cost:
@@ -6639,7 +6620,7 @@ class powerMatch(QtWidgets.QWidget):
             ns.column_dimensions[cel].width = max(length, 10)
         ns.column_dimensions['A'].width = 6
         ns.column_dimensions['B'].width = 21
-        st_row = hrows + 8760
+        st_row = hrows # hourly rows are styled when they're streamed
         st_col = col
         for row in range(1, st_row):
             for col in range(1, st_col):
@@ -6864,7 +6845,7 @@ class powerMatch(QtWidgets.QWidget):
                         pass
             cs.freeze_panes = 'B2'
             cs.activeCell = 'B2'
-        wb.save(rslts_file)
+        save_streamed(wb, rslts_file, hourly_sheet=ns, hourly=[hrows, st_col - 1, normal, ns_hours])
         self.progressbar.setValue(20)
         QtWidgets.QApplication.processEvents()
         j = rslts_file.rfind('/')
@@ -6921,6 +6902,39 @@ class powerMatch(QtWidgets.QWidget):
             self.floatstatus.exit()
         self.close()
 
+    def startWorkers(self, workers, year, pmss_details, pmss_data, re_order, dispatch_order):
+        # start a pool of dispatch processes; pmss_data is passed through shared memory
+        pm_data = dispatchArray(pmss_data)
+        try:
+            shm = shared_memory.SharedMemory(create=True, size=max(pm_data.nbytes, 1))
+            np.ndarray(pm_data.shape, dtype=np.float64, buffer=shm.buf)[:] = pm_data
+            # spawn rather than fork a copy of the GUI
+            pool = multiprocessing.get_context('spawn').Pool(processes=workers, initializer=dispatchInit,
+                   initargs=(DispatchState(self), pmss_details, shm.name, pm_data.shape, year, re_order,
+                   dispatch_order))
+        except Exception as err:
+            self.setStatus(f'Unable to start {workers} worker processes ({err}); continuing with one')
+            try:
+                shm.close()
+                shm.unlink()
+            except:
+                pass
+            return None, None
+        self.setStatus(f'Using {workers} worker processes')
+        return pool, shm
+
+    def stopWorkers(self, pool, shm, terminate=False):
+        # terminate drops any jobs still queued, as when stopping after an error
+        if pool is not None:
+            if terminate:
+                pool.terminate()
+            else:
+                pool.close()
+            pool.join()
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+
     def optClicked(self, in_year, in_option, in_pmss_details, in_pmss_data, in_re_order,
                    in_dispatch_order, pm_data_file, rslts_file):
 
@@ -7005,6 +7019,53 @@ class powerMatch(QtWidgets.QWidget):
             return population
 
         def calculate_fitness(population):
+            def lcoe_fitness(multi_value):
+                # returns None if the score can't be calculated
+                if multi_value['load_pct'] < self.targets['load_pct'][3]:
+                    if multi_value['load_pct'] == 0:
+                        print('PME3:', multi_value['lcoe'], self.targets['load_pct'][3], multi_value['load_pct'])
+                        return 1
+                    try:
+                        return pow(multi_value['lcoe'], self.targets['load_pct'][3] / multi_value['load_pct'])
+                    except OverflowError as err:
+                        self.setStatus(f"Overflow error: {err}; POW({multi_value['lcoe']:,}, " \
+                                     + f"{self.targets['load_pct'][3] / multi_value['load_pct']:,}) " \
+                                     + f"({self.targets['load_pct'][3]:,} / {multi_value['load_pct']:,} )")
+                    except:
+                        pass
+                    return None
+                return multi_value['lcoe']
+
+            def cache_fitness(chrom_key, multi_value):
+                # only the dispatch results are kept; the lcoe score depends on the current targets
+                if self.optimise_cache <= 0:
+                    return
+                fitness_cache[chrom_key] = multi_value
+                if len(fitness_cache) > self.optimise_cache:
+                    fitness_cache.popitem(last=False) # least recently used
+                fitness_stats[1] += 1
+
+            def score_chromosome(multi_value, lcoe_score):
+                if lcoe_score is not None:
+                    lcoe_fitness_scores.append(lcoe_score)
+                multi_values.append(multi_value)
+                multi_fitness_scores.append(calc_weight(multi_value))
+                if self.debug:
+                    self.chrom += 1
+                    line = str(self.popn) + ',' + str(self.chrom) + ','
+                    for fac, value in opt_order.items():
+                        try:
+                            line += str(pmss_details[fac].capacity * pmss_details[fac].multiplier) + ','
+                        except:
+                            line += ','
+                    for key in self.targets.keys():
+                        try:
+                            line += '{:.3f},'.format(multi_value[key])
+                        except:
+                            line += multi_value[key] + ','
+                    line += '{:.5f},'.format(multi_fitness_scores[-1])
+                    self.db_file.write(line + '\n')
+
             lcoe_fitness_scores = [] # scores = LCOE values
             multi_fitness_scores = [] # scores = multi-variable weight
             multi_values = [] # values for each of the six variables
@@ -7015,55 +7076,65 @@ class powerMatch(QtWidgets.QWidget):
             if self.debug:
                 self.popn += 1
                 self.chrom = 0
+            use_cache = option == O and self.optimise_cache > 0
+            chromosomes = [] # multipliers, multi_value and index of worker result (None if not from a worker)
+            chrom_multipliers = [] # for worker processes
+            chrom_pending = {} # chromosome key, index of worker result
             for chromosome in population:
                 # now get random amount of generation per technology (both RE and non-RE)
+                chrom_key = []
                 for fac, value in opt_order.items():
                     try:
                         capacity = value[2]
                         for c in range(value[0], value[1]):
                             if chromosome[c]:
                                 capacity = capacity + capacities[c]
+                        chrom_key.append(capacity)
                         try:
                             pmss_details[fac].multiplier = capacity / pmss_details[fac].capacity
                         except:
                             print('PME1:', fac, capacity, pmss_details[fac].capacity)
                     except:
+                        chrom_key.append(None)
                         print('PME2:', fac, capacity, pmss_details[fac].capacity)
+                chrom_key = tuple(chrom_key)
+                multipliers = {}
+                for fac in opt_order.keys():
+                    if fac in pmss_details.keys():
+                        multipliers[fac] = pmss_details[fac].multiplier
+                if use_cache:
+                    if chrom_key in fitness_cache:
+                        fitness_cache.move_to_end(chrom_key)
+                        fitness_stats[0] += 1
+                        chromosomes.append([multipliers, fitness_cache[chrom_key], None])
+                        continue
+                    if chrom_key in chrom_pending: # repeated in this population
+                        fitness_stats[0] += 1
+                        chromosomes.append([multipliers, None, chrom_pending[chrom_key]])
+                        continue
+                if opt_pool is not None and option == O:
+                    chrom_pending[chrom_key] = len(chrom_multipliers)
+                    chromosomes.append([multipliers, None, len(chrom_multipliers)])
+                    chrom_multipliers.append(multipliers)
+                    continue
                 multi_value, op_data, extra = self.doDispatch(year, option, pmss_details, pmss_data, re_order,
                                               dispatch_order, pm_data_file, rslts_file)
-                if multi_value['load_pct'] < self.targets['load_pct'][3]:
-                    if multi_value['load_pct'] == 0:
-                        print('PME3:', multi_value['lcoe'], self.targets['load_pct'][3], multi_value['load_pct'])
-                        lcoe_fitness_scores.append(1)
-                    else:
-                        try:
-                            lcoe_fitness_scores.append(pow(multi_value['lcoe'],
-                                self.targets['load_pct'][3] / multi_value['load_pct']))
-                        except OverflowError as err:
-                            self.setStatus(f"Overflow error: {err}; POW({multi_value['lcoe']:,}, " \
-                                         + f"{self.targets['load_pct'][3] / multi_value['load_pct']:,}) " \
-                                         + f"({self.targets['load_pct'][3]:,} / {multi_value['load_pct']:,} )")
-                        except:
-                            pass
-                else:
-                    lcoe_fitness_scores.append(multi_value['lcoe'])
-                multi_values.append(multi_value)
-                multi_fitness_scores.append(calc_weight(multi_value))
-                if self.debug:
-                    self.chrom += 1
-                    line = str(self.popn) + ',' + str(self.chrom) + ','
-                    for fac, value in opt_order.items():
-                        try:
-                            line += str(pmss_details[fac].capacity * pmss_details[fac].multiplier) + ','
-                        except:
-                            line += ','
-                    for key in self.targets.keys():
-                        try:
-                            line += '{:.3f},'.format(multi_value[key])
-                        except:
-                            line += multi_value[key] + ','
-                    line += '{:.5f},'.format(multi_fitness_scores[-1])
-                    self.db_file.write(line + '\n')
+                if use_cache:
+                    cache_fitness(chrom_key, multi_value)
+                chromosomes.append([multipliers, multi_value, None])
+            if len(chrom_multipliers) > 0:
+                # pool.map returns results in population order
+                chrom_values = opt_pool.map(optimiseDispatch, chrom_multipliers)
+                if use_cache:
+                    for chrom_key, c in chrom_pending.items():
+                        cache_fitness(chrom_key, chrom_values[c])
+            for multipliers, multi_value, c in chromosomes:
+                if c is not None:
+                    multi_value = chrom_values[c]
+                for fac, multiplier in multipliers.items():
+                    pmss_details[fac].multiplier = multiplier
+                score_chromosome(multi_value, lcoe_fitness(multi_value))
+            multi_value = multi_values[-1]
             # alternative approach to calculating fitness
             multi_fitness_scores1 = []
             maxs = {}
@@ -7658,231 +7729,245 @@ class powerMatch(QtWidgets.QWidget):
         # Create starting population
         self.opt_progressbar.barProgress(1, 'Processing iteration 1')
         QtCore.QCoreApplication.processEvents()
-        population = create_starting_population(population_size, chromosome_length)
-        # calculate best score(s) in starting population
-        # if do_lcoe best_score = lowest non-zero lcoe
-        # if do_multi best_multi = lowest weight and if not do_lcoe best_score also = best_weight
-        if self.debug:
-            filename = self.scenarios + 'opt_debug_' + \
-                       QtCore.QDateTime.toString(QtCore.QDateTime.currentDateTime(),
-                       'yyyy-MM-dd_hhmm') + '.csv'
-            self.db_file = open(filename, 'w')
-            line0 = 'Popn,Chrom,'
-            line1 = 'Weights,,'
-            line2 = 'Targets,,'
-            line3 = 'Range,' + str(population_size) + ','
-            for gen, value in opt_order.items():
-                 line0 += gen + ','
-                 line1 += ','
-                 line2 += ','
-                 line3 += ','
-            for key in self.targets.keys():
-                 line0 += key + ','
-                 line1 += str(self.targets[key][1]) + ','
-                 line2 += str(self.targets[key][2]) + ','
-                 if key[-4:] == '_pct':
-                     line3 += str(abs(self.targets[key][2] - self.targets[key][3])) + ','
-                 else:
+        fitness_cache = OrderedDict() # chromosome capacities, multi_value
+        fitness_stats = [0, 0] # hits, misses
+        opt_pool = None
+        opt_shm = None
+        if self.optimise_workers > 1:
+            opt_pool, opt_shm = self.startWorkers(self.optimise_workers, year, pmss_details, pmss_data,
+                                                  re_order, dispatch_order)
+        finished = False
+        try:
+            population = create_starting_population(population_size, chromosome_length)
+            # calculate best score(s) in starting population
+            # if do_lcoe best_score = lowest non-zero lcoe
+            # if do_multi best_multi = lowest weight and if not do_lcoe best_score also = best_weight
+            if self.debug:
+                filename = self.scenarios + 'opt_debug_' + \
+                           QtCore.QDateTime.toString(QtCore.QDateTime.currentDateTime(),
+                           'yyyy-MM-dd_hhmm') + '.csv'
+                self.db_file = open(filename, 'w')
+                line0 = 'Popn,Chrom,'
+                line1 = 'Weights,,'
+                line2 = 'Targets,,'
+                line3 = 'Range,' + str(population_size) + ','
+                for gen, value in opt_order.items():
+                     line0 += gen + ','
+                     line1 += ','
+                     line2 += ','
                      line3 += ','
-            line0 += 'Score'
-            self.db_file.write(line0 + '\n' + line1 + '\n' + line2 + '\n' + line3 + '\n')
-            self.popn = 0
-            self.chrom = 0
-        lcoe_scores, multi_scores, multi_values = calculate_fitness(population)
-        if do_lcoe:
-            try:
-                best_score = np.min(lcoe_scores)
-            except:
-                print('PME4:', lcoe_scores)
-            best_ndx = lcoe_scores.index(best_score)
-            lowest_chrom = population[best_ndx]
-            self.setStatus('Starting LCOE: $%.2f' % best_score)
-        if do_multi:
-            if self.more_details: # display starting population ?
-                pick = plot_multi(multi_scores, multi_values, multi_order, 'starting population')
-            # want maximum from first round to set base upper limit
-            for key in self.targets.keys():
-                if self.targets[key][2] < 0: # want a maximum from first round
-                    setit = 0
-                    for multi in multi_values:
-                        setit = max(multi[key], setit)
-                    self.targets[key][2] = setit
-                if self.targets[key][3] < 0: # want a maximum from first round
-                    setit = 0
-                    for multi in multi_values:
-                        setit = max(multi[key], setit)
-                    self.targets[key][3] = setit
-            # now we can find the best weighted result - lowest is best
-            best_multi = np.min(multi_scores)
-            best_mndx = multi_scores.index(best_multi)
-            multi_lowest_chrom = population[best_mndx]
-            multi_best_popn.append(multi_lowest_chrom)
-            multi_best.append(multi_values[best_mndx])
-            self.setStatus('Starting Weight: %.4f' % best_multi)
-            multi_best_weight = best_multi
-            best_multi_progress = [best_multi]
-            if not do_lcoe:
-                best_score = best_multi
-            last_multi_score = best_multi
-            lowest_multi_score = best_multi
-            mud = '='
-        # Add starting best score to progress tracker
-        best_score_progress = [best_score]
-        best_ctr = 1
-        last_score = best_score
-        lowest_score = best_score
-        lud = '='
-        # Now we'll go through the generations of genetic algorithm
-        if do_lcoe:
-            self.setStatus('Final LCOE: $%.2f' % best_score)
-            fig = 'optimise_lcoe'
-            titl = 'Optimise LCOE using Genetic Algorithm'
-            ylbl = 'Best LCOE ($/MWh)'
-        else:
-            fig = 'optimise_multi'
-            titl = 'Optimise Multi using Genetic Algorithm'
-            ylbl = 'Best Weight'
-        matplotlib.rcParams['savefig.directory'] = self.scenarios
-        plt.ion()
-        fig2 = plt.figure(fig + QtCore.QDateTime.toString(QtCore.QDateTime.currentDateTime(),
-                   '_yyyy-MM-dd_hhmm'))
-        lx = plt.subplot(111)
-        x = list(range(1, len(best_score_progress) + 1))
-        iteration = len(x)
-        plt.title(titl)
-        for generation in range(1, maximum_generation):
-            lcoe_status = ''
-            multi_status = ''
-            if do_lcoe:
-                lcoe_status = ' %s $%.2f ;' % (lud, best_score)
-            if do_multi:
-                multi_status = ' %s %.4f ;' % (mud, best_multi)
-            tim = (time.time() - start_time)
-            if tim < 60:
-                tim = ' (%s%s %.1f secs)' % (lcoe_status, multi_status, tim)
-            else:
-                tim = ' (%s%s %.2f mins)' % (lcoe_status, multi_status, tim / 60.)
-            self.opt_progressbar.barProgress(generation + 1,
-                f'Processing iteration {generation + 1} of {maximum_generation} {tim}')
-            QtWidgets.QApplication.processEvents()
-            if not self.opt_progressbar.be_open:
-                break
-        # Create an empty list for new population
-            new_population = []
-        # Using elitism approach include best individual
-            if do_lcoe:
-                new_population.append(lowest_chrom)
-            if do_multi:
-                new_population.append(multi_lowest_chrom)
-            # Create new population generating two children at a time
-            if do_lcoe:
-                if do_multi:
-                    for i in range(int(population_size/2)):
-                        parent_1 = select_individual_by_tournament(population, lcoe_scores,
-                                                                   multi_scores)
-                        parent_2 = select_individual_by_tournament(population, lcoe_scores,
-                                                                   multi_scores)
-                        child_1, child_2 = breed_by_crossover(parent_1, parent_2)
-                        new_population.append(child_1)
-                        new_population.append(child_2)
-                else:
-                    for i in range(int(population_size/2)):
-                        parent_1 = select_individual_by_tournament(population, lcoe_scores)
-                        parent_2 = select_individual_by_tournament(population, lcoe_scores)
-                        child_1, child_2 = breed_by_crossover(parent_1, parent_2)
-                        new_population.append(child_1)
-                        new_population.append(child_2)
-            else:
-                for i in range(int(population_size/2)):
-                    parent_1 = select_individual_by_tournament(population, multi_scores)
-                    parent_2 = select_individual_by_tournament(population, multi_scores)
-                    child_1, child_2 = breed_by_crossover(parent_1, parent_2)
-                    new_population.append(child_1)
-                    new_population.append(child_2)
-            # get back to original size (after elitism adds)
-            if do_lcoe:
-                new_population.pop()
-            if do_multi:
-                new_population.pop()
-            # Replace the old population with the new one
-            population = np.array(new_population)
-            if self.optimise_mutation > 0:
-                population = randomly_mutate_population(population, self.optimise_mutation)
-            # Score best solution, and add to tracker
+                for key in self.targets.keys():
+                     line0 += key + ','
+                     line1 += str(self.targets[key][1]) + ','
+                     line2 += str(self.targets[key][2]) + ','
+                     if key[-4:] == '_pct':
+                         line3 += str(abs(self.targets[key][2] - self.targets[key][3])) + ','
+                     else:
+                         line3 += ','
+                line0 += 'Score'
+                self.db_file.write(line0 + '\n' + line1 + '\n' + line2 + '\n' + line3 + '\n')
+                self.popn = 0
+                self.chrom = 0
             lcoe_scores, multi_scores, multi_values = calculate_fitness(population)
             if do_lcoe:
-                best_lcoe = np.min(lcoe_scores)
-                best_ndx = lcoe_scores.index(best_lcoe)
-                best_score = best_lcoe
-            # now we can find the best weighted result - lowest is best
+                try:
+                    best_score = np.min(lcoe_scores)
+                except:
+                    print('PME4:', lcoe_scores)
+                best_ndx = lcoe_scores.index(best_score)
+                lowest_chrom = population[best_ndx]
+                self.setStatus('Starting LCOE: $%.2f' % best_score)
             if do_multi:
+                if self.more_details: # display starting population ?
+                    pick = plot_multi(multi_scores, multi_values, multi_order, 'starting population')
+                # want maximum from first round to set base upper limit
+                for key in self.targets.keys():
+                    if self.targets[key][2] < 0: # want a maximum from first round
+                        setit = 0
+                        for multi in multi_values:
+                            setit = max(multi[key], setit)
+                        self.targets[key][2] = setit
+                    if self.targets[key][3] < 0: # want a maximum from first round
+                        setit = 0
+                        for multi in multi_values:
+                            setit = max(multi[key], setit)
+                        self.targets[key][3] = setit
+                # now we can find the best weighted result - lowest is best
                 best_multi = np.min(multi_scores)
                 best_mndx = multi_scores.index(best_multi)
                 multi_lowest_chrom = population[best_mndx]
                 multi_best_popn.append(multi_lowest_chrom)
                 multi_best.append(multi_values[best_mndx])
-           #     if multi_best_weight > best_multi:
+                self.setStatus('Starting Weight: %.4f' % best_multi)
                 multi_best_weight = best_multi
+                best_multi_progress = [best_multi]
                 if not do_lcoe:
                     best_score = best_multi
-                best_multi_progress.append(best_multi)
-            best_score_progress.append(best_score)
-            if best_score < lowest_score:
-                lowest_score = best_score
-                if do_lcoe:
-                    lowest_chrom = population[best_ndx]
-                else: #(do_multi only)
-                    multi_lowest_chrom = population[best_mndx]
-            if self.optimise_stop > 0:
-                if best_score == last_score:
-                    best_ctr += 1
-                    if best_ctr >= self.optimise_stop:
-                        break
-                else:
-                    last_score = best_score
-                    best_ctr = 1
+                last_multi_score = best_multi
+                lowest_multi_score = best_multi
+                mud = '='
+            # Add starting best score to progress tracker
+            best_score_progress = [best_score]
+            best_ctr = 1
             last_score = best_score
+            lowest_score = best_score
+            lud = '='
+            # Now we'll go through the generations of genetic algorithm
             if do_lcoe:
-                if best_score == best_score_progress[-2]:
-                    lud = '='
-                elif best_score < best_score_progress[-2]:
-                    lud = '<html>&darr;</html>'
+                self.setStatus('Final LCOE: $%.2f' % best_score)
+                fig = 'optimise_lcoe'
+                titl = 'Optimise LCOE using Genetic Algorithm'
+                ylbl = 'Best LCOE ($/MWh)'
+            else:
+                fig = 'optimise_multi'
+                titl = 'Optimise Multi using Genetic Algorithm'
+                ylbl = 'Best Weight'
+            matplotlib.rcParams['savefig.directory'] = self.scenarios
+            plt.ion()
+            fig2 = plt.figure(fig + QtCore.QDateTime.toString(QtCore.QDateTime.currentDateTime(),
+                       '_yyyy-MM-dd_hhmm'))
+            lx = plt.subplot(111)
+            x = list(range(1, len(best_score_progress) + 1))
+            iteration = len(x)
+            plt.title(titl)
+            for generation in range(1, maximum_generation):
+                lcoe_status = ''
+                multi_status = ''
+                if do_lcoe:
+                    lcoe_status = ' %s $%.2f ;' % (lud, best_score)
+                if do_multi:
+                    multi_status = ' %s %.4f ;' % (mud, best_multi)
+                tim = (time.time() - start_time)
+                if tim < 60:
+                    tim = ' (%s%s %.1f secs)' % (lcoe_status, multi_status, tim)
                 else:
-                    lud = '<html>&uarr;</html>'
-            if do_multi:
-                if best_multi == last_multi_score:
-                    mud = '='
-                elif best_multi < last_multi_score:
-                    mud = '<html>&darr;</html>'
+                    tim = ' (%s%s %.2f mins)' % (lcoe_status, multi_status, tim / 60.)
+                self.opt_progressbar.barProgress(generation + 1,
+                    f'Processing iteration {generation + 1} of {maximum_generation} {tim}')
+                QtWidgets.QApplication.processEvents()
+                if not self.opt_progressbar.be_open:
+                    break
+            # Create an empty list for new population
+                new_population = []
+            # Using elitism approach include best individual
+                if do_lcoe:
+                    new_population.append(lowest_chrom)
+                if do_multi:
+                    new_population.append(multi_lowest_chrom)
+                # Create new population generating two children at a time
+                if do_lcoe:
+                    if do_multi:
+                        for i in range(int(population_size/2)):
+                            parent_1 = select_individual_by_tournament(population, lcoe_scores,
+                                                                       multi_scores)
+                            parent_2 = select_individual_by_tournament(population, lcoe_scores,
+                                                                       multi_scores)
+                            child_1, child_2 = breed_by_crossover(parent_1, parent_2)
+                            new_population.append(child_1)
+                            new_population.append(child_2)
+                    else:
+                        for i in range(int(population_size/2)):
+                            parent_1 = select_individual_by_tournament(population, lcoe_scores)
+                            parent_2 = select_individual_by_tournament(population, lcoe_scores)
+                            child_1, child_2 = breed_by_crossover(parent_1, parent_2)
+                            new_population.append(child_1)
+                            new_population.append(child_2)
                 else:
-                    mud = '<html>&uarr;</html>'
-                last_multi_score = best_multi
-            # Plot progress
-            iteration += 1
-            x.append(iteration)
-            lx.plot(x, best_score_progress)
-            xlabel = f'Optimise Cycle ({iteration} iterations)'
-            lx.set_xlabel(xlabel)
-            lx.set_ylabel(ylbl)
-            plt.draw()
-        if self.debug:
-            try:
-                self.db_file.close()
-                optimiseDebug(self.db_file.name)
-                os.remove(self.db_file.name)
-            except:
-                pass
-            self.debug = False
-        self.opt_progressbar.setVisible(False)
-        self.opt_progressbar.close()
-        tim = (time.time() - start_time)
-        if tim < 60:
-            tim = '%.1f secs)' % tim
-        else:
-            tim = '%.2f mins)' % (tim / 60.)
-        msg = 'Optimise completed (%0d iterations; %s' % (generation + 1, tim)
-        if best_score > lowest_score:
-            msg += ' Try more iterations.'
+                    for i in range(int(population_size/2)):
+                        parent_1 = select_individual_by_tournament(population, multi_scores)
+                        parent_2 = select_individual_by_tournament(population, multi_scores)
+                        child_1, child_2 = breed_by_crossover(parent_1, parent_2)
+                        new_population.append(child_1)
+                        new_population.append(child_2)
+                # get back to original size (after elitism adds)
+                if do_lcoe:
+                    new_population.pop()
+                if do_multi:
+                    new_population.pop()
+                # Replace the old population with the new one
+                population = np.array(new_population)
+                if self.optimise_mutation > 0:
+                    population = randomly_mutate_population(population, self.optimise_mutation)
+                # Score best solution, and add to tracker
+                lcoe_scores, multi_scores, multi_values = calculate_fitness(population)
+                if do_lcoe:
+                    best_lcoe = np.min(lcoe_scores)
+                    best_ndx = lcoe_scores.index(best_lcoe)
+                    best_score = best_lcoe
+                # now we can find the best weighted result - lowest is best
+                if do_multi:
+                    best_multi = np.min(multi_scores)
+                    best_mndx = multi_scores.index(best_multi)
+                    multi_lowest_chrom = population[best_mndx]
+                    multi_best_popn.append(multi_lowest_chrom)
+                    multi_best.append(multi_values[best_mndx])
+               #     if multi_best_weight > best_multi:
+                    multi_best_weight = best_multi
+                    if not do_lcoe:
+                        best_score = best_multi
+                    best_multi_progress.append(best_multi)
+                best_score_progress.append(best_score)
+                if best_score < lowest_score:
+                    lowest_score = best_score
+                    if do_lcoe:
+                        lowest_chrom = population[best_ndx]
+                    else: #(do_multi only)
+                        multi_lowest_chrom = population[best_mndx]
+                if self.optimise_stop > 0:
+                    if best_score == last_score:
+                        best_ctr += 1
+                        if best_ctr >= self.optimise_stop:
+                            break
+                    else:
+                        last_score = best_score
+                        best_ctr = 1
+                last_score = best_score
+                if do_lcoe:
+                    if best_score == best_score_progress[-2]:
+                        lud = '='
+                    elif best_score < best_score_progress[-2]:
+                        lud = '<html>&darr;</html>'
+                    else:
+                        lud = '<html>&uarr;</html>'
+                if do_multi:
+                    if best_multi == last_multi_score:
+                        mud = '='
+                    elif best_multi < last_multi_score:
+                        mud = '<html>&darr;</html>'
+                    else:
+                        mud = '<html>&uarr;</html>'
+                    last_multi_score = best_multi
+                # Plot progress
+                iteration += 1
+                x.append(iteration)
+                lx.plot(x, best_score_progress)
+                xlabel = f'Optimise Cycle ({iteration} iterations)'
+                lx.set_xlabel(xlabel)
+                lx.set_ylabel(ylbl)
+                plt.draw()
+            if self.debug:
+                try:
+                    self.db_file.close()
+                    optimiseDebug(self.db_file.name)
+                    os.remove(self.db_file.name)
+                except:
+                    pass
+                self.debug = False
+            self.opt_progressbar.setVisible(False)
+            self.opt_progressbar.close()
+            tim = (time.time() - start_time)
+            if tim < 60:
+                tim = '%.1f secs)' % tim
+            else:
+                tim = '%.2f mins)' % (tim / 60.)
+            msg = 'Optimise completed (%0d iterations; %s' % (generation + 1, tim)
+            if best_score > lowest_score:
+                msg += ' Try more iterations.'
+            finished = True
+        finally: # workers stop even if the optimisation fails
+            self.stopWorkers(opt_pool, opt_shm, terminate=not finished)
+            opt_pool = None
+            opt_shm = None
         # we'll keep two or three to save re-calculating_fitness
         op_data = [[], [], [], [], []]
         score_data = [None, None, None, None, None]
@@ -7891,6 +7976,9 @@ class powerMatch(QtWidgets.QWidget):
         if do_multi:
             op_data[1], score_data[1] = calculate_fitness([multi_lowest_chrom])
         self.setStatus(msg)
+        if fitness_stats[0] + fitness_stats[1] > 0:
+            self.setStatus(f'Fitness cache: {fitness_stats[0]:,} hits; {fitness_stats[1]:,} misses ' \
+                           + f'({fitness_stats[0] * 100. / (fitness_stats[0] + fitness_stats[1]):.1f}% hits)')
         QtWidgets.QApplication.processEvents()
         self.progressbar.setHidden(True)
         self.progressbar.setValue(0)
@@ -8236,6 +8324,7 @@ class powerMatch(QtWidgets.QWidget):
         return
 
 if "__main__" == __name__:
+    multiprocessing.freeze_support() # spawned workers of a frozen program
     app = QtWidgets.QApplication(sys.argv)
     try:
         QtGui.QGuiApplication.setDesktopFileName('siren')
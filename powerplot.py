@@ -41,6 +41,7 @@ from credits import fileVersion
 from displaytable import Table
 from editini import EdtDialog, SaveIni
 from getmodels import getModelFile
+from plotcache import openPlotSheet
 try:
     from senplot3d import PowerPlot3D
 except:
@@ -444,6 +445,8 @@ class PowerPlot(QtWidgets.QWidget):
         self.setup = [False, False]
         self.details = True
         self.book = None
+        self.book_file = ''
+        self.sheet_cache = False
         self.error = False
         # create a colour map based on traffic lights
         cvals = [-2., -1, 2]
@@ -622,6 +625,9 @@ class PowerPlot(QtWidgets.QWidget):
                 elif key == 'short_legend':
                     if value.lower() in ['true', 'yes', 'on', '_']:
                         self.short_legend = '_'
+                elif key == 'sheet_cache':
+                    if value.lower() in ['true', 'yes', 'on']:
+                        self.sheet_cache = True
                 elif key == 'ticks_font':
                     try:
                         self.fontprops['Ticks'] = self.set_fontdict(value)
@@ -1295,6 +1301,7 @@ class PowerPlot(QtWidgets.QWidget):
             try:
                 self.book = WorkBook()
                 self.book.open_workbook(ifile)
+                self.book_file = ifile
             except:
                 self.log.setText("Can't open file - " + ifile)
                 return
@@ -1308,6 +1315,10 @@ class PowerPlot(QtWidgets.QWidget):
                 ndx = j
         self.sheet.setCurrentIndex(ndx)
 
+    def plotSheet(self, isheet):
+        # the worksheet as cached columns; read again if the file has changed
+        return openPlotSheet(self.book_file, isheet, disk=self.sheet_cache)
+
     def sheetChanged(self):
         self.toprow = None
         if self.book is None:
@@ -1437,7 +1448,7 @@ class PowerPlot(QtWidgets.QWidget):
 
     def setColumns(self, isheet, columns=[], breakdowns=[]):
         try:
-            ws = self.book.sheet_by_name(isheet)
+            ws = self.plotSheet(isheet)
         except:
             self.log.setText("Can't find sheet - " + isheet)
             return
@@ -1985,6 +1996,11 @@ class PowerPlot(QtWidgets.QWidget):
                         self.short_legend = '_'
                     elif value.lower() in ['false', 'no', 'off']:
                         self.short_legend = ''
+                elif key == 'sheet_cache':
+                    if value.lower() in ['true', 'yes', 'on']:
+                        self.sheet_cache = True
+                    else:
+                        self.sheet_cache = False
                 elif key == 'step_fill':
                     if value.lower() in ['mid', 'pre', 'post']:
                         self.step_fill = value.lower()
@@ -2156,39 +2172,19 @@ class PowerPlot(QtWidgets.QWidget):
             gridtype = 'x'
         else:
             gridtype = ''
-        ws = self.book.sheet_by_name(isheet)
+        ws = self.plotSheet(isheet)
+        layout = ws.plot_layout() # header rows are found once for each copy of the sheet
+        self.toprow = layout['toprow']
+        self.zone_row = layout['zone_row']
+        self.breakdown_row = layout['breakdown_row']
+        self.interval = layout['interval']
+        self.rows = layout['rows']
         if self.toprow is None:
-            tech_row = -1
-            row = 0
-            self.zone_row =  -1
-            self.breakdown_row = -1
-            while row < ws.nrows:
-                if ws.cell_value(row, 0) in ['Split', 'Breakdown']:
-                    self.breakdown_row = row
-                elif ws.cell_value(row, 0) == 'Technology':
-                    tech_row = row
-                elif ws.cell_value(row, 0) == 'Zone':
-                    self.zone_row = row
-                elif ws.cell_value(row, 0) in ['Hour', 'Interval', 'Trading Interval']:
-                    if ws.cell_value(row, 1) != 'Period':
-                        self.log.setText(isheet + ' sheet format incorrect')
-                        return
-                    if tech_row >= 0:
-                        self.toprow = [tech_row, row]
-                    else:
-                        self.toprow = [row, row]
-                    self.rows = ws.nrows - (row + 1)
-                    break
-                row += 1
-            if self.toprow is None:
-                self.log.setText(isheet + ' sheet format incorrect')
-                return
+            self.log.setText(isheet + ' sheet format incorrect')
+            return
         ignore_end = True
-        if ignore_end:
-            for row in range(ws.nrows -1, -1, -1):
-                if ws.cell_value(row, 0) is not None:
-                    self.rows = row
-                    break
+        if ignore_end and layout['last_row'] is not None:
+            self.rows = layout['last_row']
         try:
             year = int(ws.cell_value(self.toprow[1] + 1, 1)[:4])
             if year % 4 == 0 and year % 100 != 0 or year % 400 == 0:
@@ -2311,12 +2307,7 @@ class PowerPlot(QtWidgets.QWidget):
                 suptitle = suptitle.replace('Diurnal', '')
                 suptitle = self.replace_words('s', suptitle, isheet)
             for c2 in range(2, ws.ncols):
-                try:
-                    column = ws.cell_value(self.toprow[0], c2).replace('\n',' ')
-                except:
-                    column = str(ws.cell_value(self.toprow[0], c2))
-                if self.zone_row > 0 and ws.cell_value(self.zone_row, c2) != '' and ws.cell_value(self.zone_row, c2) is not None:
-                    column = ws.cell_value(self.zone_row, c2).replace('\n',' ') + '.' + column
+                column = ws.column_name(c2)
                 if column == self.target:
                     tgt_col = c2
                 for o in range(self.no_of_overlays):
@@ -2335,23 +2326,17 @@ class PowerPlot(QtWidgets.QWidget):
                                     continue
                             except:
                                 pass
-                            try:
-                                column = ws.cell_value(self.toprow[0], c2).replace('\n',' ')
-                            except:
-                                column = str(ws.cell_value(self.toprow[0], c2))
-                            if self.zone_row > 0 and ws.cell_value(self.zone_row, c2) != '' and ws.cell_value(self.zone_row, c2) is not None:
-                                column = ws.cell_value(self.zone_row, c2).replace('\n',' ') + '.' + column
+                            column = ws.column_name(c2)
                             if column == col:
                                 data.append([])
                                 label.append(column)
-                                for row in range(self.toprow[1] + 1, self.rows + 1):
-                                    try:
-                                        data[-1].append(ws.cell_value(row, c2))
-                                        maxy = max(maxy, data[-1][-1])
-                                        miny = min(miny, data[-1][-1])
-                                    except:
-                                        self.log.setText(f'Data error with {column} ({ssCol(c2, base=0)}{row + 1}). Period may be incomplete (1)')
-                                        return
+                                bad = ws.invalid(c2, self.toprow[1] + 1, self.rows + 1)
+                                if bad is not None:
+                                    self.log.setText(f'Data error with {column} ({ssCol(c2, base=0)}{bad + 1}). Period may be incomplete (1)')
+                                    return
+                                data[-1] = ws.series(c2, self.toprow[1] + 1, self.rows + 1)
+                                maxy = max([maxy] + data[-1])
+                                miny = min([miny] + data[-1])
                     for breakdown in breakdowns[1:]:
                         for c in range(self.order.count() -1, -1, -1):
                             col = self.order.item(c).text()
@@ -2362,64 +2347,43 @@ class PowerPlot(QtWidgets.QWidget):
                                         continue
                                 except:
                                     continue
-                                try:
-                                    column = ws.cell_value(self.toprow[0], c2).replace('\n',' ')
-                                except:
-                                    column = str(ws.cell_value(self.toprow[0], c2))
-                                if self.zone_row > 0 and ws.cell_value(self.zone_row, c2) != '' and ws.cell_value(self.zone_row, c2) is not None:
-                                    column = ws.cell_value(self.zone_row, c2).replace('\n',' ') + '.' + column
+                                column = ws.column_name(c2)
                                 if column == col:
                                     data.append([])
                                     label.append(self.short_legend + column + ' ' + breakdown)
-                                    for row in range(self.toprow[1] + 1, self.rows + 1):
-                                        try:
-                                            data[-1].append(ws.cell_value(row, c2))
-                                            maxy = max(maxy, data[-1][-1])
-                                            miny = min(miny, data[-1][-1])
-                                        except:
-                                            self.log.setText(f'Data error with {column} ({ssCol(c2, base=0)}{row + 1}). Period may be incomplete (2)')
-                                            return
+                                    bad = ws.invalid(c2, self.toprow[1] + 1, self.rows + 1)
+                                    if bad is not None:
+                                        self.log.setText(f'Data error with {column} ({ssCol(c2, base=0)}{bad + 1}). Period may be incomplete (2)')
+                                        return
+                                    data[-1] = ws.series(c2, self.toprow[1] + 1, self.rows + 1)
+                                    maxy = max([maxy] + data[-1])
+                                    miny = min([miny] + data[-1])
                 else:
                     for c in range(self.order.count() -1, -1, -1):
                         col = self.order.item(c).text()
                         for c2 in range(2, ws.ncols):
-                            try:
-                                column = ws.cell_value(self.toprow[0], c2).replace('\n',' ')
-                            except:
-                                column = str(ws.cell_value(self.toprow[0], c2))
-                            if self.zone_row > 0 and ws.cell_value(self.zone_row, c2) != '' and ws.cell_value(self.zone_row, c2) is not None:
-                                column = ws.cell_value(self.zone_row, c2).replace('\n',' ') + '.' + column
+                            column = ws.column_name(c2)
                             if column == col:
                                 data.append([])
                                 label.append(column)
-                                for row in range(self.toprow[1] + 1, self.rows + 1):
-                                    try:
-                                        data[-1].append(ws.cell_value(row, c2))
-                                        maxy = max(maxy, data[-1][-1])
-                                        miny = min(miny, data[-1][-1])
-                                    except:
-                                        self.log.setText(f'Data error with {column} ({ssCol(c2, base=0)}{row + 1}). Period may be incomplete (3)')
-                                        return
+                                bad = ws.invalid(c2, self.toprow[1] + 1, self.rows + 1)
+                                if bad is not None:
+                                    self.log.setText(f'Data error with {column} ({ssCol(c2, base=0)}{bad + 1}). Period may be incomplete (3)')
+                                    return
+                                data[-1] = ws.series(c2, self.toprow[1] + 1, self.rows + 1)
+                                maxy = max([maxy] + data[-1])
+                                miny = min([miny] + data[-1])
                                 break
                 if tgt_col >= 0:
-                    for row in range(self.toprow[1] + 1, self.rows + 1):
-                        load.append(ws.cell_value(row, tgt_col))
-                        maxy = max(maxy, load[-1])
-                        miny = min(miny, load[-1])
+                    load = ws.series(tgt_col, self.toprow[1] + 1, self.rows + 1)
+                    maxy = max([maxy] + load)
+                    miny = min([miny] + load)
                 for o in range(self.no_of_overlays):
                     if len(overlay_cols[o]) > 0:
-                        for row in range(self.toprow[1] + 1, self.rows + 1):
-                            overlay[o].append(0.)
                         if self.overlay[o] == 'Charge':
-                            for row in range(self.toprow[1] + 1, self.rows + 1):
-                                for col in overlay_cols[o]:
-                                    overlay[o][row - self.toprow[1] - 1] += ws.cell_value(row, col)
-                        elif self.overlay[o] == 'Underlying Load':
-                            for row in range(self.toprow[1] + 1, self.rows + 1):
-                                overlay[o][row - self.toprow[1] - 1] = ws.cell_value(row, overlay_cols[o][-1])
+                            overlay[o] = ws.running_sums(overlay_cols[o], self.toprow[1] + 1, self.rows + 1, 1)[:, -1].tolist()
                         else:
-                            for row in range(self.toprow[1] + 1, self.rows + 1):
-                                overlay[o][row - self.toprow[1] - 1] = ws.cell_value(row, overlay_cols[o][-1])
+                            overlay[o] = ws.series(overlay_cols[o][-1], self.toprow[1] + 1, self.rows + 1)
                         for h in range(len(overlay[o])):
                             if self.overlay_y2[o].isChecked():
                                 max2y = max(max2y, overlay[o][h])
@@ -2438,25 +2402,20 @@ class PowerPlot(QtWidgets.QWidget):
                                     continue
                             except:
                                 pass
-                            try:
-                                column = ws.cell_value(self.toprow[0], c2).replace('\n',' ')
-                            except:
-                                column = str(ws.cell_value(self.toprow[0], c2))
-                            if self.zone_row > 0 and ws.cell_value(self.zone_row, c2) != '' and ws.cell_value(self.zone_row, c2) is not None:
-                                column = ws.cell_value(self.zone_row, c2).replace('\n',' ') + '.' + column
+                            column = ws.column_name(c2)
                             if column == col:
                                 data.append([])
                                 label.append(column)
-                                for row in range(self.toprow[1] + 1, self.rows + 1, self.interval):
-                                    data[-1].append(0)
-                                    for r2 in range(row, row + self.interval):
-                                        try:
-                                            data[-1][-1] += ws.cell_value(r2, c2)
-                                            maxy = max(maxy, data[-1][-1])
-                                            miny = min(miny, data[-1][-1])
-                                        except:
-                                            self.log.setText(f'Data error with {column} ({ssCol(c2, base=0)}{row + 1}). Period may be incomplete (4)')
-                                            return
+                                bad = ws.invalid(c2, self.toprow[1] + 1, self.toprow[1] + 1 + len(x) * self.interval)
+                                if bad is not None:
+                                    row = bad - (bad - self.toprow[1] - 1) % self.interval
+                                    self.log.setText(f'Data error with {column} ({ssCol(c2, base=0)}{row + 1}). Period may be incomplete (4)')
+                                    return
+                                sums = ws.running_sums([c2], self.toprow[1] + 1, self.rows + 1, self.interval)
+                                data[-1] = sums[:, -1].tolist()
+                                if sums.size > 0: # totals as each hour is added
+                                    maxy = max(maxy, float(sums.max()))
+                                    miny = min(miny, float(sums.min()))
                     for breakdown in breakdowns[1:]:
                         for c in range(self.order.count() -1, -1, -1):
                             col = self.order.item(c).text()
@@ -2467,64 +2426,47 @@ class PowerPlot(QtWidgets.QWidget):
                                         continue
                                 except:
                                     continue
-                                try:
-                                    column = ws.cell_value(self.toprow[0], c2).replace('\n',' ')
-                                except:
-                                    column = str(ws.cell_value(self.toprow[0], c2))
-                                if self.zone_row > 0 and ws.cell_value(self.zone_row, c2) != '' and ws.cell_value(self.zone_row, c2) is not None:
-                                    column = ws.cell_value(self.zone_row, c2).replace('\n',' ') + '.' + column
+                                column = ws.column_name(c2)
                                 if column == col:
                                     data.append([])
                                     label.append(self.short_legend + column + ' ' + breakdown)
-                                    for row in range(self.toprow[1] + 1, self.rows + 1, self.interval):
-                                        data[-1].append(0)
-                                        for r2 in range(row, row + self.interval):
-                                            try:
-                                                data[-1][-1] += ws.cell_value(r2, c2)
-                                                maxy = max(maxy, data[-1][-1])
-                                                miny = min(miny, data[-1][-1])
-                                            except:
-                                                self.log.setText(f'Data error with {column} ({ssCol(c2, base=0)}{row + 1}). Period may be incomplete (5)')
-                                                return
+                                    bad = ws.invalid(c2, self.toprow[1] + 1, self.toprow[1] + 1 + len(x) * self.interval)
+                                    if bad is not None:
+                                        row = bad - (bad - self.toprow[1] - 1) % self.interval
+                                        self.log.setText(f'Data error with {column} ({ssCol(c2, base=0)}{row + 1}). Period may be incomplete (5)')
+                                        return
+                                    sums = ws.running_sums([c2], self.toprow[1] + 1, self.rows + 1, self.interval)
+                                    data[-1] = sums[:, -1].tolist()
+                                    if sums.size > 0: # totals as each hour is added
+                                        maxy = max(maxy, float(sums.max()))
+                                        miny = min(miny, float(sums.min()))
                 else:
                     for c in range(self.order.count() -1, -1, -1):
                         col = self.order.item(c).text()
                         for c2 in range(2, ws.ncols):
-                            try:
-                                column = ws.cell_value(self.toprow[0], c2).replace('\n',' ')
-                            except:
-                                column = str(ws.cell_value(self.toprow[0], c2))
-                            if self.zone_row > 0 and ws.cell_value(self.zone_row, c2) != '' and ws.cell_value(self.zone_row, c2) is not None:
-                                column = ws.cell_value(self.zone_row, c2).replace('\n',' ') + '.' + column
+                            column = ws.column_name(c2)
                             if column == col:
                                 data.append([])
                                 label.append(column)
-                                for row in range(self.toprow[1] + 1, self.rows + 1, self.interval):
-                                    data[-1].append(0)
-                                    for r2 in range(row, row + self.interval):
-                                        try:
-                                            data[-1][-1] += ws.cell_value(r2, c2)
-                                            maxy = max(maxy, data[-1][-1])
-                                            miny = min(miny, data[-1][-1])
-                                        except:
-                                            self.log.setText(f'Data error with {column} ({ssCol(c2, base=0)}{r2 + 1}). Period may be incomplete (6)')
-                                            return
+                                bad = ws.invalid(c2, self.toprow[1] + 1, self.toprow[1] + 1 + len(x) * self.interval)
+                                if bad is not None:
+                                    self.log.setText(f'Data error with {column} ({ssCol(c2, base=0)}{bad + 1}). Period may be incomplete (6)')
+                                    return
+                                sums = ws.running_sums([c2], self.toprow[1] + 1, self.rows + 1, self.interval)
+                                data[-1] = sums[:, -1].tolist()
+                                if sums.size > 0: # totals as each hour is added
+                                    maxy = max(maxy, float(sums.max()))
+                                    miny = min(miny, float(sums.min()))
                                 break
                 if tgt_col >= 0:
-                    for row in range(self.toprow[1] + 1, self.rows + 1, self.interval):
-                        load.append(0)
-                        for r2 in range(row, row + self.interval):
-                            load[-1] += ws.cell_value(r2, tgt_col)
-                        maxy = max(maxy, load[-1])
-                        miny = min(miny, load[-1])
+                    load = ws.running_sums([tgt_col], self.toprow[1] + 1, self.rows + 1, self.interval)[:, -1].tolist()
+                    maxy = max([maxy] + load)
+                    miny = min([miny] + load)
                 for o in range(self.no_of_overlays):
                     if len(overlay_cols[o]) > 0:
                         if self.overlay[o] == 'Charge':
-                            for row in range(self.toprow[1] + 1, self.rows + 1, self.interval):
-                                overlay[o].append(0.)
-                                for col in overlay_cols[o]:
-                                    for r2 in range(row, row + self.interval):
-                                        overlay[o][-1] += ws.cell_value(r2, col)
+                            overlay[o] = ws.running_sums(overlay_cols[o], self.toprow[1] + 1, self.rows + 1,
+                                                         self.interval)[:, -1].tolist()
                         elif self.overlay[o] == 'Underlying Load':
                             for row in range(self.toprow[1] + 1, self.rows + 1, self.interval):
                                 overlay[o].append(0.)
@@ -3033,8 +2975,7 @@ class PowerPlot(QtWidgets.QWidget):
                     ld1.plot(x, data[c], label=label[c], color=self.set_colour(label[c]))
                 if tgt_col >= 0:
                     if len(load) == 0:
-                        for row in range(self.toprow[1] + 1, self.rows + 1):
-                            load.append(ws.cell_value(row, tgt_col))
+                        load = ws.series(tgt_col, self.toprow[1] + 1, self.rows + 1)
                     load = sorted(load, reverse=True)
                     maxy = max(maxy, load[0])
                     ld1.plot(x, load, linewidth=self.tgtSpin.value(), label=self.short_legend + self.target,
@@ -3203,23 +3144,13 @@ class PowerPlot(QtWidgets.QWidget):
                 for c in cols:
                     col = self.order.item(c).text()
                     for c2 in range(2, ws.ncols):
-                        try:
-                            column = ws.cell_value(self.toprow[0], c2).replace('\n',' ')
-                        except:
-                            column = str(ws.cell_value(self.toprow[0], c2))
-                        if self.zone_row > 0 and ws.cell_value(self.zone_row, c2) != '' and ws.cell_value(self.zone_row, c2) is not None:
-                            column = ws.cell_value(self.zone_row, c2).replace('\n',' ') + '.' + column
+                        column = ws.column_name(c2)
                         if column == col:
                             data.append(0.)
                             labels.append(column)
                             colors.append(self.set_colour(labels[-1]))
                             tot_rows = 0
-                            for s in range(len(strt_row)):
-                                for row in range(strt_row[s] + 1, strt_row[s] + todo_rows[s] + 1):
-                                    try:
-                                        data[-1] = data[-1] + ws.cell_value(row, c2)
-                                    except:
-                                        break # part period
+                            data[-1] = float(ws.period_sums(c2, strt_row, todo_rows, 1)[0]) # stops at a part period
                             break
                 tot = sum(data)
                 if self.pie_group is not None:
@@ -3326,57 +3257,25 @@ class PowerPlot(QtWidgets.QWidget):
                     plt.grid(axis=gridtype)
                 hm2 = plt.subplot(111)
                 plt.title(titl, fontdict=self.fontprops['Title'])
-                hmdata = []
                 days = int(sum(todo_rows) / self.interval)
-                for hr in range(self.interval):
-                    hmdata.append([])
-                    for dy in range(days):
-                        hmdata[-1].append(0)
+                hmdata = np.zeros((self.interval, days))
                 for c2 in range(2, ws.ncols):
-                    try:
-                        column = ws.cell_value(self.toprow[0], c2).replace('\n',' ')
-                    except:
-                        column = str(ws.cell_value(self.toprow[0], c2))
-                    if self.zone_row > 0 and ws.cell_value(self.zone_row, c2) != '' and ws.cell_value(self.zone_row, c2) is not None:
-                        column = ws.cell_value(self.zone_row, c2).replace('\n',' ') + '.' + column
+                    column = ws.column_name(c2)
                     if column == self.target:
                         tgt_col = c2
                 for c in range(self.order.count() -1, -1, -1):
                     col = self.order.item(c).text()
                     for c2 in range(2, ws.ncols):
-                        try:
-                            column = ws.cell_value(self.toprow[0], c2).replace('\n',' ')
-                        except:
-                            column = str(ws.cell_value(self.toprow[0], c2))
-                        if self.zone_row > 0 and ws.cell_value(self.zone_row, c2) != '' and ws.cell_value(self.zone_row, c2) is not None:
-                            column = ws.cell_value(self.zone_row, c2).replace('\n',' ') + '.' + column
+                        column = ws.column_name(c2)
                         if column == col:
-                            dy = 0
-                            hr = -1
-                            for s in range(len(strt_row)):
-                                for row in range(strt_row[s] + 1, strt_row[s] + todo_rows[s] + 1):
-                                    hr += 1
-                                    if hr > self.interval - 1:
-                                        dy += 1
-                                        hr = 0
-                                    try:
-                                        hmdata[hr][dy] += ws.cell_value(row, c2)
-                                    except:
-                                        pass
+                            values = ws.day_hours(c2, strt_row, todo_rows, self.interval)[:, :days]
+                            hmdata += np.where(np.isnan(values), 0., values) # cells that aren't numbers are skipped
                             break
                 if tgt_col >= 0:
-                    dy = 0
-                    hr = -1
-                    for s in range(len(strt_row)):
-                        for row in range(strt_row[s] + 1, strt_row[s] + todo_rows[s] + 1):
-                            hr += 1
-                            if hr > self.interval - 1:
-                                dy += 1
-                                hr = 0
-                            try:
-                                hmdata[hr][dy] = hmdata[hr][dy] / ws.cell_value(row, tgt_col)
-                            except:
-                                pass
+                    load = ws.day_hours(tgt_col, strt_row, todo_rows, self.interval)[:, :days]
+                    divide = ~np.isnan(load) & (load != 0)
+                    hmdata[divide] = hmdata[divide] / load[divide]
+                hmdata = hmdata.tolist()
                 miny = 999999
                 maxy = 0
                 tgap = 0
@@ -3480,12 +3379,7 @@ class PowerPlot(QtWidgets.QWidget):
                 hs.append(h)
             x = hs[:]
             for c2 in range(2, ws.ncols):
-                try:
-                    column = ws.cell_value(self.toprow[0], c2).replace('\n',' ')
-                except:
-                    column = str(ws.cell_value(self.toprow[0], c2))
-                if self.zone_row > 0 and ws.cell_value(self.zone_row, c2) != '' and ws.cell_value(self.zone_row, c2) is not None:
-                    column = ws.cell_value(self.zone_row, c2).replace('\n',' ') + '.' + column
+                column = ws.column_name(c2)
                 if column == self.target:
                     tgt_col = c2
                 for o in range(self.no_of_overlays):
@@ -3503,28 +3397,13 @@ class PowerPlot(QtWidgets.QWidget):
                                 continue
                         except:
                             pass
-                        try:
-                            column = ws.cell_value(self.toprow[0], c2).replace('\n',' ')
-                        except:
-                            column = str(ws.cell_value(self.toprow[0], c2))
-                        if self.zone_row > 0 and ws.cell_value(self.zone_row, c2) != '' and ws.cell_value(self.zone_row, c2) is not None:
-                            column = ws.cell_value(self.zone_row, c2).replace('\n',' ') + '.' + column
+                        column = ws.column_name(c2)
                         if column == col:
                             data.append([])
                             data[-1] = [0] * len(hs)
                             label.append(column)
-                            tot_rows = 0
-                            for s in range(len(strt_row)):
-                                h = 0
-                                for row in range(strt_row[s] + 1, strt_row[s] + todo_rows[s] + 1):
-                                    try:
-                                        data[-1][h] = data[-1][h] + ws.cell_value(row, c2)
-                                    except:
-                                        break # part period
-                                    h += 1
-                                    if h >= self.interval:
-                                        h = 0
-                                tot_rows += todo_rows[s]
+                            data[-1] = ws.period_sums(c2, strt_row, todo_rows, self.interval).tolist() # stops at a part period
+                            tot_rows = sum(todo_rows)
                             for h in range(self.interval):
                                 data[-1][h] = data[-1][h] / (tot_rows / self.interval)
                                 maxy = max(maxy, data[-1][h])
@@ -3540,28 +3419,13 @@ class PowerPlot(QtWidgets.QWidget):
                                     continue
                             except:
                                 continue
-                            try:
-                                column = ws.cell_value(self.toprow[0], c2).replace('\n',' ')
-                            except:
-                                column = str(ws.cell_value(self.toprow[0], c2))
-                            if self.zone_row > 0 and ws.cell_value(self.zone_row, c2) != '' and ws.cell_value(self.zone_row, c2) is not None:
-                                column = ws.cell_value(self.zone_row, c2).replace('\n',' ') + '.' + column
+                            column = ws.column_name(c2)
                             if column == col:
                                 data.append([])
                                 data[-1] = [0] * len(hs)
                                 label.append(self.short_legend + column + ' ' + breakdown)
-                                tot_rows = 0
-                                for s in range(len(strt_row)):
-                                    h = 0
-                                    for row in range(strt_row[s] + 1, strt_row[s] + todo_rows[s] + 1):
-                                        try:
-                                            data[-1][h] = data[-1][h] + ws.cell_value(row, c2)
-                                        except:
-                                            break # part period
-                                        h += 1
-                                        if h >= self.interval:
-                                            h = 0
-                                    tot_rows += todo_rows[s]
+                                data[-1] = ws.period_sums(c2, strt_row, todo_rows, self.interval).tolist() # stops at a part period
+                                tot_rows = sum(todo_rows)
                                 for h in range(self.interval):
                                     data[-1][h] = data[-1][h] / (tot_rows / self.interval)
                                     maxy = max(maxy, data[-1][h])
@@ -3571,28 +3435,13 @@ class PowerPlot(QtWidgets.QWidget):
                 for c in range(self.order.count() -1, -1, -1):
                     col = self.order.item(c).text()
                     for c2 in range(2, ws.ncols):
-                        try:
-                            column = ws.cell_value(self.toprow[0], c2).replace('\n',' ')
-                        except:
-                            column = str(ws.cell_value(self.toprow[0], c2))
-                        if self.zone_row > 0 and ws.cell_value(self.zone_row, c2) != '' and ws.cell_value(self.zone_row, c2) is not None:
-                            column = ws.cell_value(self.zone_row, c2).replace('\n',' ') + '.' + column
+                        column = ws.column_name(c2)
                         if column == col:
                             data.append([])
                             data[-1] = [0] * len(hs)
                             label.append(column)
-                            tot_rows = 0
-                            for s in range(len(strt_row)):
-                                h = 0
-                                for row in range(strt_row[s] + 1, strt_row[s] + todo_rows[s] + 1):
-                                    try:
-                                        data[-1][h] = data[-1][h] + ws.cell_value(row, c2)
-                                    except:
-                                        break # part period
-                                    h += 1
-                                    if h >= self.interval:
-                                        h = 0
-                                tot_rows += todo_rows[s]
+                            data[-1] = ws.period_sums(c2, strt_row, todo_rows, self.interval).tolist() # stops at a part period
+                            tot_rows = sum(todo_rows)
                             for h in range(self.interval):
                                 data[-1][h] = data[-1][h] / (tot_rows / self.interval)
                                 maxy = max(maxy, data[-1][h])
@@ -3994,29 +3843,16 @@ class PowerPlot(QtWidgets.QWidget):
         if self.target == '<none>':
             self.log.setText('Target not set.')
             return
-        ws = self.book.sheet_by_name(isheet)
+        ws = self.plotSheet(isheet)
         if self.toprow is None:
-            tech_row = -1
-            row = 0
-            self.zone_row =  -1
-            self.breakdown_row = -1
-            while row < ws.nrows:
-                if ws.cell_value(row, 0) in ['Split', 'Breakdown']:
-                    self.breakdown_row = row
-                elif ws.cell_value(row, 0) == 'Technology':
-                    tech_row = row
-                elif ws.cell_value(row, 0) == 'Zone':
-                    self.zone_row = row
-                elif ws.cell_value(row, 0) in ['Hour', 'Interval', 'Trading Interval']:
-                    if ws.cell_value(row, 1) != 'Period':
-                        self.log.setText(isheet + ' sheet format incorrect')
-                        return
-                    if tech_row >= 0:
-                        self.toprow = [tech_row, row]
-                    else:
-                        self.toprow = [row, row]
-                    self.rows = ws.nrows - (row + 1)
-                    break
+            layout = ws.plot_layout()
+            self.toprow = layout['toprow']
+            self.zone_row = layout['zone_row']
+            self.breakdown_row = layout['breakdown_row']
+            self.rows = layout['rows']
+            if self.toprow is None:
+                self.log.setText(isheet + ' sheet format incorrect')
+                return
         try:
             year = int(ws.cell_value(self.toprow[1] + 1, 1)[:4])
             if year % 4 == 0 and year % 100 != 0 or year % 400 == 0:
@@ -4093,12 +3929,7 @@ class PowerPlot(QtWidgets.QWidget):
         total_tgt = 0
         total_data = []
         for c2 in range(2, ws.ncols):
-            try:
-                column = ws.cell_value(self.toprow[0], c2).replace('\n',' ')
-            except:
-                column = str(ws.cell_value(self.toprow[0], c2))
-            if self.zone_row > 0 and ws.cell_value(self.zone_row, c2) != '' and ws.cell_value(self.zone_row, c2) is not None:
-                column = ws.cell_value(self.zone_row, c2).replace('\n',' ') + '.' + column
+            column = ws.column_name(c2)
             if column == self.target:
                 tgt_col = c2
         if tgt_col < 0:
@@ -4150,12 +3981,7 @@ class PowerPlot(QtWidgets.QWidget):
             for c in range(self.order.count() -1, -1, -1):
                 col = self.order.item(c).text()
                 for c2 in range(2, ws.ncols):
-                    try:
-                        column = ws.cell_value(self.toprow[0], c2).replace('\n',' ')
-                    except:
-                        column = str(ws.cell_value(self.toprow[0], c2))
-                    if self.zone_row > 0 and ws.cell_value(self.zone_row, c2) != '' and ws.cell_value(self.zone_row, c2) is not None:
-                        column = ws.cell_value(self.zone_row, c2).replace('\n',' ') + '.' + column
+                    column = ws.column_name(c2)
                     if column == col:
                         data.append([])
                         total_data.append(0.)
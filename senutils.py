@@ -22,6 +22,7 @@
 import configparser  # decode .ini file
 import csv
 import math
+import numpy as np
 import openpyxl as oxl
 from openpyxl.formula import Tokenizer
 import os
@@ -29,6 +30,7 @@ try:
     import pwd
 except:
     pass
+import re
 import sys
 from PyQt5 import QtCore, QtWidgets
 import xlrd
@@ -170,6 +172,36 @@ class ListWidget(QtWidgets.QListWidget):
                 self.currentItem().setBackground(background)
 
 
+#
+# convert a csv cell to an int or float if it looks like a number (commas allowed)
+csv_int = re.compile(r'-?[0-9,]*[0-9][0-9,]*')
+csv_float = re.compile(r'-?[0-9,.]*[0-9][0-9,.]*')
+
+def csvValue(cell):
+    if csv_int.fullmatch(cell):
+        return int(cell.replace(',', ''))
+    if csv_float.fullmatch(cell):
+        try:
+            return float(cell.replace(',', ''))
+        except:
+            pass
+    return cell
+
+#
+# return a list of values as a float array; anything not a number becomes nan
+def floatArray(values):
+    try:
+        return np.array(values, dtype=np.float64)
+    except:
+        pass
+    array = np.full(len(values), np.nan)
+    for i in range(len(values)):
+        try:
+            array[i] = float(values[i])
+        except:
+            pass
+    return array
+
 # Class to support input file as .csv, .xls, or .xlsx
 class WorkBook(object):
 
@@ -191,6 +223,7 @@ class WorkBook(object):
         else:
             self._type = filetype
         self._data_only = data_only
+        self._read_only = read_only
         try:
             if self._type == 'xls':
                 self._book = xlrd.open_workbook(filename, on_demand=on_demand)
@@ -202,29 +235,17 @@ class WorkBook(object):
                 csv_file = open(filename, newline='')
                 things = csv.reader(csv_file)
                 self._sheet_names = ['n/a']
+                # distinct cell text is converted once; data files repeat a lot of values
+                values = {}
                 self._worksheet = []
                 for row in things:
                     self._worksheet.append([])
                     for cell in row:
-                        if len(cell) > 0:
-                            if cell[0] == '-':
-                                minus = '-'
-                                cell = cell[1:]
-                            else:
-                                minus = ''
-                            if cell.isdigit():
-                                 self._worksheet[-1].append(int(minus + cell))
-                            elif cell.replace(',', '').isdigit():
-                                 self._worksheet[-1].append(int(minus + cell.replace(',', '')))
-                            elif cell.replace(',', '').replace('.', '').isdigit():
-                                 try:
-                                     self._worksheet[-1].append(float(minus + cell.replace(',', '')))
-                                 except:
-                                     self._worksheet[-1].append(minus + cell)
-                            else:
-                                 self._worksheet[-1].append(minus + cell)
-                        else:
-                             self._worksheet[-1].append('')
+                        try:
+                            self._worksheet[-1].append(values[cell])
+                        except KeyError:
+                            values[cell] = csvValue(cell)
+                            self._worksheet[-1].append(values[cell])
                 csv_file.close()
                 self.nrows = len(self._worksheet)
                 self.ncols = 0
@@ -288,6 +309,8 @@ class WorkBook(object):
             elif self._type == 'xlsx' or self._type == 'xlsm':
                 self._sheet._sheet = self._book.worksheets[sheetx]
                 self._sheet.name = self._book.sheetnames[sheetx]
+                if self._read_only and self._sheet._sheet.max_row is None: # no dimensions saved
+                    self._sheet._sheet.calculate_dimension(force=True)
                 self._sheet.nrows = self._sheet._sheet.max_row
                 self._sheet.ncols = self._sheet._sheet.max_column
             elif self._type == 'ods':
@@ -368,6 +391,80 @@ class WorkBook(object):
             col -= 1
             return self.cell_value(row, col)
 
+        def _span(self, the_range, count):
+            # start and stop of a range, (start, stop) or None for all, limited to count
+            if the_range is None:
+                return 0, count
+            if isinstance(the_range, range):
+                start, stop = the_range.start, the_range.stop
+            else:
+                start, stop = the_range
+            if stop is None or stop > count:
+                stop = count
+            return max(start, 0), stop
+
+        def iter_rows(self, row_range=None, col_range=None):
+            # yield each row, as a list of values, for row_range (and columns in col_range).
+            # Missing cells are None as from cell_value
+            start_row, stop_row = self._span(row_range, self.nrows)
+            start_col, stop_col = self._span(col_range, self.ncols)
+            if start_row >= stop_row or start_col >= stop_col:
+                return
+            width = stop_col - start_col
+            if self._type == 'xls':
+                for row in range(start_row, stop_row):
+                    yield self._sheet.row_values(row, start_col, stop_col)
+            elif self._type == 'xlsx' or self._type == 'xlsm':
+                # a single pass through the sheet; streamed if the workbook is read only
+                for values in self._sheet.iter_rows(min_row=start_row + 1, max_row=stop_row,
+                                                    min_col=start_col + 1, max_col=stop_col, values_only=True):
+                    values = list(values)
+                    if len(values) < width:
+                        values.extend([None] * (width - len(values)))
+                    yield values
+            else: # ods and csv are lists of rows
+                for row in range(start_row, stop_row):
+                    values = self._sheet[row][start_col:stop_col]
+                    if len(values) < width:
+                        values.extend([None] * (width - len(values)))
+                    yield values
+
+        def column(self, col, row_range=None):
+            # values in a column as a float array; anything not a number is nan
+            start_row, stop_row = self._span(row_range, self.nrows)
+            if start_row >= stop_row:
+                return np.array([], dtype=np.float64)
+            if self._type == 'xls':
+                if col >= self.ncols:
+                    return np.full(stop_row - start_row, np.nan)
+                return floatArray(self._sheet.col_values(col, start_row, stop_row))
+            return floatArray([row[0] for row in self.iter_rows((start_row, stop_row), (col, col + 1))])
+
+        def to_array(self, row_range=None, col_range=None):
+            # a block of the sheet as a rows x columns float array; anything not a number is nan
+            start_row, stop_row = self._span(row_range, self.nrows)
+            start_col, stop_col = self._span(col_range, self.ncols)
+            if start_row >= stop_row or start_col >= stop_col:
+                return np.empty((max(stop_row - start_row, 0), max(stop_col - start_col, 0)))
+            if self._type == 'xls':
+                return np.column_stack([floatArray(self._sheet.col_values(col, start_row, stop_row))
+                                        for col in range(start_col, stop_col)])
+            rows = list(self.iter_rows((start_row, stop_row), (start_col, stop_col)))
+            try:
+                return np.array(rows, dtype=np.float64)
+            except:
+                return np.vstack([floatArray(row) for row in rows])
+
+        def header_map(self, row=0):
+            # column number for each heading in a row; the last of any duplicates
+            headers = {}
+            for values in self.iter_rows((row, row + 1)):
+                for col in range(len(values)):
+                    if values[col] is None or values[col] == '':
+                        continue
+                    headers[values[col]] = col
+            return headers
+
 #        def cell_write(self, row, col, value):
 #            if self._type == 'xls':
 #                self._sheet.write(row, col, value)
@@ -430,6 +527,49 @@ def techClean(tech, full=False):
         cleantech = cleantech.replace('REc', 'Rec')
     return cleantech
 
+#
+# find the wind speed columns in a .srw file to extrapolate to tgt_height from. Returns
+# [height, col, height0, col0, direction col] or None if the file already has the height
+def windColumns(lines, tgt_height, spread=None):
+    units = lines[3].rstrip(',\n').split(',')
+    hghts = lines[4].rstrip(',\n').split(',')
+    heights_ms = []
+    heights_dirn = []
+    for j in range(len(units)):
+        if units[j] == 'm/s':
+             heights_ms.append([int(hghts[j]), j])
+             if spread is not None:
+                 if tgt_height in range(heights_ms[-1][0] - spread, heights_ms[-1][0] + spread):
+                     return None
+             if heights_ms[-1][0] == tgt_height:
+                 return None
+        elif units[j] == 'degrees':
+             heights_dirn.append([int(hghts[j]), j])
+    heights_ms.sort(key=lambda x: x[0], reverse=True)
+    heights_dirn.sort(key=lambda x: x[0], reverse=True)
+    if float(heights_ms[1][0]) == float(heights_ms[0][0]):
+        return None
+    return [float(heights_ms[0][0]), heights_ms[0][1], float(heights_ms[1][0]), heights_ms[1][1],
+            heights_dirn[0][1]]
+
+#
+# extrapolate the hourly speeds at height and height0 to tgt_height
+def extrapolateSpeed(speed, speed0, height, height0, tgt_height, law='logarithmic'):
+    speed = np.asarray(speed, dtype=np.float64)
+    speed0 = np.asarray(speed0, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        # one-seventh power law unless speed increases with height
+        alpha = np.where((speed0 >= speed) | (speed0 <= 0), 1. / 7.,
+                         np.log(speed / speed0) / math.log(height / height0))
+        if law.lower()[0] == 'l': # law == 'logarithmic'
+            z0 = np.exp(((np.power(height0, alpha) * math.log(height)) - np.power(height, alpha) * math.log(height0)) \
+                        / (np.power(height0, alpha) - np.power(height, alpha)))
+            z0 = np.where(z0 < 1e-302, 0.03, z0)
+            speedz = np.log(tgt_height / z0) / np.log(height0 / z0) * speed0
+        else: # law == 'hellmann'
+            speedz = np.power(tgt_height / height0, alpha) * speed0
+    return np.round(speedz, 4)
+
 #
 # add another windspeed height
 def extrapolateWind(wind_file, tgt_height, law='logarithmic', replace=False, spread=None):
@@ -449,63 +589,21 @@ def extrapolateWind(wind_file, tgt_height, law='logarithmic', replace=False, spr
     lines = tf.readlines()
     tf.close()
     fst_row = 5
-    units = lines[3].rstrip(',\n').split(',')
-    hghts = lines[4].rstrip(',\n').split(',')
-    col = -1
-    heights_ms = []
-    heights_dirn = []
-    for j in range(len(units)):
-        if units[j] == 'm/s':
-             heights_ms.append([int(hghts[j]), j])
-             if spread is not None:
-                 if tgt_height in range(heights_ms[-1][0] - spread, heights_ms[-1][0] + spread):
-                     return None
-             if heights_ms[-1][0] == tgt_height:
-                 if replace:
-                     return False
-                 else:
-                     return None
-        elif units[j] == 'degrees':
-             heights_dirn.append([int(hghts[j]), j])
-    lines[2] = lines[2].rstrip(',\n') + ',Direction,Speed\n'
-    lines[3] = lines[3].rstrip(',\n') + ',degrees,m/s\n'
-    lines[4] = lines[4].rstrip(',\n') + ',' + str(tgt_height) + ',' + str(tgt_height) + '\n'
-    heights_ms.sort(key=lambda x: x[0], reverse=True)
-    heights_dirn.sort(key=lambda x: x[0], reverse=True)
-    height = float(heights_ms[0][0])
-    col = heights_ms[0][1]
-    height0 = float(heights_ms[1][0])
-    if height0 == height:
+    cols = windColumns(lines, tgt_height, spread=spread)
+    if cols is None:
         if replace:
             return False
         else:
             return None
-    col0 = heights_ms[1][1]
-    cold = heights_dirn[0][1]
-    for i in range(fst_row, len(lines)):
-        bits = lines[i].rstrip(',\n').split(',')
-        speed = float(bits[col])
-        speed0 = float(bits[col0])
-        if speed0 >= speed:
-            alpha = 1. / 7. # one-seventh power law
-        else:
-         #   alpha = (math.log(speed)-math.log(speed0))/(math.log(height)-math.log(height0))
-            alpha = math.log(speed / speed0) / math.log(height / height0)
-        z0 = math.exp(((pow(height0, alpha) * math.log(height)) - pow(height, alpha) * math.log(height0)) \
-                      / ( pow(height0, alpha) - pow(height, alpha)))
-        # z1 = math.exp(((pow(height, alpha) * math.log(height0)) - pow(height0, alpha) * math.log(height)) \
-        #               / ( pow(height, alpha) - pow(height0, alpha)))
-        if z0 < 1e-308:
-            z0 = 0.03
-        elif z0 < 1e-302:
-            print('(500)', i, wind_file, z0)
-            z0 = 0.03
-        if law.lower()[0] == 'l': # law == 'logarithmic'
-            speedz = math.log(tgt_height / z0) / math.log(height0 / z0) * speed0
-            lines[i] = lines[i].strip() + ',' + bits[cold] + ',' + str(round(speedz, 4)) + '\n'
-        else: # law == 'hellmann'
-            speeda = pow(tgt_height / height0, alpha) * speed0
-            lines[i] = lines[i].strip() + ',' + bits[cold] + ',' + str(round(speeda, 4)) + '\n'
+    height, col, height0, col0, cold = cols
+    lines[2] = lines[2].rstrip(',\n') + ',Direction,Speed\n'
+    lines[3] = lines[3].rstrip(',\n') + ',degrees,m/s\n'
+    lines[4] = lines[4].rstrip(',\n') + ',' + str(tgt_height) + ',' + str(tgt_height) + '\n'
+    rows = [line.rstrip(',\n').split(',') for line in lines[fst_row:]]
+    speedz = extrapolateSpeed([float(bits[col]) for bits in rows], [float(bits[col0]) for bits in rows],
+                              height, height0, tgt_height, law=law)
+    for i, speed in enumerate(speedz.tolist()):
+        lines[fst_row + i] = lines[fst_row + i].strip() + ',' + rows[i][cold] + ',' + str(speed) + '\n'
     if replace:
         if os.path.exists(wind_file + '~'):
             os.remove(wind_file + '~')
@@ -517,16 +615,6 @@ def extrapolateWind(wind_file, tgt_height, law='logarithmic', replace=False, spr
         return True
     else:
         return lines
-        array = [] # this doesn't work yet
-        for i in range(4):
-            bits = lines[i].split(',')
-            array.append(bits)
-        for i in range(fst_row, len(lines)):
-            bits = lines[i].split(',')
-            for j in range(len(bits)):
-                bits[j] = float(bits[j])
-            array.append(bits)
-        return array
 
 # Change default font size
 def setFontSize(app):
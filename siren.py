@@ -22,6 +22,7 @@
 import configparser   # decode .ini file
 import datetime
 from functools import partial
+import multiprocessing
 import os
 from PyQt5 import QtCore, QtGui, QtWidgets
 import shutil
@@ -911,6 +912,7 @@ class makeNew(QtWidgets.QDialog):
 
 
 if '__main__' == __name__:
+    multiprocessing.freeze_support() # spawned workers of a frozen program
     app = QtWidgets.QApplication(sys.argv)
     try:
         QtGui.QGuiApplication.setDesktopFileName('siren')
@@ -1,14 +1,16 @@
 #!/usr/bin/python
 #
 source_files = ['check_siren.py', 'colours', 'credits', 'dataview', 'dijkstra_4',
-                'displayobject', 'displaytable', 'editini', 'flexiplot', 'floaters',
-                'getera5', 'getmap', 'getmerra2', 'getmodels', 'grid', 'indexweather',
-                'inisyntax', 'makegrid', 'makeweatherfiles', 'newstation',
-                'plotweather', 'powerclasses', 'powermap', 'powermatch', 'powermodel',
-                'powerplot', 'pmtmldetail', 'sammodels', 'samrun', 'senplot3d',
-                'senutils', 'siren', 'sirenicons', 'sirensetup', 'sirenupd', 'ssc',
-                'station', 'superpower', 'towns', 'turbine', 'updateswis',
-                'viewresource', 'visualise', 'wascene', 'worldwindow', 'zoompan',
+                'displayobject', 'displaytable', 'downloader', 'editini', 'flexiplot',
+                'floaters', 'getera5', 'getmap', 'getmerra2', 'getmodels', 'grid',
+                'indexweather', 'inisyntax', 'makegrid', 'makeweatherfiles',
+                'newstation', 'plotcache', 'plotweather', 'powerclasses', 'powermap',
+                'powermatch', 'powermodel', 'powerplot', 'pmdatacache', 'pmdispatch',
+                'pmtmldetail', 'sammodels', 'samrun', 'senplot3d', 'senutils', 'siren',
+                'sirenicons', 'sirensetup', 'sirenupd', 'spatialindex', 'ssc',
+                'station', 'superpower', 'tilefetch', 'towns', 'turbine', 'updateswis',
+                'viewresource', 'visualise', 'wascene', 'weatherfile', 'worldwindow',
+                'zoompan',
                 'getfiles.ini', 'siren_default.ini',
                 'about.html', 'credits.html', 'help.html', 'SIREN_notes.html',
                 'siren_versions.csv',
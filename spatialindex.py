@@ -0,0 +1,112 @@
+#!/usr/bin/python3
+#
+#  Copyright (C) 2026 Sustainable Energy Now Inc., Angus King
+#
+#  spatialindex.py - This file is part of SIREN.
+#
+#  SIREN is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as
+#  published by the Free Software Foundation, either version 3 of
+#  the License, or (at your option) any later version.
+#
+#  SIREN is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General
+#  Public License along with SIREN.  If not, see
+#  <http://www.gnu.org/licenses/>.
+#
+# Nearest point lookups for lists of lat/lon points. Points are held as unit
+# vectors so the closest by straight line (chord) is also the closest by great
+# circle (haversine) distance. A KD-tree is used if scipy is available otherwise
+# the points are bucketed into a grid of cubes that is searched outwards.
+from math import asin, ceil, floor, sqrt
+import numpy as np
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+RADIUS = 6367 # km, as used by the haversine functions
+
+def unitVectors(lats, lons):
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    lon = np.radians(np.asarray(lons, dtype=np.float64))
+    return np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+def chordKm(chord):
+    return RADIUS * 2 * asin(min(chord / 2., 1.))
+
+
+class SpatialIndex():
+    def __init__(self, lats, lons):
+        self.points = unitVectors(lats, lons).reshape(-1, 3)
+        self.tree = None
+        self.cells = {}
+        if len(self.points) == 0:
+            return
+        if cKDTree is not None:
+            self.tree = cKDTree(self.points)
+            return
+        # points are on a surface so aim for a few points in each occupied cube
+        extent = float((self.points.max(axis=0) - self.points.min(axis=0)).max())
+        self.size = max(extent / sqrt(len(self.points)), 1e-6)
+        keys = np.floor(self.points / self.size).astype(np.int64)
+        for i, key in enumerate(map(tuple, keys.tolist())):
+            try:
+                self.cells[key].append(i)
+            except KeyError:
+                self.cells[key] = [i]
+        self.rings = int(ceil(extent / self.size)) + 1 # beyond this search everything
+
+    def __len__(self):
+        return len(self.points)
+
+    def nearest(self, lat, lon, exclude=None):
+        # return index of and distance (km) to the closest point; points where the exclude array is True are skipped
+        if len(self.points) == 0:
+            return None, None
+        point = unitVectors([lat], [lon])[0]
+        if self.tree is not None:
+            k = 1
+            while True:
+                chords, idx = self.tree.query(point, k=min(k, len(self.points)))
+                for chord, i in zip(np.atleast_1d(chords).tolist(), np.atleast_1d(idx).tolist()):
+                    if exclude is None or not exclude[i]:
+                        return int(i), chordKm(chord)
+                if k >= len(self.points):
+                    return None, None
+                k *= 4
+        cx, cy, cz = [int(floor(c / self.size)) for c in point]
+        best = None
+        best_chord = None
+        for ring in range(min(self.rings, 4)):
+            for x in range(cx - ring, cx + ring + 1):
+                for y in range(cy - ring, cy + ring + 1):
+                    for z in range(cz - ring, cz + ring + 1):
+                        if max(abs(x - cx), abs(y - cy), abs(z - cz)) != ring:
+                            continue # inner cubes already done
+                        try:
+                            cell = self.cells[(x, y, z)]
+                        except KeyError:
+                            continue
+                        for i in cell:
+                            if exclude is not None and exclude[i]:
+                                continue
+                            chord = float(np.linalg.norm(self.points[i] - point))
+                            if best is None or chord < best_chord or (chord == best_chord and i < best):
+                                best = i
+                                best_chord = chord
+            # anything further out is at least ring cubes away
+            if best is not None and best_chord <= ring * self.size:
+                return best, chordKm(best_chord)
+        # point is well away from the grid so check every point
+        chords = np.linalg.norm(self.points - point, axis=1)
+        if exclude is not None:
+            chords[exclude] = np.inf
+        best = int(np.argmin(chords))
+        if chords[best] == np.inf:
+            return None, None
+        return best, chordKm(float(chords[best]))
@@ -384,6 +384,9 @@ class Data:
         def clear(self):
                 SSCAPI.ssc_data_clear(self._data)
 
+        def unassign(self, name):
+                SSCAPI.ssc_data_unassign(self._data, name)
+
         def first(self):
                 p = SSCAPI.ssc_data_first(self._data)
                 if (p is not None) and (len(p) > 0):
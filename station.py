@@ -23,11 +23,13 @@ import csv
 import os
 import sys
 from math import radians, cos, sin, asin, sqrt, pow
+import numpy as np
 
 import configparser   # decode .ini file
 
 from getmodels import getModelFile
 from senutils import getParents, getUser, techClean, WorkBook
+from spatialindex import SpatialIndex
 
 def within_map(y, x, poly):
     n = len(poly)
@@ -241,6 +243,7 @@ class Stations:
             self.stations in locals()
         except:
             self.stations = []
+        self.index = None
         if not existing:
             return
         if os.path.exists(self.sam_file):
@@ -612,25 +615,37 @@ class Stations:
         if sam is not None:
             sam.close()
 
+    def resetIndex(self):
+        # call when stations are added, deleted, moved or changed
+        self.index = None
+
+    def stationIndex(self):
+        # SpatialIndex of the stations, built when first needed after resetIndex
+        if self.index is None:
+            self.index = [SpatialIndex([station.lat for station in self.stations],
+                                       [station.lon for station in self.stations]),
+                          np.array([station.technology[:6] == 'Fossil' for station in self.stations], dtype=bool),
+                          np.array([station.name for station in self.stations], dtype=object)]
+        return self.index
+
     def Nearest(self, lat, lon, distance=False, fossil=False, ignore=None):
-        hdr = ''
-        distnce = 999999
-        for station in self.stations:
-            if station.technology[:6] == 'Fossil' and not fossil:
-                continue
-            dist = self.haversine(lat, lon, station.lat, station.lon)
-            if dist < distnce:
-                if ignore is not None and ignore == station.name:
-                    continue
-                hdr = station.name
-                distnce = dist
-        for station in self.stations:
-            if station.name == hdr:
-                if distance:
-                    return station, distnce
-                else:
-                    return station
-        return None
+        index, fossils, names = self.stationIndex()
+        exclude = None
+        if not fossil:
+            exclude = fossils
+        if ignore is not None:
+            if exclude is None:
+                exclude = names == ignore
+            else:
+                exclude = exclude | (names == ignore)
+        i, dist = index.nearest(lat, lon, exclude=exclude)
+        if i is None:
+            return None
+        station = self.stations[i]
+        if distance:
+            return station, self.haversine(lat, lon, station.lat, station.lon)
+        else:
+            return station
 
     def Stn_Location(self, name):
         for station in self.stations:
@@ -21,24 +21,102 @@
 
 from math import asin, ceil, cos, fabs, pow, radians, sin, sqrt, floor
 import csv
+import multiprocessing
 import os
 import sys
 import ssc
 import time
-import zipfile
 import configparser  # decode .ini file
 from PyQt5 import QtCore, QtGui, QtWidgets
 
 from getmodels import getModelFile
-from senutils import getParents, getUser, techClean, extrapolateWind, WorkBook
+from senutils import getParents, getUser, techClean, WorkBook
+from spatialindex import SpatialIndex
 from powerclasses import *
 # import Station
 from turbine import Turbine
+from weatherfile import hubResource, readWeather, removeResourceFiles, resourceFile, windResourceData
 
-import tempfile # for wind extrapolate
+import tempfile # for worker folders
 
 the_days = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
 
+# weather file lookups: (folder or index file, year, type): [mtime, files, SpatialIndex]
+closest_index = {}
+
+# each worker process has its own SuperPower, and so its own ssc.API, to simulate stations
+power_worker = {}
+
+def powerInit(plots, year, temp_dir):
+    power_worker['power'] = SuperPower([], plots, year=year)
+    # a folder per worker for extracted and extrapolated weather files
+    power_worker['power'].temp_dir = f'{temp_dir}/{os.getpid()}/'
+    os.makedirs(power_worker['power'].temp_dir, exist_ok=True)
+
+def stationPower(station):
+    return power_worker['power'].getStationPower(station)
+
+
+class StationData(ssc.Data):
+    # ssc.Data that keeps the SAM defaults for a technology between stations.
+    # Variables set for a station are remembered so they can be reset for the next one
+    def __init__(self, defaults):
+        super().__init__()
+        self.defaults = defaults
+        self.assigned = set()
+        for name in self.defaults:
+            self.set_default(name)
+
+    def set_default(self, name):
+        typ, value = self.defaults[name][:2]
+        if typ == 'string':
+            ssc.Data.set_string(self, name, value)
+        elif typ == 'array':
+            ssc.Data.set_array(self, name, value)
+        elif typ == 'number':
+            ssc.Data.set_number(self, name, value)
+        elif typ == 'matrix':
+            ssc.Data.set_matrix(self, name, value)
+
+    def set_string(self, name, value):
+        self.assigned.add(name)
+        super().set_string(name, value)
+
+    def set_number(self, name, value):
+        self.assigned.add(name)
+        super().set_number(name, value)
+
+    def set_array(self, name, data):
+        self.assigned.add(name)
+        super().set_array(name, data)
+
+    def set_matrix(self, name, mat):
+        self.assigned.add(name)
+        super().set_matrix(name, mat)
+
+    def set_table(self, name, table):
+        self.assigned.add(name)
+        super().set_table(name, table)
+
+    def restore(self):
+        # put back defaults overwritten for this station
+        for name in self.assigned:
+            if name in self.defaults:
+                self.set_default(name)
+
+    def reset(self):
+        # remove the previous station's variables and put back any defaults SAM may have changed
+        for name in self.assigned:
+            if name in self.defaults:
+                self.set_default(name)
+            else:
+                self.unassign(name)
+        self.assigned = set()
+        for name, default in self.defaults.items():
+            if len(default) > 2:
+                self.set_default(name)
+
+
 class SuperPower():
     log = QtCore.pyqtSignal()
     log2 = QtCore.pyqtSignal()
@@ -64,7 +142,6 @@ class SuperPower():
         return km
 
     def find_closest(self, latitude, longitude, wind=False):
-        dist = 99999
         closest = ''
         if wind:
             filetype = ['.srw', '.srz']
@@ -77,67 +154,86 @@ class SuperPower():
             index_file = self.solar_index
             folder = self.solar_files
         if index_file == '':
-            fils = os.listdir(folder)
-            for fil in fils:
-                if fil[-4:] in filetype:
-                    bit = fil.split('_')
-                    if bit[-1][:4] == self.base_year:
-                        dist1 = self.haversine(float(bit[-3]), float(bit[-2]), latitude, longitude)
-                        if dist1 < dist:
-                            closest = fil
-                            dist = dist1
+            source = folder
         else:
+            source = index_file
+            if not os.path.exists(source):
+                source = folder + '/' + index_file
+            if not os.path.exists(source):
+                return closest
+        # the index is kept while the folder or index file is unchanged
+        key = (source, self.base_year, technology)
+        try:
+            mtime = os.stat(source).st_mtime_ns
+        except:
+            mtime = None
+        if key not in closest_index or closest_index[key][0] != mtime:
             fils = []
-            if self.default_files[technology] is None:
-                dft_file = index_file
-                if os.path.exists(dft_file):
-                    pass
-                else:
-                    dft_file = folder + '/' + index_file
-                if os.path.exists(dft_file):
-                    self.default_files[technology] = WorkBook()
-                    self.default_files[technology].open_workbook(dft_file, )
-                else:
-                    return closest
-            var = {}
-            worksheet = self.default_files[technology].sheet_by_index(0)
-            num_rows = worksheet.nrows - 1
-            num_cols = worksheet.ncols - 1
-#           get column names
-            curr_col = -1
-            while curr_col < num_cols:
-                curr_col += 1
-                var[worksheet.cell_value(0, curr_col)] = curr_col
-            curr_row = 0
-            while curr_row < num_rows:
-                curr_row += 1
-                lat = worksheet.cell_value(curr_row, var['Latitude'])
-                lon = worksheet.cell_value(curr_row, var['Longitude'])
-                fil = worksheet.cell_value(curr_row, var['Filename'])
-                fils.append([lat, lon, fil])
-            for fil in fils:
-                dist1 = self.haversine(fil[0], fil[1], latitude, longitude)
-                if dist1 < dist:
-                    closest = fil[2]
-                    dist = dist1
+            lats = []
+            lons = []
+            if index_file == '':
+                for fil in os.listdir(folder):
+                    if fil[-4:] in filetype:
+                        bit = fil.split('_')
+                        if bit[-1][:4] == self.base_year:
+                            try:
+                                lats.append(float(bit[-3]))
+                                lons.append(float(bit[-2]))
+                            except:
+                                continue
+                            fils.append(fil)
+            else:
+                self.default_files[technology] = WorkBook()
+                self.default_files[technology].open_workbook(source, )
+                var = {}
+                worksheet = self.default_files[technology].sheet_by_index(0)
+                num_rows = worksheet.nrows - 1
+                num_cols = worksheet.ncols - 1
+#               get column names
+                curr_col = -1
+                while curr_col < num_cols:
+                    curr_col += 1
+                    var[worksheet.cell_value(0, curr_col)] = curr_col
+                curr_row = 0
+                while curr_row < num_rows:
+                    curr_row += 1
+                    lats.append(worksheet.cell_value(curr_row, var['Latitude']))
+                    lons.append(worksheet.cell_value(curr_row, var['Longitude']))
+                    fils.append(worksheet.cell_value(curr_row, var['Filename']))
+            closest_index[key] = [mtime, fils, SpatialIndex(lats, lons)]
+        fils, index = closest_index[key][1:]
+        i, dist = index.nearest(latitude, longitude)
+        if i is not None:
+            closest = fils[i]
         if __name__ == '__main__':
             print(closest)
         return closest
 
-    def do_defaults(self, station):
+    def sam_technology(self, station):
         if 'PV' in station.technology:
-            technology = 'PV'
+            return 'PV'
         elif 'Wind' in station.technology:
-            technology = 'Wind'
-        else:
-            technology = station.technology
+            return 'Wind'
+        return station.technology
+
+    def get_defaults(self, technology):
+        # SAM default variables for technology as a dict of name: [type, value]
+        if technology in self.ssc_defaults:
+            return self.ssc_defaults[technology]
+        defaults = {}
+        self.ssc_defaults[technology] = defaults
+        try:
+            if self.default_files[technology] is None:
+                pass
+        except:
+            return defaults
         if self.default_files[technology] is None:
             dft_file = self.variable_files + '/' + self.defaults[technology]
             if os.path.exists(dft_file):
                 self.default_files[technology] = WorkBook()
                 self.default_files[technology].open_workbook(dft_file)
             else:
-                return
+                return defaults
         var = {}
         worksheet = self.default_files[technology].sheet_by_index(0)
         num_rows = worksheet.nrows - 1
@@ -154,22 +250,45 @@ class SuperPower():
               worksheet.cell_value(curr_row, var['TYPE']) == 'SSC_INOUT') and \
               worksheet.cell_value(curr_row, var['DEFAULT']) != '' and \
               str(worksheet.cell_value(curr_row, var['DEFAULT'])).lower() != 'input':
+                name = worksheet.cell_value(curr_row, var['NAME']).encode('utf-8')
+                default = worksheet.cell_value(curr_row, var['DEFAULT'])
                 if worksheet.cell_value(curr_row, var['DATA']) == 'SSC_STRING':
-                    self.data.set_string(worksheet.cell_value(curr_row, var['NAME']).encode('utf-8'),
-                      worksheet.cell_value(curr_row, var['DEFAULT']).encode('utf-8'))
+                    defaults[name] = ['string', default.encode('utf-8')]
                 elif worksheet.cell_value(curr_row, var['DATA']) == 'SSC_ARRAY':
-                    arry = split_array(worksheet.cell_value(curr_row, var['DEFAULT']))
-                    self.data.set_array(worksheet.cell_value(curr_row, var['NAME']).encode('utf-8'), arry)
+                    defaults[name] = ['array', split_array(default)]
                 elif worksheet.cell_value(curr_row, var['DATA']) == 'SSC_NUMBER':
-                    if isinstance(worksheet.cell_value(curr_row, var['DEFAULT']), float):
-                        self.data.set_number(worksheet.cell_value(curr_row, var['NAME']).encode('utf-8'),
-                          float(worksheet.cell_value(curr_row, var['DEFAULT'])))
+                    if isinstance(default, float):
+                        defaults[name] = ['number', float(default)]
                     else:
-                        self.data.set_number(worksheet.cell_value(curr_row, var['NAME']).encode('utf-8'),
-                          worksheet.cell_value(curr_row, int(var['DEFAULT'])))
+                        defaults[name] = ['number', default]
                 elif worksheet.cell_value(curr_row, var['DATA']) == 'SSC_MATRIX':
-                    mtrx = split_matrix(worksheet.cell_value(curr_row, var['DEFAULT']))
-                    self.data.set_matrix(worksheet.cell_value(curr_row, var['NAME']).encode('utf-8'), mtrx)
+                    defaults[name] = ['matrix', split_matrix(default)]
+                else:
+                    continue
+                if worksheet.cell_value(curr_row, var['TYPE']) == 'SSC_INOUT':
+                    defaults[name].append(True) # SAM may change it
+        return defaults
+
+    def get_data(self, station):
+        # reuse the ssc.Data for the station's technology. It holds the SAM defaults
+        # and only the variables set for the previous station are reset
+        technology = self.sam_technology(station)
+        if technology in self.ssc_data:
+            data = self.ssc_data[technology]
+            data.reset()
+        else:
+            data = StationData(self.get_defaults(technology))
+            self.ssc_data[technology] = data
+        return data
+
+    def get_module(self, modname):
+        if modname not in self.ssc_modules:
+            self.ssc_modules[modname] = ssc.Module(modname.encode('utf-8'))
+        return self.ssc_modules[modname]
+
+    def do_defaults(self, station):
+        # SAM defaults take precedence over variables set for the station
+        self.data.restore()
 
     def debug_sam(self, name, tech, module, data, status):
         data_typs = ['invalid', 'string', 'number', 'array', 'matrix', 'table']
@@ -326,6 +445,13 @@ class SuperPower():
         self.wind_hub_formula = [None, None]
         self.wind_hub_spread = [None, None]
         self.wind_law = ['l', 'l']
+        self.wind_hub_cache = False
+        try:
+            variable = config.get('Wind', 'hub_cache')
+            if variable.lower() in ['true', 'yes', 'on']:
+                self.wind_hub_cache = True
+        except:
+            pass
         try:
             self.wind_turbine_spacing[0] = int(float(config.get('Wind', 'turbine_spacing')))
         except:
@@ -555,7 +681,17 @@ class SuperPower():
                 self.debug = True
         except:
             pass
+        self.sam_workers = 1
+        try:
+            self.sam_workers = int(config.get('Power', 'sam_workers'))
+            if self.sam_workers <= 0:
+                self.sam_workers = os.cpu_count()
+        except:
+            pass
         self.gen_pct = None
+        self.ssc_defaults = {} # technology: SAM default variables
+        self.ssc_data = {} # technology: StationData
+        self.ssc_modules = {} # module name: ssc.Module
         ssc_api = ssc.API()
 # to supress messages
         if not self.expert:
@@ -614,96 +750,150 @@ class SuperPower():
             elif len(to_do) >= self.progress_bar:
                 show_progress = True
                 self.progress.barRange(0, len(to_do))
-        for st in range(len(to_do)):
-  #      for st in range(len(self.stations)):
-            stn = self.stations[to_do[st]]
-            if show_progress:
-                try:
-                    self.progress.barProgress(st, 'Processing ' + stn.name + ' (' + stn.technology + ')')
-                    QtWidgets.QApplication.processEvents()
-                    if not self.progress.be_open:
+        pool = None
+        if self.sam_workers > 1 and len(to_do) > 1:
+            pool, work_dir = self.startWorkers(min(self.sam_workers, len(to_do)))
+        try:
+            if pool is None:
+                powers = (self.getStationPower(self.stations[st]) for st in to_do)
+            else: # stations are simulated by the workers and returned in order
+                powers = pool.imap(stationPower, [self.stations[st] for st in to_do])
+            for st in range(len(to_do)):
+      #      for st in range(len(self.stations)):
+                stn = self.stations[to_do[st]]
+                if show_progress:
+                    try:
+                        self.progress.barProgress(st, 'Processing ' + stn.name + ' (' + stn.technology + ')')
+                        QtWidgets.QApplication.processEvents()
+                        if not self.progress.be_open:
+                            break
+                    except:
                         break
-                except:
-                    break
-            if stn.technology[:6] == 'Fossil' and not self.plots['actual']:
-                continue
-            if self.plots['by_station']:
-                if stn.name not in self.selected:
+                power = next(powers)
+                if stn.technology[:6] == 'Fossil' and not self.plots['actual']:
                     continue
-            if stn.technology == 'Rooftop PV' and stn.scenario == 'Existing' \
-              and not self.plots['gross_load']:
-                continue
-            if self.plots['by_station']:
-                if stn.name not in self.selected:
+                if self.plots['by_station']:
+                    if stn.name not in self.selected:
+                        continue
+                if stn.technology == 'Rooftop PV' and stn.scenario == 'Existing' \
+                  and not self.plots['gross_load']:
                     continue
-                key = stn.name
-            else:
-                if stn.technology == 'Rooftop PV' and (stn.scenario.find('Existing') >= 0):
-                    key = 'Existing Rooftop PV'
-                else:
-                    key = stn.technology
-            if self.plots['save_zone']:
-                key = stn.zone + '.' + key
-            if self.plots['save_data'] or self.plots['financials'] or self.plots['save_detail']:
-                self.stn_outs.append(stn.name)
-                self.stn_tech.append(stn.technology)
-                self.stn_size.append(stn.capacity)
-                self.stn_pows.append([])
-                if stn.grid_len is not None:
-                    self.stn_grid.append(stn.grid_len)
+                if self.plots['by_station']:
+                    if stn.name not in self.selected:
+                        continue
+                    key = stn.name
                 else:
-                    self.stn_grid.append(0.)
-                if stn.grid_path_len is not None:
-                    self.stn_path.append(stn.grid_path_len)
-                else:
-                    self.stn_path.append(0.)
-            elif self.plots['save_tech'] or self.plots['save_match']:
-                self.stn_outs.append(stn.name)
-                self.stn_tech.append(stn.technology)
-                if self.plots['visualise']:
+                    if stn.technology == 'Rooftop PV' and (stn.scenario.find('Existing') >= 0):
+                        key = 'Existing Rooftop PV'
+                    else:
+                        key = stn.technology
+                if self.plots['save_zone']:
+                    key = stn.zone + '.' + key
+                if self.plots['save_data'] or self.plots['financials'] or self.plots['save_detail']:
+                    self.stn_outs.append(stn.name)
+                    self.stn_tech.append(stn.technology)
+                    self.stn_size.append(stn.capacity)
                     self.stn_pows.append([])
-            elif self.plots['visualise']:
-                self.stn_outs.append(stn.name)
-                self.stn_pows.append([])
-            if self.plots['save_zone']:
-                self.stn_zone.append(stn.zone)
-            power = self.getStationPower(stn)
-            total_power = 0.
-            total_energy = 0.
-            if power is None:
-                pass
-            else:
-                if key in self.ly:
+                    if stn.grid_len is not None:
+                        self.stn_grid.append(stn.grid_len)
+                    else:
+                        self.stn_grid.append(0.)
+                    if stn.grid_path_len is not None:
+                        self.stn_path.append(stn.grid_path_len)
+                    else:
+                        self.stn_path.append(0.)
+                elif self.plots['save_tech'] or self.plots['save_match']:
+                    self.stn_outs.append(stn.name)
+                    self.stn_tech.append(stn.technology)
+                    if self.plots['visualise']:
+                        self.stn_pows.append([])
+                elif self.plots['visualise']:
+                    self.stn_outs.append(stn.name)
+                    self.stn_pows.append([])
+                if self.plots['save_zone']:
+                    self.stn_zone.append(stn.zone)
+                total_power = 0.
+                total_energy = 0.
+                if power is None:
                     pass
                 else:
-                    self.ly[key] = []
-                    for i in range(len(self.x)):
-                        self.ly[key].append(0.)
-                for i in range(len(power)):
-                    if self.plots['grid_losses']:
-                        if stn.grid_path_len is not None:
-                            enrgy = power[i] * (1 - self.grid_line_loss * stn.grid_path_len - self.grid_subs_loss)
-                        else:
-                            enrgy = power[i] * (1 - self.grid_subs_loss)
-                        self.ly[key][i] += enrgy / 1000.
-                        total_energy += enrgy / 1000.
-                        self.ly['Generation'][i] += power[i] / 1000.
+                    if key in self.ly:
+                        pass
                     else:
-                        self.ly[key][i] += power[i] / 1000.
-                    total_power += power[i] / 1000.
-                    if self.plots['save_data'] or self.plots['financials'] or self.plots['save_detail'] \
-                      or self.plots['visualise']:
-                        self.stn_pows[-1].append(power[i] / 1000.)
-            if total_energy > 0:
-                pt = PowerSummary(stn.name, stn.technology, total_power, stn.capacity, total_energy)
-            else:
-                pt = PowerSummary(stn.name, stn.technology, total_power, stn.capacity)
-            if self.plots['save_zone']:
-                pt.zone = stn.zone
-            self.power_summary.append(pt)
+                        self.ly[key] = []
+                        for i in range(len(self.x)):
+                            self.ly[key].append(0.)
+                    for i in range(len(power)):
+                        if self.plots['grid_losses']:
+                            if stn.grid_path_len is not None:
+                                enrgy = power[i] * (1 - self.grid_line_loss * stn.grid_path_len - self.grid_subs_loss)
+                            else:
+                                enrgy = power[i] * (1 - self.grid_subs_loss)
+                            self.ly[key][i] += enrgy / 1000.
+                            total_energy += enrgy / 1000.
+                            self.ly['Generation'][i] += power[i] / 1000.
+                        else:
+                            self.ly[key][i] += power[i] / 1000.
+                        total_power += power[i] / 1000.
+                        if self.plots['save_data'] or self.plots['financials'] or self.plots['save_detail'] \
+                          or self.plots['visualise']:
+                            self.stn_pows[-1].append(power[i] / 1000.)
+                if total_energy > 0:
+                    pt = PowerSummary(stn.name, stn.technology, total_power, stn.capacity, total_energy)
+                else:
+                    pt = PowerSummary(stn.name, stn.technology, total_power, stn.capacity)
+                if self.plots['save_zone']:
+                    pt.zone = stn.zone
+                self.power_summary.append(pt)
+        finally:
+            if pool is not None:
+                pool.terminate() # in case the loop was stopped
+                pool.join()
+                work_dir.cleanup()
+        removeResourceFiles()
         if show_progress:
             self.progress.barProgress(-1)
 
+    def startWorkers(self, workers):
+        work_dir = tempfile.TemporaryDirectory()
+        try:
+            # spawn rather than fork a copy of the GUI
+            pool = multiprocessing.get_context('spawn').Pool(processes=workers, initializer=powerInit,
+                   initargs=(self.plots, self.base_year, work_dir.name))
+        except Exception as err:
+            work_dir.cleanup()
+            if self.status:
+                self.status.log(f'Unable to start {workers} worker processes ({err}); continuing with one')
+            return None, None
+        if self.status:
+            self.status.log(f'Using {workers} worker processes')
+        return pool, work_dir
+
+    def windResource(self, wind_file, hub_hght, wtyp):
+        # the wind file with speeds extrapolated to hub_hght as a table for SAM's wind_resource_data
+        # or None if the file has speeds at (or within hub_spread of) that height
+        if hub_hght < 50:
+            return None
+        hub = hubResource(wind_file, hub_hght, law=self.wind_law[wtyp], spread=self.wind_hub_spread[wtyp],
+                          disk=self.wind_hub_cache)
+        if hub is None:
+            return None
+        return self.resourceTable(hub)
+
+    def resourceTable(self, hub):
+        # a hub resource, or a wind file's resource data, as an ssc table
+        table = ssc.Data()
+        bits = hub['header'][0].split(',')
+        for name, i in [(b'year', 4), (b'lat', 5), (b'lon', 6), (b'elev', 7)]:
+            try:
+                table.set_number(name, float(bits[i]))
+            except:
+                pass
+        table.set_array(b'heights', hub['heights'])
+        table.set_array(b'fields', hub['fields'])
+        table.set_matrix(b'data', hub['data'].tolist())
+        return table
+
     def getStationPower(self, station):
         def do_module(modname, station, field):
             if self.debug and self.status:
@@ -711,7 +901,7 @@ class SuperPower():
                 clock_start = time.time()
             else:
                 do_time = False
-            module = ssc.Module(modname.encode('utf-8'))
+            module = self.get_module(modname)
             if do_time:
                 time2 = time.time() - clock_start
                 self.status.log('Load (%.6f seconds)' % (time2))
@@ -725,7 +915,6 @@ class SuperPower():
                 if do_time:
                     time4 = time.time() - clock_start - time2 - time3
                     self.status.log('Get data (%.6f seconds)' % (time4))
-                del module
                 return farmpwr
             else:
                 if self.status:
@@ -739,7 +928,6 @@ class SuperPower():
                         print(modname + ' error [', idx, ' ]: ', msg.decode())
                     idx += 1
                     msg = module.log(idx)
-                del module
                 return None
         if self.plots['actual'] and self.actual_power != '':
             if self.default_files['actual'] is None:
@@ -782,11 +970,9 @@ class SuperPower():
         if self.status:
             self.status.log('Processing ' + station.name + ' (' + station.technology + ')')
             QtWidgets.QApplication.processEvents()
-        self.data = None
-        self.data = ssc.Data()
+        self.data = self.get_data(station)
         farmpwr = [] # just in case
         if 'Wind' in station.technology:
-            temp_wind = None
             if 'Off' in station.technology: # offshore?
                 wtyp = 1
             else:
@@ -795,17 +981,6 @@ class SuperPower():
             turbine = Turbine(station.turbine)
             if not hasattr(turbine, 'capacity'):
                 return None
-            if closest[-4:] == '.srz':
-                if self.temp_dir is None:
-                    self.temp_dir = tempfile.gettempdir() + '/'
-                zf = zipfile.ZipFile(self.wind_files + '/' + closest, 'r')
-                for zi in zf.infolist():
-                    zf.extract(zi, self.temp_dir)
-                    wind_file = f'{self.temp_dir}{zi.filename}'
-                    temp_wind = wind_file
-                    break
-            else:
-                wind_file = self.wind_files + '/' + closest
             hub_hght = 0
             if self.wind_hub_formula[wtyp] is not None: # if a hub height is specified
                 formula = self.wind_hub_formula[wtyp].replace('rotor', str(turbine.rotor))
@@ -813,23 +988,22 @@ class SuperPower():
                     hub_hght = eval(formula)
                 except:
                     pass
-            temp_file = None
+            wind_table = None
             if hub_hght > 0: # if a hub height is specified
                 try:
-                    wind_data = extrapolateWind(wind_file, hub_hght, law=self.wind_law[wtyp],
-                                spread=self.wind_hub_spread[wtyp])
-                    if wind_data is not None:
-                        if self.temp_dir is None:
-                            self.temp_dir = tempfile.gettempdir() + '/'
-                        temp_file = 'windfile.srw'
-                        wf = open(self.temp_dir + temp_file, 'w')
-                        for line in wind_data:
-                            wf.write(line)
-                        wf.close()
-                        wind_file = self.temp_dir + temp_file
+                    wind_table = self.windResource(self.wind_files + '/' + closest, hub_hght, wtyp)
                 except:
                     pass
-            self.data.set_string(b'wind_resource_filename', wind_file.encode('utf-8'))
+            if wind_table is None and closest[-4:] == '.srz': # pass a zipped file's data rather than a copy
+                try:
+                    wind_table = self.resourceTable(windResourceData(self.wind_files + '/' + closest))
+                except:
+                    pass
+            if wind_table is None:
+                wind_file = resourceFile(self.wind_files + '/' + closest, self.temp_dir)
+                self.data.set_string(b'wind_resource_filename', wind_file.encode('utf-8'))
+            else: # pass the extrapolated data rather than a file
+                self.data.set_table(b'wind_resource_data', wind_table.get_data_handle())
             no_turbines = int(station.no_turbines)
             if station.scenario == 'Existing' and (no_turbines * turbine.capacity) != (station.capacity * 1000):
                 loss = round(1. - (station.capacity * 1000) / (no_turbines * turbine.capacity), 2)
@@ -871,31 +1045,10 @@ class SuperPower():
                     self.data.set_number(b'wind_turbine_hub_ht', hub_hght)
             self.do_defaults(station)
             farmpwr = do_module('windpower', station, 'gen')
-            if temp_file is not None: # if a hub height is specified
-                try:
-                    os.remove(self.temp_dir + temp_file)
-                except:
-                    pass
-            if temp_wind is not None: # from a zipped file
-                try:
-                    os.remove(self.temp_dir + temp_wind)
-                except:
-                    pass
             return farmpwr
         elif station.technology == 'CST':
-            temp_solar = None
             closest = self.find_closest(station.lat, station.lon)
-            if closest[-4:] == '.smz':
-                if self.temp_dir is None:
-                    self.temp_dir = tempfile.gettempdir() + '/'
-                zf = zipfile.ZipFile(self.solar_files + '/' + closest, 'r')
-                for zi in zf.infolist():
-                    zf.extract(zi, self.temp_dir)
-                    solar_file = f'{self.temp_dir}{zi.filename}'
-                    temp_solar = solar_file
-                    break
-            else:
-                solar_file = self.solar_files + '/' + closest
+            solar_file = resourceFile(self.solar_files + '/' + closest, self.temp_dir)
             base_capacity = 104.
             self.data.set_string(b'file_name', solar_file.encode('utf-8'))
             self.data.set_number(b'system_capacity', int(base_capacity * 1000))
@@ -935,26 +1088,10 @@ class SuperPower():
                 if station.capacity != base_capacity:
                     for i in range(len(farmpwr)):
                         farmpwr[i] = farmpwr[i] * station.capacity / float(base_capacity)
-            if temp_solar is not None: # from a zipped file
-                try:
-                    os.remove(self.temp_dir + temp_solar)
-                except:
-                    pass
             return farmpwr
         elif station.technology == 'Solar Thermal':
-            temp_solar = None
             closest = self.find_closest(station.lat, station.lon)
-            if closest[-4:] == '.smz':
-                if self.temp_dir is None:
-                    self.temp_dir = tempfile.gettempdir() + '/'
-                zf = zipfile.ZipFile(self.solar_files + '/' + closest, 'r')
-                for zi in zf.infolist():
-                    zf.extract(zi, self.temp_dir)
-                    solar_file = f'{self.temp_dir}{zi.filename}'
-                    temp_solar = solar_file
-                    break
-            else:
-                solar_file = self.solar_files + '/' + closest
+            solar_file = resourceFile(self.solar_files + '/' + closest, self.temp_dir)
             base_capacity = 104
             self.data.set_string(b'solar_resource_file', solar_file.encode('utf-8'))
             self.data.set_number(b'system_capacity', base_capacity * 1000)
@@ -1004,26 +1141,10 @@ class SuperPower():
                 if station.capacity != base_capacity:
                     for i in range(len(farmpwr)):
                         farmpwr[i] = farmpwr[i] * station.capacity / float(base_capacity)
-            if temp_solar is not None: # from a zipped file
-                try:
-                    os.remove(self.temp_dir + temp_solar)
-                except:
-                    pass
             return farmpwr
         elif 'PV' in station.technology:
-            temp_solar = None
             closest = self.find_closest(station.lat, station.lon)
-            if closest[-4:] == '.smz':
-                if self.temp_dir is None:
-                    self.temp_dir = tempfile.gettempdir() + '/'
-                zf = zipfile.ZipFile(self.solar_files + '/' + closest, 'r')
-                for zi in zf.infolist():
-                    zf.extract(zi, self.temp_dir)
-                    solar_file = f'{self.temp_dir}{zi.filename}'
-                    temp_solar = solar_file
-                    break
-            else:
-                solar_file = self.solar_files + '/' + closest
+            solar_file = resourceFile(self.solar_files + '/' + closest, self.temp_dir)
             self.data.set_string(b'solar_resource_file', solar_file.encode('utf-8'))
             dc_ac_ratio = self.pv_dc_ac_ratio[0]
             if station.technology[:5] == 'Fixed':
@@ -1070,26 +1191,10 @@ class SuperPower():
             self.data.set_number(b'losses', self.pv_losses)
             self.do_defaults(station)
             farmpwr = do_module('pvwattsv5', station, 'gen')
-            if temp_solar is not None: # from a zipped file
-                try:
-                    os.remove(self.temp_dir + temp_solar)
-                except:
-                    pass
             return farmpwr
         elif station.technology == 'Biomass':
-            temp_solar = None
             closest = self.find_closest(station.lat, station.lon)
-            if closest[-4:] == '.smz':
-                if self.temp_dir is None:
-                    self.temp_dir = tempfile.gettempdir() + '/'
-                zf = zipfile.ZipFile(self.solar_files + '/' + closest, 'r')
-                for zi in zf.infolist():
-                    zf.extract(zi, self.temp_dir)
-                    solar_file = f'{self.temp_dir}{zi.filename}'
-                    temp_solar = solar_file
-                    break
-            else:
-                solar_file = self.solar_files + '/' + closest
+            solar_file = resourceFile(self.solar_files + '/' + closest, self.temp_dir)
             self.data.set_string(b'file_name', solar_file.encode('utf-8'))
             self.data.set_number(b'system_capacity', station.capacity * 1000)
             self.data.set_number(b'biopwr.plant.nameplate', station.capacity * 1000)
@@ -1100,26 +1205,10 @@ class SuperPower():
             self.data.set_number(b'biopwr.feedstock.total_c', feedstock * carbon_pct / 100.)
             self.do_defaults(station)
             farmpwr = do_module('biomass', station, 'gen')
-            if temp_solar is not None: # from a zipped file
-                try:
-                    os.remove(self.temp_dir + temp_solar)
-                except:
-                    pass
             return farmpwr
         elif station.technology == 'Geothermal':
-            temp_solar = None
             closest = self.find_closest(station.lat, station.lon)
-            if closest[-4:] == '.smz':
-                if self.temp_dir is None:
-                    self.temp_dir = tempfile.gettempdir() + '/'
-                zf = zipfile.ZipFile(self.solar_files + '/' + closest, 'r')
-                for zi in zf.infolist():
-                    zf.extract(zi, self.temp_dir)
-                    solar_file = f'{self.temp_dir}{zi.filename}'
-                    temp_solar = solar_file
-                    break
-            else:
-                solar_file = self.solar_files + '/' + closest
+            solar_file = resourceFile(self.solar_files + '/' + closest, self.temp_dir)
             self.data.set_string(b'file_name', solar_file.encode('utf-8'))
             self.data.set_number(b'nameplate', station.capacity * 1000)
             self.data.set_number(b'resource_potential', station.capacity * 10.)
@@ -1127,11 +1216,6 @@ class SuperPower():
             self.data.set_string(b'hybrid_dispatch_schedule', ('1' * 24 * 12).encode('utf-8'))
             self.do_defaults(station)
             pwr = do_module('geothermal', station, 'monthly_energy')
-            if temp_solar is not None: # from a zipped file
-                try:
-                    os.remove(self.temp_dir + temp_solar)
-                except:
-                    pass
             if pwr is not None:
                 farmpwr = []
                 for i in range(12):
@@ -1168,21 +1252,18 @@ class SuperPower():
             return farmpwr
         elif station.technology == 'Wave':   # fudge Wave using 10m wind speed
             closest = self.find_closest(station.lat, station.lon)
-            tf = open(self.solar_files + '/' + closest, 'r')
-            lines = tf.readlines()
-            tf.close()
-            fst_row = len(lines) - 8760
+            weather = readWeather(self.solar_files + '/' + closest)
+            fst_row = len(weather.lines) - 8760
             wnd_col = 4
-            for i in range(fst_row, len(lines)):
-                bits = lines[i].split(',')
-                if float(bits[wnd_col]) == 0:
+            for wind in weather.column(wnd_col, fst_row).tolist():
+                if wind == 0:
                     farmpwr.append(0.)
                 else:
-                    wave_height = 0.0070104 * pow(float(bits[wnd_col]) * 1.94384, 2)   # 0.023 * 0.3048 = 0.0070104 ft to metres
+                    wave_height = 0.0070104 * pow(wind * 1.94384, 2)   # 0.023 * 0.3048 = 0.0070104 ft to metres
                     if self.wave_cutout > 0 and wave_height > self.wave_cutout:
                         farmpwr.append(0.)
                     else:
-                        wave_period = 0.45 * float(bits[wnd_col]) * 1.94384
+                        wave_period = 0.45 * wind * 1.94384
                         wave_pwr = pow(wave_height, 2) * wave_period * self.wave_efficiency
                         if wave_pwr > 1.:
                             wave_pwr = 1.
@@ -1204,23 +1285,10 @@ class SuperPower():
                 for key, value in props:
                     propty[key] = value
                 closest = self.find_closest(station.lat, station.lon)
-                if closest[-4:] == '.smz':
-                    if self.temp_dir is None:
-                        self.temp_dir = tempfile.gettempdir() + '/'
-                    zf = zipfile.ZipFile(self.solar_files + '/' + closest, 'r')
-                    for zi in zf.infolist():
-                        zf.extract(zi, self.temp_dir)
-                        tf = open(f'{self.temp_dir}{zi.filename}', 'r')
-                        lines = tf.readlines()
-                        tf.close()
-                        os.remove(f'{self.temp_dir}{zi.filename}')
-                        break
-                else:
-                    tf = open(self.solar_files + '/' + closest, 'r')
-                    lines = tf.readlines()
-                    tf.close()
+                weather = readWeather(self.solar_files + '/' + closest)
+                lines = weather.lines
                 fst_row = len(lines) - 8760
-                if closest[-4:] == '.smw':
+                if closest[-4:] == '.smw' or closest[-4:] == '.smz':
                     dhi_col = 9
                     dni_col = 8
                     ghi_col = 7
@@ -1252,20 +1320,8 @@ class SuperPower():
                 propty['formula'] = formula
                 if formula.find('wind50') >= 0:
                     closest = self.find_closest(station.lat, station.lon, wind=True)
-                    if closest[-4:] == '.srz':
-                        if self.temp_dir is None:
-                            self.temp_dir = tempfile.gettempdir() + '/'
-                        zf = zipfile.ZipFile(self.wind_files + '/' + closest, 'r')
-                        for zi in zf.infolist():
-                            zf.extract(zi, self.temp_dir)
-                            lines = tf.readlines()
-                            tf.close()
-                            os.remove(f'{self.temp_dir}{zi.filename}')
-                            break
-                    else:
-                        tf = open(self.wind_files + '/' + closest, 'r')
-                        wlines = tf.readlines()
-                        tf.close()
+                    wweather = readWeather(self.wind_files + '/' + closest)
+                    wlines = wweather.lines
                     if closest[-4:] == '.srw' or closest[-4:] == '.srz':
                         units = wlines[3].strip().split(',')
                         heights = wlines[4].strip().split(',')
@@ -1275,27 +1331,27 @@ class SuperPower():
                                    wnd50_col = j
                                    break
                     fst_wrow = len(wlines) - 8760
-                    wnd50_row = fst_wrow - fst_row
                     wnd50 = True
-                for i in range(fst_row, len(lines)):
-                    bits = lines[i].strip().split(',')
-                    if wnd50:
-                        bits2 = wlines[i + wnd50_row].strip().split(',')
-                    formulb = propty['formula'].lower().split()
+                formulb = propty['formula'].lower().split()
+                # the hourly values of the columns the formula uses
+                values = {}
+                if 'dhi' in formulb:
+                    values['dhi'] = weather.column(dhi_col, fst_row).tolist()
+                if 'dni' in formulb:
+                    values['dni'] = weather.column(dni_col, fst_row).tolist()
+                if 'ghi' in formulb:
+                    values['ghi'] = weather.column(ghi_col, fst_row).tolist()
+                if 'temp' in formulb:
+                    values['temp'] = weather.column(tmp_col, fst_row).tolist()
+                if 'wind' in formulb:
+                    values['wind'] = weather.column(wnd_col, fst_row).tolist()
+                if wnd50 and 'wind50' in formulb:
+                    values['wind50'] = wweather.column(wnd50_col, fst_wrow).tolist()
+                for i in range(len(lines) - fst_row):
                     formula = ''
                     for form in formulb:
-                        if form == 'dhi':
-                            formula += bits[dhi_col]
-                        elif form == 'dni':
-                            formula += bits[dni_col]
-                        elif form == 'ghi':
-                            formula += bits[ghi_col]
-                        elif form == 'temp':
-                            formula += bits[tmp_col]
-                        elif form == 'wind':
-                            formula += bits[wnd_col]
-                        elif form == 'wind50':
-                            formula += bits2[wnd50_col]
+                        if form in values:
+                            formula += str(values[form][i])
                         else:
                             for key in list(propty.keys()):
                                 if form == key:
@@ -0,0 +1,228 @@
+#!/usr/bin/python3
+#
+#  Copyright (C) 2026 Sustainable Energy Now Inc., Angus King
+#
+#  tilefetch.py - This file is part of SIREN.
+#
+#  SIREN is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as
+#  published by the Free Software Foundation, either version 3 of
+#  the License, or (at your option) any later version.
+#
+#  SIREN is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General
+#  Public License along with SIREN.  If not, see
+#  <http://www.gnu.org/licenses/>.
+#
+# Map tile fetcher for getmap. Tiles are requested through one connection pool
+# by a few worker threads, taking the servers in a template's [abc] in turn.
+# Tiles retrieved are kept in a cache folder, under a hash of the url template
+# then zoom and x_y, and are used until they're more than max_age days old.
+# When the fetcher is closed the cache is pruned of tiles past max_age and then
+# of the oldest tiles until it's within max_mb.
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from urllib3 import PoolManager
+
+TILE_WORKERS = 2 # tile servers generally ask for few connections
+TILE_DAYS = 30
+TILE_MB = 500
+TILE_TIMEOUT = 30 # seconds
+
+def defaultCacheDir():
+    return os.path.join(tempfile.gettempdir(), 'siren_tiles')
+
+
+class TileFetcher():
+    def __init__(self, url_template, cache_dir=None, max_age=TILE_DAYS, workers=TILE_WORKERS, headers=None,
+                 debug=False, max_mb=TILE_MB, timeout=TILE_TIMEOUT):
+        self.template = url_template
+        self.debug = debug
+        url = url_template
+        i = url.find('//')
+        if i >= 0:
+            self.scheme = url[:i + 2]
+            url = url[i + 2:]
+        else:
+            self.scheme = ''
+        i = url.find('/')
+        if i < 0:
+            i = len(url)
+        self.url_tail = url[i:]
+        self.url = url[:i]
+        self.subs = []
+        i = self.url.find('[')
+        if i >= 0:
+            j = self.url.find(']', i)
+            if j > 0:
+                for k in range(i + 1, j):
+                    self.subs.append(self.url[k])
+                self.url = self.url[:i + 1] + self.url[j:]
+        self.sub_ctr = -1
+        self.workers = max(int(workers), 1)
+        self.http = PoolManager(num_pools=len(self.subs) + 1, maxsize=self.workers, headers=headers)
+        if cache_dir is None:
+            cache_dir = defaultCacheDir()
+        if cache_dir == '':
+            self.cache_root = None
+            self.cache_dir = None
+        else:
+            self.cache_root = cache_dir
+            self.cache_dir = os.path.join(cache_dir, hashlib.sha1(url_template.encode()).hexdigest()[:16])
+        self.max_age = float(max_age) * 86400
+        self.max_bytes = float(max_mb) * 1024 * 1024
+        self.timeout = float(timeout)
+
+    def nextSub(self):
+        if len(self.subs) == 0:
+            return None
+        self.sub_ctr += 1
+        if self.sub_ctr >= len(self.subs):
+            self.sub_ctr = 0
+        return self.subs[self.sub_ctr]
+
+    def tileTail(self, x, y, zoom):
+        url_tail = self.url_tail.replace('/zoom', '/' + str(zoom))
+        url_tail = url_tail.replace('/x', '/' + str(x))
+        url_tail = url_tail.replace('/y', '/' + str(y))
+        return url_tail
+
+    def tileUrl(self, x, y, zoom, sub=None):
+        url = self.url
+        if sub is not None:
+            url = url.replace('[]', sub)
+        return self.scheme + url + self.tileTail(x, y, zoom)
+
+    def cacheName(self, x, y, zoom):
+        if self.cache_dir is None:
+            return None
+        return os.path.join(self.cache_dir, str(zoom), f'{x}_{y}')
+
+    def cached(self, x, y, zoom):
+        # tile from the cache if it's there and not too old
+        cache_file = self.cacheName(x, y, zoom)
+        if cache_file is None:
+            return None
+        try:
+            if time.time() - os.path.getmtime(cache_file) > self.max_age:
+                return None
+            with open(cache_file, 'rb') as tf:
+                return tf.read()
+        except:
+            return None
+
+    def saveTile(self, x, y, zoom, data):
+        cache_file = self.cacheName(x, y, zoom)
+        if cache_file is None:
+            return
+        work_file = f'{cache_file}.{threading.get_ident()}.tmp'
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            with open(work_file, 'wb') as tf:
+                tf.write(data)
+            os.replace(work_file, cache_file)
+        except:
+            try:
+                os.remove(work_file)
+            except:
+                pass
+
+    def fetch(self, x, y, zoom, sub=None):
+        # return x, y, zoom, message and the tile image data
+        data = self.cached(x, y, zoom)
+        if data is not None:
+            return x, y, zoom, 'OK', data
+        url_tail = self.tileTail(x, y, zoom)
+        if self.debug:
+            print('Retrieving ' + url_tail)
+        try:
+            response = self.http.request('GET', self.tileUrl(x, y, zoom, sub), timeout=self.timeout)
+        except Exception as err:
+            return x, y, zoom, url_tail + ' failed\n' + str(err), None
+        if response.status != 200:
+            return x, y, zoom, url_tail + ' failed\n' + str(response.status) + ' ' + str(response.reason), None
+        if self.debug:
+            print(url_tail + ' retrieved')
+        self.saveTile(x, y, zoom, response.data)
+        return x, y, zoom, 'OK', response.data
+
+    def fetchTiles(self, tiles):
+        # fetch tiles, a list of (x, y, zoom), yielding what fetch returns as each arrives.
+        # Only a few tiles are requested ahead so not many are held at once
+        tiles = iter(tiles)
+        pending = set()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            try:
+                while True:
+                    while len(pending) < self.workers * 2:
+                        try:
+                            x, y, zoom = next(tiles)
+                        except StopIteration:
+                            break
+                        pending.add(executor.submit(self.fetch, x, y, zoom, self.nextSub()))
+                    if len(pending) == 0:
+                        break
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def prune(self):
+        # remove tiles, for any template, past max_age then the oldest until within max_bytes
+        if self.cache_root is None or not os.path.isdir(self.cache_root):
+            return
+        now = time.time()
+        tiles = []
+        total = 0
+        for root, dirs, files in os.walk(self.cache_root):
+            for name in files:
+                tile_file = os.path.join(root, name)
+                try:
+                    stat = os.stat(tile_file)
+                except:
+                    continue
+                if name.endswith('.tmp'):
+                    if now - stat.st_mtime > 3600: # left by an interrupted write
+                        try:
+                            os.remove(tile_file)
+                        except:
+                            pass
+                    continue
+                if now - stat.st_mtime > self.max_age:
+                    try:
+                        os.remove(tile_file)
+                    except:
+                        pass
+                    continue
+                tiles.append((stat.st_mtime, stat.st_size, tile_file))
+                total += stat.st_size
+        if total > self.max_bytes:
+            tiles.sort()
+            for mtime, size, tile_file in tiles:
+                try:
+                    os.remove(tile_file)
+                except:
+                    continue
+                total -= size
+                if total <= self.max_bytes:
+                    break
+        for root, dirs, files in os.walk(self.cache_root, topdown=False):
+            if root != self.cache_root:
+                try:
+                    os.rmdir(root) # only if it's now empty
+                except:
+                    pass
+
+    def close(self):
+        self.http.clear()
+        self.prune()
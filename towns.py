@@ -26,6 +26,7 @@ from math import radians, cos, sin, asin, sqrt
 
 from getmodels import getModelFile
 from senutils import getParents, getUser, WorkBook
+from spatialindex import SpatialIndex
 
 
 class Town:
@@ -202,6 +203,7 @@ class Towns:
 
         self.get_config()
         self.towns = []
+        self.index = None
 #   Process BOM stations first
         if os.path.exists(self.bom_file):
             get_towns(self.bom_file)
@@ -249,21 +251,25 @@ class Towns:
                 distance = dist
         return hdr
 
+    def resetIndex(self):
+        # call when towns are added, deleted or moved
+        self.index = None
+
+    def townIndex(self):
+        # SpatialIndex of the towns, built when first needed after resetIndex
+        if self.index is None:
+            self.index = SpatialIndex([twn.lat for twn in self.towns], [twn.lon for twn in self.towns])
+        return self.index
+
     def Nearest(self, lat, lon, distance=False):
-        the_town = ''
-        distnce = 999999
-        for twn in self.towns:
-            dist = self.haversine(lat, lon, twn.lat, twn.lon)
-            if dist < distnce:
-                the_town = twn.name
-                distnce = dist
-        for twn in self.towns:
-            if twn.name == the_town:
-                if distance:
-                    return twn, distnce
-                else:
-                    return twn
-        return
+        i, dist = self.townIndex().nearest(lat, lon)
+        if i is None:
+            return
+        twn = self.towns[i]
+        if distance:
+            return twn, self.haversine(lat, lon, twn.lat, twn.lon)
+        else:
+            return twn
 
     def Stn_Location(self, lid):
         for town in self.towns:
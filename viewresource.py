@@ -19,16 +19,18 @@
 #  <http://www.gnu.org/licenses/>.
 #
 
+from collections import OrderedDict
 import os
 import sys
 import time
+import numpy as np
 from PyQt5 import QtCore, QtGui, QtWidgets
 import configparser   # decode .ini file
 
 import displayobject
 from editini import SaveIni
 from getmodels import getModelFile
-from senutils import WorkBook
+from senutils import floatArray, WorkBook
 
 
 def gradient(lo, hi, steps=10):
@@ -58,6 +60,123 @@ def rreplace(s, old, new, occurrence):
     return new.join(li)
 
 
+CUBE_CACHE = 4 # resource files
+FRAME_CACHE_BYTES = 128 * 1024 * 1024
+MAX_PIXELS = 2000000 # for an overlay image
+
+def argb(colour):
+    return 0xff000000 | int(colour[1:7], base=16)
+
+
+class ResourceCube():
+    # a resource grid file as period x lat x lon arrays, one for each variable
+    def __init__(self, worksheet):
+        self.columns = worksheet.header_map()
+        if 'Wind @ 100m' in self.columns and self.columns['Wind @ 100m'] > self.columns.get('Wind @ 50m', -1):
+            self.columns['Wind @ 50m'] = self.columns['Wind @ 100m']
+        sheet = list(worksheet.iter_rows((1, worksheet.nrows)))
+        self.limits = None # min and max rows
+        per_col = self.columns['Period']
+        if len(sheet) > 1 and sheet[0][per_col] == 'Min.' and sheet[1][per_col] == 'Max.':
+            self.limits = {}
+            for key, col in self.columns.items():
+                self.limits[key] = [sheet[0][col], sheet[1][col]]
+            sheet = sheet[2:]
+        else:
+            sheet = sheet[1:]
+        self.periods = {}
+        for row in range(len(sheet)):
+            if sheet[row][self.columns['Latitude']] is None:
+                sheet = sheet[:row]
+                break
+        lats = np.array([float(values[self.columns['Latitude']]) for values in sheet], dtype=np.float64)
+        lons = np.array([float(values[self.columns['Longitude']]) for values in sheet], dtype=np.float64)
+        per_ndx = []
+        for values in sheet:
+            period = str(values[per_col])
+            try:
+                per_ndx.append(self.periods[period])
+            except KeyError:
+                self.periods[period] = len(self.periods)
+                per_ndx.append(self.periods[period])
+        self.lats, lat_ndx = np.unique(lats, return_inverse=True)
+        self.lats = self.lats[::-1] # north to south
+        lat_ndx = len(self.lats) - 1 - lat_ndx
+        self.lons, lon_ndx = np.unique(lons, return_inverse=True)
+        self.values = {}
+        for key, col in self.columns.items():
+            if key in ['Latitude', 'Longitude', 'Period']:
+                continue
+            cube = np.full((len(self.periods), len(self.lats), len(self.lons)), np.nan)
+            cube[per_ndx, lat_ndx, lon_ndx] = floatArray([values[col] for values in sheet])
+            self.values[key] = cube
+        self.geometry = None
+
+    def layout(self, scene, coord_grid):
+        # scene position of each cell and the cell each pixel of an overlay image is in.
+        # Maps are rectangular projections so x depends on longitude and y on latitude only
+        if self.geometry is not None:
+            return self.geometry
+        def in_map(a_min, a_max, b_min, b_max):
+            return (a_min <= b_max) & (b_min <= a_max)
+        lat_cell = coord_grid[0]
+        if lat_cell == 0 and len(self.lats) > 1:
+            lat_cell = float(np.min(self.lats[:-1] - self.lats[1:]))
+        lon_cell = coord_grid[1] / 2
+        if len(self.lons) > 1:
+            lon_cell = (self.lons[1] - self.lons[0]) / 2.
+        if coord_grid[2] == 'c':
+            lat_hi = self.lats + lat_cell / 2
+            lat_lo = self.lats - lat_cell / 2
+            lon_lo = self.lons - lon_cell
+            lon_hi = self.lons + lon_cell
+            lat_in = in_map(self.lats - coord_grid[0] / 2, self.lats + coord_grid[0] / 2,
+                            scene.map_lower_right[0], scene.map_upper_left[0])
+            lon_in = in_map(self.lons - coord_grid[1] / 2, self.lons + coord_grid[1] / 2,
+                            scene.map_upper_left[1], scene.map_lower_right[1])
+        else:
+            lat_hi = self.lats
+            lat_lo = self.lats - lat_cell
+            lon_lo = self.lons
+            lon_hi = self.lons + coord_grid[1]
+            lat_in = in_map(self.lats - coord_grid[0], self.lats,
+                            scene.map_lower_right[0], scene.map_upper_left[0])
+            lon_in = in_map(self.lons, self.lons + coord_grid[1],
+                            scene.map_upper_left[1], scene.map_lower_right[1])
+        mid_lat = float(self.lats.mean())
+        mid_lon = float(self.lons.mean())
+        x_lo = np.array([scene.mapFromLonLat(QtCore.QPointF(lon, mid_lat)).x() for lon in lon_lo])
+        x_hi = np.array([scene.mapFromLonLat(QtCore.QPointF(lon, mid_lat)).x() for lon in lon_hi])
+        y_lo = np.array([scene.mapFromLonLat(QtCore.QPointF(mid_lon, lat)).y() for lat in lat_hi])
+        y_hi = np.array([scene.mapFromLonLat(QtCore.QPointF(mid_lon, lat)).y() for lat in lat_lo])
+        left = float(x_lo.min())
+        top = float(y_lo.min())
+        width = max(float(x_hi.max()) - left, 1e-6)
+        height = max(float(y_hi.max()) - top, 1e-6)
+        scale = min(1., (MAX_PIXELS / (width * height)) ** .5)
+        w = max(int(np.ceil(width * scale)), 1)
+        h = max(int(np.ceil(height * scale)), 1)
+
+        def pixelCells(lo, hi, start, size, count):
+            # cell for each pixel (-1 for none) and whether the pixel is on a cell's edge.
+            # Edges are the first pixel of each cell and the last before a gap
+            centres = start + (np.arange(count) + .5) * size / count
+            cell = np.searchsorted(lo, centres, side='right') - 1
+            cell[(cell < 0) | (centres > hi[np.maximum(cell, 0)])] = -1
+            edge = np.ones(count, dtype=bool)
+            edge[1:] = cell[1:] != cell[:-1]
+            edge[:-1] |= cell[1:] < 0
+            return cell, edge
+
+        # lons ascend with x and lats descend with y (north up)
+        col_of_x, x_edge = pixelCells(x_lo, x_hi, left, width, w)
+        row_of_y, y_edge = pixelCells(y_lo, y_hi, top, height, h)
+        self.geometry = {'in_map': lat_in[:, None] & lon_in[None, :], 'col': col_of_x, 'row': row_of_y,
+                         'edge': y_edge[:, None] | x_edge[None, :], 'pos': (left, top),
+                         'scale': (width / w, height / h), 'size': (w, h)}
+        return self.geometry
+
+
 class Resource(QtWidgets.QDialog):
     procStart = QtCore.pyqtSignal(str)
 
@@ -66,6 +185,8 @@ class Resource(QtWidgets.QDialog):
         self.year = year
         self.scene = scene
         self.resource_items = []
+        self.cubes = OrderedDict() # resource file: [modified time, ResourceCube]
+        self.frames = OrderedDict() # (file, size and time, period, variable, ...): overlay pixmap
         self.be_open = True
         self.colours = {'dhi': ['DHI (Diffuse)', '#717100', '#ffff00', None],
                         'dni': ['DNI (Normal)', '#734c00', '#ff5500', None],
@@ -642,9 +763,86 @@ class Resource(QtWidgets.QDialog):
         except:
             pass
 
+    def resourceCube(self, new_file):
+        # the resource file as a ResourceCube; the last few are kept
+        try:
+            stat = os.stat(new_file)
+        except OSError:
+            return None
+        stamp = (stat.st_size, stat.st_mtime_ns)
+        try:
+            cube = self.cubes.pop(new_file)
+            if cube[0] == stamp:
+                self.cubes[new_file] = cube
+                return cube[1]
+        except KeyError:
+            pass
+        workbook = WorkBook()
+        workbook.open_workbook(new_file, read_only=True) # rows are read in order
+        cube = ResourceCube(workbook.sheet_by_index(0))
+        workbook.close()
+        self.cubes[new_file] = [stamp, cube]
+        while len(self.cubes) > CUBE_CACHE:
+            self.cubes.popitem(last=False)
+        return cube
+
+    def resourceFrame(self, cube, period, variable, colours, steps, opacity):
+        # the resource cells for period as a colour mapped image. Edges are more opaque, as
+        # where the outlines of neighbouring cells overlap
+        geometry = cube.layout(self.scene, self.coord_grid)
+        in_map = geometry['in_map']
+        if cube.limits is None:
+            lo_valu = 99999.
+            hi_valu = 0.
+            values = cube.values[variable][:, in_map]
+            if np.isfinite(values).any():
+                lo_valu = min(lo_valu, float(np.nanmin(values)))
+                hi_valu = max(hi_valu, float(np.nanmax(values)))
+        else:
+            lo_valu, hi_valu = cube.limits[variable]
+        try:
+            values = cube.values[variable][cube.periods[period]]
+        except KeyError:
+            values = np.full((len(cube.lats), len(cube.lons)), np.nan)
+        there = in_map & np.isfinite(values)
+        values = np.where(there, values, lo_valu)
+        if steps > 0:
+            table = np.array([argb(colour) for colour in colours], dtype=np.uint32)
+            incr = (hi_valu - lo_valu) / steps
+            if incr == 0:
+                step = np.zeros(values.shape, dtype=np.int64)
+            else:
+                step = np.round((values - lo_valu) / incr).astype(np.int64)
+            pen = table[np.clip(step, -len(table), len(table) - 1)]
+        else:
+            lo_colour = np.array([int(colours[0][i * 2 + 1:i * 2 + 3], base=16) for i in range(3)], dtype=np.float64)
+            hi_colour = np.array([int(colours[-1][i * 2 + 1:i * 2 + 3], base=16) for i in range(3)], dtype=np.float64)
+            if hi_valu == lo_valu:
+                pct = np.zeros(values.shape)
+            else:
+                pct = np.clip((values - lo_valu) / (hi_valu - lo_valu), 0., 1.)
+            rgb = np.round((hi_colour - lo_colour) * pct[..., None] + lo_colour).astype(np.uint32)
+            pen = 0xff000000 | (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+        rgb = pen & 0xffffff
+        edge_alpha = np.uint32(int(round(255 * (1 - (1 - opacity) ** 2)))) << 24
+        fill_alpha = np.uint32(int(round(255 * opacity))) << 24
+        pen = np.where(there, rgb | edge_alpha, 0).astype(np.uint32)
+        if self.grid_only.isChecked():
+            fill = np.zeros(pen.shape, dtype=np.uint32)
+        else:
+            filled = there & (values >= lo_valu) & ((values > 0) | (variable == 'temp'))
+            fill = np.where(filled, rgb | fill_alpha, 0).astype(np.uint32)
+        # an extra row and column of nothing for pixels outside the cells
+        pen = np.pad(pen, ((0, 1), (0, 1)))
+        fill = np.pad(fill, ((0, 1), (0, 1)))
+        rows = geometry['row'][:, None]
+        cols = geometry['col'][None, :]
+        pixels = np.where(geometry['edge'], pen[rows, cols], fill[rows, cols]).astype(np.uint32)
+        w, h = geometry['size']
+        image = QtGui.QImage(pixels.tobytes(), w, h, w * 4, QtGui.QImage.Format_ARGB32).copy()
+        return QtGui.QPixmap.fromImage(image)
+
     def resourceGrid(self):
-        def in_map(a_min, a_max, b_min, b_max):
-            return (a_min <= b_max) and (b_min <= a_max)
         self.clear_Resource()
         for key in self.colours:
             if self.colours[key][0] == self.whatCombo.currentText():
@@ -667,123 +865,36 @@ class Resource(QtWidgets.QDialog):
         else:
             new_file = self.scene.resource_grid.replace('$YEAR$', period[:4])
         self.resource_items = []
-        if new_file != self.resource_file:
-            if os.path.exists(new_file):
-                self.resource_var = {}
-                workbook = WorkBook()
-                workbook.open_workbook(new_file)
-                self.resource_worksheet = workbook.sheet_by_index(0)
-                num_cols = self.resource_worksheet.ncols - 1
-#                get column names
-                curr_col = -1
-                while curr_col < num_cols:
-                    curr_col += 1
-                    self.resource_var[self.resource_worksheet.cell_value(0, curr_col)] = curr_col
-                    if self.resource_worksheet.cell_value(0, curr_col) == 'Wind @ 100m':
-                        self.resource_var['Wind @ 50m'] = curr_col
-                self.resource_file = new_file
-            else:
-                return
-        num_rows = self.resource_worksheet.nrows - 1
-        num_cols = self.resource_worksheet.ncols - 1
-        lo_valu = 99999.
-        hi_valu = 0.
-        calc_minmax = True
-        cells = []
-        curr_row = 1
-        if self.resource_worksheet.cell_value(curr_row, self.resource_var['Period']) == 'Min.' and \
-          self.resource_worksheet.cell_value(curr_row + 1, self.resource_var['Period']) == 'Max.':
-            calc_minmax = False
-            lo_valu = self.resource_worksheet.cell_value(curr_row, self.resource_var[variable])
-            hi_valu = self.resource_worksheet.cell_value(curr_row + 1, self.resource_var[variable])
-            curr_row += 1
-        while curr_row < num_rows:
-            curr_row += 1
-            if self.resource_worksheet.cell_value(curr_row, self.resource_var['Latitude']) is None:
-                break
-            a_lat = float(self.resource_worksheet.cell_value(curr_row, self.resource_var['Latitude']))
-            a_lon = float(self.resource_worksheet.cell_value(curr_row, self.resource_var['Longitude']))
-            in_the_map = False
-            if self.coord_grid[2] == 'c':
-                if in_map(a_lat - (self.coord_grid[0] / 2), a_lat + (self.coord_grid[0] / 2),
-                          self.scene.map_lower_right[0], self.scene.map_upper_left[0]) \
-                  and in_map(a_lon - (self.coord_grid[1] / 2), a_lon + (self.coord_grid[1] / 2),
-                             self.scene.map_upper_left[1], self.scene.map_lower_right[1]):
-                    in_the_map = True
-            else:
-                if in_map(a_lat - self.coord_grid[0], a_lat,
-                          self.scene.map_lower_right[0], self.scene.map_upper_left[0]) \
-                  and in_map(a_lon, a_lon + self.coord_grid[1],
-                             self.scene.map_upper_left[1], self.scene.map_lower_right[1]):
-                    in_the_map = True
-            if in_the_map:
-                try:
-                    if str(self.resource_worksheet.cell_value(curr_row, self.resource_var['Period'])) == period:
-                        cells.append([float(self.resource_worksheet.cell_value(curr_row, self.resource_var['Latitude'])),
-                                     float(self.resource_worksheet.cell_value(curr_row, self.resource_var['Longitude'])),
-                                     self.resource_worksheet.cell_value(curr_row, self.resource_var[variable])])
-                    if calc_minmax:
-                        if self.resource_worksheet.cell_value(curr_row, self.resource_var[variable]) < lo_valu:
-                            lo_valu = self.resource_worksheet.cell_value(curr_row, self.resource_var[variable])
-                        if self.resource_worksheet.cell_value(curr_row, self.resource_var[variable]) > hi_valu:
-                            hi_valu = self.resource_worksheet.cell_value(curr_row, self.resource_var[variable])
-                except:
-                    pass
-        if steps > 0:
-            incr = (hi_valu - lo_valu) / steps
-        else:
-            lo_colour = []
-            hi_colour = []
-            for i in range(3):
-                lo_1 = int(colours[0][i * 2 + 1:i * 2 + 3], base=16)
-                lo_colour.append(lo_1)
-                hi_1 = int(colours[-1][i * 2 + 1:i * 2 + 3], base=16)
-                hi_colour.append(hi_1)
-        lo_per = 99999.
-        hi_per = 0.
-        lons = []
-        lon_cell = self.coord_grid[1] / 2
-        for cell in cells:
-            if cell[1] not in lons:
-                lons.append(cell[1])
-        if len(lons) > 1:
-            lons = sorted(lons)
-            lon_cell = (lons[1] - lons[0]) / 2.
-            del lons
-        for cell in cells:
-            if self.coord_grid[2] == 'c':
-                p = self.scene.mapFromLonLat(QtCore.QPointF(cell[1] - lon_cell, cell[0] + self.coord_grid[0] / 2))
-                pe = self.scene.mapFromLonLat(QtCore.QPointF(cell[1] + lon_cell, cell[0] + self.coord_grid[0] / 2))
-                ps = self.scene.mapFromLonLat(QtCore.QPointF(cell[1] - lon_cell, cell[0] - self.coord_grid[0] / 2))
-            else:
-                p = self.scene.mapFromLonLat(QtCore.QPointF(cell[1], cell[0]))
-                pe = self.scene.mapFromLonLat(QtCore.QPointF(cell[1] + self.coord_grid[1], cell[0]))
-                ps = self.scene.mapFromLonLat(QtCore.QPointF(cell[1], cell[0] - self.coord_grid[0]))
-            x_d = pe.x() - p.x()
-            y_d = ps.y() - p.y()
-            self.resource_items.append(QtWidgets.QGraphicsRectItem(p.x(), p.y(), x_d, y_d))
-            if steps > 0:
-                step = int(round((cell[2] - lo_valu) / incr))
-                a_colour = QtGui.QColor(colours[step])
-            else:
-                colr = []
-                pct = (cell[2] - lo_valu) / (hi_valu - lo_valu)
-                for i in range(3):
-                    colr.append(((hi_colour[i] - lo_colour[i]) * pct + lo_colour[i]) / 255.)
-                a_colour = QtGui.QColor()
-                a_colour.setRgbF(colr[0], colr[1], colr[2])
-            if not self.grid_only.isChecked():
-                if cell[2] >= lo_valu:
-                    if cell[2] > 0 or variable == 'temp':
-                        self.resource_items[-1].setBrush(a_colour)
-            self.resource_items[-1].setPen(a_colour)
-            self.resource_items[-1].setOpacity(opacity)
-            self.resource_items[-1].setZValue(1)
-            self.scene.addItem(self.resource_items[-1])
-            if cell[2] < lo_per:
-                lo_per = cell[2]
-            if cell[2] > hi_per:
-                hi_per = cell[2]
+        if not os.path.exists(new_file):
+            return
+        cube = self.resourceCube(new_file)
+        if cube is None:
+            return
+        self.resource_file = new_file
+        if variable not in cube.values:
+            return
+        if steps == 0:
+            colours = gradient(self.colours[key][1], self.colours[key][2], 1)
+        # frames of a file that has since changed aren't used
+        key = (new_file, self.cubes[new_file][0], period, variable, steps, tuple(colours),
+               self.grid_only.isChecked(), opacity)
+        try:
+            pixmap = self.frames.pop(key)
+        except KeyError:
+            pixmap = self.resourceFrame(cube, period, variable, colours, steps, opacity)
+        self.frames[key] = pixmap
+        total = 0
+        for frame in self.frames.values():
+            total += frame.width() * frame.height() * 4
+        while total > FRAME_CACHE_BYTES and len(self.frames) > 1:
+            old_key, frame = self.frames.popitem(last=False)
+            total -= frame.width() * frame.height() * 4
+        geometry = cube.layout(self.scene, self.coord_grid)
+        self.resource_items.append(QtWidgets.QGraphicsPixmapItem(pixmap))
+        self.resource_items[-1].setPos(geometry['pos'][0], geometry['pos'][1])
+        self.resource_items[-1].setTransform(QtGui.QTransform.fromScale(geometry['scale'][0], geometry['scale'][1]))
+        self.resource_items[-1].setZValue(1)
+        self.scene.addItem(self.resource_items[-1])
         QtCore.QCoreApplication.processEvents()
         QtCore.QCoreApplication.flush()
         if self.do_loop and not self.scene.exitLoop:
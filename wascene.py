@@ -939,6 +939,7 @@ class WAScene(QtWidgets.QGraphicsScene):
                 do_them(linesa.lines, grid_lines='a', opacity=self.area_opacity)
 
     def addStation(self, st):
+        self._stations.resetIndex() # new, moved or changed station
         self._stationGroups[st.name] = []
         try:
             p = self.mapFromLonLat(QtCore.QPointF(st.lon, st.lat))
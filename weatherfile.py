@@ -0,0 +1,393 @@
+#!/usr/bin/python3
+#
+#  Copyright (C) 2026 Sustainable Energy Now Inc., Angus King
+#
+#  weatherfile.py - This file is part of SIREN.
+#
+#  SIREN is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Affero General Public License as
+#  published by the Free Software Foundation, either version 3 of
+#  the License, or (at your option) any later version.
+#
+#  SIREN is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General
+#  Public License along with SIREN.  If not, see
+#  <http://www.gnu.org/licenses/>.
+#
+# Reader for SAM weather files (.srw, .smw and .csv) and their zipped versions
+# (.srz and .smz). Zipped files are read straight from the archive rather than
+# being extracted to a temporary file. Recently read files are kept in memory,
+# least recently used first out once they use more than CACHE_BYTES, as the same
+# file is often used for a number of stations.
+# Wind resource tables with speeds extrapolated to a hub height are also kept, in
+# memory and, if asked, in a .hubcache folder in the wind weather folder, for
+# stations sharing a file. They're found from the file's size and modification
+# time so the weather file isn't read again.
+from collections import OrderedDict
+import io
+import json
+import os
+import tempfile
+import threading
+import zipfile
+import numpy as np
+from senutils import extrapolateSpeed, windColumns
+
+CACHE_BYTES = 256 * 1024 * 1024
+HUB_CACHE_BYTES = 64 * 1024 * 1024
+HUB_DISK_BYTES = 256 * 1024 * 1024
+HUB_VERSION = 2
+HOURS = 8760
+
+# names for the smw columns
+SMW_NAMES = ['temperature', 'dew_point', 'wet_bulb', 'humidity', 'wind_speed', 'wind_direction',
+             'pressure', 'ghi', 'dni', 'dhi', 'albedo', 'snow']
+
+# abspath: WeatherData
+weather_cache = OrderedDict()
+weather_bytes = 0 # total size of weather_cache
+# abspath: [size, mtime, file written for SAM]
+resource_files = {}
+# (abspath, size, mtime, height, law): hub resource
+hub_cache = OrderedDict()
+hub_bytes = 0 # total size of hub_cache
+
+# SAM wind_resource_data field for each .srw column
+wind_fields = {'temperature': 1, 'pressure': 2, 'speed': 3, 'direction': 4}
+
+
+class WeatherData():
+    def __init__(self, filename, stamp, lines):
+        self.filename = filename
+        self.stamp = stamp # [size, mtime] of the file when read
+        self.lines = lines
+        self.size = sum(len(line) for line in lines) + 56 * len(lines) # bytes used, about
+        self.cached = False # in weather_cache
+        self._data = None
+        self.lat = None
+        self.lon = None
+        self.year = None
+        if filename[-4:] in ['.srw', '.srz']:
+            self.fst_row = 5
+        elif filename[-4:] in ['.smw', '.smz']:
+            self.fst_row = 1
+        else:
+            self.fst_row = max(len(lines) - HOURS, 0)
+        try:
+            self.location()
+        except:
+            pass
+
+    def location(self):
+        bits = self.lines[0].split(',')
+        if self.filename[-4:] in ['.srw', '.srz']:
+            self.lat = float(bits[5])
+            self.lon = float(bits[6])
+            self.year = bits[4]
+        elif self.filename[-4:] in ['.smw', '.smz']:
+            self.lat = float(bits[4])
+            self.lon = float(bits[5])
+            self.year = int(bits[8])
+        elif self.fst_row < 3:
+            self.lat = float(bits[4])
+            self.lon = float(bits[5])
+        else:
+            cols = self.lines[self.fst_row - 3].strip().split(',')
+            bits = self.lines[self.fst_row - 2].strip().split(',')
+            for i in range(len(cols)):
+                if cols[i].lower() in ['latitude', 'lat']:
+                    self.lat = float(bits[i])
+                elif cols[i].lower() in ['longitude', 'lon', 'long', 'lng']:
+                    self.lon = float(bits[i])
+
+    def names(self):
+        if self.filename[-4:] in ['.srw', '.srz']:
+            cols = self.lines[2].rstrip(',\n').split(',')
+            heights = self.lines[4].rstrip(',\n').split(',')
+            names = []
+            for i in range(len(cols)):
+                try:
+                    names.append(f'{cols[i].strip().lower()}_{heights[i].strip()}')
+                except IndexError:
+                    names.append(cols[i].strip().lower())
+        elif self.filename[-4:] in ['.smw', '.smz']:
+            names = SMW_NAMES[:]
+        elif self.fst_row > 0:
+            names = [col.strip().lower() for col in self.lines[self.fst_row - 1].rstrip(',\n').split(',')]
+        else:
+            names = []
+        return names
+
+    @property
+    def data(self):
+        # the hourly values as a record array; values that aren't numbers are NaN
+        global weather_bytes
+        if self._data is None:
+            self._data = parseRows(self.lines[self.fst_row:], self.names())
+            self.size += self._data.nbytes
+            if self.cached:
+                weather_bytes += self._data.nbytes
+                trimCache()
+        return self._data
+
+    def rows(self, fst_row=None):
+        # the record array from line fst_row of the file on, as lines[fst_row:] would be
+        if fst_row is None:
+            return self.data
+        return self.data[max(fst_row - self.fst_row, 0):]
+
+    def column(self, col, fst_row=None):
+        # values of the col'th column from line fst_row of the file on
+        return self.rows(fst_row)[self.data.dtype.names[col]]
+
+    def nbytes(self):
+        return self.size
+
+
+def parseRows(lines, names):
+    rows = [line.rstrip(',\r\n').split(',') for line in lines]
+    ncols = max([len(row) for row in rows] + [0])
+    while len(names) < ncols:
+        names.append(f'col{len(names)}')
+    fields = []
+    for i, name in enumerate(names[:ncols]):
+        if name == '' or name in fields:
+            name = f'{name}_{i}' if name != '' else f'col{i}'
+        fields.append(name)
+    data = np.recarray((len(rows), ), dtype=[(name, np.float64) for name in fields])
+    for i, name in enumerate(fields):
+        try:
+            data[name] = np.array([row[i] for row in rows], dtype=np.float64)
+        except (IndexError, ValueError):
+            for r, row in enumerate(rows):
+                try:
+                    data[name][r] = float(row[i])
+                except (IndexError, ValueError):
+                    data[name][r] = np.nan
+    return data
+
+def fileStamp(filename):
+    stat = os.stat(filename)
+    return [stat.st_size, stat.st_mtime_ns]
+
+def memberLines(filename):
+    # lines of the (first) file in a zipped weather file
+    with zipfile.ZipFile(filename, 'r') as zf:
+        for zi in zf.infolist():
+            with zf.open(zi) as zm:
+                return io.TextIOWrapper(zm).readlines()
+    return []
+
+def cacheWeather(path, weather):
+    global weather_bytes
+    weather_cache[path] = weather
+    weather.cached = True
+    weather_bytes += weather.size
+    trimCache()
+
+def uncacheWeather(path):
+    global weather_bytes
+    weather = weather_cache.pop(path)
+    weather.cached = False
+    weather_bytes -= weather.size
+
+def trimCache():
+    # least recently used out; the running total saves adding up the whole cache each time
+    while weather_bytes > CACHE_BYTES and len(weather_cache) > 1:
+        uncacheWeather(next(iter(weather_cache)))
+
+def readWeather(filename):
+    # return the WeatherData for filename; from the cache if the file is unchanged
+    path = os.path.abspath(filename)
+    stamp = fileStamp(path)
+    try:
+        weather = weather_cache[path]
+        if weather.stamp == stamp:
+            weather_cache.move_to_end(path)
+            return weather
+        uncacheWeather(path) # file has changed
+    except KeyError:
+        pass
+    if path[-4:] in ['.srz', '.smz']:
+        lines = memberLines(path)
+    else:
+        with open(path, 'r') as tf:
+            lines = tf.readlines()
+    weather = WeatherData(filename, stamp, lines)
+    cacheWeather(path, weather)
+    return weather
+
+def resourceFile(filename, temp_dir=None):
+    # SAM's solar modules need a file name so zipped files are written, once, to temp_dir
+    if filename[-4:] not in ['.srz', '.smz']:
+        return filename
+    if temp_dir is None:
+        temp_dir = tempfile.gettempdir()
+    path = os.path.abspath(filename)
+    stamp = fileStamp(path)
+    try:
+        if resource_files[path][:2] == stamp and os.path.exists(resource_files[path][2]):
+            return resource_files[path][2]
+    except KeyError:
+        pass
+    weather = readWeather(path)
+    resource_file = os.path.join(temp_dir, os.path.basename(path)[:-1] + 'w')
+    with open(resource_file, 'w') as wf:
+        wf.writelines(weather.lines)
+    resource_files[path] = stamp + [resource_file]
+    return resource_file
+
+def removeResourceFiles():
+    for path in list(resource_files.keys()):
+        try:
+            os.remove(resource_files[path][2])
+        except:
+            pass
+        del resource_files[path]
+
+def hubLaw(law):
+    if law.lower()[0] == 'l':
+        return 'logarithmic'
+    return 'hellmann'
+
+def hubCacheName(path, height, law):
+    folder, name = os.path.split(path)
+    return os.path.join(folder, '.hubcache', f'{name}_{height:g}_{law}.npz')
+
+def readHubCache(path, key):
+    try:
+        cache_file = hubCacheName(path, key[3], key[4])
+        with np.load(cache_file, allow_pickle=False) as npz:
+            details = json.loads(str(npz['details']))
+            if details['version'] != HUB_VERSION or details['key'] != list(key[1:]):
+                return None
+            hub = {'header': details['header'], 'heights': details['heights'], 'fields': details['fields'],
+                   'data': None}
+            if 'data' in npz:
+                hub['data'] = npz['data']
+        os.utime(cache_file) # recently used
+        return hub
+    except:
+        return None
+
+def writeHubCache(path, key, hub):
+    cache_file = hubCacheName(path, key[3], key[4])
+    # a work file for each writer; SAM workers can save the same file at the same time
+    work_file = f'{cache_file}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        details = {'version': HUB_VERSION, 'key': list(key[1:]), 'header': hub['header'],
+                   'heights': hub['heights'], 'fields': hub['fields']}
+        arrays = {'details': np.array(json.dumps(details))}
+        if hub['data'] is not None:
+            arrays['data'] = hub['data']
+        with open(work_file, 'wb') as wf:
+            np.savez(wf, **arrays)
+        os.replace(work_file, cache_file)
+    except:
+        try:
+            os.remove(work_file)
+        except:
+            pass
+        return
+    # least recently used out
+    cache_dir = os.path.dirname(cache_file)
+    files = []
+    total = 0
+    for fil in os.listdir(cache_dir):
+        if fil[-4:] == '.tmp': # still being written
+            continue
+        try:
+            stat = os.stat(os.path.join(cache_dir, fil))
+        except:
+            continue
+        files.append([stat.st_mtime_ns, stat.st_size, fil])
+        total += stat.st_size
+    files.sort()
+    while total > HUB_DISK_BYTES and len(files) > 1:
+        mtime, size, fil = files.pop(0)
+        try:
+            os.remove(os.path.join(cache_dir, fil))
+        except:
+            pass
+        total -= size
+
+def windFields(weather):
+    # heights, SAM fields and values of the columns of a wind file that SAM's wind_resource_data takes
+    names = weather.data.dtype.names
+    heights = []
+    fields = []
+    columns = []
+    hghts = weather.lines[4].rstrip(',\n').split(',')
+    for j, name in enumerate(weather.lines[2].rstrip(',\n').split(',')):
+        try:
+            field = wind_fields[name.strip().lower()]
+            hght = float(hghts[j])
+        except (IndexError, KeyError, ValueError):
+            continue
+        fields.append(field)
+        heights.append(hght)
+        columns.append(weather.data[names[j]])
+    return heights, fields, columns
+
+def hubTable(weather, tgt_height, law):
+    # the resource table for a wind file with its speeds extrapolated to tgt_height: the file's header
+    # lines then heights, fields and data (hours x columns) as for SAM's wind_resource_data.
+    # data is None if the file has speeds at that height
+    hub = {'header': weather.lines[:5], 'heights': [], 'fields': [], 'data': None}
+    cols = windColumns(weather.lines, tgt_height)
+    if cols is None:
+        return hub
+    height, col, height0, col0, cold = cols
+    names = weather.data.dtype.names
+    hub['heights'], hub['fields'], columns = windFields(weather)
+    speedz = extrapolateSpeed(weather.data[names[col]], weather.data[names[col0]], height, height0,
+                              tgt_height, law=law)
+    hub['fields'].extend([4, 3])
+    hub['heights'].extend([float(tgt_height), float(tgt_height)])
+    columns.extend([weather.data[names[cold]], speedz])
+    hub['data'] = np.column_stack(columns)
+    return hub
+
+def windResourceData(wind_file):
+    # the resource table (see hubTable) for a wind file as it is, so SAM can be given a
+    # zipped file's data rather than a copy of the file
+    weather = readWeather(wind_file)
+    heights, fields, columns = windFields(weather)
+    return {'header': weather.lines[:5], 'heights': heights, 'fields': fields, 'data': np.column_stack(columns)}
+
+def hubSize(hub):
+    if hub['data'] is None:
+        return 1024
+    return hub['data'].nbytes + 1024
+
+def hubResource(wind_file, tgt_height, law='logarithmic', spread=None, disk=False):
+    # return the hub resource (see hubTable) for wind_file at tgt_height or None if the file
+    # has speeds at (or within spread of) that height. The cache is checked before the file is read
+    global hub_bytes
+    path = os.path.abspath(wind_file)
+    stamp = fileStamp(path)
+    key = (path, stamp[0], stamp[1], float(tgt_height), hubLaw(law))
+    try:
+        hub = hub_cache[key]
+        hub_cache.move_to_end(key)
+    except KeyError:
+        hub = None
+        if disk:
+            hub = readHubCache(path, key)
+        if hub is None:
+            hub = hubTable(readWeather(path), tgt_height, key[4])
+            if disk:
+                writeHubCache(path, key, hub)
+        hub_cache[key] = hub
+        hub_bytes += hubSize(hub)
+        while hub_bytes > HUB_CACHE_BYTES and len(hub_cache) > 1:
+            old_key, old_hub = hub_cache.popitem(last=False)
+            hub_bytes -= hubSize(old_hub)
+    if hub['data'] is None or windColumns(hub['header'], tgt_height, spread=spread) is None:
+        return None
+    return hub